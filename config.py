@@ -32,10 +32,286 @@ DOCKING_CONFIG = {
     'num_modes': 20       # Jumlah pose yang dihasilkan
 }
 
+# Binding site (box) per receptor. Setiap ligan di-docking ke semua site dan
+# hasil disimpan per site; box di sini menimpa center/size di DOCKING_CONFIG.
+DOCKING_SITES = {
+    'atp': {
+        'center_x': -9.7, 'center_y': 1.4, 'center_z': 62.1,
+        'size_x': 25, 'size_y': 25, 'size_z': 25
+    },
+    # Contoh pocket tambahan (sesuaikan koordinat dengan struktur yang dipakai):
+    # 'allosteric': {
+    #     'center_x': 0.0, 'center_y': 0.0, 'center_z': 0.0,
+    #     'size_x': 20, 'size_y': 20, 'size_z': 20
+    # },
+}
+
+# Box per ligan dari radius of gyration (sisi = scale x Rg), center tetap di site
+BOX_SIZING_CONFIG = {
+    'enabled': False,
+    'scale': 2.857,       # Skala yang direkomendasikan untuk Vina
+    'min_size': 10,       # Angstrom
+    'max_size': 25        # Batas atas (juga tidak melebihi box site)
+}
+
+# Seeding dari ligan ko-kristal (erlotinib/AQ4 di 1M17): core MCS ditempatkan di
+# koordinat kristal lalu docking dimulai dari seed dengan pencarian yang diperkecil
+TEMPLATE_SEEDING_CONFIG = {
+    'enabled': False,
+    'reference_pdb_id': EGFR_PDB_ID,
+    'reference_resname': 'AQ4',
+    'reference_smiles': 'COCCOc1cc2ncnc(Nc3cccc(C#C)c3)c2cc1OCCOC',  # Untuk bond order ligan kristal
+    'site': 'atp',                  # Site di DOCKING_SITES tempat ligan referensi berada
+    'min_core_atoms': 10,           # MCS lebih kecil dari ini: docking global biasa
+    'local_only_fraction': 0.9,     # Core >= fraksi heavy atom ini: minimisasi lokal saja
+    'reduced_exhaustiveness': 4,    # Exhaustiveness untuk pencarian tereduksi di sekitar seed
+    'box_padding': 4.0,             # Angstrom di sekitar seed untuk box tereduksi
+    'mcs_timeout': 10               # Detik per pencarian MCS
+}
+
+# Warm start re-docking dari pose teratas run sebelumnya (box site digeser sedikit atau
+# receptor diganti struktur yang mirip): minimisasi lokal + pencarian global tereduksi,
+# docking penuh hanya jika skor bergeser lebih dari drift_threshold
+WARM_START_CONFIG = {
+    'enabled': False,
+    'previous_receptor': None,      # Receptor run sebelumnya di results store (None: receptor yang sama)
+    'top_k': 3,                     # Jumlah pose lama yang diminimisasi ulang
+    'exhaustiveness': 4,            # Exhaustiveness pencarian global tereduksi
+    'box_padding': 4.0,             # Angstrom di sekitar pose lama untuk box tereduksi
+    'drift_threshold': 1.0          # kcal/mol; pergeseran lebih besar dieskalasi ke docking penuh
+}
+
+# Backend docking dan preparasi receptor. 'auto' memilih backend tercepat yang
+# tersedia dari probe (di-cache); isi nama backend untuk memaksa pilihan. Engine
+# numpy hanya dipilih mode 'auto' jika tidak ada backend Vina yang tersedia
+BACKEND_CONFIG = {
+    'docking': 'auto',                                  # 'auto', 'vina-python', 'vina-cli', atau 'fake' (uji)
+    'docking_candidates': ['vina-python', 'vina-cli', 'numpy'],  # Kandidat mode auto (urutan = prioritas tanpa timing)
+    'receptor_prep': 'auto',                            # 'auto', 'mgltools', atau 'obabel'
+    'receptor_candidates': ['mgltools', 'obabel'],
+    'calibration_ligand': None,                         # Ligan untuk probe timing (None = ligan pertama)
+    'probe_cache': os.path.join(RESULTS_DIR, 'backend_probe.json')
+}
+
+# Engine docking NumPy (backend 'numpy'): fallback tanpa binary vina. Rantai Monte
+# Carlo = exhaustiveness, dibagi ke max_workers proses; tiap langkah diikuti BFGS lokal
+NUMPY_ENGINE_CONFIG = {
+    'max_workers': None,      # None = semua core
+    'spacing': 0.375,         # Angstrom, resolusi grid map
+    'cache_dir': os.path.join(RESULTS_DIR, 'grid_cache'),
+    'mc_steps': 400,          # Langkah Monte Carlo per rantai
+    'local_steps': 10,        # Iterasi BFGS per langkah
+    'temperature': 1.2,       # Suhu Metropolis (kcal/mol), sama dengan Vina
+    'min_rmsd': 1.0           # RMSD minimum antar pose output
+}
+
+# Scheduler: paralelisme antar job (ligan, site)
+SCHEDULER_CONFIG = {
+    'max_workers': 4,     # Job vina CLI yang berjalan bersamaan
+    'cpu_per_job': 2      # Thread per job vina CLI (0 = semua core)
+}
+
+# Clustering pose berdasarkan RMSD (symmetry-aware); hanya satu pose
+# representatif per cluster yang disimpan, beserta populasi cluster
+CLUSTERING_CONFIG = {
+    'enabled': True,
+    'rmsd_cutoff': 2.0,       # Angstrom, atom berat
+    'method': 'leader',       # 'leader' atau 'hierarchical' (complete linkage)
+    'symmetry': True,         # Minimum RMSD atas permutasi atom yang ekuivalen
+    'max_permutations': 64
+}
+
+# Time budget per ligan (docking dipecah menjadi beberapa run pendek,
+# pose terbaik yang sudah ditemukan tetap disimpan jika budget habis)
+TIME_BUDGET_CONFIG = {
+    'enabled': True,
+    'slices': 4,                    # Jumlah run Vina per ligan (exhaustiveness dibagi rata)
+    'budget_factor': 1.5,           # Budget = prediksi cost model x faktor ini
+    'min_seconds': 60,
+    'max_seconds': 1800
+}
+
+# Cost model waktu docking (urutan job terlama dulu, timeout per job dan ETA batch)
+COST_MODEL_CONFIG = {
+    'min_samples': 20,              # Timing historis minimum sebelum model dikalibrasi
+    'max_samples': 5000,            # Hanya timing terbaru yang dipakai untuk fit
+    'ridge': 1e-3,
+    'timeout_factor': 3.0,          # Timeout = prediksi x faktor ini
+    'min_timeout': 120,
+    'max_timeout': 3600,
+    'prior': {                      # Estimasi awal sebelum kalibrasi
+        'base_seconds': 30,
+        'seconds_per_torsion': 20,          # Per rotatable bond (TORSDOF)
+        'seconds_per_heavy_atom': 2,
+        'reference_exhaustiveness': 8,
+        'reference_volume': 15625           # 25 x 25 x 25 A^3
+    }
+}
+
+# Results store ter-index (SQLite) sebagai output utama; Excel hanya export opsional
+RESULTS_STORE_CONFIG = {
+    'enabled': True,
+    'db_file': os.path.join(RESULTS_DIR, 'docking_results.sqlite'),
+    'export_excel': True,      # Export hasil query ke docking_results.xlsx
+    'excel_max_rows': 100000,  # Batas baris sheet All_Results (pose terbaik dulu)
+    'commit_every': 50,        # Hasil di-commit ke disk tiap N ligan...
+    'commit_seconds': 30,      # ...atau tiap N detik, mana yang lebih dulu
+    'summary_top_n': 50        # Jumlah ligan terbaik yang dimuat untuk visualisasi
+}
+
+# Pose store biner terkompresi (semua pose semua ligan, random access per ligan)
+POSE_STORE_CONFIG = {
+    'enabled': True,
+    'store_dir': os.path.join(RESULTS_DIR, 'pose_store'),
+    'chunk_size': 256         # Jumlah ligan per file chunk
+}
+
+# Work queue bersama untuk banyak worker (python main.py worker)
+WORK_QUEUE_CONFIG = {
+    'db_file': os.path.join(RESULTS_DIR, 'work_queue.sqlite'),
+    'chunk_size': 5,          # Jumlah ligan per task
+    'lease_seconds': 900,     # Task dikembalikan ke antrian jika tidak ada heartbeat
+    'heartbeat_seconds': 60,
+    'max_attempts': 3,
+    'journal_mode': 'WAL'     # Gunakan 'DELETE' jika database dipakai lintas node via NFS
+}
+
+# Rescoring NumPy dengan fungsi skor Vina (python main.py validate-scoring)
+SCORING_CONFIG = {
+    'grid_spacing': 0.375,    # Angstrom, sama dengan default AutoDock
+    'cache_dir': os.path.join(RESULTS_DIR, 'grid_cache'),
+    'validation_ligands': 20, # Jumlah ligan teratas yang dibandingkan dengan vina --score_only
+    'validation_file': 'scoring_validation.csv'
+}
+
+# Rescoring pose yang sudah ada dengan beberapa scoring function (python main.py rescore)
+RESCORING_CONFIG = {
+    'scoring_functions': ['vina', 'vinardo', 'ad4'],
+    'ad4_maps': None,         # Prefix map autogrid4 (misal 'data/proteins/1M17_clean'); tanpa ini ad4 dilewati
+    'max_workers': 4,         # Worker process; map dihitung sekali per (scoring function, site) per worker
+    'chunk_size': 50,         # File pose per task
+    'cpu': 1,
+    'minimize': False         # True: minimisasi lokal dengan tiap scoring function sebelum skor
+}
+
+# Fingerprint interaksi protein-ligan per pose (H-bond, hidrofobik, pi-stacking, salt bridge
+# per residu), disimpan sebagai bit terpack di results store (python main.py interactions)
+INTERACTION_CONFIG = {
+    'enabled': True,                # Hitung fingerprint setelah docking di pipeline lengkap
+    'cache_dir': os.path.join(RESULTS_DIR, 'ifp_cache'),  # Index spasial receptor (.npy, mmap antar worker)
+    'cell_size': 2.0,               # Angstrom per sel grid index
+    'max_workers': 4,
+    'chunk_size': 100,              # File pose per task
+    'key_interactions': ['MET793:hbond'],  # Filter default; 'MET793' saja = interaksi apa pun dengan residu
+}
+
+# Active learning untuk library besar (python main.py active-learning): docking subset acak,
+# latih surrogate (ensemble ridge pada Morgan fingerprint + deskriptor), lalu docking batch
+# dengan prediksi terbaik dan paling tidak pasti sampai budget habis
+ACTIVE_LEARNING_CONFIG = {
+    'library': None,                # File .smi (SMILES nama per baris); None: TARGET_LIGANDS
+    'budget': 0.1,                  # Ligan yang di-docking: fraksi library (<= 1) atau jumlah
+    'seed_size': 1000,              # Subset acak pertama
+    'batch_size': 500,              # Ligan per iterasi
+    'exploit_fraction': 0.5,        # Bagian batch dari prediksi terbaik; sisanya paling tidak pasti
+    'n_models': 5,                  # Ensemble bootstrap (std = ketidakpastian)
+    'alpha': 10.0,                  # Regularisasi ridge
+    'radius': 2,                    # Morgan fingerprint
+    'n_bits': 1024,
+    'top_fraction': 0.01,           # Recall top 1% dilaporkan pada benchmark
+    'seed': 42,
+    'max_workers': 4                # Featurisasi paralel
+}
+
+# Index Morgan fingerprint on-disk untuk hit expansion (python main.py similar); diisi
+# otomatis saat preparasi ligan atau sekaligus dari file library (build-fp-index)
+FINGERPRINT_INDEX_CONFIG = {
+    'enabled': True,
+    'index_dir': os.path.join(DATA_DIR, 'fingerprint_index'),
+    'radius': 2,
+    'n_bits': 2048,
+    'max_workers': 4,               # Proses untuk build dan pencarian
+    'chunk_rows': 200000,           # Baris index per task pencarian
+    'top_k': 50,                    # Hit per query
+    'query_top_n': 10               # Query default: N ligan terbaik di results store
+}
+
+# Pipeline DAG (python main.py run / stage): manifest hash per stage untuk melewati stage
+# yang up to date; stage independen (receptor dan ligan) berjalan paralel
+PIPELINE_CONFIG = {
+    'manifest_dir': os.path.join(RESULTS_DIR, 'manifests'),
+    'max_workers': 2                # Stage paralel maksimum
+}
+
+# Mode streaming: ligan yang selesai dipreparasi langsung masuk antrian docking (stage
+# ligands digabung ke dock); antrian terbatas menahan preparasi jika docking tertinggal
+STREAMING_CONFIG = {
+    'enabled': False,
+    'prep_workers': 2,              # Thread preparasi ligan (masing-masing 1 slot CPU)
+    'queue_size': 32,               # Ligan siap docking maksimum di antrian
+    'cpu_budget': None,             # Core bersama preparasi + docking (None = semua core)
+    'prep_slots': 1                 # Core yang selalu disisakan untuk preparasi (docking maks. cpu_budget - prep_slots)
+}
+
+# Runner asyncio untuk tool eksternal (vina, obabel, prepare_receptor4.py): batas proses
+# bersamaan per tool; proses yang timeout dihentikan bersama process group-nya
+TOOL_RUNNER_CONFIG = {
+    'limits': {                     # None = default (vina: jumlah core, obabel: 2x core)
+        'vina': None,
+        'obabel': None,
+        'prepare_receptor4.py': 2
+    },
+    'default_limit': None,          # Tool lain (None = jumlah core)
+    'kill_grace': 5.0               # Detik antara SIGTERM dan SIGKILL
+}
+
+# Funnel screening bertahap (python main.py funnel); stage dijalankan berurutan dan
+# survivor tiap stage dipromosikan ke stage berikutnya (top_n, top_fraction, max_score)
+FUNNEL_CONFIG = {
+    'library': None,                # File .smi; None: library active learning / TARGET_LIGANDS
+    'state_dir': os.path.join(RESULTS_DIR, 'funnel'),  # State stage (cache/resume) dan pose per stage
+    'max_workers': 4,               # Proses filter 2D; docking memakai SCHEDULER_CONFIG
+    'chunk_size': 1000              # Ligan per chunk filter/docking (progres tersimpan per chunk)
+}
+
+FUNNEL_STAGES = [
+    {'name': 'filter_2d', 'type': 'filter',
+     'filters': {'mw_max': 500, 'logp_max': 5, 'hbd_max': 5, 'hba_max': 10, 'rotatable_bonds_max': 10}},
+    {'name': 'dock_fast', 'type': 'dock',
+     'docking': {'exhaustiveness': 4, 'num_modes': 3},
+     'promote': {'top_fraction': 0.05}},
+    {'name': 'dock_accurate', 'type': 'dock',
+     'docking': {'exhaustiveness': 32},
+     'promote': {'top_n': 500}},
+    {'name': 'rescore', 'type': 'rescore',
+     'scoring_functions': ['vina', 'vinardo'],
+     'score': 'consensus',          # 'consensus' (z-score) atau kolom score_<sf>
+     'promote': {'top_n': 100}}
+]
+
+# Export pose docking ke SDF.gz dengan bond order dari molekul sumber
+SDF_EXPORT_CONFIG = {
+    'enabled': True,
+    'best_pose_only': False,
+    'max_workers': 4                # Worker process untuk pemetaan pose ke molekul sumber
+}
+
 # Output files
 OUTPUT_FILES = {
     'protein_prepared': 'egfr_prepared.pdbqt',
     'docking_results': 'docking_results.xlsx',
+    'refined_results': 'refined_results.csv',
+    'box_benchmark': 'benchmark_box_sizing.csv',
+    'engine_benchmark': 'benchmark_docking_engines.csv',
+    'docked_sdf': 'docked_poses.sdf.gz',
+    'consensus_scores': 'consensus_scores.csv',
+    'interaction_hits': 'interaction_hits.csv',
+    'active_learning': 'active_learning.csv',
+    'active_learning_benchmark': 'active_learning_benchmark.csv',
+    'similar_ligands': 'similar_ligands.csv',
+    'funnel_report': 'funnel_report.csv',
+    'funnel_hits': 'funnel_hits.csv',
+    'docking_json': 'docking_results.json',
     'visualization_html': 'docking_visualization.html',
     'analysis_report': 'analysis_report.pdf'
 }
\ No newline at end of file
@@ -6,18 +6,42 @@ Automasi penuh dari download data hingga analisis
 
 import os
 import sys
+import json
 import logging
+import glob
+import argparse
 import traceback
+import pandas as pd
 from datetime import datetime
 from config import *
 from scripts.protein_prep import ProteinPreparator
-from scripts.ligand_prep import LigandPreparator
+from scripts.ligand_prep import LigandPreparator, read_smiles_library
 from scripts.docking import AutoDockVina
 from scripts.visualization import ResultVisualizer
+from scripts.work_queue import WorkQueue, LeaseHeartbeat, default_worker_id
+from scripts.pose_store import PoseStore
+from scripts.results_store import ResultsStore, receptor_name
+from scripts.pose_store import pose_key
+from scripts.backends import (DOCKING_BACKENDS, BackendProbe, select_backend, select_receptor_backends,
+                              docking_calibration)
+from scripts.vina_scoring import VinaScorer, validate_against_vina
+from scripts.cost_model import DockingCostModel
+from scripts.benchmarks import benchmark_box_sizing, benchmark_docking_engines
+from scripts.template_seeding import TemplateSeeder, extract_reference_ligand
+from scripts.sdf_export import PoseSDFExporter
+from scripts.rescoring import MultiScoreRescorer
+from scripts.warm_start import WarmStartPlanner
+from scripts.interactions import InteractionProfiler
+from scripts.active_learning import ActiveLearningScreen, DockingOracle
+from scripts.fingerprint_index import FingerprintIndex
+from scripts.funnel import ScreeningFunnel
+from scripts.pipeline_dag import PipelineDAG, Stage
+from scripts.streaming import StreamingScreen, CpuBudget
+from scripts.tool_runner import configure_runner
 
-def setup_logging():
+def setup_logging(name='docking'):
     """Setup logging untuk tracking proses"""
-    log_file = os.path.join(RESULTS_DIR, f'docking_log_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log')
+    log_file = os.path.join(RESULTS_DIR, f'{name}_log_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log')
     logging.basicConfig(
         level=logging.INFO,
         format='%(asctime)s - %(levelname)s - %(message)s',
@@ -26,7 +50,14 @@ def setup_logging():
             logging.StreamHandler(sys.stdout)
         ]
     )
-    return logging.getLogger(__name__)
+    logger = logging.getLogger(__name__)
+    configure_tool_runner(logger)
+    return logger
+
+def configure_tool_runner(logger):
+    """Runner tool eksternal bersama dari TOOL_RUNNER_CONFIG (stderr tool masuk log debug)"""
+    limits = {tool: limit for tool, limit in TOOL_RUNNER_CONFIG['limits'].items() if limit is not None}
+    configure_runner(logger, limits, TOOL_RUNNER_CONFIG['default_limit'], TOOL_RUNNER_CONFIG['kill_grace'])
 
 def create_directories():
     """Buat folder-folder yang dibutuhkan"""
@@ -35,61 +66,828 @@ def create_directories():
         os.makedirs(directory, exist_ok=True)
         print(f"✓ Directory created/exists: {directory}")
 
-def main():
-    """Fungsi utama untuk menjalankan docking simulation"""
-    print("🧬 EGFR Docking Simulation Started")
+def prepare_inputs(logger, results_store=None):
+    """Step 1 dan 2: preparasi protein dan ligan"""
+    # Step 1: Preparasi Protein
+    print("\n📥 Step 1: Downloading and Preparing EGFR Protein...")
+    protein_prep = ProteinPreparator(PROTEIN_DIR, logger, create_receptor_backends(logger))
+    protein_file = None
+    for pdb_id in [EGFR_PDB_ID] + BACKUP_PDB_IDS:
+        protein_file = protein_prep.prepare_protein(pdb_id)
+        if protein_file:
+            break
+        logger.warning(f"Protein preparation failed for {pdb_id}, trying next backup structure")
+    if not protein_file:
+        raise Exception("Failed to prepare protein")
+    print(f"✓ Protein prepared: {protein_file}")
+    
+    # Step 2: Preparasi Ligand
+    print("\n🧪 Step 2: Preparing Ligands...")
+    ligand_prep = LigandPreparator(LIGAND_DIR, logger, results_store, create_fingerprint_index(logger))
+    ligand_files = ligand_prep.prepare_ligands(TARGET_LIGANDS)
+    if not ligand_files:
+        raise Exception("Failed to prepare ligands")
+    print(f"✓ {len(ligand_files)} ligands prepared")
+    
+    return protein_file, ligand_files
+
+def receptor_pdb_id():
+    """PDB ID receptor yang sudah dipreparasi, dengan urutan fallback prepare_inputs
+    (EGFR_PDB_ID lalu BACKUP_PDB_IDS); EGFR_PDB_ID jika belum ada yang dipreparasi"""
+    for pdb_id in [EGFR_PDB_ID] + BACKUP_PDB_IDS:
+        if os.path.exists(prepared_receptor_file(pdb_id)):
+            return pdb_id
+    return EGFR_PDB_ID
+
+def prepared_receptor_file(pdb_id=None):
+    """File PDBQT receptor hasil prepare_inputs (default: receptor_pdb_id)"""
+    return os.path.join(PROTEIN_DIR, f"{pdb_id or receptor_pdb_id()}_clean.pdbqt")
+
+def create_template_seeder(logger):
+    """TemplateSeeder dari ligan ko-kristal jika TEMPLATE_SEEDING_CONFIG aktif (None jika tidak)"""
+    config = TEMPLATE_SEEDING_CONFIG
+    if not config['enabled']:
+        return None
+    
+    pdb_file = ProteinPreparator(PROTEIN_DIR, logger).download_pdb(config['reference_pdb_id'])
+    if not pdb_file:
+        logger.warning("Reference structure unavailable, docking without template seeds")
+        return None
+    try:
+        reference, bond_orders = extract_reference_ligand(pdb_file, config['reference_resname'],
+                                                          config['reference_smiles'])
+    except Exception as e:
+        logger.warning(f"Could not extract reference ligand, docking without template seeds: {str(e)}")
+        return None
+    
+    return TemplateSeeder(reference, LigandPreparator(LIGAND_DIR, logger), logger, config, bond_orders)
+
+def prepare_seeds(logger, ligand_dict):
+    """Seed ligan {nama: SMILES} yang akan di-docking dari ligan ko-kristal (None jika seeding tidak aktif)"""
+    if not TEMPLATE_SEEDING_CONFIG['enabled']:
+        return None
+    
+    print("\n🧩 Preparing template seeds from co-crystal ligand...")
+    seeder = create_template_seeder(logger)
+    if seeder is None:
+        return None
+    seeds = seeder.seed_ligands(ligand_dict)
+    print(f"✓ {len(seeds)} of {len(ligand_dict)} ligands seeded from {TEMPLATE_SEEDING_CONFIG['reference_resname']}")
+    return seeds
+
+def create_results_store(logger):
+    """Buat ResultsStore dari RESULTS_STORE_CONFIG (None jika dinonaktifkan)"""
+    if not RESULTS_STORE_CONFIG['enabled']:
+        return None
+    return ResultsStore(
+        RESULTS_STORE_CONFIG['db_file'],
+        logger,
+        commit_every=RESULTS_STORE_CONFIG['commit_every'],
+        commit_seconds=RESULTS_STORE_CONFIG['commit_seconds']
+    )
+
+def create_fingerprint_index(logger):
+    """FingerprintIndex dari FINGERPRINT_INDEX_CONFIG (None jika dinonaktifkan)"""
+    if not FINGERPRINT_INDEX_CONFIG['enabled']:
+        return None
+    return FingerprintIndex(FINGERPRINT_INDEX_CONFIG['index_dir'], logger, FINGERPRINT_INDEX_CONFIG['radius'],
+                            FINGERPRINT_INDEX_CONFIG['n_bits'])
+
+def export_excel(results_store):
+    """Export Excel opsional dari results store"""
+    if results_store is not None and RESULTS_STORE_CONFIG['export_excel']:
+        results_store.export_excel(os.path.join(RESULTS_DIR, OUTPUT_FILES['docking_results']),
+                                   max_rows=RESULTS_STORE_CONFIG['excel_max_rows'])
+
+def export_sdf(logger, results_store, best_pose_only=None):
+    """Export pose dari results store ke satu SDF.gz (bond order dari ligand prep)"""
+    if results_store is None:
+        return None
+    if best_pose_only is None:
+        best_pose_only = SDF_EXPORT_CONFIG['best_pose_only']
+    exporter = PoseSDFExporter(LIGAND_DIR, logger, SDF_EXPORT_CONFIG['max_workers'])
+    return exporter.export(results_store, os.path.join(RESULTS_DIR, OUTPUT_FILES['docked_sdf']),
+                           best_pose_only=best_pose_only)
+
+def create_backend_probe(logger):
+    """Probe backend dengan cache dari BACKEND_CONFIG"""
+    return BackendProbe(BACKEND_CONFIG['probe_cache'], logger)
+
+def create_receptor_backends(logger):
+    """Backend preparasi receptor sesuai BACKEND_CONFIG (terpilih dulu, sisanya fallback)"""
+    return select_receptor_backends(BACKEND_CONFIG['receptor_prep'], logger, create_backend_probe(logger),
+                                    candidates=BACKEND_CONFIG['receptor_candidates'])
+
+def backend_options():
+    """Argumen konstruktor per backend docking dari config"""
+    return {'numpy': NUMPY_ENGINE_CONFIG}
+
+def create_docking_backend(logger, protein_file=None, ligand_files=None):
+    """Backend docking sesuai BACKEND_CONFIG; 'auto' memilih yang tercepat pada ligan kalibrasi
+    
+    Tanpa protein/ligan (misal worker) dipakai hasil probe tercache atau ketersediaan saja.
+    """
+    calibrate = None
+    if protein_file and ligand_files:
+        ligand_name = BACKEND_CONFIG['calibration_ligand'] or next(iter(ligand_files))
+        calibrate = docking_calibration(protein_file, ligand_files[ligand_name],
+                                        dict(DOCKING_CONFIG, **next(iter(DOCKING_SITES.values()), {})))
+    return select_backend('docking', DOCKING_BACKENDS, BACKEND_CONFIG['docking'], logger,
+                          create_backend_probe(logger), calibrate, BACKEND_CONFIG['docking_candidates'],
+                          backend_options())
+
+def create_cost_model(logger, results_store=None):
+    """Cost model dari COST_MODEL_CONFIG, dikalibrasi dari timing di results store"""
+    cost_model = DockingCostModel(logger, **COST_MODEL_CONFIG)
+    cost_model.calibrate(results_store)
+    return cost_model
+
+def create_warm_start(logger, results_store, pose_store, receptor, work_dir=RESULTS_DIR):
+    """WarmStartPlanner dari WARM_START_CONFIG (None jika dinonaktifkan atau tanpa results store)"""
+    if not WARM_START_CONFIG['enabled'] or results_store is None or receptor is None:
+        return None
+    return WarmStartPlanner(results_store, work_dir, logger, WARM_START_CONFIG, receptor, pose_store)
+
+def create_docker(logger, results_store=None, protein_file=None, ligand_files=None, results_dir=RESULTS_DIR,
+                  receptor=None, pose_store_dir=None):
+    """AutoDockVina dengan pose store, results store, backend dan cost model dari config
+    
+    receptor: nama receptor hasil di results store (default nama file protein);
+    pose_store_dir: pose store terpisah (misal per stage funnel) selain store global.
+    """
+    pose_store = create_pose_store(logger, pose_store_dir)
+    if receptor is None and protein_file is not None:
+        receptor = receptor_name(protein_file)
+    return AutoDockVina(results_dir, logger, pose_store, results_store,
+                        create_docking_backend(logger, protein_file, ligand_files), CLUSTERING_CONFIG,
+                        create_cost_model(logger, results_store), BOX_SIZING_CONFIG,
+                        create_warm_start(logger, results_store, pose_store, receptor, results_dir))
+
+def scheduler_settings(backend):
+    """Docking config dengan cpu per job dan jumlah worker untuk scheduler (dari backend docking)"""
+    docking_config = dict(DOCKING_CONFIG, cpu=SCHEDULER_CONFIG['cpu_per_job'])
+    # Backend in-process sudah memakai semua core di dalam satu dock
+    max_workers = 1 if backend.in_process else SCHEDULER_CONFIG['max_workers']
+    return docking_config, max_workers
+
+def create_pose_store(logger, store_dir=None):
+    """Buat PoseStore dari POSE_STORE_CONFIG (None jika dinonaktifkan)"""
+    if not POSE_STORE_CONFIG['enabled']:
+        return None
+    return PoseStore(store_dir or POSE_STORE_CONFIG['store_dir'], logger, POSE_STORE_CONFIG['chunk_size'])
+
+def create_work_queue(logger):
+    """Buat WorkQueue dari WORK_QUEUE_CONFIG"""
+    return WorkQueue(
+        WORK_QUEUE_CONFIG['db_file'],
+        logger,
+        lease_seconds=WORK_QUEUE_CONFIG['lease_seconds'],
+        max_attempts=WORK_QUEUE_CONFIG['max_attempts'],
+        journal_mode=WORK_QUEUE_CONFIG['journal_mode']
+    )
+
+def run_enqueue():
+    """Preparasi input lalu masukkan semua ligan ke work queue"""
+    print("🧬 EGFR Docking Simulation - Enqueue")
     print("=" * 50)
     
-    # Setup
-    logger = setup_logging()
+    logger = setup_logging('enqueue')
     create_directories()
     
-    try:
-        # Step 1: Preparasi Protein
-        print("\n📥 Step 1: Downloading and Preparing EGFR Protein...")
-        protein_prep = ProteinPreparator(PROTEIN_DIR, logger)
-        protein_file = protein_prep.prepare_egfr_protein(EGFR_PDB_ID, BACKUP_PDB_IDS)
-        if not protein_file:
-            raise Exception("Failed to prepare protein")
-        print(f"✓ Protein prepared: {protein_file}")
-        
-        # Step 2: Preparasi Ligand
-        print("\n🧪 Step 2: Preparing Ligands...")
-        ligand_prep = LigandPreparator(LIGAND_DIR, logger)
-        ligand_files = ligand_prep.prepare_ligands(TARGET_LIGANDS)
-        if not ligand_files:
-            raise Exception("Failed to prepare ligands")
-        print(f"✓ {len(ligand_files)} ligands prepared")
+    results_store = create_results_store(logger)
+    protein_file, ligand_files = prepare_inputs(logger, results_store)
+    
+    # Ligan terlama di-enqueue lebih dulu sehingga worker mengambilnya di awal (LPT)
+    cost_model = create_cost_model(logger, results_store)
+    predicted = {ligand_name: sum(cost_model.predict_job(ligand_file, dict(DOCKING_CONFIG, **box))
+                                  for box in DOCKING_SITES.values())
+                 for ligand_name, ligand_file in ligand_files.items()}
+    ligand_files = dict(sorted(ligand_files.items(), key=lambda item: predicted[item[0]], reverse=True))
+    
+    # Probe backend sekali di sini; worker memakai hasil probe tercache
+    create_docking_backend(logger, protein_file, ligand_files)
+    
+    queue = create_work_queue(logger)
+    queue.initialize(protein_file, dict(DOCKING_CONFIG, cpu=SCHEDULER_CONFIG['cpu_per_job']),
+                     TIME_BUDGET_CONFIG, DOCKING_SITES,
+                     prepare_seeds(logger, {name: TARGET_LIGANDS[name] for name in ligand_files}),
+                     TEMPLATE_SEEDING_CONFIG['site'])
+    n_tasks = queue.enqueue(ligand_files, WORK_QUEUE_CONFIG['chunk_size'])
+    
+    print(f"✓ {len(ligand_files)} ligands enqueued in {n_tasks} tasks: {WORK_QUEUE_CONFIG['db_file']}")
+    print("👉 Start any number of workers with: python main.py worker")
+
+def run_worker(max_tasks=None):
+    """Ambil task dari work queue, jalankan docking dan commit hasilnya"""
+    worker_id = default_worker_id()
+    logger = setup_logging(f'worker_{os.getpid()}')
+    queue = create_work_queue(logger)
+    settings = queue.get_settings()
+    
+    sites = settings.get('sites') or {'default': {}}
+    seeds = settings.get('seeds')
+    results_store = create_results_store(logger)
+    docker = create_docker(logger, results_store, settings['protein_file'])
+    pose_store = docker.pose_store
+    
+    # Sama dengan run_docking_batch: backend in-process tidak dipotong per slice
+    budget_config = settings.get('budget_config')
+    docking_config = settings['docking_config']
+    use_budget = docker.use_time_budget(budget_config)
+    if use_budget:
+        docking_config = dict(docking_config, slices=budget_config['slices'])
+    n_tasks = 0
+    logger.info(f"Worker {worker_id} started")
+    
+    while max_tasks is None or n_tasks < max_tasks:
+        task = queue.claim(worker_id)
+        if task is None:
+            break
+        task_id, ligand_files = task
+        logger.info(f"Worker {worker_id} claimed task {task_id} ({len(ligand_files)} ligands)")
         
-        # Step 3: Molecular Docking
-        print("\n🔬 Step 3: Running Molecular Docking...")
-        docker = AutoDockVina(RESULTS_DIR, logger)
-        docking_results = docker.run_docking_batch(
-            protein_file, 
-            ligand_files, 
-            DOCKING_CONFIG
-        )
+        try:
+            results = {}
+            with LeaseHeartbeat(queue, task_id, worker_id, WORK_QUEUE_CONFIG['heartbeat_seconds']) as heartbeat:
+                for ligand_name, ligand_file in ligand_files.items():
+                    for site, box in sites.items():
+                        if heartbeat.lease_lost:
+                            break
+                        job_file, site_config, local_only = docker.plan_job(
+                            ligand_name, ligand_file, docking_config, site, box,
+                            seeds if site == settings.get('seed_site') else None)
+                        predicted = docker.predict_job(job_file, site_config, local_only)
+                        time_budget = None
+                        if use_budget and not local_only:
+                            time_budget = docker.cost_model.time_budget(predicted, budget_config)
+                        result = docker.run_vina_docking(settings['protein_file'], job_file, ligand_name,
+                                                         site_config, time_budget, site,
+                                                         docker.cost_model.timeout(predicted), local_only)
+                        if result:
+                            results[pose_key(ligand_name, site)] = (ligand_name, result)
+            
+            if heartbeat.lease_lost:
+                logger.warning(f"Abandoning task {task_id}, lease was taken over")
+            else:
+                # Pose harus sudah di disk sebelum task ditandai selesai
+                if pose_store is not None:
+                    pose_store.flush()
+                if results_store is not None:
+                    results_store.add_results(list(results.values()), receptor_name(settings['protein_file']))
+                queue.complete(task_id, worker_id, {key: result for key, (_, result) in results.items()})
+        except Exception as e:
+            logger.error(f"Task {task_id} failed: {str(e)}")
+            queue.fail(task_id, worker_id, e)
+        n_tasks += 1
+    
+    docker.close()
+    logger.info(f"Worker {worker_id} finished after {n_tasks} tasks")
+    print(f"✓ Worker {worker_id} finished after {n_tasks} tasks")
+
+def run_status():
+    """Tampilkan jumlah task per status di work queue"""
+    logger = logging.getLogger(__name__)
+    counts = create_work_queue(logger).status()
+    for status in ('pending', 'leased', 'done', 'failed'):
+        print(f"{status:>8}: {counts.get(status, 0)}")
+
+def run_collect():
+    """Gabungkan hasil dari work queue dan simpan ke Excel"""
+    logger = setup_logging('collect')
+    results_store = create_results_store(logger)
+    if results_store is not None:
+        # Worker sudah menulis ke results store, cukup export
+        results_store.export_excel(os.path.join(RESULTS_DIR, OUTPUT_FILES['docking_results']),
+                                   max_rows=RESULTS_STORE_CONFIG['excel_max_rows'])
+        print(f"✓ Collected results for {len(results_store.summary())} ligands")
+        return
+    results = create_work_queue(logger).collect_results()
+    AutoDockVina(RESULTS_DIR, logger).save_results_to_excel(results)
+    print(f"✓ Collected results for {len(results)} ligands")
+
+def run_refine(poses_dir, site=None):
+    """Minimisasi lokal untuk semua file pose *.pdbqt di poses_dir (tanpa global search)"""
+    print("🧬 EGFR Docking Simulation - Local Optimization")
+    print("=" * 50)
+    
+    logger = setup_logging('refine')
+    protein_file = prepared_receptor_file()
+    pose_files = {os.path.splitext(os.path.basename(path))[0]: path
+                  for path in sorted(glob.glob(os.path.join(poses_dir, '*.pdbqt')))}
+    if not pose_files:
+        print(f"❌ No pose files found in {poses_dir}")
+        return
+    
+    docker = create_docker(logger)
+    docking_config, max_workers = scheduler_settings(docker.backend)
+    if site is not None:
+        docking_config = dict(docking_config, **DOCKING_SITES[site])
+    results = docker.refine_batch(protein_file, pose_files, docking_config, site, max_workers)
+    
+    rows = []
+    for ligand_name, result in results.items():
+        for pose, (refined, original, shift) in enumerate(zip(result['binding_affinities'],
+                                                              result['input_affinities'],
+                                                              result['pose_shift']), 1):
+            rows.append({'Ligand': ligand_name, 'Pose': pose, 'Refined_Affinity': refined,
+                         'Input_Affinity': original, 'Shift_RMSD': shift})
+    output_file = os.path.join(RESULTS_DIR, OUTPUT_FILES['refined_results'])
+    pd.DataFrame(rows).to_csv(output_file, index=False)
+    print(f"✓ Refined {len(results)} of {len(pose_files)} pose files: {output_file}")
+
+def run_benchmark_box():
+    """Benchmark box tetap vs box per ligan (Rg) pada TARGET_LIGANDS"""
+    print("🧬 EGFR Docking Simulation - Box Sizing Benchmark")
+    print("=" * 50)
+    
+    logger = setup_logging('benchmark_box')
+    create_directories()
+    protein_file, ligand_files = prepare_inputs(logger)
+    
+    site_config = dict(DOCKING_CONFIG, **next(iter(DOCKING_SITES.values()), {}))
+    backend = create_docking_backend(logger, protein_file, ligand_files)
+    try:
+        report = benchmark_box_sizing(protein_file, ligand_files, site_config, BOX_SIZING_CONFIG,
+                                      os.path.join(RESULTS_DIR, 'benchmark_box'), logger, backend=backend)
+    finally:
+        if backend is not None:
+            backend.close()
+    output_file = os.path.join(RESULTS_DIR, OUTPUT_FILES['box_benchmark'])
+    report.to_csv(output_file, index=False)
+    print(f"✓ Benchmark saved: {output_file}")
+
+def run_benchmark_engine():
+    """Benchmark engine NumPy vs Vina (kecepatan dan akurasi pose) pada TARGET_LIGANDS"""
+    print("🧬 EGFR Docking Simulation - Docking Engine Benchmark")
+    print("=" * 50)
+    
+    logger = setup_logging('benchmark_engine')
+    create_directories()
+    protein_file, ligand_files = prepare_inputs(logger)
+    
+    backends = {'numpy': select_backend('docking', DOCKING_BACKENDS, 'numpy', logger, options=backend_options())}
+    vina = select_backend('docking', DOCKING_BACKENDS, 'auto', logger, candidates=['vina-python', 'vina-cli'])
+    if vina is None:
+        print("⚠️  Vina not available, benchmarking the NumPy engine alone")
+    else:
+        backends['vina'] = vina
+    
+    site_config = dict(DOCKING_CONFIG, **next(iter(DOCKING_SITES.values()), {}))
+    try:
+        report = benchmark_docking_engines(protein_file, ligand_files, site_config, backends,
+                                           os.path.join(RESULTS_DIR, 'benchmark_engine'), logger)
+    finally:
+        for backend in backends.values():
+            backend.close()
+    output_file = os.path.join(RESULTS_DIR, OUTPUT_FILES['engine_benchmark'])
+    report.to_csv(output_file, index=False)
+    print(f"✓ Benchmark saved: {output_file}")
+
+def run_export_sdf(best_pose_only=False):
+    """Export semua pose di results store ke SDF.gz"""
+    logger = setup_logging('export_sdf')
+    output_file = export_sdf(logger, create_results_store(logger), best_pose_only)
+    if output_file:
+        print(f"✓ Poses exported: {output_file}")
+    else:
+        print("❌ SDF export failed, check the log file")
+
+def create_rescorer(results_store, logger, scoring_functions=None):
+    """MultiScoreRescorer dari RESCORING_CONFIG"""
+    return MultiScoreRescorer(results_store, logger, scoring_functions or RESCORING_CONFIG['scoring_functions'],
+                              RESCORING_CONFIG['max_workers'], RESCORING_CONFIG['chunk_size'],
+                              RESCORING_CONFIG['ad4_maps'], RESCORING_CONFIG['cpu'], RESCORING_CONFIG['minimize'])
+
+def run_rescore():
+    """Rescoring pose di results store dengan RESCORING_CONFIG lalu tulis skor konsensus"""
+    print("🧬 EGFR Docking Simulation - Multi-function Rescoring")
+    print("=" * 50)
+    
+    logger = setup_logging('rescore')
+    results_store = create_results_store(logger)
+    if results_store is None:
+        print("❌ Results store is disabled, nothing to rescore")
+        return
+    
+    protein_file = prepared_receptor_file()
+    rescorer = create_rescorer(results_store, logger)
+    counts = rescorer.rescore(protein_file, DOCKING_CONFIG, DOCKING_SITES)
+    if counts is None:
+        print("❌ Rescoring failed, check the log file")
+        return
+    
+    consensus = results_store.consensus(receptor_name(protein_file), RESCORING_CONFIG['scoring_functions'])
+    output_file = os.path.join(RESULTS_DIR, OUTPUT_FILES['consensus_scores'])
+    consensus.to_csv(output_file, index=False)
+    print(f"✓ Rescored poses ({', '.join(f'{sf}: {n}' for sf, n in counts.items())}): {output_file}")
+
+def compute_fingerprints(logger, results_store, protein_file, overwrite=False):
+    """Fingerprint interaksi untuk pose di results store yang belum punya fingerprint"""
+    profiler = InteractionProfiler(results_store, logger, INTERACTION_CONFIG['cache_dir'],
+                                   INTERACTION_CONFIG['max_workers'], INTERACTION_CONFIG['chunk_size'],
+                                   INTERACTION_CONFIG['cell_size'])
+    return profiler.fingerprint(protein_file, overwrite=overwrite)
+
+def run_interactions(require=None, exclude=None, best_pose_only=False, overwrite=False):
+    """Hitung fingerprint interaksi lalu filter pose berdasarkan interaksi kunci"""
+    print("🧬 EGFR Docking Simulation - Interaction Fingerprints")
+    print("=" * 50)
+    
+    logger = setup_logging('interactions')
+    results_store = create_results_store(logger)
+    if results_store is None:
+        print("❌ Results store is disabled, nothing to fingerprint")
+        return
+    
+    protein_file = prepared_receptor_file()
+    n_poses = compute_fingerprints(logger, results_store, protein_file, overwrite)
+    if n_poses is None:
+        print("❌ Fingerprinting failed, check the log file")
+        return
+    print(f"✓ Fingerprinted {n_poses} new poses")
+    
+    if require is None and exclude is None:
+        require = INTERACTION_CONFIG['key_interactions']
+    try:
+        hits = results_store.filter_interactions(receptor_name(protein_file), require or [], exclude or [],
+                                                 best_pose_only)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    output_file = os.path.join(RESULTS_DIR, OUTPUT_FILES['interaction_hits'])
+    hits.to_csv(output_file, index=False)
+    print(f"✓ {len(hits)} poses match (require: {', '.join(require or []) or '-'}, "
+          f"exclude: {', '.join(exclude or []) or '-'}): {output_file}")
+
+def run_active_learning(benchmark=False):
+    """Screening library dengan active learning; benchmark: replay skor docking penuh dari results store"""
+    print("🧬 EGFR Docking Simulation - Active Learning")
+    print("=" * 50)
+    
+    logger = setup_logging('active_learning')
+    create_directories()
+    results_store = create_results_store(logger)
+    if results_store is None:
+        print("❌ Active learning requires the results store")
+        return
+    
+    protein_file = prepared_receptor_file()
+    screen = ActiveLearningScreen(logger, ACTIVE_LEARNING_CONFIG)
+    if benchmark:
+        # Ligan yang sudah di-docking penuh menjadi benchmark; docking diganti skor tersimpan
+        scored = results_store.scored_ligands(receptor_name(protein_file))
+        if len(scored) < ACTIVE_LEARNING_CONFIG['seed_size']:
+            print(f"❌ Benchmark needs at least {ACTIVE_LEARNING_CONFIG['seed_size']} fully docked ligands "
+                  f"with SMILES, found {len(scored)}")
+            return
+        library = dict(zip(scored['ligand'], scored['smiles']))
+        truth = dict(zip(scored['ligand'], scored['best_affinity']))
+        history, _ = screen.run(library, lambda batch: {name: truth[name] for name in batch}, truth)
+        output_file = os.path.join(RESULTS_DIR, OUTPUT_FILES['active_learning_benchmark'])
+    else:
+        if not os.path.exists(protein_file):
+            print(f"❌ Prepared receptor not found: {protein_file}")
+            return
+        library_file = ACTIVE_LEARNING_CONFIG['library']
+        library = read_smiles_library(library_file) if library_file else TARGET_LIGANDS
+        docker = create_docker(logger, results_store, protein_file)
+        docking_config, max_workers = scheduler_settings(docker.backend)
+        ligand_prep = LigandPreparator(LIGAND_DIR, logger, results_store, create_fingerprint_index(logger))
+        oracle = DockingOracle(ligand_prep, docker, protein_file,
+                               docking_config, logger, DOCKING_SITES, max_workers, TIME_BUDGET_CONFIG)
+        history, _ = screen.run(library, oracle)
+        output_file = os.path.join(RESULTS_DIR, OUTPUT_FILES['active_learning'])
+    
+    history.to_csv(output_file, index=False)
+    last = history.iloc[-1]
+    print(f"✓ {int(last['n_docked'])} of {len(library)} ligands docked ({last['fraction_docked']:.1%}), "
+          f"best {last['best_score']:.2f} kcal/mol: {output_file}")
+    if benchmark:
+        print(f"✓ Recall of true top {ACTIVE_LEARNING_CONFIG['top_fraction']:.0%}: {last['recall']:.1%} "
+              f"(random: {last['random_recall']:.1%})")
+
+def run_build_fp_index(library_file=None):
+    """Bangun index fingerprint sekaligus dari file library .smi (default library active learning)"""
+    logger = setup_logging('fp_index')
+    library_file = library_file or ACTIVE_LEARNING_CONFIG['library']
+    library = read_smiles_library(library_file) if library_file else TARGET_LIGANDS
+    index = FingerprintIndex(FINGERPRINT_INDEX_CONFIG['index_dir'], logger, FINGERPRINT_INDEX_CONFIG['radius'],
+                             FINGERPRINT_INDEX_CONFIG['n_bits'])
+    n_added = index.build(library, FINGERPRINT_INDEX_CONFIG['max_workers'])
+    print(f"✓ Fingerprint index: {n_added} ligands added, {len(index)} total")
+
+def run_similar(queries=None, k=None):
+    """Hit expansion: ligan library paling mirip (Tanimoto) dengan query atau hit teratas"""
+    logger = setup_logging('similar')
+    index = FingerprintIndex(FINGERPRINT_INDEX_CONFIG['index_dir'], logger, FINGERPRINT_INDEX_CONFIG['radius'],
+                             FINGERPRINT_INDEX_CONFIG['n_bits'])
+    if len(index) == 0:
+        print("❌ Fingerprint index is empty, run ligand preparation or build-fp-index first")
+        return
+    
+    results_store = create_results_store(logger)
+    receptor = receptor_name(prepared_receptor_file())
+    if not queries:
+        if results_store is None:
+            print("❌ No queries given and results store is disabled")
+            return
+        queries = results_store.summary(receptor)['ligand'].head(FINGERPRINT_INDEX_CONFIG['query_top_n']).tolist()
+    
+    hits = pd.DataFrame(index.search(queries, k or FINGERPRINT_INDEX_CONFIG['top_k'],
+                                     FINGERPRINT_INDEX_CONFIG['max_workers'], FINGERPRINT_INDEX_CONFIG['chunk_rows']))
+    if hits.empty:
+        print("❌ No hits found")
+        return
+    if results_store is not None:
+        # Hit yang sudah di-docking ditandai dengan affinity terbaiknya
+        docked = results_store.best_affinities(receptor, hits['ligand'].unique())
+        hits['docked_affinity'] = hits['ligand'].map(docked)
+    output_file = os.path.join(RESULTS_DIR, OUTPUT_FILES['similar_ligands'])
+    hits.to_csv(output_file, index=False)
+    print(f"✓ {len(hits)} similar ligands for {hits['query'].nunique()} queries: {output_file}")
+
+def run_funnel(library_file=None):
+    """Screening library lewat funnel bertahap FUNNEL_STAGES (stage selesai dilewati saat run ulang)"""
+    print("🧬 EGFR Docking Simulation - Screening Funnel")
+    print("=" * 50)
+    
+    logger = setup_logging('funnel')
+    create_directories()
+    results_store = create_results_store(logger)
+    if results_store is None:
+        print("❌ The screening funnel requires the results store")
+        return
+    protein_file = prepared_receptor_file()
+    if not os.path.exists(protein_file):
+        print(f"❌ Prepared receptor not found: {protein_file}")
+        return
+    
+    library_file = library_file or FUNNEL_CONFIG['library'] or ACTIVE_LEARNING_CONFIG['library']
+    library = read_smiles_library(library_file) if library_file else TARGET_LIGANDS
+    ligand_prep = LigandPreparator(LIGAND_DIR, logger, results_store, create_fingerprint_index(logger))
+    # Backend hanya dipilih untuk settings scheduler; docker per stage membuat backend sendiri
+    backend = create_docking_backend(logger)
+    try:
+        docking_config, max_workers = scheduler_settings(backend)
+    finally:
+        backend.close()
+    funnel = ScreeningFunnel(
+        FUNNEL_STAGES, FUNNEL_CONFIG['state_dir'], logger, results_store, ligand_prep,
+        lambda results_dir, receptor: create_docker(logger, results_store, protein_file, results_dir=results_dir,
+                                                    receptor=receptor,
+                                                    pose_store_dir=os.path.join(results_dir, 'pose_store')),
+        protein_file, docking_config, DOCKING_SITES, max_workers,
+        lambda scoring_functions: create_rescorer(results_store, logger, scoring_functions),
+        FUNNEL_CONFIG['chunk_size'], create_template_seeder(logger), TEMPLATE_SEEDING_CONFIG['site']
+    )
+    try:
+        report, hits = funnel.run(library)
+    except (RuntimeError, ValueError) as e:
+        print(f"❌ {e}")
+        return
+    
+    report_file = os.path.join(RESULTS_DIR, OUTPUT_FILES['funnel_report'])
+    hits_file = os.path.join(RESULTS_DIR, OUTPUT_FILES['funnel_hits'])
+    report.to_csv(report_file, index=False)
+    hits.to_csv(hits_file, index=False)
+    print(report[['stage', 'n_input', 'n_promoted', 'attrition', 'ligands_per_second', 'cached']].to_string(index=False))
+    print(f"✓ {len(hits)} of {len(library)} ligands survived the funnel: {hits_file}")
+
+def run_probe_backends():
+    """Probe ulang backend docking dan preparasi receptor (menimpa cache)"""
+    logger = setup_logging('probe_backends')
+    create_directories()
+    protein_file, ligand_files = prepare_inputs(logger)
+    
+    probe = create_backend_probe(logger)
+    ligand_name = BACKEND_CONFIG['calibration_ligand'] or next(iter(ligand_files))
+    calibrate = docking_calibration(protein_file, ligand_files[ligand_name],
+                                    dict(DOCKING_CONFIG, **next(iter(DOCKING_SITES.values()), {})))
+    backends = {name: DOCKING_BACKENDS[name](logger, **backend_options().get(name, {}))
+                for name in BACKEND_CONFIG['docking_candidates']}
+    results = probe.probe('docking', backends, calibrate, refresh=True)
+    for name, entry in results.items():
+        status = f"{entry['seconds']:.2f} s" if entry['seconds'] is not None else "unavailable"
+        print(f"   - {name}: {status}")
+    print(f"✓ Probe results cached: {BACKEND_CONFIG['probe_cache']}")
+
+def run_validate_scoring():
+    """Bandingkan rescoring NumPy dengan vina --score_only pada pose teratas"""
+    logger = setup_logging('validate_scoring')
+    results_store = create_results_store(logger)
+    if results_store is None:
+        print("❌ Results store is disabled, nothing to validate")
+        return
+    
+    protein_file = prepared_receptor_file()
+    best = results_store.query(receptor=receptor_name(protein_file), best_pose_only=True,
+                               limit=SCORING_CONFIG['validation_ligands'])
+    docked_files = {(row['ligand'], row['site']): row['output_file'] for _, row in best.iterrows()}
+    
+    # Satu scorer (grid) per site: pose dinilai di box tempat ia di-docking
+    site_configs = {site: dict(DOCKING_CONFIG, **DOCKING_SITES.get(site, {})) for site in best['site'].unique()}
+    scorers = {site: VinaScorer(protein_file, site_config, logger, SCORING_CONFIG['grid_spacing'],
+                                SCORING_CONFIG['cache_dir'])
+               for site, site_config in site_configs.items()}
+    stats = validate_against_vina(scorers, protein_file, docked_files, site_configs, logger,
+                                  os.path.join(RESULTS_DIR, SCORING_CONFIG['validation_file']))
+    if stats:
+        print(f"✓ {stats['n']} poses: r = {stats['pearson_r']:.3f}, MAE = {stats['mae']:.3f} kcal/mol")
+
+def create_streaming_screen(logger, ligand_prep, docker):
+    """StreamingScreen dari STREAMING_CONFIG (preparasi dan docking berbagi CpuBudget)"""
+    return StreamingScreen(ligand_prep, docker, logger,
+                           CpuBudget(STREAMING_CONFIG['cpu_budget'], STREAMING_CONFIG['prep_slots']),
+                           STREAMING_CONFIG['prep_workers'], STREAMING_CONFIG['queue_size'])
+
+def load_docking_results():
+    """Hasil docking {ligan: result} yang ditulis stage dock"""
+    with open(os.path.join(RESULTS_DIR, OUTPUT_FILES['docking_json'])) as f:
+        return json.load(f)
+
+def create_pipeline(logger, max_workers=None):
+    """DAG pipeline utama: fetch -> clean -> receptor, ligands (paralel) -> dock -> analyze -> report
+    
+    Tiap stage mendeklarasikan file input/output dan parameter config-nya; stage yang
+    up to date (manifest hash sama) dilewati. Dengan STREAMING_CONFIG aktif, stage ligands
+    digabung ke dock (preparasi di-stream ke docking).
+    """
+    pdb_id = receptor_pdb_id()
+    pdb_file = os.path.join(PROTEIN_DIR, f"{pdb_id}.pdb")
+    clean_file = os.path.join(PROTEIN_DIR, f"{pdb_id}_clean.pdb")
+    protein_file = prepared_receptor_file(pdb_id)
+    ligand_files = {name: os.path.join(LIGAND_DIR, f"{name}.pdbqt") for name in TARGET_LIGANDS}
+    docking_json = os.path.join(RESULTS_DIR, OUTPUT_FILES['docking_json'])
+    use_store = RESULTS_STORE_CONFIG['enabled']
+    streaming = STREAMING_CONFIG['enabled']
+    dock_outputs = [docking_json]
+    if not use_store or RESULTS_STORE_CONFIG['export_excel']:
+        dock_outputs.append(os.path.join(RESULTS_DIR, OUTPUT_FILES['docking_results']))
+    if use_store and SDF_EXPORT_CONFIG['enabled']:
+        dock_outputs.append(os.path.join(RESULTS_DIR, OUTPUT_FILES['docked_sdf']))
+    analyze_outputs = [os.path.join(RESULTS_DIR, 'interaction_analysis.png'),
+                       os.path.join(RESULTS_DIR, 'binding_affinity_chart.png'),
+                       os.path.join(RESULTS_DIR, OUTPUT_FILES['visualization_html'])]
+    report_file = os.path.join(RESULTS_DIR, OUTPUT_FILES['analysis_report'])
+    
+    def prepare_ligands():
+        ligand_prep = LigandPreparator(LIGAND_DIR, logger, create_results_store(logger),
+                                       create_fingerprint_index(logger))
+        return ligand_prep.prepare_ligands(TARGET_LIGANDS)
+    
+    def dock():
+        results_store = create_results_store(logger)
+        if streaming:
+            # Preparasi ligan di-stream langsung ke worker docking
+            docker = create_docker(logger, results_store, protein_file)
+            docking_config, max_workers = scheduler_settings(docker.backend)
+            ligand_prep = LigandPreparator(LIGAND_DIR, logger, results_store, create_fingerprint_index(logger))
+            docking_results = create_streaming_screen(logger, ligand_prep, docker).run(
+                protein_file,
+                TARGET_LIGANDS,
+                docking_config,
+                TIME_BUDGET_CONFIG,
+                summary_limit=0 if results_store is not None else None,
+                sites=DOCKING_SITES,
+                max_workers=max_workers,
+                seeds=prepare_seeds(logger, TARGET_LIGANDS),
+                seed_site=TEMPLATE_SEEDING_CONFIG['site']
+            )
+        else:
+            available = {name: path for name, path in ligand_files.items() if os.path.exists(path)}
+            if not available:
+                logger.error("No prepared ligands to dock")
+                return None
+            docker = create_docker(logger, results_store, protein_file, available)
+            docking_config, max_workers = scheduler_settings(docker.backend)
+            docking_results = docker.run_docking_batch(
+                protein_file,
+                available,
+                docking_config,
+                TIME_BUDGET_CONFIG,
+                summary_limit=0 if results_store is not None else None,
+                sites=DOCKING_SITES,
+                max_workers=max_workers,
+                seeds=prepare_seeds(logger, {name: TARGET_LIGANDS[name] for name in available}),
+                seed_site=TEMPLATE_SEEDING_CONFIG['site']
+            )
+        if results_store is not None:
+            # docking.json hanya ringkasan summary_top_n ligan terbaik untuk visualisasi/laporan;
+            # hasil lengkap tetap di results store
+            docking_results = results_store.load_results(receptor_name(protein_file),
+                                                         limit=RESULTS_STORE_CONFIG['summary_top_n'])
         if not docking_results:
-            raise Exception("Docking failed")
-        print(f"✓ Docking completed for {len(docking_results)} ligands")
-        
-        # Step 4: Visualisasi dan Analisis
-        print("\n📊 Step 4: Generating Visualization and Analysis...")
-        visualizer = ResultVisualizer(RESULTS_DIR, logger)
-        
-        # Generate visualizations
+            return None
+        if docker.warm_start is not None:
+            counts = docker.warm_start.summary()
+            logger.info(f"Warm start: {counts['warm']} ligands re-docked warm, "
+                        f"{counts['escalated']} escalated to full docking")
+        export_excel(results_store)
+        if SDF_EXPORT_CONFIG['enabled']:
+            export_sdf(logger, results_store)
+        if INTERACTION_CONFIG['enabled'] and results_store is not None:
+            compute_fingerprints(logger, results_store, protein_file)
+        tmp_file = f"{docking_json}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(docking_results, f, indent=1, default=str)
+        os.replace(tmp_file, docking_json)
+        return docking_results
+    
+    def analyze():
+        docking_results = load_docking_results()
+        visualizer = ResultVisualizer(RESULTS_DIR, logger, LIGAND_DIR)
         visualizer.create_interaction_plots(docking_results)
         visualizer.create_binding_affinity_chart(docking_results)
         visualizer.create_3d_visualization(protein_file, docking_results)
-        visualizer.generate_analysis_report(docking_results)
-        
-        print("✓ Analysis and visualization completed")
+        # Visualizer hanya mencatat error di log; stage berhasil jika semua file terbentuk
+        return all(os.path.exists(path) for path in analyze_outputs)
+    
+    def report():
+        ResultVisualizer(RESULTS_DIR, logger, LIGAND_DIR).generate_analysis_report(load_docking_results())
+        return os.path.exists(report_file)
+    
+    dock_params = {'docking': DOCKING_CONFIG, 'sites': DOCKING_SITES, 'time_budget': TIME_BUDGET_CONFIG,
+                   'box_sizing': BOX_SIZING_CONFIG, 'clustering': CLUSTERING_CONFIG,
+                   'template_seeding': TEMPLATE_SEEDING_CONFIG, 'warm_start': WARM_START_CONFIG,
+                   'backend': BACKEND_CONFIG['docking']}
+    stages = [
+        Stage('fetch', lambda: ProteinPreparator(PROTEIN_DIR, logger).download_pdb(pdb_id),
+              outputs=[pdb_file], params={'pdb_id': pdb_id},
+              help='Download struktur PDB'),
+        Stage('clean', lambda: ProteinPreparator(PROTEIN_DIR, logger).clean_pdb(pdb_file),
+              inputs=[pdb_file], outputs=[clean_file],
+              help='Hapus air, ion dan ligan dari struktur'),
+        Stage('receptor', lambda: ProteinPreparator(PROTEIN_DIR, logger,
+                                                    create_receptor_backends(logger)).pdb_to_pdbqt(clean_file),
+              inputs=[clean_file], outputs=[protein_file],
+              params={'backends': BACKEND_CONFIG['receptor_candidates']},
+              help='Konversi receptor ke PDBQT'),
+        Stage('dock', dock, inputs=[protein_file] + ([] if streaming else list(ligand_files.values())),
+              outputs=(list(ligand_files.values()) if streaming else []) + dock_outputs,
+              params=dict(dock_params, ligands=TARGET_LIGANDS) if streaming else dock_params,
+              help='Preparasi ligan + docking (streaming)' if streaming else 'Docking semua ligan di semua site'),
+        Stage('analyze', analyze, inputs=[docking_json, protein_file], outputs=analyze_outputs,
+              help='Chart affinity, plot interaksi dan visualisasi 3D'),
+        # pyplot tidak thread-safe: report (yang juga menggambar chart) menunggu analyze
+        Stage('report', report, inputs=[docking_json], outputs=[report_file], after=['analyze'],
+              help='Laporan analisis PDF')
+    ]
+    if not streaming:
+        stages.insert(3, Stage('ligands', prepare_ligands, outputs=list(ligand_files.values()),
+                               params={'ligands': TARGET_LIGANDS}, help='Preparasi ligan TARGET_LIGANDS'))
+    return PipelineDAG(stages, PIPELINE_CONFIG['manifest_dir'], logger,
+                       max_workers or PIPELINE_CONFIG['max_workers'])
+
+def print_stage_results(results):
+    """Status tiap stage setelah run DAG"""
+    icons = {'done': '✓', 'skipped': '⏭', 'failed': '❌', 'blocked': '⛔'}
+    for name, status in results.items():
+        print(f"   {icons[status]} {name}: {status}")
+
+def run_stages(targets=None, only=False, downstream=False, force=False, list_stages=False, max_workers=None):
+    """Jalankan stage atau subgraph pipeline tertentu (upstream yang up to date dilewati)"""
+    logger = setup_logging('stages')
+    create_directories()
+    pipeline = create_pipeline(logger, max_workers)
+    if list_stages:
+        for name in pipeline.order:
+            stage = pipeline.stages[name]
+            upstream = ', '.join(pipeline.upstream[name]) or '-'
+            print(f"   {name:<10} {pipeline.status(name):<11} after: {upstream:<20} {stage.help}")
+        return
+    try:
+        results = pipeline.run(targets, with_upstream=not only, with_downstream=downstream, force=force)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    print_stage_results(results)
+    if any(status in ('failed', 'blocked') for status in results.values()):
+        print("Check the log file for detailed error information")
+        sys.exit(1)
+
+def run_pipeline(force=False):
+    """Fungsi utama untuk menjalankan docking simulation"""
+    print("🧬 EGFR Docking Simulation Started")
+    print("=" * 50)
+    
+    # Setup
+    logger = setup_logging()
+    create_directories()
+    
+    try:
+        pipeline = create_pipeline(logger)
+        results = pipeline.run(force=force)
+        print_stage_results(results)
+        failed = [name for name, status in results.items() if status == 'failed']
+        if failed:
+            raise Exception(f"Pipeline stage failed: {', '.join(failed)}")
         
-        # Step 5: Summary
-        print("\n📋 Step 5: Results Summary")
+        # Summary
+        print("\n📋 Results Summary")
         print("=" * 30)
         
         # Sort by binding affinity
+        docking_results = load_docking_results()
         sorted_results = sorted(docking_results.items(), 
                               key=lambda x: float(x[1]['best_affinity']))
         
@@ -99,6 +897,10 @@ def main():
         
         print(f"\n📁 All results saved in: {RESULTS_DIR}")
         print("📝 Check the following files:")
+        if RESULTS_STORE_CONFIG['enabled']:
+            print(f"   - Results store: {RESULTS_STORE_CONFIG['db_file']}")
+            if SDF_EXPORT_CONFIG['enabled']:
+                print(f"   - Docked poses (SDF): {os.path.join(RESULTS_DIR, OUTPUT_FILES['docked_sdf'])}")
         print(f"   - Excel report: {os.path.join(RESULTS_DIR, OUTPUT_FILES['docking_results'])}")
         print(f"   - 3D visualization: {os.path.join(RESULTS_DIR, OUTPUT_FILES['visualization_html'])}")
         print(f"   - Analysis report: {os.path.join(RESULTS_DIR, OUTPUT_FILES['analysis_report'])}")
@@ -112,5 +914,89 @@ def main():
         print("Check the log file for detailed error information")
         sys.exit(1)
 
+def main():
+    """Entry point CLI"""
+    parser = argparse.ArgumentParser(description="EGFR Docking Simulation")
+    subparsers = parser.add_subparsers(dest='command')
+    run_parser = subparsers.add_parser('run', help='Jalankan pipeline lengkap (default); stage up to date dilewati')
+    run_parser.add_argument('--force', action='store_true', help='Jalankan ulang semua stage')
+    stage_parser = subparsers.add_parser('stage', help='Jalankan stage pipeline tertentu beserta upstream-nya')
+    stage_parser.add_argument('stages', nargs='*', help='fetch, clean, receptor, ligands, dock, analyze, report')
+    stage_parser.add_argument('--only', action='store_true', help='Tanpa upstream (pakai output yang sudah ada)')
+    stage_parser.add_argument('--downstream', action='store_true', help='Sertakan semua stage downstream')
+    stage_parser.add_argument('--force', action='store_true', help='Jalankan ulang stage target meski up to date')
+    stage_parser.add_argument('--list', action='store_true', help='Tampilkan stage, dependensi dan statusnya')
+    stage_parser.add_argument('--jobs', type=int, default=None, help='Stage paralel maksimum')
+    subparsers.add_parser('enqueue', help='Preparasi input dan isi work queue')
+    worker_parser = subparsers.add_parser('worker', help='Ambil dan kerjakan task dari work queue')
+    worker_parser.add_argument('--max-tasks', type=int, default=None)
+    subparsers.add_parser('status', help='Status work queue')
+    subparsers.add_parser('collect', help='Gabungkan hasil work queue ke Excel')
+    refine_parser = subparsers.add_parser('refine', help='Minimisasi lokal pose yang sudah ada (tanpa global search)')
+    refine_parser.add_argument('poses_dir', help='Folder berisi file pose *.pdbqt')
+    refine_parser.add_argument('--site', default=None, help='Nama site di DOCKING_SITES untuk box')
+    subparsers.add_parser('benchmark-box', help='Benchmark box tetap vs box per ligan pada TARGET_LIGANDS')
+    subparsers.add_parser('benchmark-engine', help='Benchmark engine NumPy vs Vina pada TARGET_LIGANDS')
+    sdf_parser = subparsers.add_parser('export-sdf', help='Export pose dari results store ke SDF.gz')
+    sdf_parser.add_argument('--best-only', action='store_true', help='Hanya pose terbaik per ligan/site')
+    subparsers.add_parser('probe-backends', help='Probe ulang backend docking pada ligan kalibrasi')
+    subparsers.add_parser('rescore', help='Rescoring pose dengan vina, vinardo dan ad4 lalu skor konsensus')
+    interactions_parser = subparsers.add_parser('interactions', help='Fingerprint interaksi pose lalu filter per interaksi')
+    interactions_parser.add_argument('--require', nargs='*', default=None, help='Interaksi wajib, misal MET793:hbond')
+    interactions_parser.add_argument('--exclude', nargs='*', default=None, help='Interaksi yang tidak boleh ada')
+    interactions_parser.add_argument('--best-only', action='store_true', help='Hanya pose terbaik per ligan/site')
+    interactions_parser.add_argument('--overwrite', action='store_true', help='Hitung ulang semua fingerprint')
+    al_parser = subparsers.add_parser('active-learning', help='Screening library dengan active learning')
+    al_parser.add_argument('--benchmark', action='store_true',
+                           help='Replay skor docking penuh di results store dan laporkan recall top 1%%')
+    fp_parser = subparsers.add_parser('build-fp-index', help='Bangun index fingerprint dari file library .smi')
+    fp_parser.add_argument('library', nargs='?', default=None, help='File .smi (default: library active learning)')
+    similar_parser = subparsers.add_parser('similar', help='Cari ligan library yang mirip dengan hit (Tanimoto)')
+    similar_parser.add_argument('queries', nargs='*', help='Nama ligan di index atau SMILES (default: hit teratas)')
+    similar_parser.add_argument('--k', type=int, default=None, help='Jumlah hit per query')
+    funnel_parser = subparsers.add_parser('funnel', help='Screening bertahap: filter 2D, docking cepat, docking akurat, rescoring')
+    funnel_parser.add_argument('library', nargs='?', default=None, help='File .smi (default: FUNNEL_CONFIG)')
+    subparsers.add_parser('validate-scoring', help='Validasi rescoring NumPy terhadap vina --score_only')
+    args = parser.parse_args()
+    
+    if args.command == 'run':
+        run_pipeline(args.force)
+    elif args.command == 'stage':
+        run_stages(args.stages, args.only, args.downstream, args.force, args.list, args.jobs)
+    elif args.command == 'enqueue':
+        run_enqueue()
+    elif args.command == 'worker':
+        run_worker(args.max_tasks)
+    elif args.command == 'status':
+        run_status()
+    elif args.command == 'collect':
+        run_collect()
+    elif args.command == 'refine':
+        run_refine(args.poses_dir, args.site)
+    elif args.command == 'benchmark-box':
+        run_benchmark_box()
+    elif args.command == 'benchmark-engine':
+        run_benchmark_engine()
+    elif args.command == 'export-sdf':
+        run_export_sdf(args.best_only)
+    elif args.command == 'probe-backends':
+        run_probe_backends()
+    elif args.command == 'rescore':
+        run_rescore()
+    elif args.command == 'interactions':
+        run_interactions(args.require, args.exclude, args.best_only, args.overwrite)
+    elif args.command == 'active-learning':
+        run_active_learning(args.benchmark)
+    elif args.command == 'build-fp-index':
+        run_build_fp_index(args.library)
+    elif args.command == 'similar':
+        run_similar(args.queries, args.k)
+    elif args.command == 'funnel':
+        run_funnel(args.library)
+    elif args.command == 'validate-scoring':
+        run_validate_scoring()
+    else:
+        run_pipeline()
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
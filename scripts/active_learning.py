@@ -0,0 +1,253 @@
+import math
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from rdkit import Chem
+from rdkit.Chem import rdFingerprintGenerator
+from scripts.ligand_prep import calculate_descriptors
+from scripts.results_store import DESCRIPTOR_COLUMNS, receptor_name
+
+
+def _featurize_chunk(names, smiles_list, radius, n_bits):
+    """Morgan fingerprint (terpack) dan deskriptor untuk satu chunk SMILES (di worker process)"""
+    generator = rdFingerprintGenerator.GetMorganGenerator(radius=radius, fpSize=n_bits)
+    kept, fingerprints, descriptors = [], [], []
+    for name, smiles in zip(names, smiles_list):
+        mol = Chem.MolFromSmiles(smiles)
+        if mol is None:
+            continue
+        kept.append(name)
+        fingerprints.append(np.packbits(generator.GetFingerprintAsNumPy(mol).astype(bool)))
+        values = calculate_descriptors(mol)
+        descriptors.append([values[column] for column in DESCRIPTOR_COLUMNS])
+    if not kept:
+        return kept, np.zeros((0, n_bits // 8), dtype=np.uint8), np.zeros((0, len(DESCRIPTOR_COLUMNS)), np.float32)
+    return kept, np.array(fingerprints, dtype=np.uint8), np.array(descriptors, dtype=np.float32)
+
+
+class LigandFeatures:
+    """Fitur surrogate model untuk library: Morgan fingerprint terpack + deskriptor RDKit
+
+    Fingerprint disimpan terpack (n_bits / 8 byte per ligan) dan baru di-unpack per
+    chunk saat membangun matriks fitur, sehingga library jutaan ligan tetap muat di memori.
+    """
+
+    def __init__(self, names, fingerprints, descriptors, n_bits):
+        self.names = names
+        self.fingerprints = fingerprints
+        self.descriptors = descriptors
+        self.n_bits = n_bits
+
+    @classmethod
+    def from_library(cls, library, logger, radius=2, n_bits=1024, max_workers=None, chunk_size=5000):
+        """Featurisasi {nama: SMILES} paralel per chunk; SMILES tidak valid dilewati"""
+        items = list(library.items())
+        chunks = [items[start:start + chunk_size] for start in range(0, len(items), chunk_size)] or [[]]
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(_featurize_chunk, [name for name, _ in chunk], [smiles for _, smiles in chunk],
+                                       radius, n_bits) for chunk in chunks]
+            parts = [future.result() for future in futures]
+        names = [name for part in parts for name in part[0]]
+        if len(names) < len(items):
+            logger.warning(f"Skipped {len(items) - len(names)} ligands with invalid SMILES")
+        return cls(names, np.concatenate([part[1] for part in parts]), np.concatenate([part[2] for part in parts]),
+                   n_bits)
+
+    def matrix(self, indices):
+        """Matriks fitur float32 (len(indices), n_bits + n_deskriptor)"""
+        bits = np.unpackbits(self.fingerprints[indices], axis=1, count=self.n_bits)
+        return np.hstack([bits.astype(np.float32), self.descriptors[indices]])
+
+
+class SurrogateEnsemble:
+    """Ensemble ridge regression bootstrap di NumPy sebagai prediktor skor docking
+
+    Mean antar model = prediksi skor, standar deviasi = ketidakpastian untuk akuisisi.
+    Dilatih dengan persamaan normal (fitur x fitur) sehingga biaya linear terhadap jumlah data.
+    """
+
+    def __init__(self, n_models=5, alpha=1.0, seed=0):
+        self.n_models = n_models
+        self.alpha = alpha
+        self.rng = np.random.default_rng(seed)
+
+    def fit(self, X, y):
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        self.center = X.mean(axis=0)
+        self.scale = X.std(axis=0)
+        self.scale[self.scale == 0] = 1.0
+        X = (X - self.center) / self.scale
+        penalty = self.alpha * np.eye(X.shape[1])
+
+        weights, intercepts = [], []
+        for _ in range(self.n_models):
+            counts = np.bincount(self.rng.integers(0, len(y), len(y)), minlength=len(y)).astype(np.float64)
+            x_mean = counts @ X / counts.sum()
+            y_mean = counts @ y / counts.sum()
+            Xc = X - x_mean
+            w = np.linalg.solve(Xc.T @ (Xc * counts[:, None]) + penalty, Xc.T @ (counts * (y - y_mean)))
+            weights.append(w)
+            intercepts.append(y_mean - x_mean @ w)
+        self.weights = np.stack(weights, axis=1)
+        self.intercepts = np.array(intercepts)
+        return self
+
+    def predict(self, X):
+        """(mean, std) prediksi per baris"""
+        predictions = ((np.asarray(X, dtype=np.float64) - self.center) / self.scale) @ self.weights + self.intercepts
+        return predictions.mean(axis=1), predictions.std(axis=1)
+
+
+def spearman(a, b):
+    """Korelasi rank Spearman (tanpa koreksi ties)"""
+    if len(a) < 3:
+        return np.nan
+    ranks_a = np.argsort(np.argsort(a))
+    ranks_b = np.argsort(np.argsort(b))
+    return float(np.corrcoef(ranks_a, ranks_b)[0, 1])
+
+
+def select_batch(mean, std, batch_size, exploit_fraction):
+    """Index batch berikutnya: skor prediksi terbaik (exploit) + ketidakpastian tertinggi (explore)"""
+    batch_size = min(batch_size, len(mean))
+    n_exploit = int(round(batch_size * exploit_fraction))
+    exploit = np.argsort(mean, kind='stable')[:n_exploit]
+    rest = np.ones(len(mean), dtype=bool)
+    rest[exploit] = False
+    explore = np.nonzero(rest)[0][np.argsort(-std[rest], kind='stable')[:batch_size - n_exploit]]
+    return np.concatenate([exploit, explore])
+
+
+class DockingOracle:
+    """Skor ligan dengan preparasi + docking sungguhan; hasil yang sudah ada di results store dipakai ulang"""
+
+    def __init__(self, ligand_prep, docker, protein_file, docking_config, logger, sites=None, max_workers=1,
+                 budget_config=None):
+        self.ligand_prep = ligand_prep
+        self.docker = docker
+        self.protein_file = protein_file
+        self.docking_config = docking_config
+        self.logger = logger
+        self.sites = sites
+        self.max_workers = max_workers
+        self.budget_config = budget_config
+        self.receptor = receptor_name(protein_file)
+
+    def __call__(self, library):
+        """Docking {nama: SMILES}, return {nama: affinity terbaik} (ligan gagal tidak ada di hasil)"""
+        results_store = self.docker.results_store
+        scores = results_store.best_affinities(self.receptor, library)
+        missing = {name: smiles for name, smiles in library.items() if name not in scores}
+        if len(scores):
+            self.logger.info(f"Reusing {len(scores)} stored docking results")
+        if missing:
+            ligand_files = self.ligand_prep.prepare_ligands(missing)
+            if ligand_files:
+                self.docker.run_docking_batch(self.protein_file, ligand_files, self.docking_config,
+                                              self.budget_config, summary_limit=0, sites=self.sites,
+                                              max_workers=self.max_workers)
+                scores.update(results_store.best_affinities(self.receptor, ligand_files))
+        return scores
+
+
+class ActiveLearningScreen:
+    """Screening library dengan active learning: docking subset acak, latih surrogate, lalu
+    docking batch dengan prediksi terbaik dan paling tidak pasti hingga budget habis
+
+    oracle: callable {nama: SMILES} -> {nama: skor} (DockingOracle, atau skor tersimpan untuk benchmark).
+    """
+
+    def __init__(self, logger, config):
+        self.logger = logger
+        self.config = config
+
+    def budget(self, n_ligands):
+        """Jumlah ligan maksimum yang di-docking (config budget: jumlah atau fraksi library)"""
+        budget = self.config['budget']
+        return min(n_ligands, int(math.ceil(budget * n_ligands)) if budget <= 1 else int(budget))
+
+    def run(self, library, oracle, truth=None):
+        """Jalankan loop active learning
+
+        truth: {nama: skor} docking seluruh library (benchmark) untuk menghitung recall top fraksi.
+        Return (DataFrame riwayat per iterasi, {nama: skor} hasil docking).
+        """
+        config = self.config
+        features = LigandFeatures.from_library(library, self.logger, config['radius'], config['n_bits'],
+                                               config['max_workers'])
+        names = features.names
+        n_ligands = len(names)
+        budget = self.budget(n_ligands)
+        rng = np.random.default_rng(config['seed'])
+        model = SurrogateEnsemble(config['n_models'], config['alpha'], config['seed'])
+
+        top_names = None
+        if truth is not None:
+            ranked = sorted((name for name in names if name in truth), key=truth.get)
+            top_names = set(ranked[:max(1, int(math.ceil(config['top_fraction'] * len(ranked))))])
+
+        self.logger.info(f"Active learning over {n_ligands} ligands, budget {budget} "
+                         f"({budget / max(n_ligands, 1):.1%} of library)")
+        labels = {}
+        attempted = np.zeros(n_ligands, dtype=bool)
+        batch = rng.choice(n_ligands, min(config['seed_size'], budget), replace=False)
+        predicted = None
+        history = []
+        iteration = 0
+
+        while len(batch):
+            start_time = time.monotonic()
+            batch_names = [names[i] for i in batch]
+            scores = oracle({name: library[name] for name in batch_names})
+            attempted[batch] = True
+            labels.update((name, scores[name]) for name in batch_names if name in scores)
+
+            row = {
+                'iteration': iteration,
+                'batch_size': len(batch),
+                'n_docked': int(attempted.sum()),
+                'fraction_docked': attempted.sum() / n_ligands,
+                'n_scored': len(labels),
+                'best_score': min(labels.values()) if labels else np.nan,
+                'batch_best': min((scores[n] for n in batch_names if n in scores), default=np.nan),
+                # Kualitas model: prediksi batch ini (sebelum retrain) vs skor docking
+                'batch_spearman': np.nan
+            }
+            if predicted is not None:
+                known = [k for k, name in enumerate(batch_names) if name in scores]
+                row['batch_spearman'] = spearman(predicted[known], [scores[batch_names[k]] for k in known])
+            if top_names is not None:
+                row['recall'] = len(top_names & labels.keys()) / len(top_names)
+                row['random_recall'] = row['fraction_docked']
+
+            remaining = budget - int(attempted.sum())
+            if remaining <= 0 or attempted.all() or len(labels) < 2:
+                batch = np.array([], dtype=np.int64)
+            else:
+                labeled = np.nonzero([name in labels for name in names])[0]
+                model.fit(features.matrix(labeled), [labels[names[i]] for i in labeled])
+                candidates = np.nonzero(~attempted)[0]
+                mean, std = self.predict(model, features, candidates)
+                chosen = select_batch(mean, std, min(config['batch_size'], remaining), config['exploit_fraction'])
+                batch = candidates[chosen]
+                predicted = mean[chosen]
+
+            row['seconds'] = round(time.monotonic() - start_time, 2)
+            history.append(row)
+            recall = f", recall top {config['top_fraction']:.0%} {row['recall']:.1%}" if 'recall' in row else ''
+            self.logger.info(f"Iteration {iteration}: {row['n_docked']} docked, best {row['best_score']:.2f} "
+                             f"kcal/mol{recall}")
+            iteration += 1
+
+        return pd.DataFrame(history), labels
+
+    def predict(self, model, features, indices, chunk_size=50000):
+        """Prediksi surrogate untuk indices per chunk (matriks fitur tidak dibuat sekaligus)"""
+        means, stds = [], []
+        for start in range(0, len(indices), chunk_size):
+            mean, std = model.predict(features.matrix(indices[start:start + chunk_size]))
+            means.append(mean)
+            stds.append(std)
+        return np.concatenate(means), np.concatenate(stds)
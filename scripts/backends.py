@@ -0,0 +1,490 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import subprocess
+import numpy as np
+from scripts.pdbqt_reader import read_docked_poses, write_docked_poses, parse_vina_affinity
+from scripts.vina_engine import VinaEngine, BOX_KEYS
+from scripts.numpy_docking import NumpyDockingEngine
+from scripts.tool_runner import get_runner
+
+
+class DockingBackend:
+    """Interface backend docking: dock (global search) dan optimize (minimisasi lokal)
+
+    dock return pesan error atau None jika berhasil; subprocess.TimeoutExpired diteruskan ke
+    pemanggil. in_process=True berarti paralelisme ada di dalam backend (satu worker cukup).
+    """
+    name = None
+    in_process = False
+    auto_select = True
+    fallback_only = False
+
+    def __init__(self, logger):
+        self.logger = logger
+
+    def close(self):
+        """Lepas resource backend (misal process pool); backend tetap bisa dipakai lagi"""
+
+    def available(self):
+        """True jika tool/library backend tersedia di environment ini"""
+        raise NotImplementedError
+
+    def fingerprint(self):
+        """Identitas instalasi (path/versi) untuk invalidasi cache probe"""
+        return self.name
+
+    def dock(self, protein_file, ligand_file, output_file, log_file, docking_config, timeout):
+        raise NotImplementedError
+
+    def optimize(self, protein_file, pose_file, output_file, docking_config, timeout=120):
+        """Minimisasi lokal satu pose, return energi (kcal/mol)"""
+        raise NotImplementedError
+
+
+class VinaCLIBackend(DockingBackend):
+    """Docking lewat binary vina (file config + proses lewat ToolRunner)"""
+    name = 'vina-cli'
+
+    def __init__(self, logger, executable='vina', runner=None):
+        super().__init__(logger)
+        self.executable = executable
+        self._runner = runner
+
+    @property
+    def runner(self):
+        return self._runner or get_runner()
+
+    def available(self):
+        return shutil.which(self.executable) is not None
+
+    def fingerprint(self):
+        return f"{self.name}:{shutil.which(self.executable)}"
+
+    def create_config_file(self, protein_file, ligand_file, output_file, docking_config):
+        """Buat file konfigurasi untuk Vina"""
+        config_file = tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False)
+
+        config_content = f"""receptor = {protein_file}
+ligand = {ligand_file}
+out = {output_file}
+
+center_x = {docking_config['center_x']}
+center_y = {docking_config['center_y']}
+center_z = {docking_config['center_z']}
+
+size_x = {docking_config['size_x']}
+size_y = {docking_config['size_y']}
+size_z = {docking_config['size_z']}
+
+exhaustiveness = {docking_config['exhaustiveness']}
+num_modes = {docking_config['num_modes']}
+"""
+        if 'seed' in docking_config:
+            config_content += f"seed = {docking_config['seed']}\n"
+        if docking_config.get('cpu'):
+            config_content += f"cpu = {docking_config['cpu']}\n"
+
+        config_file.write(config_content)
+        config_file.close()
+
+        return config_file.name
+
+    def dock(self, protein_file, ligand_file, output_file, log_file, docking_config, timeout):
+        config_file = self.create_config_file(protein_file, ligand_file, output_file, docking_config)
+        cmd = [self.executable, '--config', config_file, '--log', log_file]
+        try:
+            result = self.runner.run(cmd, timeout)
+        finally:
+            os.unlink(config_file)
+
+        if result.returncode != 0 or not os.path.exists(output_file):
+            return result.stderr or f"vina exited with code {result.returncode}"
+        return None
+
+    def optimize(self, protein_file, pose_file, output_file, docking_config, timeout=120):
+        cmd = [self.executable, '--receptor', protein_file, '--ligand', pose_file, '--out', output_file,
+               '--local_only']
+        for key in BOX_KEYS:
+            cmd += [f'--{key}', str(docking_config[key])]
+        if docking_config.get('cpu'):
+            cmd += ['--cpu', str(docking_config['cpu'])]
+        result = self.runner.run(cmd, timeout)
+
+        energy = parse_vina_affinity(result.stdout)
+        if result.returncode != 0 or energy is None or not os.path.exists(output_file):
+            raise RuntimeError(result.stderr or f"vina exited with code {result.returncode}")
+        return energy
+
+
+class VinaPythonBackend(DockingBackend):
+    """Docking in-process lewat Vina Python API (map di-cache per box oleh VinaEngine)
+
+    Engine in-process tidak bisa dihentikan di tengah jalan sehingga timeout diabaikan dan
+    time budget (TIME_BUDGET_CONFIG) dinonaktifkan untuk backend ini.
+    """
+    name = 'vina-python'
+    in_process = True
+
+    def __init__(self, logger, engine=None):
+        super().__init__(logger)
+        self._engine = engine
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            self._engine = VinaEngine(self.logger)
+        return self._engine
+
+    def available(self):
+        return VinaEngine.available()
+
+    def fingerprint(self):
+        try:
+            import vina
+            return f"{self.name}:{getattr(vina, '__version__', 'unknown')}"
+        except ImportError:
+            return f"{self.name}:missing"
+
+    def dock(self, protein_file, ligand_file, output_file, log_file, docking_config, timeout):
+        self.engine.dock(protein_file, ligand_file, output_file, docking_config)
+        return None
+
+    def optimize(self, protein_file, pose_file, output_file, docking_config, timeout=120):
+        return self.engine.optimize(protein_file, pose_file, output_file, docking_config)
+
+
+class NumpyBackend(DockingBackend):
+    """Docking NumPy (Monte Carlo + BFGS di grid map Vina) tanpa binary vina
+
+    Fallback untuk node tanpa vina (mode 'auto' hanya memilihnya jika tidak ada backend
+    Vina); paralel lewat process pool engine sendiri yang dilepas di close().
+    Timeout diabaikan seperti backend in-process lainnya.
+    """
+    name = 'numpy'
+    in_process = True
+    fallback_only = True
+
+    def __init__(self, logger, engine=None, **engine_config):
+        super().__init__(logger)
+        self._engine = engine
+        self.engine_config = engine_config
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            self._engine = NumpyDockingEngine(self.logger, **self.engine_config)
+        return self._engine
+
+    def close(self):
+        if self._engine is not None:
+            self._engine.close()
+
+    def available(self):
+        return True
+
+    def fingerprint(self):
+        return f"{self.name}:{np.__version__}"
+
+    def dock(self, protein_file, ligand_file, output_file, log_file, docking_config, timeout):
+        affinities = self.engine.dock(protein_file, ligand_file, output_file, docking_config)
+        with open(log_file, 'w') as f:
+            f.write("mode |   affinity | dist from best mode\n")
+            f.write("     | (kcal/mol) | rmsd l.b.| rmsd u.b.\n")
+            f.write("-----+------------+----------+----------\n")
+            for i, affinity in enumerate(affinities, 1):
+                f.write(f"{i:>4} {affinity:>12.3f} {'-':>10} {'-':>10}\n")
+        return None
+
+    def optimize(self, protein_file, pose_file, output_file, docking_config, timeout=120):
+        return self.engine.optimize(protein_file, pose_file, output_file, docking_config)
+
+
+class FakeDockingBackend(DockingBackend):
+    """Backend uji tanpa tool eksternal: pose = konformer input diputar acak di tengah box
+
+    Energi deterministik dari nama file ligan, sehingga pipeline (clustering, store,
+    export) bisa dijalankan dan dites tanpa vina. Tidak dipilih oleh mode 'auto'.
+    """
+    name = 'fake'
+    auto_select = False
+
+    def __init__(self, logger, seconds_per_pose=0.0):
+        super().__init__(logger)
+        self.seconds_per_pose = seconds_per_pose
+
+    def available(self):
+        return True
+
+    def fake_poses(self, ligand_file, docking_config, num_modes):
+        """Pose acak (rotasi + translasi kecil di sekitar center box) dari konformer input"""
+        poses = read_docked_poses(ligand_file)
+        seed = int(hashlib.sha1(os.path.basename(ligand_file).encode()).hexdigest()[:8], 16)
+        rng = np.random.default_rng(seed + docking_config.get('seed', 0))
+
+        coords = poses['coords'][0].astype(np.float64)
+        coords -= coords.mean(axis=0)
+        center = np.array([docking_config['center_x'], docking_config['center_y'], docking_config['center_z']])
+        pose_coords = []
+        for _ in range(num_modes):
+            rotation, _ = np.linalg.qr(rng.normal(size=(3, 3)))
+            pose_coords.append(coords @ rotation.T + center + rng.normal(scale=1.0, size=3))
+
+        poses['coords'] = np.array(pose_coords, dtype=np.float32)
+        poses['energies'] = np.sort(-5.0 - 5.0 * rng.random(num_modes))
+        poses['rmsd_lb'] = np.zeros(num_modes)
+        poses['rmsd_ub'] = np.zeros(num_modes)
+        return poses
+
+    def dock(self, protein_file, ligand_file, output_file, log_file, docking_config, timeout):
+        num_modes = docking_config['num_modes']
+        time.sleep(self.seconds_per_pose * num_modes)
+        write_docked_poses(output_file, self.fake_poses(ligand_file, docking_config, num_modes))
+        return None
+
+    def optimize(self, protein_file, pose_file, output_file, docking_config, timeout=120):
+        poses = read_docked_poses(pose_file)
+        energy = float(np.nan_to_num(poses['energies'][0], nan=-5.0)) - 0.1
+        poses['energies'][:] = energy
+        write_docked_poses(output_file, poses, [0])
+        return energy
+
+
+class ReceptorPrepBackend:
+    """Interface backend preparasi receptor PDB -> PDBQT (argv tool eksternal lewat ToolRunner)"""
+    name = None
+    executable = None
+
+    def __init__(self, logger, runner=None):
+        self.logger = logger
+        self._runner = runner
+
+    @property
+    def runner(self):
+        return self._runner or get_runner()
+
+    def close(self):
+        """Tidak ada resource yang perlu dilepas (interface sama dengan DockingBackend)"""
+
+    def available(self):
+        return shutil.which(self.executable) is not None
+
+    def fingerprint(self):
+        return f"{self.name}:{shutil.which(self.executable)}"
+
+    def command(self, pdb_file, output_file):
+        raise NotImplementedError
+
+    def convert(self, pdb_file, output_file, timeout=600):
+        """Konversi pdb_file ke output_file, return pesan error atau None jika berhasil
+
+        Timeout juga dikembalikan sebagai pesan error agar backend berikutnya dicoba.
+        """
+        cmd = self.command(pdb_file, output_file)
+        self.logger.info(f"Running command: {' '.join(cmd)}")
+        try:
+            result = self.runner.run(cmd, timeout)
+        except subprocess.TimeoutExpired:
+            return f"{self.executable} timed out after {timeout} s"
+        except OSError as e:
+            return str(e)
+        if result.returncode != 0 or not os.path.exists(output_file):
+            return result.stderr or f"{self.executable} exited with code {result.returncode}"
+        return None
+
+
+class MGLToolsBackend(ReceptorPrepBackend):
+    """prepare_receptor4.py dari MGLTools (menambah hidrogen polar dan muatan Gasteiger)"""
+    name = 'mgltools'
+    executable = 'prepare_receptor4.py'
+
+    def command(self, pdb_file, output_file):
+        return [self.executable, '-r', pdb_file, '-o', output_file, '-A', 'hydrogens']
+
+
+class OpenBabelBackend(ReceptorPrepBackend):
+    """Open Babel sebagai receptor rigid (-xr)"""
+    name = 'obabel'
+    executable = 'obabel'
+
+    def command(self, pdb_file, output_file):
+        return [self.executable, pdb_file, '-O', output_file, '-xr']
+
+
+DOCKING_BACKENDS = {
+    'vina-python': VinaPythonBackend,
+    'vina-cli': VinaCLIBackend,
+    'numpy': NumpyBackend,
+    'fake': FakeDockingBackend
+}
+
+RECEPTOR_BACKENDS = {
+    'mgltools': MGLToolsBackend,
+    'obabel': OpenBabelBackend
+}
+
+
+class BackendProbe:
+    """Probe sekali: backend mana yang tersedia dan berapa lama satu run kalibrasi
+
+    Hasil di-cache di file JSON dan dipakai ulang selama fingerprint instalasi
+    (path binary / versi library) dan input kalibrasi (calibrate.key) tidak berubah.
+    """
+
+    def __init__(self, cache_file, logger):
+        self.cache_file = cache_file
+        self.logger = logger
+
+    def load(self):
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return {}
+        try:
+            with open(self.cache_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self, cache):
+        if not self.cache_file:
+            return
+        os.makedirs(os.path.dirname(self.cache_file) or '.', exist_ok=True)
+        with open(self.cache_file, 'w') as f:
+            json.dump(cache, f, indent=2)
+
+    def probe(self, kind, backends, calibrate=None, refresh=False):
+        """Probe {nama: backend}; return {nama: {'available', 'seconds', 'error'}}
+
+        calibrate(backend, work_dir) menjalankan satu run kalibrasi; tanpa calibrate
+        hanya ketersediaan yang dicek (seconds None). Timing tercache dari ligan/receptor
+        kalibrasi lain (calibrate.key berbeda) diukur ulang.
+        """
+        cache = self.load()
+        results = cache.get(kind, {})
+        calibration = getattr(calibrate, 'key', None)
+        changed = False
+        for name, backend in backends.items():
+            fingerprint = backend.fingerprint()
+            cached = results.get(name)
+            timed = cached is not None and (calibrate is None or not cached['available']
+                                            or (cached['seconds'] is not None
+                                                and cached.get('calibration') == calibration))
+            if not refresh and cached and cached.get('fingerprint') == fingerprint and timed:
+                continue
+
+            entry = {'fingerprint': fingerprint, 'available': backend.available(), 'seconds': None, 'error': None,
+                     'calibration': calibration if calibrate is not None else None}
+            if entry['available'] and calibrate is not None:
+                with tempfile.TemporaryDirectory() as work_dir:
+                    start_time = time.monotonic()
+                    try:
+                        calibrate(backend, work_dir)
+                        entry['seconds'] = round(time.monotonic() - start_time, 3)
+                    except Exception as e:
+                        entry['available'] = False
+                        entry['error'] = str(e)
+                    finally:
+                        backend.close()
+            results[name] = entry
+            changed = True
+            status = (f"{entry['seconds']:.2f} s" if entry['seconds'] is not None
+                      else "available" if entry['available'] else f"unavailable {entry['error'] or ''}".strip())
+            self.logger.info(f"Probed {kind} backend {name}: {status}")
+
+        if changed:
+            cache[kind] = results
+            self.save(cache)
+        return {name: results[name] for name in backends}
+
+
+def calibration_key(files, config=None):
+    """Hash isi file input kalibrasi (+ config) untuk invalidasi cache probe"""
+    digest = hashlib.sha1(json.dumps(config, sort_keys=True, default=str).encode())
+    for path in files:
+        with open(path, 'rb') as f:
+            digest.update(hashlib.sha1(f.read()).digest())
+    return digest.hexdigest()[:16]
+
+
+def docking_calibration(protein_file, ligand_file, docking_config):
+    """Run kalibrasi docking: satu ligan, exhaustiveness dan jumlah pose minimal"""
+    config = dict(docking_config, exhaustiveness=1, num_modes=1, seed=0)
+
+    def calibrate(backend, work_dir):
+        output_file = os.path.join(work_dir, 'calibration_out.pdbqt')
+        error = backend.dock(protein_file, ligand_file, output_file, os.path.join(work_dir, 'calibration.log'),
+                             config, timeout=600)
+        if error is not None:
+            raise RuntimeError(error)
+    calibrate.key = calibration_key([protein_file, ligand_file], config)
+    return calibrate
+
+
+def receptor_calibration(pdb_file):
+    """Run kalibrasi preparasi receptor pada satu file PDB"""
+    def calibrate(backend, work_dir):
+        error = backend.convert(pdb_file, os.path.join(work_dir, 'calibration.pdbqt'))
+        if error is not None:
+            raise RuntimeError(error)
+    calibrate.key = calibration_key([pdb_file])
+    return calibrate
+
+
+def rank_backends(probe_results, order, fallback=()):
+    """Nama backend tersedia, tercepat dulu (tanpa timing mengikuti urutan order)
+
+    Backend di fallback (misal engine NumPy) selalu di belakang backend lain yang tersedia,
+    berapa pun timing kalibrasinya.
+    """
+    available = [name for name in order if probe_results.get(name, {}).get('available')]
+    return sorted(available, key=lambda name: (name in fallback, probe_results[name]['seconds'] is None,
+                                               probe_results[name]['seconds'] or 0.0))
+
+
+def select_backend(kind, registry, choice, logger, probe=None, calibrate=None, candidates=None, options=None):
+    """Instance backend sesuai pilihan config ('auto' atau nama backend di registry)
+
+    Mode 'auto' mem-probe kandidat (tercache) dan memilih yang tercepat; return None jika
+    tidak ada backend yang tersedia. options: {nama backend: kwargs konstruktor}.
+    """
+    options = options or {}
+    if choice != 'auto':
+        if choice not in registry:
+            raise ValueError(f"Unknown {kind} backend: {choice} (choose from {', '.join(registry)})")
+        backend = registry[choice](logger, **options.get(choice, {}))
+        if not backend.available():
+            logger.warning(f"Configured {kind} backend {choice} is not available")
+        return backend
+
+    candidates = candidates or [name for name, cls in registry.items() if getattr(cls, 'auto_select', True)]
+    backends = {name: registry[name](logger, **options.get(name, {})) for name in candidates}
+    if probe is not None:
+        results = probe.probe(kind, backends, calibrate)
+    else:
+        results = {name: {'available': backend.available(), 'seconds': None} for name, backend in backends.items()}
+    fallback = [name for name in candidates if getattr(registry[name], 'fallback_only', False)]
+    ranked = rank_backends(results, candidates, fallback)
+    if not ranked:
+        logger.error(f"No {kind} backend available (tried {', '.join(candidates)})")
+        return None
+    logger.info(f"Selected {kind} backend: {ranked[0]}")
+    return backends[ranked[0]]
+
+
+def select_receptor_backends(choice, logger, probe=None, calibrate=None, candidates=None):
+    """Daftar backend preparasi receptor untuk dicoba berurutan (terpilih dulu, sisanya fallback)"""
+    candidates = candidates or list(RECEPTOR_BACKENDS)
+    if choice != 'auto':
+        first = select_backend('receptor', RECEPTOR_BACKENDS, choice, logger)
+        return [first] + [RECEPTOR_BACKENDS[name](logger) for name in candidates if name != choice]
+
+    backends = {name: RECEPTOR_BACKENDS[name](logger) for name in candidates}
+    if probe is not None:
+        results = probe.probe('receptor', backends, calibrate)
+    else:
+        results = {name: {'available': backend.available(), 'seconds': None} for name, backend in backends.items()}
+    ranked = rank_backends(results, candidates)
+    # Backend yang tidak terdeteksi tetap dicoba terakhir (PATH bisa berbeda saat run)
+    return [backends[name] for name in ranked] + [backends[name] for name in candidates if name not in ranked]
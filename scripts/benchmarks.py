@@ -0,0 +1,120 @@
+import os
+import time
+import pandas as pd
+from scripts.docking import AutoDockVina
+from scripts.pdbqt_reader import read_docked_poses, concatenate_poses, subset_poses
+from scripts.pose_clustering import heavy_atom_mask, symmetry_permutations, pairwise_rmsd
+
+
+def pose_rmsd(poses_a, poses_b, index_a=0, index_b=0, symmetry=True):
+    """RMSD atom berat (dengan simetri) antara satu pose dari dua hasil docking ligan yang sama"""
+    if poses_a['atom_types'] != poses_b['atom_types']:
+        raise ValueError("Poses do not share the same atom order")
+    pair = concatenate_poses([subset_poses(poses_a, [index_a]), subset_poses(poses_b, [index_b])])
+    permutations = symmetry_permutations(pair) if symmetry else None
+    return float(pairwise_rmsd(pair['coords'][:, heavy_atom_mask(pair)], permutations)[0, 1])
+
+
+def benchmark_box_sizing(protein_file, ligand_files, docking_config, box_config, results_dir, logger,
+                         backend=None, reference_files=None):
+    """Bandingkan waktu docking dan akurasi pose antara box site tetap dan box per ligan (Rg)
+
+    reference_files: {ligan: PDBQT pose referensi, misal ligan kristal} opsional. Tanpa referensi,
+    akurasi diukur sebagai RMSD pose terbaik box per ligan terhadap pose terbaik box tetap.
+    Return DataFrame satu baris per ligan.
+    """
+    dockers = {
+        'fixed': AutoDockVina(os.path.join(results_dir, 'fixed'), logger, backend=backend),
+        'adaptive': AutoDockVina(os.path.join(results_dir, 'adaptive'), logger, backend=backend,
+                                 box_config=dict(box_config, enabled=True))
+    }
+    for docker in dockers.values():
+        os.makedirs(docker.results_dir, exist_ok=True)
+
+    rows = []
+    for ligand_name, ligand_file in ligand_files.items():
+        row = {'ligand': ligand_name}
+        poses = {}
+        for label, docker in dockers.items():
+            config = docker.site_config(ligand_file, docking_config)
+            start_time = time.monotonic()
+            result = docker.run_vina_docking(protein_file, ligand_file, ligand_name, config, timeout=3600)
+            row[f'{label}_seconds'] = time.monotonic() - start_time
+            row[f'{label}_box'] = config['size_x']
+            row[f'{label}_best_affinity'] = result['best_affinity'] if result else None
+            if result:
+                poses[label] = read_docked_poses(result['output_file'])
+
+        if len(poses) == 2:
+            row['delta_affinity'] = row['adaptive_best_affinity'] - row['fixed_best_affinity']
+            row['rmsd_adaptive_vs_fixed'] = pose_rmsd(poses['adaptive'], poses['fixed'])
+            if reference_files and ligand_name in reference_files:
+                try:
+                    reference = read_docked_poses(reference_files[ligand_name])
+                    for label in dockers:
+                        row[f'{label}_rmsd_to_reference'] = pose_rmsd(poses[label], reference)
+                except Exception as e:
+                    logger.warning(f"Could not compare {ligand_name} to reference pose: {str(e)}")
+        rows.append(row)
+
+    report = pd.DataFrame(rows)
+    if report.empty or 'delta_affinity' not in report:
+        logger.error("Box sizing benchmark produced no comparable results")
+        return report
+
+    fixed_total = report['fixed_seconds'].sum()
+    adaptive_total = report['adaptive_seconds'].sum()
+    logger.info(f"Box sizing benchmark: fixed {fixed_total:.0f} s, adaptive {adaptive_total:.0f} s "
+                f"(speedup {fixed_total / max(adaptive_total, 1e-9):.2f}x), "
+                f"mean |delta affinity| {report['delta_affinity'].abs().mean():.2f} kcal/mol, "
+                f"{(report['rmsd_adaptive_vs_fixed'] < 2.0).mean():.0%} of best poses within 2 A")
+    return report
+
+
+def benchmark_docking_engines(protein_file, ligand_files, docking_config, backends, results_dir, logger,
+                              reference='vina', reference_files=None):
+    """Bandingkan waktu docking dan akurasi pose antar backend (misal NumPy vs Vina)
+
+    backends: {label: DockingBackend}; akurasi tiap backend diukur sebagai RMSD pose terbaik
+    terhadap pose terbaik backend reference, dan opsional terhadap reference_files (pose kristal).
+    Return DataFrame satu baris per ligan.
+    """
+    dockers = {label: AutoDockVina(os.path.join(results_dir, label), logger, backend=backend)
+               for label, backend in backends.items()}
+    for docker in dockers.values():
+        os.makedirs(docker.results_dir, exist_ok=True)
+
+    rows = []
+    for ligand_name, ligand_file in ligand_files.items():
+        row = {'ligand': ligand_name}
+        poses = {}
+        for label, docker in dockers.items():
+            start_time = time.monotonic()
+            result = docker.run_vina_docking(protein_file, ligand_file, ligand_name, docking_config, timeout=3600)
+            row[f'{label}_seconds'] = time.monotonic() - start_time
+            row[f'{label}_best_affinity'] = result['best_affinity'] if result else None
+            if result:
+                poses[label] = read_docked_poses(result['output_file'])
+
+        for label in poses:
+            if label != reference and reference in poses:
+                row[f'{label}_delta_affinity'] = row[f'{label}_best_affinity'] - row[f'{reference}_best_affinity']
+                row[f'{label}_rmsd_to_{reference}'] = pose_rmsd(poses[label], poses[reference])
+        if reference_files and ligand_name in reference_files:
+            try:
+                crystal = read_docked_poses(reference_files[ligand_name])
+                for label in poses:
+                    row[f'{label}_rmsd_to_reference'] = pose_rmsd(poses[label], crystal)
+            except Exception as e:
+                logger.warning(f"Could not compare {ligand_name} to reference pose: {str(e)}")
+        rows.append(row)
+
+    report = pd.DataFrame(rows)
+    for label in backends:
+        if label == reference or f'{label}_rmsd_to_{reference}' not in report:
+            continue
+        speed = report[f'{reference}_seconds'].sum() / max(report[f'{label}_seconds'].sum(), 1e-9)
+        logger.info(f"Engine benchmark {label} vs {reference}: {speed:.2f}x speed, "
+                    f"mean |delta affinity| {report[f'{label}_delta_affinity'].abs().mean():.2f} kcal/mol, "
+                    f"{(report[f'{label}_rmsd_to_{reference}'] < 2.0).mean():.0%} of best poses within 2 A")
+    return report
@@ -0,0 +1,33 @@
+import numpy as np
+from scripts.pdbqt_reader import read_docked_poses
+from scripts.pose_clustering import heavy_atom_mask
+
+# Feinstein & Brylinski (2015): akurasi Vina optimal pada sisi box = 2.857 x Rg
+RG_BOX_SCALE = 2.857
+
+
+def radius_of_gyration(ligand_file):
+    """Radius of gyration (Angstrom) atom berat dari konformer di file PDBQT ligan"""
+    poses = read_docked_poses(ligand_file)
+    coords = poses['coords'][0][heavy_atom_mask(poses)].astype(np.float64)
+    return float(np.sqrt(((coords - coords.mean(axis=0)) ** 2).sum(axis=1).mean()))
+
+
+def ligand_box(ligand_file, docking_config, box_config):
+    """Docking config dengan box kubus seukuran ligan, center tetap di site
+
+    Sisi box = scale x Rg, dibatasi [min_size, max_size] dan tidak melebihi box site.
+    """
+    rg = radius_of_gyration(ligand_file)
+    edge = box_config.get('scale', RG_BOX_SCALE) * rg
+    edge = max(edge, box_config['min_size'])
+    sized = dict(docking_config)
+    for axis in ('size_x', 'size_y', 'size_z'):
+        sized[axis] = round(min(edge, box_config['max_size'], docking_config[axis]), 3)
+    return sized
+
+
+def box_of(docking_config):
+    """Box (center dan size) dari docking config untuk dicatat bersama hasil"""
+    return {key: float(docking_config[key])
+            for key in ('center_x', 'center_y', 'center_z', 'size_x', 'size_y', 'size_z')}
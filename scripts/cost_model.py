@@ -0,0 +1,137 @@
+import math
+import heapq
+import numpy as np
+
+# Prior heuristik (detik) sebelum ada cukup timing historis untuk kalibrasi
+DEFAULT_PRIOR = {
+    'base_seconds': 30,
+    'seconds_per_torsion': 20,
+    'seconds_per_heavy_atom': 2,
+    'reference_exhaustiveness': 8,
+    'reference_volume': 15625
+}
+
+# Kolom design matrix untuk log volume dan log exhaustiveness (skala multiplikatif)
+SCALING_COLUMNS = {3: 'volume', 4: 'exhaustiveness'}
+
+
+def read_ligand_stats(ligand_file):
+    """Hitung jumlah torsi dan heavy atom dari file PDBQT ligan"""
+    torsions = 0
+    heavy_atoms = 0
+    with open(ligand_file, 'r') as f:
+        for line in f:
+            if line.startswith('TORSDOF'):
+                torsions = int(line.split()[1])
+            elif line.startswith(('ATOM', 'HETATM')):
+                atom_type = line[77:79].strip() if len(line) > 77 else line.split()[-1]
+                if atom_type not in ('H', 'HD', 'HS'):
+                    heavy_atoms += 1
+    return {'torsions': torsions, 'heavy_atoms': heavy_atoms}
+
+
+def job_features(ligand_file, docking_config):
+    """Fitur cost model untuk satu job docking (ligan + box + exhaustiveness)"""
+    features = read_ligand_stats(ligand_file)
+    features['volume'] = docking_config['size_x'] * docking_config['size_y'] * docking_config['size_z']
+    features['exhaustiveness'] = docking_config['exhaustiveness']
+    return features
+
+
+def estimate_makespan(predictions, max_workers):
+    """Simulasi LPT: waktu selesai batch jika job (urut terlama dulu) dibagi ke max_workers"""
+    workers = [0.0] * max(1, max_workers)
+    for seconds in sorted(predictions, reverse=True):
+        heapq.heappush(workers, heapq.heappop(workers) + seconds)
+    return max(workers)
+
+
+class DockingCostModel:
+    """Prediksi waktu docking (detik) dari torsi, heavy atom, volume box dan exhaustiveness
+
+    log(detik) dimodelkan linear terhadap fitur dan dikalibrasi (ridge least squares)
+    dari timing historis di results store; sebelum cukup data dipakai prior heuristik.
+    Volume atau exhaustiveness yang tidak bervariasi di histori tidak bisa dipisahkan dari
+    intercept; koefisiennya dikunci ke 1 (waktu sebanding, seperti prior) dan hanya term
+    lain yang di-fit.
+    """
+
+    def __init__(self, logger, min_samples=20, max_samples=5000, ridge=1e-3, timeout_factor=3.0,
+                 min_timeout=120, max_timeout=3600, prior=None):
+        self.logger = logger
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.ridge = ridge
+        self.timeout_factor = timeout_factor
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.prior = prior or DEFAULT_PRIOR
+        self.coefficients = None
+        self.n_samples = 0
+
+    def design_matrix(self, features):
+        """Matriks fitur (n_jobs, 5): intercept, torsi, heavy atom, log volume, log exhaustiveness"""
+        return np.array([[1.0, f['torsions'], f['heavy_atoms'], math.log(f['volume']), math.log(f['exhaustiveness'])]
+                         for f in features])
+
+    def calibrate(self, results_store):
+        """Fit koefisien dari timing historis; return True jika model terkalibrasi"""
+        if results_store is None:
+            return False
+        timings = results_store.load_timings(limit=self.max_samples)
+        if len(timings) < self.min_samples:
+            self.logger.info(f"Cost model uses heuristic prior ({len(timings)} of {self.min_samples} timings available)")
+            return False
+
+        X = self.design_matrix(timings.to_dict('records'))
+        y = np.log(np.maximum(timings['elapsed_seconds'].to_numpy(), 1.0))
+        fixed = [column for column in SCALING_COLUMNS if np.ptp(X[:, column]) < 1e-9]
+        free = [column for column in range(X.shape[1]) if column not in fixed]
+        X_free = X[:, free]
+        y_free = y - X[:, fixed].sum(axis=1)
+        penalty = self.ridge * len(y) * np.eye(len(free))
+        penalty[0, 0] = 0.0  # intercept tidak di-regularisasi
+        coefficients = np.ones(X.shape[1])
+        coefficients[free] = np.linalg.solve(X_free.T @ X_free + penalty, X_free.T @ y_free)
+        self.coefficients = coefficients
+        self.n_samples = len(y)
+
+        residual = y - X @ self.coefficients
+        self.logger.info(f"Cost model calibrated on {self.n_samples} timings "
+                         f"(log-time RMSE {np.sqrt(np.mean(residual ** 2)):.2f})")
+        if fixed:
+            self.logger.info(f"No variance in {', '.join(SCALING_COLUMNS[column] for column in fixed)}, "
+                             f"using proportional prior scaling")
+        return True
+
+    def prior_seconds(self, features):
+        """Estimasi heuristik dari prior (dipakai sebelum kalibrasi)"""
+        seconds = (self.prior['base_seconds']
+                   + self.prior['seconds_per_torsion'] * features['torsions']
+                   + self.prior['seconds_per_heavy_atom'] * features['heavy_atoms'])
+        seconds *= features['exhaustiveness'] / self.prior['reference_exhaustiveness']
+        seconds *= features['volume'] / self.prior['reference_volume']
+        return seconds
+
+    def predict(self, features):
+        """Prediksi waktu docking (detik) untuk satu dict fitur"""
+        if self.coefficients is None:
+            return self.prior_seconds(features)
+        return float(np.exp(self.design_matrix([features]) @ self.coefficients)[0])
+
+    def predict_job(self, ligand_file, docking_config):
+        """Prediksi waktu docking untuk satu ligan di satu box (prior max_timeout jika file tidak terbaca)"""
+        try:
+            return self.predict(job_features(ligand_file, docking_config))
+        except Exception as e:
+            self.logger.warning(f"Could not read ligand stats from {ligand_file}: {str(e)}")
+            return float(self.max_timeout)
+
+    def timeout(self, predicted):
+        """Timeout per job: kelipatan prediksi, dibatasi min/max"""
+        return min(max(predicted * self.timeout_factor, self.min_timeout), self.max_timeout)
+
+    def time_budget(self, predicted, budget_config):
+        """Time budget untuk docking bertahap dari prediksi waktu"""
+        seconds = predicted * budget_config['budget_factor']
+        return min(max(seconds, budget_config['min_seconds']), budget_config['max_seconds'])
@@ -1,121 +1,539 @@
 import os
+import math
+import time
 import subprocess
-import tempfile
+import numpy as np
 import pandas as pd
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from scripts.pdbqt_reader import (read_docked_poses, write_docked_poses, concatenate_poses, subset_poses,
+                                  pose_to_pdbqt)
+from scripts.pose_clustering import cluster_poses
+from scripts.pose_store import pose_key
+from scripts.results_store import receptor_name
+from scripts.backends import VinaCLIBackend
+from scripts.cost_model import DockingCostModel, job_features, estimate_makespan
+from scripts.box_sizing import ligand_box, box_of
+from scripts.template_seeding import seeded_config
+
+def format_duration(seconds):
+    """Format detik sebagai h:mm:ss"""
+    seconds = int(round(seconds))
+    return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
 
 class AutoDockVina:
-    def __init__(self, results_dir, logger):
+    def __init__(self, results_dir, logger, pose_store=None, results_store=None, backend=None,
+                 clustering_config=None, cost_model=None, box_config=None, warm_start=None):
         self.results_dir = results_dir
         self.logger = logger
+        self.pose_store = pose_store
+        self.results_store = results_store
+        self.backend = backend or VinaCLIBackend(logger)
+        self.clustering_config = clustering_config
+        self.cost_model = cost_model or DockingCostModel(logger)
+        self.box_config = box_config
+        self.warm_start = warm_start
     
-    def create_config_file(self, protein_file, ligand_file, output_file, docking_config):
-        """Buat file konfigurasi untuk Vina"""
-        config_file = tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False)
+    def run_vina_process(self, protein_file, ligand_file, output_file, log_file, docking_config, timeout):
+        """Jalankan satu proses docking lewat backend
         
-        config_content = f"""receptor = {protein_file}
-ligand = {ligand_file}
-out = {output_file}
-
-center_x = {docking_config['center_x']}
-center_y = {docking_config['center_y']}
-center_z = {docking_config['center_z']}
-
-size_x = {docking_config['size_x']}
-size_y = {docking_config['size_y']}
-size_z = {docking_config['size_z']}
-
-exhaustiveness = {docking_config['exhaustiveness']}
-num_modes = {docking_config['num_modes']}
-"""
+        Return pesan error, atau None jika berhasil. TimeoutExpired diteruskan ke pemanggil.
+        """
+        return self.backend.dock(protein_file, ligand_file, output_file, log_file, docking_config, timeout)
+    
+    def close(self):
+        """Lepas resource backend (process pool engine NumPy)"""
+        self.backend.close()
+    
+    def site_config(self, ligand_file, docking_config, box=None):
+        """Docking config untuk satu ligan di satu site (box seukuran ligan jika diaktifkan)"""
+        config = dict(docking_config, **(box or {}))
+        if self.box_config and self.box_config.get('enabled', False):
+            try:
+                config = ligand_box(ligand_file, config, self.box_config)
+            except Exception as e:
+                self.logger.warning(f"Could not size box for {ligand_file}, using site box: {str(e)}")
+        return config
+    
+    def plan_job(self, ligand_name, ligand_file, docking_config, site=None, box=None, seeds=None):
+        """Tentukan (ligand_file, docking_config, local_only) untuk satu job
+        
+        seeds: {ligan: info seed dari TemplateSeeder} untuk site referensi; ligan dengan seed
+        didocking dari konformasi seed (minimisasi lokal atau pencarian tereduksi).
+        """
+        site_config = self.site_config(ligand_file, docking_config, box)
+        seed = (seeds or {}).get(ligand_name)
+        if seed is None:
+            return ligand_file, site_config, False
+        return seed['seed_file'], seeded_config(seed, site_config), seed['mode'] == 'local'
+    
+    def predict_job(self, ligand_file, docking_config, local_only=False):
+        """Prediksi waktu job dari cost model"""
+        if local_only:
+            # Minimisasi lokal kira-kira sebanding dengan satu run exhaustiveness 1
+            docking_config = dict(docking_config, exhaustiveness=1)
+        return self.cost_model.predict_job(ligand_file, docking_config)
+    
+    def run_vina_docking(self, protein_file, ligand_file, ligand_name, docking_config, time_budget=None, site=None,
+                         timeout=600, local_only=False):
+        """Jalankan docking dengan AutoDock Vina (local_only: minimisasi lokal pose input saja)"""
+        job_name = pose_key(ligand_name, site)
+        warm_seed = None
+        if self.warm_start is not None and not local_only:
+            warm_seed = self.warm_start.seed(ligand_name, site or 'default', docking_config)
+        
+        if local_only:
+            result = self.refine_poses(protein_file, ligand_file, ligand_name, docking_config, site)
+        elif warm_seed is not None:
+            result = self.run_warm_docking(protein_file, ligand_file, ligand_name, docking_config, warm_seed,
+                                           time_budget, site, timeout)
+        elif time_budget:
+            result = self.run_budgeted_docking(protein_file, ligand_file, job_name, docking_config, time_budget)
+        else:
+            result = self.run_single_docking(protein_file, ligand_file, job_name, docking_config, timeout)
         
-        config_file.write(config_content)
-        config_file.close()
+        if result:
+            result['site'] = site or 'default'
+            result['box'] = box_of(docking_config)
+            # Fitur job disimpan bersama timing untuk kalibrasi cost model
+            try:
+                result['cost_features'] = job_features(ligand_file, docking_config)
+            except Exception as e:
+                self.logger.warning(f"Could not read ligand stats from {ligand_file}: {str(e)}")
+        return result
+    
+    def run_warm_docking(self, protein_file, ligand_file, ligand_name, docking_config, seed, time_budget=None,
+                         site=None, timeout=600):
+        """Re-docking dari pose run sebelumnya: minimisasi lokal + pencarian global tereduksi
         
-        return config_file.name
+        Docking penuh hanya dijalankan jika skor terbaik bergeser lebih dari drift_threshold
+        dari affinity lama (receptor/box berubah terlalu banyak untuk warm start).
+        """
+        job_name = pose_key(ligand_name, site)
+        previous = seed['previous_affinity']
+        self.logger.info(f"Warm start for {job_name} from previous affinity {previous:.2f} kcal/mol")
+        
+        try:
+            refined = self.refine_poses(protein_file, seed['seed_file'], ligand_name, docking_config, site)
+            searched = self.run_single_docking(protein_file, ligand_file, job_name, seeded_config(seed, docking_config),
+                                               timeout)
+            candidates = [result for result in (refined, searched) if result]
+            if candidates:
+                result = min(candidates, key=lambda r: r['best_affinity'])
+                # refine_poses dan run_single_docking sama-sama mengisi pose store; yang terakhir menang
+                if result is refined and searched and self.pose_store is not None:
+                    self.pose_store.add(job_name, read_docked_poses(refined['output_file']))
+                if not self.warm_start.escalate(previous, result['best_affinity']):
+                    result['warm_start'] = 'warm'
+                    result['score_drift'] = round(result['best_affinity'] - previous, 3)
+                    return result
+                self.logger.info(f"Score of {job_name} drifted to {result['best_affinity']:.2f} kcal/mol, "
+                                 f"escalating to full docking")
+            else:
+                self.warm_start.escalate(previous, np.inf)
+                self.logger.warning(f"Warm start failed for {job_name}, escalating to full docking")
+            
+            if time_budget:
+                result = self.run_budgeted_docking(protein_file, ligand_file, job_name, docking_config, time_budget)
+            else:
+                result = self.run_single_docking(protein_file, ligand_file, job_name, docking_config, timeout)
+            if result:
+                result['warm_start'] = 'escalated'
+                result['score_drift'] = round(result['best_affinity'] - previous, 3)
+            return result
+        finally:
+            # Seed file warm start hanya file kerja untuk job ini
+            if os.path.exists(seed['seed_file']):
+                os.unlink(seed['seed_file'])
     
-    def run_vina_docking(self, protein_file, ligand_file, ligand_name, docking_config):
-        """Jalankan docking dengan AutoDock Vina"""
+    def run_single_docking(self, protein_file, ligand_file, ligand_name, docking_config, timeout=600):
+        """Satu run Vina dengan timeout per job"""
         try:
             output_file = os.path.join(self.results_dir, f"{ligand_name}_docked.pdbqt")
             log_file = os.path.join(self.results_dir, f"{ligand_name}_docking.log")
             
-            # Create config file
-            config_file = self.create_config_file(protein_file, ligand_file, output_file, docking_config)
-            
-            # Run Vina
-            cmd = [
-                'vina',
-                '--config', config_file,
-                '--log', log_file
-            ]
+            self.logger.info(f"Running docking for {ligand_name} (timeout {timeout:.0f} s)...")
+            start_time = time.monotonic()
+            error = self.run_vina_process(protein_file, ligand_file, output_file, log_file, docking_config, timeout)
+            elapsed = time.monotonic() - start_time
             
-            self.logger.info(f"Running docking for {ligand_name}...")
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=600)
-            
-            # Clean up config file
-            os.unlink(config_file)
-            
-            if result.returncode == 0 and os.path.exists(output_file):
+            if error is None:
                 # Parse results
-                binding_affinities = self.parse_vina_output(log_file)
+                poses = read_docked_poses(output_file, scored_only=True)
+                poses, cluster_sizes = self.cluster_docked_poses(ligand_name, poses, output_file)
+                binding_affinities = poses['energies'].tolist()
+                if self.pose_store is not None:
+                    self.pose_store.add(ligand_name, poses)
                 self.logger.info(f"Docking completed for {ligand_name} - Best affinity: {binding_affinities[0]:.2f} kcal/mol")
                 
                 return {
                     'output_file': output_file,
                     'log_file': log_file,
                     'binding_affinities': binding_affinities,
-                    'best_affinity': binding_affinities[0] if binding_affinities else None
+                    'rmsd_lb': poses['rmsd_lb'].tolist(),
+                    'rmsd_ub': poses['rmsd_ub'].tolist(),
+                    'cluster_sizes': cluster_sizes,
+                    'best_affinity': binding_affinities[0] if binding_affinities else None,
+                    'elapsed_seconds': elapsed
                 }
             else:
-                self.logger.error(f"Vina docking failed for {ligand_name}: {result.stderr}")
+                self.logger.error(f"Vina docking failed for {ligand_name}: {error}")
                 return None
                 
         except Exception as e:
             self.logger.error(f"Error in Vina docking for {ligand_name}: {str(e)}")
             return None
     
-    def parse_vina_output(self, log_file):
-        """Parse hasil binding affinity dari log Vina"""
-        affinities = []
+    def cluster_docked_poses(self, ligand_name, poses, output_file):
+        """Post-processing: cluster pose berdasarkan RMSD dan simpan satu representatif per cluster
+        
+        Return (poses, cluster_sizes); output_file ditulis ulang hanya berisi representatif.
+        """
+        config = self.clustering_config
+        if not config or not config.get('enabled', False) or len(poses['energies']) < 2:
+            return poses, None
+        
         try:
-            with open(log_file, 'r') as f:
-                lines = f.readlines()
-            
-            parsing = False
-            for line in lines:
-                if "-----+------------+----------+----------" in line:
-                    parsing = True
-                    continue
-                elif parsing and line.strip() == "":
+            clusters = cluster_poses(poses, cutoff=config['rmsd_cutoff'], method=config['method'],
+                                     symmetry=config['symmetry'], max_permutations=config['max_permutations'])
+        except Exception as e:
+            self.logger.warning(f"Pose clustering failed for {ligand_name}, keeping all poses: {str(e)}")
+            return poses, None
+        
+        representatives = clusters['representatives']
+        poses = subset_poses(poses, representatives)
+        write_docked_poses(output_file, poses)
+        self.logger.info(f"Clustered {len(clusters['labels'])} poses of {ligand_name} into {len(representatives)} "
+                         f"clusters (RMSD < {config['rmsd_cutoff']} A)")
+        return poses, clusters['populations'].tolist()
+    
+    def write_merged_log(self, log_file, ligand_name, affinities, partial):
+        """Tulis log ringkas dengan format tabel Vina untuk hasil gabungan"""
+        with open(log_file, 'w') as f:
+            f.write(f"Merged time-budgeted docking for {ligand_name}\n")
+            if partial:
+                f.write("WARNING: time budget exhausted, results are partial (best-so-far)\n")
+            f.write("\nmode |   affinity | dist from best mode\n")
+            f.write("     | (kcal/mol) | rmsd l.b.| rmsd u.b.\n")
+            f.write("-----+------------+----------+----------\n")
+            for i, affinity in enumerate(affinities, 1):
+                f.write(f"{i:>4} {affinity:>12.3f} {'-':>10} {'-':>10}\n")
+            f.write("\n")
+    
+    def run_budgeted_docking(self, protein_file, ligand_file, ligand_name, docking_config, time_budget):
+        """Docking dengan time budget: exhaustiveness dipecah menjadi beberapa run pendek
+        dan pose terbaik dari run yang selesai tetap dikembalikan jika budget habis"""
+        start_time = time.monotonic()
+        slices = max(1, docking_config.get('slices', 1))
+        slice_config = dict(docking_config)
+        slice_config['exhaustiveness'] = max(1, math.ceil(docking_config['exhaustiveness'] / slices))
+        
+        pose_sets = []
+        slice_files = []
+        completed_slices = 0
+        partial = False
+        
+        try:
+            for i in range(slices):
+                remaining = time_budget - (time.monotonic() - start_time)
+                if remaining <= 1:
+                    partial = True
                     break
-                elif parsing and len(line.split()) >= 2:
-                    try:
-                        affinity = float(line.split()[1])
-                        affinities.append(affinity)
-                    except (ValueError, IndexError):
-                        continue
-                        
+                
+                slice_output = os.path.join(self.results_dir, f"{ligand_name}_slice{i}.pdbqt")
+                slice_log = os.path.join(self.results_dir, f"{ligand_name}_slice{i}.log")
+                slice_files.extend([slice_output, slice_log])
+                slice_config['seed'] = docking_config.get('seed', 0) + i + 1
+                
+                self.logger.info(f"Running docking slice {i + 1}/{slices} for {ligand_name} "
+                                 f"({remaining:.0f} s of budget left)...")
+                try:
+                    error = self.run_vina_process(protein_file, ligand_file, slice_output, slice_log,
+                                                  slice_config, remaining)
+                except subprocess.TimeoutExpired:
+                    self.logger.warning(f"Time budget of {time_budget:.0f} s exhausted for {ligand_name} "
+                                        f"after {completed_slices}/{slices} slices")
+                    partial = True
+                    break
+                
+                if error is not None:
+                    self.logger.error(f"Vina docking slice {i + 1} failed for {ligand_name}: {error}")
+                    continue
+                
+                pose_sets.append(read_docked_poses(slice_output, scored_only=True))
+                completed_slices += 1
+            
+            if not pose_sets:
+                self.logger.error(f"No poses found for {ligand_name} within time budget")
+                return None
+            
+            # Gabungkan pose dari semua slice, ambil num_modes terbaik
+            poses = concatenate_poses(pose_sets)
+            order = poses['energies'].argsort(kind='stable')[:docking_config['num_modes']]
+            
+            output_file = os.path.join(self.results_dir, f"{ligand_name}_docked.pdbqt")
+            log_file = os.path.join(self.results_dir, f"{ligand_name}_docking.log")
+            poses = subset_poses(poses, order)
+            poses, cluster_sizes = self.cluster_docked_poses(ligand_name, poses, output_file)
+            if cluster_sizes is None:
+                write_docked_poses(output_file, poses)
+            binding_affinities = poses['energies'].tolist()
+            if self.pose_store is not None:
+                self.pose_store.add(ligand_name, poses)
+            self.write_merged_log(log_file, ligand_name, binding_affinities, partial)
+            
+            elapsed = time.monotonic() - start_time
+            status = "partial" if partial else "complete"
+            self.logger.info(f"Docking {status} for {ligand_name} in {elapsed:.0f} s - "
+                             f"Best affinity: {binding_affinities[0]:.2f} kcal/mol")
+            
+            return {
+                'output_file': output_file,
+                'log_file': log_file,
+                'binding_affinities': binding_affinities,
+                'rmsd_lb': poses['rmsd_lb'].tolist(),
+                'rmsd_ub': poses['rmsd_ub'].tolist(),
+                'cluster_sizes': cluster_sizes,
+                'best_affinity': binding_affinities[0],
+                'partial': partial,
+                'time_budget': time_budget,
+                'elapsed_seconds': elapsed,
+                'completed_slices': completed_slices
+            }
+            
         except Exception as e:
-            self.logger.error(f"Error parsing Vina output: {str(e)}")
+            self.logger.error(f"Error in budgeted Vina docking for {ligand_name}: {str(e)}")
+            return None
+        finally:
+            for path in slice_files:
+                if os.path.exists(path):
+                    os.unlink(path)
+    
+    def run_docking_batch(self, protein_file, ligand_files, docking_config, budget_config=None,
+                          summary_limit=None, sites=None, max_workers=1, seeds=None, seed_site=None, receptor=None,
+                          cpu_budget=None):
+        """Jalankan batch docking untuk semua pasangan (ligan, site)
+        
+        sites: {nama_site: box} yang menimpa box di docking_config; None berarti satu box.
+        seeds: {ligan: info seed} dari TemplateSeeder, dipakai hanya di seed_site.
+        receptor: nama receptor di results store (default nama file protein).
+        cpu_budget: CpuBudget bersama (scripts/streaming.py); tiap job memegang docking_config['cpu'] slot.
+        Dengan results store, tiap hasil langsung di-stream ke disk dan dict yang
+        dikembalikan (site terbaik per ligan) dibaca ulang dari disk: semua ligan, atau hanya
+        summary_limit ligan terbaik jika diberikan (0 = tidak dimuat).
+        """
+        sites = sites or {'default': {}}
+        use_budget = self.use_time_budget(budget_config)
+        if use_budget:
+            docking_config = dict(docking_config, slices=budget_config['slices'])
+        
+        self.logger.info(f"Starting batch docking for {len(ligand_files)} ligands x {len(sites)} sites "
+                         f"with {max_workers} workers...")
+        
+        # Urutkan job dari prediksi terlama (LPT) agar ligan besar tidak tertinggal di akhir batch
+        jobs = []
+        for ligand_name, ligand_file in ligand_files.items():
+            for site, box in sites.items():
+                job_file, site_config, local_only = self.plan_job(ligand_name, ligand_file, docking_config, site,
+                                                                  box, seeds if site == seed_site else None)
+                predicted = self.predict_job(job_file, site_config, local_only)
+                jobs.append((predicted, ligand_name, job_file, site, site_config, local_only))
+        jobs.sort(key=lambda job: job[0], reverse=True)
         
-        return affinities
+        eta = estimate_makespan([job[0] for job in jobs], max_workers)
+        self.logger.info(f"Estimated batch time: {format_duration(eta)} for {len(jobs)} jobs "
+                         f"(longest job {format_duration(jobs[0][0]) if jobs else '-'})")
+        
+        iter_jobs = (self.job_args(job, budget_config if use_budget else None) for job in jobs)
+        return self.execute_jobs(protein_file, iter_jobs, max_workers, receptor, summary_limit, cpu_budget)
     
-    def run_docking_batch(self, protein_file, ligand_files, docking_config):
-        """Jalankan batch docking untuk semua ligan"""
-        self.logger.info(f"Starting batch docking for {len(ligand_files)} ligands...")
+    def run_docking_stream(self, protein_file, ligand_stream, docking_config, budget_config=None,
+                           summary_limit=None, sites=None, max_workers=1, seeds=None, seed_site=None, receptor=None,
+                           cpu_budget=None):
+        """Seperti run_docking_batch, tetapi ligan diambil dari iterable (nama, file PDBQT)
+        
+        Job di-plan saat ligan tiba, sehingga docking bisa berjalan selama preparasi ligan
+        lain masih berlangsung; urutan LPT dan estimasi waktu batch tidak tersedia.
+        """
+        sites = sites or {'default': {}}
+        use_budget = self.use_time_budget(budget_config)
+        if use_budget:
+            docking_config = dict(docking_config, slices=budget_config['slices'])
+        self.logger.info(f"Starting streaming docking over {len(sites)} sites with {max_workers} workers...")
+        
+        def iter_jobs():
+            for ligand_name, ligand_file in ligand_stream:
+                for site, box in sites.items():
+                    job_file, site_config, local_only = self.plan_job(ligand_name, ligand_file, docking_config, site,
+                                                                      box, seeds if site == seed_site else None)
+                    predicted = self.predict_job(job_file, site_config, local_only)
+                    yield self.job_args((predicted, ligand_name, job_file, site, site_config, local_only),
+                                        budget_config if use_budget else None)
         
+        return self.execute_jobs(protein_file, iter_jobs(), max_workers, receptor, summary_limit, cpu_budget)
+    
+    def use_time_budget(self, budget_config):
+        """True jika time budget dipakai; backend in-process tidak bisa dihentikan saat budget habis"""
+        if budget_config is None or not budget_config.get('enabled', False):
+            return False
+        if self.backend.in_process:
+            self.logger.info(f"Time budget disabled for in-process backend {self.backend.name}")
+            return False
+        return True
+    
+    def job_args(self, job, budget_config=None):
+        """Argumen eksekusi satu job terencana (time budget dan timeout dari prediksi cost model)"""
+        predicted, ligand_name, ligand_file, site, site_config, local_only = job
+        time_budget = None
+        if budget_config is not None and not local_only:
+            time_budget = self.cost_model.time_budget(predicted, budget_config)
+            self.logger.info(f"Time budget for {ligand_name} at {site}: {time_budget:.0f} s")
+        return (ligand_name, ligand_file, site, site_config, time_budget, self.cost_model.timeout(predicted),
+                local_only)
+    
+    def execute_jobs(self, protein_file, jobs, max_workers, receptor=None, summary_limit=None, cpu_budget=None):
+        """Jalankan job docking dengan jumlah in-flight terbatas lalu tulis hasilnya"""
+        receptor = receptor or receptor_name(protein_file)
+        writer = None
+        if self.results_store is not None:
+            # Pose di-flush sebelum tiap batch hasil di-commit
+            writer = self.results_store.open_writer(
+                receptor, self.pose_store.flush if self.pose_store is not None else None)
         results = {}
+        n_success = 0
+        jobs = iter(jobs)
         
-        for ligand_name, ligand_file in ligand_files.items():
-            result = self.run_vina_docking(protein_file, ligand_file, ligand_name, docking_config)
-            if result:
-                results[ligand_name] = result
+        def dock(ligand_name, ligand_file, site, site_config, time_budget, timeout, local_only):
+            if cpu_budget is None:
+                return self.run_vina_docking(protein_file, ligand_file, ligand_name, site_config, time_budget,
+                                             site, timeout, local_only)
+            with cpu_budget.slots(site_config.get('cpu', 1), priority=True):
+                return self.run_vina_docking(protein_file, ligand_file, ligand_name, site_config, time_budget,
+                                             site, timeout, local_only)
+        
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                # Jumlah job in-flight dibatasi agar memori tidak tumbuh dengan ukuran library
+                pending = {}
+                while True:
+                    for job in jobs:
+                        pending[executor.submit(dock, *job)] = job[0]
+                        if len(pending) >= 2 * max_workers:
+                            break
+                    if not pending:
+                        break
+                    
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        ligand_name = pending.pop(future)
+                        result = future.result()
+                        if not result:
+                            continue
+                        n_success += 1
+                        
+                        if writer is None:
+                            # Tanpa results store: simpan site terbaik per ligan di memori
+                            if ligand_name not in results or result['best_affinity'] < results[ligand_name]['best_affinity']:
+                                results[ligand_name] = result
+                        else:
+                            writer.append(ligand_name, result)
+        finally:
+            if writer is not None:
+                writer.close()
+            if self.pose_store is not None:
+                self.pose_store.flush()
+            self.backend.close()
+        
+        self.logger.info(f"Batch docking completed. {n_success} successful dockings.")
+        
+        # Results store adalah system of record; Excel hanya jika tidak ada store
+        if writer is None:
+            self.save_results_to_excel(results)
+            return results
+        return self.results_store.load_results(receptor, limit=summary_limit)
+    
+    def run_local_process(self, protein_file, pose_file, output_file, docking_config, timeout=120):
+        """Minimisasi lokal satu pose lewat backend, return energi (kcal/mol)"""
+        return self.backend.optimize(protein_file, pose_file, output_file, docking_config, timeout)
+    
+    def refine_poses(self, protein_file, pose_file, ligand_name, docking_config, site=None):
+        """Minimisasi lokal semua pose di pose_file tanpa global search
         
-        # Save results to Excel
-        self.save_results_to_excel(results)
+        pose_file boleh berisi banyak MODEL (hasil run sebelumnya atau tool lain).
+        Pose hasil minimisasi ditulis ke <nama>_refined.pdbqt, urut energi terbaik.
+        """
+        job_name = pose_key(ligand_name, site)
+        work_files = []
+        try:
+            poses = read_docked_poses(pose_file)
+            refined = []
+            energies = []
+            for index in range(len(poses['coords'])):
+                pose_in = os.path.join(self.results_dir, f"{job_name}_pose{index + 1}_in.pdbqt")
+                pose_out = os.path.join(self.results_dir, f"{job_name}_pose{index + 1}_min.pdbqt")
+                work_files += [pose_in, pose_out]
+                with open(pose_in, 'w') as f:
+                    f.write(pose_to_pdbqt(poses, index))
+                energies.append(self.run_local_process(protein_file, pose_in, pose_out, docking_config))
+                refined.append(read_docked_poses(pose_out))
+            
+            refined = concatenate_poses(refined)
+            refined['energies'] = np.array(energies)
+            # Pergeseran tiap pose akibat minimisasi (RMSD terhadap pose input)
+            shift = np.sqrt(((refined['coords'] - poses['coords']) ** 2).sum(-1).mean(-1))
+            refined['rmsd_lb'] = np.zeros(len(energies))
+            refined['rmsd_ub'] = np.zeros(len(energies))
+            order = np.argsort(refined['energies'], kind='stable')
+            
+            output_file = os.path.join(self.results_dir, f"{job_name}_refined.pdbqt")
+            write_docked_poses(output_file, refined, order)
+            if self.pose_store is not None:
+                self.pose_store.add(job_name, subset_poses(refined, order))
+            binding_affinities = refined['energies'][order].tolist()
+            self.logger.info(f"Local optimization completed for {job_name} - Best affinity: "
+                             f"{binding_affinities[0]:.2f} kcal/mol")
+            
+            return {
+                'output_file': output_file,
+                'log_file': None,
+                'binding_affinities': binding_affinities,
+                'input_affinities': poses['energies'][order].tolist(),
+                'pose_shift': shift[order].astype(float).round(3).tolist(),
+                'rmsd_lb': refined['rmsd_lb'].tolist(),
+                'rmsd_ub': refined['rmsd_ub'].tolist(),
+                'cluster_sizes': None,
+                'best_affinity': binding_affinities[0],
+                'site': site or 'default',
+                'local_only': True
+            }
+        
+        except Exception as e:
+            self.logger.error(f"Error in local optimization for {job_name}: {str(e)}")
+            return None
+        finally:
+            for path in work_files:
+                if os.path.exists(path):
+                    os.unlink(path)
+    
+    def refine_batch(self, protein_file, pose_files, docking_config, site=None, max_workers=1):
+        """Minimisasi lokal paralel untuk {nama_ligan: pose_file}, return {nama_ligan: result}"""
+        self.logger.info(f"Starting local optimization for {len(pose_files)} pose files "
+                         f"with {max_workers} workers...")
+        results = {}
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = {executor.submit(self.refine_poses, protein_file, pose_file, ligand_name,
+                                           docking_config, site): ligand_name
+                           for ligand_name, pose_file in pose_files.items()}
+                for future in futures:
+                    result = future.result()
+                    if result:
+                        results[futures[future]] = result
+        finally:
+            self.backend.close()
         
-        self.logger.info(f"Batch docking completed. {len(results)} successful dockings.")
+        self.logger.info(f"Local optimization completed. {len(results)} successful refinements.")
         return results
     
     def save_results_to_excel(self, results):
@@ -123,11 +541,17 @@ num_modes = {docking_config['num_modes']}
         try:
             data = []
             for ligand_name, result in results.items():
+                cluster_sizes = result.get('cluster_sizes') or [None] * len(result['binding_affinities'])
+                box = result.get('box')
+                box_size = f"{box['size_x']:g}x{box['size_y']:g}x{box['size_z']:g}" if box else None
                 for i, affinity in enumerate(result['binding_affinities']):
                     data.append({
                         'Ligand': ligand_name,
+                        'Site': result.get('site', 'default'),
                         'Pose': i + 1,
                         'Binding_Affinity_kcal_mol': affinity,
+                        'Cluster_Size': cluster_sizes[i],
+                        'Box_Size': box_size,
                         'Output_File': result['output_file']
                     })
             
@@ -142,8 +566,12 @@ num_modes = {docking_config['num_modes']}
                 for ligand_name, result in results.items():
                     summary_data.append({
                         'Ligand': ligand_name,
+                        'Best_Site': result.get('site', 'default'),
                         'Best_Binding_Affinity': result['best_affinity'],
-                        'Number_of_Poses': len(result['binding_affinities'])
+                        'Number_of_Poses': len(result['binding_affinities']),
+                        'Partial': result.get('partial', False),
+                        'Warm_Start': result.get('warm_start'),
+                        'Score_Drift': result.get('score_drift')
                     })
                 
                 summary_df = pd.DataFrame(summary_data)
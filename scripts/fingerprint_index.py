@@ -0,0 +1,254 @@
+import os
+import json
+import threading
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from rdkit import Chem
+from rdkit.Chem import rdFingerprintGenerator
+
+# Jumlah bit 1 per nilai byte / per nilai 16-bit (popcount lewat lookup table)
+POPCOUNT = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+POPCOUNT16 = (POPCOUNT[np.arange(65536) & 0xFF] + POPCOUNT[np.arange(65536) >> 8]).astype(np.uint8)
+
+
+def morgan_fingerprints(smiles_list, radius=2, n_bits=2048):
+    """Morgan fingerprint terpack (n, n_bits / 8) uint8 dan mask SMILES yang valid"""
+    generator = rdFingerprintGenerator.GetMorganGenerator(radius=radius, fpSize=n_bits)
+    packed = np.zeros((len(smiles_list), n_bits // 8), dtype=np.uint8)
+    valid = np.zeros(len(smiles_list), dtype=bool)
+    for i, smiles in enumerate(smiles_list):
+        mol = Chem.MolFromSmiles(smiles) if smiles else None
+        if mol is not None:
+            packed[i] = np.packbits(generator.GetFingerprintAsNumPy(mol).astype(bool))
+            valid[i] = True
+    return packed, valid
+
+
+def _fingerprint_chunk(names, smiles_list, radius, n_bits):
+    """Fingerprint satu chunk library (di worker process); SMILES tidak valid dibuang"""
+    packed, valid = morgan_fingerprints(smiles_list, radius, n_bits)
+    return [name for name, keep in zip(names, valid) if keep], packed[valid]
+
+
+def tanimoto_top_k(queries, query_counts, fingerprints, counts, k):
+    """Top-k Tanimoto tiap query terhadap satu blok fingerprint
+
+    Return (index baris dalam blok, similarity), keduanya (n_query, min(k, n_baris)), urut menurun.
+    """
+    k = min(k, len(fingerprints))
+    indices = np.zeros((len(queries), k), dtype=np.int64)
+    similarities = np.zeros((len(queries), k), dtype=np.float32)
+    if k == 0:
+        return indices, similarities
+    counts = counts.astype(np.float32)
+    # Lookup 16-bit: setengah jumlah operasi dibanding per byte
+    words = np.ascontiguousarray(fingerprints).view(np.uint16)
+    for q, (query, query_count) in enumerate(zip(queries.view(np.uint16), query_counts)):
+        common = POPCOUNT16[words & query].sum(axis=1, dtype=np.uint16).astype(np.float32)
+        union = query_count + counts - common
+        similarity = np.divide(common, union, out=np.zeros_like(common), where=union > 0)
+        # Seri di batas top-k diambil dari baris terkecil agar hasil tidak bergantung pada chunking
+        threshold = similarity[np.argpartition(-similarity, k - 1)[k - 1]]
+        above = np.nonzero(similarity > threshold)[0]
+        top = np.concatenate([above, np.nonzero(similarity == threshold)[0][:k - len(above)]])
+        top = top[np.lexsort((top, -similarity[top]))]
+        indices[q] = top
+        similarities[q] = similarity[top]
+    return indices, similarities
+
+
+# Index dibuka memory-mapped sekali per worker process
+_INDEX = None
+
+
+def _init_worker(index_dir):
+    global _INDEX
+    _INDEX = FingerprintIndex(index_dir, None)
+
+
+def _search_task(queries, query_counts, start, stop, k):
+    """Top-k untuk satu rentang baris index (dijalankan di worker process)"""
+    fingerprints, counts = _INDEX.arrays()
+    indices, similarities = tanimoto_top_k(queries, query_counts, fingerprints[start:stop], counts[start:stop], k)
+    return indices + start, similarities
+
+
+class FingerprintIndex:
+    """Index Morgan fingerprint on-disk untuk pencarian similarity Tanimoto massal
+
+    Layout direktori (append-only, dibaca memory-mapped):
+      meta.json           radius dan n_bits
+      fingerprints.bin    fingerprint terpack, n_bits / 8 byte per ligan
+      popcounts.bin       jumlah bit 1 per ligan (uint16)
+      names.txt           satu nama ligan per baris, urutan sama dengan fingerprints.bin
+    """
+
+    def __init__(self, index_dir, logger, radius=2, n_bits=2048, buffer_size=10000):
+        self.index_dir = index_dir
+        self.logger = logger
+        self.buffer_size = buffer_size
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._names = None
+
+        meta_file = os.path.join(index_dir, 'meta.json')
+        if os.path.exists(meta_file):
+            with open(meta_file) as f:
+                meta = json.load(f)
+            radius, n_bits = meta['radius'], meta['n_bits']
+        else:
+            os.makedirs(index_dir, exist_ok=True)
+            with open(meta_file, 'w') as f:
+                json.dump({'radius': radius, 'n_bits': n_bits}, f)
+        self.radius = radius
+        self.n_bits = n_bits
+        self.n_bytes = n_bits // 8
+
+    def path(self, name):
+        return os.path.join(self.index_dir, name)
+
+    def __len__(self):
+        """Jumlah ligan lengkap di index (baris fingerprint, popcount dan nama yang konsisten)"""
+        return len(self.names())
+
+    def stored_rows(self):
+        """Jumlah baris fingerprint dan popcount yang lengkap di disk"""
+        if not os.path.exists(self.path('popcounts.bin')):
+            return 0
+        return min(os.path.getsize(self.path('fingerprints.bin')) // self.n_bytes,
+                   os.path.getsize(self.path('popcounts.bin')) // 2)
+
+    def names(self):
+        """Nama ligan sesuai urutan baris"""
+        if self._names is None:
+            self._names = []
+            if os.path.exists(self.path('names.txt')):
+                with open(self.path('names.txt')) as f:
+                    self._names = [line.rstrip('\n') for line in f][:self.stored_rows()]
+        return self._names
+
+    def arrays(self):
+        """(fingerprints (n, n_bytes), popcounts (n,)) memory-mapped read-only"""
+        n = self.stored_rows()
+        if n == 0:
+            return np.zeros((0, self.n_bytes), dtype=np.uint8), np.zeros(0, dtype=np.uint16)
+        fingerprints = np.memmap(self.path('fingerprints.bin'), dtype=np.uint8, mode='r', shape=(n, self.n_bytes))
+        counts = np.memmap(self.path('popcounts.bin'), dtype=np.uint16, mode='r', shape=(n,))
+        return fingerprints, counts
+
+    def add(self, name, smiles):
+        """Tambahkan satu ligan ke buffer (ligan yang sudah ada di index dilewati)"""
+        with self._lock:
+            self._buffer.append((name, smiles))
+            full = len(self._buffer) >= self.buffer_size
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Fingerprint buffer lalu tulis ke disk"""
+        with self._lock:
+            buffer, self._buffer = self._buffer, []
+        if buffer:
+            names, smiles_list = zip(*buffer)
+            packed, valid = morgan_fingerprints(smiles_list, self.radius, self.n_bits)
+            self.add_packed([name for name, keep in zip(names, valid) if keep], packed[valid])
+
+    def add_packed(self, names, packed):
+        """Append fingerprint terpack; nama yang sudah ada (atau duplikat) dilewati"""
+        existing = set(self.names())
+        keep = []
+        for i, name in enumerate(names):
+            if name not in existing:
+                existing.add(name)
+                keep.append(i)
+        if not keep:
+            return 0
+        names = [names[i] for i in keep]
+        packed = np.ascontiguousarray(packed[keep], dtype=np.uint8)
+        counts = POPCOUNT[packed].sum(axis=1, dtype=np.uint16)
+        # Nama ditulis terakhir; sisa baris tanpa nama dari tulisan terputus dipotong dulu
+        n_rows = len(self.names())
+        for file_name, width in (('fingerprints.bin', self.n_bytes), ('popcounts.bin', 2)):
+            if os.path.exists(self.path(file_name)) and os.path.getsize(self.path(file_name)) > n_rows * width:
+                os.truncate(self.path(file_name), n_rows * width)
+        with open(self.path('fingerprints.bin'), 'ab') as f:
+            f.write(packed.tobytes())
+        with open(self.path('popcounts.bin'), 'ab') as f:
+            f.write(counts.tobytes())
+        with open(self.path('names.txt'), 'a') as f:
+            f.write(''.join(f"{name}\n" for name in names))
+        self._names = None
+        return len(names)
+
+    def build(self, library, max_workers=None, chunk_size=20000):
+        """Bangun/perluas index dari {nama: SMILES} dengan featurisasi paralel per chunk"""
+        existing = set(self.names())
+        items = [(name, smiles) for name, smiles in library.items() if name not in existing]
+        chunks = [items[start:start + chunk_size] for start in range(0, len(items), chunk_size)]
+        n_added = 0
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(_fingerprint_chunk, [name for name, _ in chunk],
+                                       [smiles for _, smiles in chunk], self.radius, self.n_bits) for chunk in chunks]
+            for future in futures:
+                names, packed = future.result()
+                n_added += self.add_packed(names, packed)
+        if self.logger is not None:
+            self.logger.info(f"Fingerprint index: added {n_added} ligands ({len(self)} total)")
+        return n_added
+
+    def query_fingerprints(self, queries):
+        """Fingerprint query dari nama ligan di index atau SMILES -> (packed, label valid)"""
+        lookup = {name: row for row, name in enumerate(self.names())}
+        fingerprints, _ = self.arrays()
+        packed, labels = [], []
+        for query in queries:
+            if query in lookup:
+                packed.append(np.asarray(fingerprints[lookup[query]]))
+                labels.append(query)
+                continue
+            fingerprint, valid = morgan_fingerprints([query], self.radius, self.n_bits)
+            if valid[0]:
+                packed.append(fingerprint[0])
+                labels.append(query)
+            elif self.logger is not None:
+                self.logger.warning(f"Query is neither an indexed ligand nor valid SMILES: {query}")
+        return np.array(packed, dtype=np.uint8).reshape(-1, self.n_bytes), labels
+
+    def search(self, queries, k=50, max_workers=None, chunk_rows=200000, exclude_self=True):
+        """Top-k ligan paling mirip (Tanimoto) untuk tiap query (nama ligan di index atau SMILES)
+
+        Index dipindai per rentang chunk_rows baris di worker process (memory-mapped), lalu
+        top-k per chunk digabung. Query yang berupa nama ligan tidak muncul sebagai hit-nya
+        sendiri jika exclude_self. Return list dict (query, rank, ligand, tanimoto).
+        """
+        packed, labels = self.query_fingerprints(queries)
+        n_rows = len(self)
+        if not labels or n_rows == 0:
+            return []
+        query_counts = POPCOUNT[packed].sum(axis=1).astype(np.float32)
+        k_search = k + 1 if exclude_self else k
+        ranges = [(start, min(start + chunk_rows, n_rows)) for start in range(0, n_rows, chunk_rows)]
+
+        if len(ranges) == 1:
+            fingerprints, counts = self.arrays()
+            parts = [tanimoto_top_k(packed, query_counts, fingerprints[:n_rows], counts[:n_rows], k_search)]
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                     initargs=(self.index_dir,)) as executor:
+                futures = [executor.submit(_search_task, packed, query_counts, start, stop, k_search)
+                           for start, stop in ranges]
+                parts = [future.result() for future in futures]
+
+        indices = np.concatenate([part[0] for part in parts], axis=1)
+        similarities = np.concatenate([part[1] for part in parts], axis=1)
+        # Urut similarity menurun, seri diurutkan menurut baris index (hasil deterministik)
+        order = np.array([np.lexsort((row_indices, -row_similarities))
+                          for row_indices, row_similarities in zip(indices, similarities)])
+        names = self.names()
+        hits = []
+        for q, label in enumerate(labels):
+            ranked = [column for column in order[q] if not (exclude_self and names[indices[q, column]] == label)]
+            for rank, column in enumerate(ranked[:k], 1):
+                hits.append({'query': label, 'rank': rank, 'ligand': names[indices[q, column]],
+                             'tanimoto': round(float(similarities[q, column]), 4)})
+        return hits
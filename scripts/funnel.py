@@ -0,0 +1,291 @@
+import os
+import json
+import math
+import time
+import hashlib
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from rdkit import Chem
+from scripts.ligand_prep import calculate_descriptors
+from scripts.results_store import DESCRIPTOR_COLUMNS, receptor_name
+
+STAGE_TYPES = ('filter', 'dock', 'rescore')
+
+
+def descriptor_filter(descriptors, filters):
+    """True jika deskriptor memenuhi semua filter <deskriptor>_min / <deskriptor>_max"""
+    for key, value in filters.items():
+        column, _, bound = key.rpartition('_')
+        if column not in DESCRIPTOR_COLUMNS or bound not in ('min', 'max'):
+            raise ValueError(f"Unknown filter: {key}")
+        if (descriptors[column] < value) if bound == 'min' else (descriptors[column] > value):
+            return False
+    return True
+
+
+def _filter_chunk(names, smiles_list, filters):
+    """Filter 2D satu chunk library (di worker process); SMILES tidak valid ikut dibuang"""
+    passed = []
+    for name, smiles in zip(names, smiles_list):
+        mol = Chem.MolFromSmiles(smiles)
+        if mol is not None and descriptor_filter(calculate_descriptors(mol), filters):
+            passed.append(name)
+    return passed
+
+
+def promote(scores, rule):
+    """Ligan yang lolos ke stage berikutnya dari {nama: skor} (lebih kecil lebih baik)
+
+    rule: None (semua lolos) atau dict dengan max_score (threshold), top_fraction dan/atau top_n;
+    semua batas yang diberikan berlaku bersamaan.
+    """
+    ranked = sorted(scores, key=lambda name: (scores[name], name))
+    if not rule:
+        return ranked
+    if rule.get('max_score') is not None:
+        ranked = [name for name in ranked if scores[name] <= rule['max_score']]
+    limits = [len(ranked)]
+    if rule.get('top_fraction') is not None:
+        limits.append(int(math.ceil(rule['top_fraction'] * len(scores))))
+    if rule.get('top_n') is not None:
+        limits.append(int(rule['top_n']))
+    return ranked[:min(limits)]
+
+
+def content_hash(value):
+    """Hash stabil untuk config atau daftar nama (menentukan apakah cache stage masih berlaku)"""
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+class ScreeningFunnel:
+    """Funnel screening bertahap dari daftar stage deklaratif (FUNNEL_STAGES)
+
+    Tiap stage menerima ligan yang lolos dari stage sebelumnya, memberi skor, lalu
+    mempromosikan survivor berdasarkan rank atau threshold (kunci 'promote').
+    Tipe stage:
+      filter   filter deskriptor 2D RDKit (kunci 'filters', format seperti query results store)
+      dock     docking dengan override DOCKING_CONFIG (kunci 'docking'); hasil disimpan di
+               results store dengan receptor '<receptor>@<stage>:<hash config>', folder output dan
+               pose store sendiri (docker_factory(results_dir, receptor))
+      rescore  rescoring pose stage docking sebelumnya ('scoring_functions', 'score':
+               'consensus' atau 'score_<sf>')
+    Stage yang selesai dicatat di state_dir dan dilewati saat run ulang jika config dan
+    input tidak berubah; stage docking yang terputus melanjutkan dari hasil yang tersimpan.
+    seeder (TemplateSeeder, opsional) membuat seed template untuk ligan tiap chunk docking
+    di seed_site.
+    """
+
+    def __init__(self, stages, state_dir, logger, results_store, ligand_prep, docker_factory, protein_file,
+                 docking_config, sites=None, max_workers=1, rescorer_factory=None, chunk_size=1000,
+                 seeder=None, seed_site=None):
+        self.stages = stages
+        self.state_dir = state_dir
+        self.logger = logger
+        self.results_store = results_store
+        self.ligand_prep = ligand_prep
+        self.docker_factory = docker_factory
+        self.protein_file = protein_file
+        self.docking_config = docking_config
+        self.sites = sites
+        self.max_workers = max_workers
+        self.rescorer_factory = rescorer_factory
+        self.chunk_size = chunk_size
+        self.seeder = seeder
+        self.seed_site = seed_site
+        os.makedirs(state_dir, exist_ok=True)
+
+        names = [stage.get('name') for stage in stages]
+        if len(set(names)) != len(names) or None in names:
+            raise ValueError("Every funnel stage needs a unique 'name'")
+        for stage in stages:
+            if stage.get('type') not in STAGE_TYPES:
+                raise ValueError(f"Unknown stage type for {stage['name']}: {stage.get('type')}")
+            if 'poses_from' in stage and stage['poses_from'] not in [dock['name'] for dock in stages
+                                                                     if dock['type'] == 'dock']:
+                raise ValueError(f"Stage {stage['name']}: poses_from must name a dock stage")
+
+    def stage_docking_config(self, stage):
+        """DOCKING_CONFIG dengan override stage"""
+        return dict(self.docking_config, **stage.get('docking', {}))
+
+    def stage_receptor(self, stage):
+        """Nama receptor results store untuk hasil satu stage docking
+
+        Hash config docking ikut di nama: hasil hanya dipakai ulang jika parameter docking sama,
+        sedangkan perubahan aturan promote tidak memicu docking ulang.
+        """
+        docking_hash = content_hash([self.stage_docking_config(stage), self.sites])[:8]
+        return f"{receptor_name(self.protein_file)}@{stage['name']}:{docking_hash}"
+
+    def state_file(self, stage):
+        return os.path.join(self.state_dir, f"{stage['name']}.json")
+
+    def load_state(self, stage, config_hash, input_hash):
+        """State stage yang sudah selesai dengan config dan input yang sama, atau None"""
+        try:
+            with open(self.state_file(stage)) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if state.get('config_hash') != config_hash or state.get('input_hash') != input_hash:
+            return None
+        return state
+
+    def save_state(self, stage, state):
+        """Tulis state stage secara atomik"""
+        tmp_file = f"{self.state_file(stage)}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_file, self.state_file(stage))
+
+    def stage_config(self, stage):
+        """Config efektif stage untuk hash cache (docking ikut config dasar)"""
+        config = dict(stage)
+        if stage['type'] in ('dock', 'rescore'):
+            config['base_docking'] = self.docking_config
+            config['sites'] = self.sites
+            config['seed_site'] = self.seed_site if self.seeder is not None else None
+        return config
+
+    def run(self, library):
+        """Jalankan semua stage untuk {nama: SMILES}
+
+        Return (DataFrame laporan per stage, DataFrame survivor akhir dengan skor tiap stage).
+        """
+        survivors = sorted(library)
+        report = []
+        stage_scores = {}
+        previous_dock = None
+
+        for stage in self.stages:
+            config_hash = content_hash(self.stage_config(stage))
+            input_hash = content_hash(survivors)
+            state = self.load_state(stage, config_hash, input_hash)
+            cached = state is not None
+            start_time = time.monotonic()
+
+            if not cached:
+                self.logger.info(f"Funnel stage {stage['name']} ({stage['type']}): {len(survivors)} ligands")
+                if stage['type'] == 'filter':
+                    scores = None
+                    promoted = self.run_filter(stage, survivors, library)
+                else:
+                    if stage['type'] == 'dock':
+                        scores = self.run_dock(stage, survivors, library)
+                    else:
+                        scores = self.run_rescore(stage, survivors, stage.get('poses_from', previous_dock))
+                    if scores is None:
+                        raise RuntimeError(f"Funnel stage {stage['name']} failed")
+                    promoted = promote(scores, stage.get('promote'))
+                state = {
+                    'config_hash': config_hash,
+                    'input_hash': input_hash,
+                    'n_input': len(survivors),
+                    'n_scored': len(scores) if scores is not None else len(promoted),
+                    'seconds': round(time.monotonic() - start_time, 2),
+                    # Skor hanya disimpan untuk survivor agar state tetap kecil
+                    'survivors': {name: scores[name] if scores is not None else None for name in promoted}
+                }
+                self.save_state(stage, state)
+            else:
+                self.logger.info(f"Funnel stage {stage['name']}: cached, {len(state['survivors'])} survivors")
+
+            if stage['type'] == 'dock':
+                previous_dock = stage['name']
+            stage_scores[stage['name']] = state['survivors']
+            survivors = list(state['survivors'])
+            seconds = state['seconds']
+            report.append({
+                'stage': stage['name'],
+                'type': stage['type'],
+                'n_input': state['n_input'],
+                'n_scored': state['n_scored'],
+                'n_promoted': len(survivors),
+                'attrition': 1 - len(survivors) / state['n_input'] if state['n_input'] else 0.0,
+                'seconds': seconds,
+                'ligands_per_second': round(state['n_input'] / seconds, 3) if seconds else None,
+                'cached': cached
+            })
+            self.logger.info(f"Funnel stage {stage['name']}: {state['n_input']} -> {len(survivors)} ligands "
+                             f"in {seconds:.1f} s")
+            if not survivors:
+                self.logger.warning(f"No ligands survived stage {stage['name']}, stopping funnel")
+                break
+
+        hits = pd.DataFrame({'ligand': survivors, 'smiles': [library.get(name) for name in survivors]})
+        for stage in self.stages:
+            if stage['type'] != 'filter' and stage['name'] in stage_scores:
+                hits[f"{stage['name']}_score"] = hits['ligand'].map(stage_scores[stage['name']])
+        return pd.DataFrame(report), hits
+
+    def run_filter(self, stage, names, library):
+        """Stage filter 2D paralel per chunk"""
+        filters = stage.get('filters', {})
+        chunks = [names[start:start + self.chunk_size] for start in range(0, len(names), self.chunk_size)]
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(_filter_chunk, chunk, [library[name] for name in chunk], filters)
+                       for chunk in chunks]
+            return [name for future in futures for name in future.result()]
+
+    def prepare(self, names, library):
+        """File PDBQT ligan; ligan yang sudah dipreparasi (stage sebelumnya/run lain) dipakai ulang"""
+        ligand_files = {}
+        missing = {}
+        for name in names:
+            pdbqt_file = os.path.join(self.ligand_prep.ligand_dir, f"{name}.pdbqt")
+            if os.path.exists(pdbqt_file):
+                ligand_files[name] = pdbqt_file
+            else:
+                missing[name] = library[name]
+        if missing:
+            ligand_files.update(self.ligand_prep.prepare_ligands(missing))
+        return ligand_files
+
+    def run_dock(self, stage, names, library):
+        """Stage docking per chunk; ligan yang sudah punya hasil untuk stage ini tidak di-docking ulang"""
+        receptor = self.stage_receptor(stage)
+        scores = self.results_store.best_affinities(receptor, names)
+        missing = [name for name in names if name not in scores]
+        if scores:
+            self.logger.info(f"Stage {stage['name']}: reusing {len(scores)} stored results")
+        if not missing:
+            return scores
+
+        results_dir = os.path.join(self.state_dir, stage['name'])
+        os.makedirs(results_dir, exist_ok=True)
+        docker = self.docker_factory(results_dir, receptor)
+        docking_config = self.stage_docking_config(stage)
+        for start in range(0, len(missing), self.chunk_size):
+            ligand_files = self.prepare(missing[start:start + self.chunk_size], library)
+            if not ligand_files:
+                continue
+            seeds = None
+            if self.seeder is not None:
+                seeds = self.seeder.seed_ligands({name: library[name] for name in ligand_files})
+            docker.run_docking_batch(self.protein_file, ligand_files, docking_config, summary_limit=0,
+                                     sites=self.sites, max_workers=self.max_workers, seeds=seeds,
+                                     seed_site=self.seed_site, receptor=receptor)
+            scores.update(self.results_store.best_affinities(receptor, ligand_files))
+            self.logger.info(f"Stage {stage['name']}: {len(scores)} of {len(names)} ligands docked")
+        return scores
+
+    def run_rescore(self, stage, names, poses_from):
+        """Stage rescoring pose terbaik dari stage docking poses_from"""
+        if poses_from is None or self.rescorer_factory is None:
+            self.logger.error(f"Stage {stage['name']} needs a preceding dock stage and a rescorer")
+            return None
+        receptor = self.stage_receptor(next(dock for dock in self.stages if dock['name'] == poses_from))
+        scoring_functions = stage.get('scoring_functions')
+        rescorer = self.rescorer_factory(scoring_functions)
+        if rescorer.rescore(self.protein_file, self.docking_config, self.sites, receptor, names) is None:
+            return None
+
+        score = stage.get('score', 'consensus')
+        if score == 'consensus':
+            poses = self.results_store.consensus(receptor, rescorer.active_functions(), best_pose_only=True)
+            column = 'consensus_z'
+        else:
+            poses = self.results_store.query(receptor=receptor, ligands=names, best_pose_only=True)
+            column = score
+        poses = poses[poses['ligand'].isin(set(names))].dropna(subset=[column])
+        return poses.groupby('ligand')[column].min().astype(float).to_dict()
@@ -0,0 +1,380 @@
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from scripts.pdbqt_reader import read_docked_poses
+from scripts.vina_scoring import (read_pdbqt_atoms, atom_elements, bonded_pairs, assign_xs_types,
+                                  XS_HYDROPHOBIC, XS_DONOR, XS_ACCEPTOR)
+from scripts.results_store import receptor_name
+
+INTERACTION_TYPES = ['hbond', 'hydrophobic', 'pi_stacking', 'salt_bridge']
+# Jarak maksimum (Angstrom) antar atom/pusat ring; kriteria sederhana ala PLIP tanpa sudut H-bond
+INTERACTION_CUTOFFS = {'hbond': 3.5, 'hydrophobic': 4.0, 'pi_stacking': 5.5, 'salt_bridge': 5.5}
+PI_PARALLEL_ANGLE = 30.0    # Derajat antar normal ring: <= paralel (face-to-face)
+PI_TSHAPED_ANGLE = 60.0     # >= T-shaped (edge-to-face)
+PI_MAX_OFFSET = 2.0         # Offset lateral maksimum untuk stacking paralel
+
+# Bit fitur per atom
+DONOR, ACCEPTOR, HYDROPHOBIC, CATION, ANION = 1, 2, 4, 8, 16
+
+CATION_ATOMS = {('LYS', 'NZ'), ('ARG', 'NE'), ('ARG', 'NH1'), ('ARG', 'NH2')}
+ANION_ATOMS = {('ASP', 'OD1'), ('ASP', 'OD2'), ('GLU', 'OE1'), ('GLU', 'OE2')}
+AROMATIC_RINGS = {
+    'PHE': [('CG', 'CD1', 'CE1', 'CZ', 'CE2', 'CD2')],
+    'TYR': [('CG', 'CD1', 'CE1', 'CZ', 'CE2', 'CD2')],
+    'TRP': [('CD2', 'CE2', 'CZ2', 'CH2', 'CZ3', 'CE3'), ('CG', 'CD1', 'NE1', 'CE2', 'CD2')],
+    'HIS': [('CG', 'ND1', 'CE1', 'NE2', 'CD2')]
+}
+
+
+def xs_features(xs_types):
+    """Bit fitur donor/akseptor/hidrofobik dari tipe XS (0 untuk hidrogen)"""
+    features = np.zeros(len(xs_types), dtype=np.uint8)
+    for i, xs_type in enumerate(xs_types):
+        if xs_type is None or xs_type == 'Met_D':
+            continue
+        if xs_type in XS_DONOR:
+            features[i] |= DONOR
+        if xs_type in XS_ACCEPTOR:
+            features[i] |= ACCEPTOR
+        if xs_type in XS_HYDROPHOBIC:
+            features[i] |= HYDROPHOBIC
+    return features
+
+
+def ring_geometry(coords, rings):
+    """Pusat dan normal satuan ring untuk koordinat (..., n_atoms, 3); rings berisi tuple index berurutan"""
+    centers = np.stack([coords[..., list(ring), :].mean(axis=-2) for ring in rings], axis=-2)
+    normals = np.stack([np.cross(coords[..., ring[2], :] - coords[..., ring[0], :],
+                                 coords[..., ring[-2], :] - coords[..., ring[0], :]) for ring in rings], axis=-2)
+    normals /= np.maximum(np.linalg.norm(normals, axis=-1, keepdims=True), 1e-6)
+    return centers.astype(np.float32), normals.astype(np.float32)
+
+
+def ligand_rings(atom_types, neighbors):
+    """Ring aromatik 5/6 anggota ligan (semua karbon bertipe 'A'), urut mengikuti ikatan"""
+    rings = {}
+
+    def extend(path):
+        if len(path) > 6:
+            return
+        for atom in neighbors[path[-1]]:
+            if atom == path[0] and len(path) >= 5:
+                rings.setdefault(frozenset(path), tuple(path))
+            elif atom > path[0] and atom not in path:
+                extend(path + [atom])
+
+    for start in range(len(atom_types)):
+        extend([start])
+    aromatic = []
+    for ring in rings.values():
+        types = [atom_types[i] for i in ring]
+        elements = atom_elements(types)
+        if 'A' in types and all(t == 'A' for t, e in zip(types, elements) if e == 'C'):
+            aromatic.append(ring)
+    return aromatic
+
+
+def ligand_features(atom_types, coords):
+    """Bit fitur per atom ligan dan ring aromatik, dari tipe atom PDBQT dan konektivitas
+
+    Kation: N sp3 dengan 4 tetangga (amina terprotonasi/kuarterner). Anion: O terminal
+    tanpa H pada C (karboksilat) atau S/P dengan >= 2 O terminal (sulfonat/fosfat).
+    """
+    elements = atom_elements(atom_types)
+    features = xs_features(assign_xs_types(atom_types, coords))
+    neighbors = [[] for _ in elements]
+    for i, j in bonded_pairs(coords, elements):
+        neighbors[i].append(j)
+        neighbors[j].append(i)
+
+    terminal_o = [e == 'O' and len(neighbors[i]) == 1 for i, e in enumerate(elements)]
+    for i, element in enumerate(elements):
+        if element == 'N' and atom_types[i] == 'N' and len(neighbors[i]) == 4:
+            features[i] |= CATION
+        elif element in ('C', 'S', 'P'):
+            oxygens = [j for j in neighbors[i] if terminal_o[j]]
+            if len(oxygens) >= 2:
+                for j in oxygens:
+                    features[j] |= ANION
+
+    heavy_neighbors = [[j for j in neighbors[i] if elements[j] != 'H'] if elements[i] != 'H' else []
+                       for i in range(len(elements))]
+    return features, ligand_rings(atom_types, heavy_neighbors)
+
+
+class ReceptorIndex:
+    """Index spasial grid seragam atom receptor yang relevan untuk interaksi
+
+    Tiap sel menyimpan daftar atom (padded) dalam jarak cutoff dari sel, sehingga
+    tetangga sekumpulan titik didapat dengan satu gather tanpa loop per titik.
+    Array disimpan sebagai .npy dan dibuka memory-mapped read-only oleh tiap worker.
+    """
+
+    ARRAYS = ['coords', 'features', 'residue_index', 'origin', 'shape', 'cells',
+              'ring_centers', 'ring_normals', 'ring_residue']
+
+    def __init__(self, arrays, residues, cell_size, cutoff):
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+        self.residues = residues
+        self.cell_size = cell_size
+        self.cutoff = cutoff
+        self.dims = tuple(int(n) for n in self.shape)
+
+    @classmethod
+    def build(cls, protein_file, cell_size=2.0, cutoff=max(INTERACTION_CUTOFFS.values())):
+        """Bangun index dari file PDBQT receptor"""
+        coords, atom_types, residues = read_pdbqt_atoms(protein_file)
+        features = xs_features(assign_xs_types(atom_types, coords))
+        for i, (resname, _, _, atom_name) in enumerate(residues):
+            if (resname, atom_name) in CATION_ATOMS:
+                features[i] |= CATION
+            elif (resname, atom_name) in ANION_ATOMS:
+                features[i] |= ANION
+
+        chains = {chain for _, chain, _, _ in residues}
+        keys = list(dict.fromkeys((chain, resnum, resname) for resname, chain, resnum, _ in residues))
+        labels = [f"{chain}:{resname}{resnum}" if len(chains) > 1 else f"{resname}{resnum}"
+                  for chain, resnum, resname in keys]
+        key_index = {key: i for i, key in enumerate(keys)}
+        residue_index = np.array([key_index[(chain, resnum, resname)] for resname, chain, resnum, _ in residues],
+                                 dtype=np.int32)
+
+        # Ring aromatik per residu dari nama atom
+        atom_lookup = {(chain, resnum, atom_name): i for i, (_, chain, resnum, atom_name) in enumerate(residues)}
+        rings, ring_residue = [], []
+        for residue, (chain, resnum, resname) in enumerate(keys):
+            for names in AROMATIC_RINGS.get(resname, []):
+                ring = [atom_lookup.get((chain, resnum, name)) for name in names]
+                if None not in ring:
+                    rings.append(tuple(ring))
+                    ring_residue.append(residue)
+        if rings:
+            ring_centers, ring_normals = ring_geometry(coords, rings)
+        else:
+            ring_centers = ring_normals = np.zeros((0, 3), dtype=np.float32)
+
+        # Hanya atom dengan fitur yang masuk grid; baris terakhir = atom padding jauh di luar
+        keep = np.nonzero(features)[0]
+        atom_coords = np.concatenate([coords[keep], np.full((1, 3), 1e6, dtype=np.float32)])
+        origin = (coords.min(axis=0) - cutoff).astype(np.float32)
+        shape = (np.ceil((coords.max(axis=0) + cutoff - origin) / cell_size).astype(np.int64) + 1)
+
+        # Pasangan (sel, atom) untuk semua sel yang kubusnya dalam jarak cutoff dari atom
+        low = np.floor((coords[keep] - cutoff - origin) / cell_size).astype(np.int64).clip(0, shape - 1)
+        high = np.floor((coords[keep] + cutoff - origin) / cell_size).astype(np.int64).clip(0, shape - 1)
+        span = int(np.ceil(2 * cutoff / cell_size)) + 1
+        pair_cells, pair_atoms = [], []
+        for offset in np.ndindex(span, span, span):
+            cell = low + np.array(offset)
+            valid = np.all(cell <= high, axis=1)
+            pair_cells.append(np.ravel_multi_index(cell[valid].T, tuple(shape)))
+            pair_atoms.append(np.nonzero(valid)[0])
+        pair_cells = np.concatenate(pair_cells)
+        pair_atoms = np.concatenate(pair_atoms)
+        order = np.argsort(pair_cells, kind='stable')
+        pair_cells, pair_atoms = pair_cells[order], pair_atoms[order]
+        counts = np.bincount(pair_cells, minlength=int(np.prod(shape)))
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        cells = np.full((len(counts), max(int(counts.max(initial=0)), 1)), len(keep), dtype=np.int32)
+        cells[pair_cells, np.arange(len(pair_cells)) - starts[pair_cells]] = pair_atoms
+
+        arrays = {
+            'coords': atom_coords,
+            'features': np.concatenate([features[keep], [0]]).astype(np.uint8),
+            'residue_index': np.concatenate([residue_index[keep], [0]]).astype(np.int32),
+            'origin': origin,
+            'shape': shape,
+            'cells': cells,
+            'ring_centers': ring_centers,
+            'ring_normals': ring_normals,
+            'ring_residue': np.array(ring_residue, dtype=np.int32)
+        }
+        return cls(arrays, labels, cell_size, cutoff)
+
+    def save(self, directory):
+        """Simpan array sebagai .npy (atomik lewat folder sementara)"""
+        tmp_dir = f"{directory}.tmp{os.getpid()}"
+        os.makedirs(tmp_dir, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(tmp_dir, 'residues.json'), 'w') as f:
+            json.dump({'residues': self.residues, 'cell_size': self.cell_size, 'cutoff': self.cutoff}, f)
+        try:
+            os.rename(tmp_dir, directory)
+        except OSError:
+            # Proses lain sudah menyimpan index yang sama
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    @classmethod
+    def load(cls, directory):
+        """Buka index tersimpan (memory-mapped, read-only)"""
+        arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r') for name in cls.ARRAYS}
+        with open(os.path.join(directory, 'residues.json')) as f:
+            meta = json.load(f)
+        return cls(arrays, meta['residues'], meta['cell_size'], meta['cutoff'])
+
+    def neighbors(self, points):
+        """Kandidat atom (index ke coords, padded) untuk titik (P, 3) -> (P, K)"""
+        cell = np.floor((points - self.origin) / self.cell_size).astype(np.int64)
+        cell = np.clip(cell, 0, np.array(self.dims) - 1)
+        return self.cells[np.ravel_multi_index(cell.T, self.dims)]
+
+
+def receptor_index_dir(protein_file, cache_dir, cell_size=2.0):
+    """Folder cache index untuk satu file receptor (berdasarkan isi file)"""
+    with open(protein_file, 'rb') as f:
+        digest = hashlib.sha1(f.read())
+    digest.update(str(cell_size).encode())
+    return os.path.join(cache_dir, f"ifp_{receptor_name(protein_file)}_{digest.hexdigest()[:16]}")
+
+
+def get_receptor_index(protein_file, cache_dir, logger, cell_size=2.0):
+    """Folder index receptor; dibangun sekali lalu dipakai ulang antar run dan worker"""
+    directory = receptor_index_dir(protein_file, cache_dir, cell_size)
+    if not os.path.exists(directory):
+        logger.info(f"Building receptor spatial index for {protein_file}")
+        os.makedirs(cache_dir, exist_ok=True)
+        ReceptorIndex.build(protein_file, cell_size).save(directory)
+    return directory
+
+
+class InteractionFingerprinter:
+    """Fingerprint interaksi per pose: satu bit per (residu, tipe interaksi)
+
+    Urutan bit = residu receptor x INTERACTION_TYPES, stabil untuk file receptor yang sama.
+    """
+
+    def __init__(self, index, batch_points=4096):
+        self.index = index
+        self.batch_points = batch_points
+        self.labels = [f"{residue}:{interaction}" for residue in index.residues for interaction in INTERACTION_TYPES]
+
+    def fingerprint_poses(self, poses):
+        """Fingerprint boolean (n_poses, n_bits) untuk semua pose satu ligan"""
+        coords = poses['coords']
+        n_poses, n_atoms, _ = coords.shape
+        features, rings = ligand_features(poses['atom_types'], coords[0])
+        fingerprints = np.zeros((n_poses, len(self.labels)), dtype=bool)
+        n_types = len(INTERACTION_TYPES)
+
+        # Interaksi atom-atom: hanya atom ligan yang punya fitur
+        atoms = np.nonzero(features)[0]
+        points = coords[:, atoms].reshape(-1, 3)
+        point_pose = np.repeat(np.arange(n_poses), len(atoms))
+        point_features = np.tile(features[atoms], n_poses)
+        rules = [
+            ('hbond', [(DONOR, ACCEPTOR), (ACCEPTOR, DONOR)]),
+            ('hydrophobic', [(HYDROPHOBIC, HYDROPHOBIC)]),
+            ('salt_bridge', [(CATION, ANION), (ANION, CATION)])
+        ]
+        for start in range(0, len(points), self.batch_points):
+            batch = slice(start, start + self.batch_points)
+            candidates = self.index.neighbors(points[batch])
+            distance = np.linalg.norm(points[batch, None] - self.index.coords[candidates], axis=-1)
+            receptor_features = self.index.features[candidates]
+            ligand_batch = point_features[batch, None]
+            for interaction, pairs in rules:
+                bit = INTERACTION_TYPES.index(interaction)
+                match = np.zeros(candidates.shape, dtype=bool)
+                for ligand_bit, receptor_bit in pairs:
+                    match |= ((ligand_batch & ligand_bit) != 0) & ((receptor_features & receptor_bit) != 0)
+                rows, columns = np.nonzero(match & (distance <= INTERACTION_CUTOFFS[interaction]))
+                residues = self.index.residue_index[candidates[rows, columns]]
+                fingerprints[point_pose[batch][rows], residues * n_types + bit] = True
+
+        # Pi-stacking: pusat ring ligan vs ring receptor
+        if rings and len(self.index.ring_centers):
+            centers, normals = ring_geometry(coords, rings)  # (n_poses, n_rings, 3)
+            offset = centers[:, :, None] - self.index.ring_centers[None, None]
+            distance = np.linalg.norm(offset, axis=-1)
+            cosine = np.abs((normals[:, :, None] * self.index.ring_normals[None, None]).sum(-1))
+            angle = np.degrees(np.arccos(np.clip(cosine, 0.0, 1.0)))
+            # Offset lateral: jarak pusat ligan ke sumbu normal ring receptor
+            axial = (offset * self.index.ring_normals[None, None]).sum(-1)
+            lateral = np.sqrt(np.maximum(distance ** 2 - axial ** 2, 0.0))
+            stacked = (distance <= INTERACTION_CUTOFFS['pi_stacking']) & (
+                ((angle <= PI_PARALLEL_ANGLE) & (lateral <= PI_MAX_OFFSET)) | (angle >= PI_TSHAPED_ANGLE))
+            pose, _, ring = np.nonzero(stacked)
+            bit = INTERACTION_TYPES.index('pi_stacking')
+            fingerprints[pose, self.index.ring_residue[ring] * n_types + bit] = True
+        return fingerprints
+
+
+# Satu fingerprinter per worker process; index receptor dibuka mmap sekali per worker
+_FINGERPRINTER = None
+
+
+def _init_worker(index_dir, batch_points):
+    global _FINGERPRINTER
+    _FINGERPRINTER = InteractionFingerprinter(ReceptorIndex.load(index_dir), batch_points)
+
+
+def _fingerprint_task(jobs):
+    """Fingerprint satu chunk file pose (dijalankan di worker process)
+
+    jobs: list (ligan, site, file pose). Return (rows (ligan, site, pose, bit terpack), gagal).
+    """
+    rows = []
+    failed = []
+    for ligand_name, site, pose_file in jobs:
+        try:
+            fingerprints = _FINGERPRINTER.fingerprint_poses(read_docked_poses(pose_file))
+        except Exception as e:
+            failed.append((ligand_name, str(e)))
+            continue
+        packed = np.packbits(fingerprints, axis=1)
+        rows.extend((ligand_name, site, pose, packed[pose - 1].tobytes()) for pose in range(1, len(packed) + 1))
+    return rows, failed
+
+
+class InteractionProfiler:
+    """Hitung fingerprint interaksi semua pose receptor di results store (paralel per chunk file)"""
+
+    def __init__(self, results_store, logger, cache_dir, max_workers=None, chunk_size=100, cell_size=2.0,
+                 batch_points=4096):
+        self.results_store = results_store
+        self.logger = logger
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers or os.cpu_count()
+        self.chunk_size = chunk_size
+        self.cell_size = cell_size
+        self.batch_points = batch_points
+
+    def fingerprint(self, protein_file, receptor=None, overwrite=False):
+        """Fingerprint pose yang belum punya fingerprint (semua jika overwrite); return jumlah pose"""
+        try:
+            receptor = receptor or receptor_name(protein_file)
+            index_dir = get_receptor_index(protein_file, self.cache_dir, self.logger, self.cell_size)
+            labels = InteractionFingerprinter(ReceptorIndex.load(index_dir)).labels
+            self.results_store.set_fingerprint_labels(receptor, labels)
+
+            files = self.results_store.pose_files(receptor, missing_fingerprints=not overwrite)
+            if files.empty:
+                self.logger.info("All poses already have interaction fingerprints")
+                return 0
+            jobs = list(files.itertuples(index=False, name=None))
+            chunks = [jobs[start:start + self.chunk_size] for start in range(0, len(jobs), self.chunk_size)]
+            self.logger.info(f"Fingerprinting {len(jobs)} pose files ({len(labels)} bits, {len(chunks)} tasks, "
+                             f"{self.max_workers} workers)")
+
+            n_poses = 0
+            with ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                     initargs=(index_dir, self.batch_points)) as executor:
+                futures = [executor.submit(_fingerprint_task, chunk) for chunk in chunks]
+                for future in as_completed(futures):
+                    rows, failed = future.result()
+                    for ligand_name, error in failed:
+                        self.logger.warning(f"Could not fingerprint {ligand_name}: {error}")
+                    # Tulis segera agar hasil parsial tetap tersimpan
+                    n_poses += self.results_store.add_fingerprints(rows, receptor)
+
+            self.logger.info(f"Interaction fingerprints stored for {n_poses} poses")
+            return n_poses
+
+        except Exception as e:
+            self.logger.error(f"Error computing interaction fingerprints: {str(e)}")
+            return None
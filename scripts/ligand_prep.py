@@ -1,13 +1,44 @@
 import os
-import subprocess
 from rdkit import Chem
 from rdkit.Chem import AllChem, Descriptors
 import tempfile
+from scripts.tool_runner import get_runner
+
+
+def calculate_descriptors(mol):
+    """Hitung deskriptor drug-like untuk satu molekul"""
+    return {
+        'mw': Descriptors.MolWt(mol),
+        'logp': Descriptors.MolLogP(mol),
+        'hbd': Descriptors.NumHDonors(mol),
+        'hba': Descriptors.NumHAcceptors(mol),
+        'rotatable_bonds': Descriptors.NumRotatableBonds(mol),
+        'heavy_atoms': mol.GetNumHeavyAtoms()
+    }
+
+
+def read_smiles_library(smiles_file):
+    """Baca library ligan dari file .smi (SMILES dan nama per baris) -> {nama: SMILES}"""
+    library = {}
+    with open(smiles_file, 'r') as f:
+        for number, line in enumerate(f, 1):
+            fields = line.split()
+            if not fields or fields[0].startswith('#'):
+                continue
+            library[fields[1] if len(fields) > 1 else f"ligand_{number}"] = fields[0]
+    return library
+
 
 class LigandPreparator:
-    def __init__(self, ligand_dir, logger):
+    def __init__(self, ligand_dir, logger, results_store=None, fingerprint_index=None):
         self.ligand_dir = ligand_dir
         self.logger = logger
+        self.results_store = results_store
+        self.fingerprint_index = fingerprint_index
+    
+    def calculate_descriptors(self, mol):
+        """Hitung deskriptor drug-like untuk satu molekul"""
+        return calculate_descriptors(mol)
     
     def smiles_to_3d_mol(self, smiles, name):
         """Convert SMILES ke molekul 3D"""
@@ -26,12 +57,10 @@ class LigandPreparator:
             AllChem.MMFFOptimizeMolecule(mol)
             
             # Calculate drug-like properties
-            mw = Descriptors.MolWt(mol)
-            logp = Descriptors.MolLogP(mol)
-            hbd = Descriptors.NumHDonors(mol)
-            hba = Descriptors.NumHAcceptors(mol)
+            props = self.calculate_descriptors(mol)
             
-            self.logger.info(f"Ligand {name} properties - MW: {mw:.2f}, LogP: {logp:.2f}, HBD: {hbd}, HBA: {hba}")
+            self.logger.info(f"Ligand {name} properties - MW: {props['mw']:.2f}, LogP: {props['logp']:.2f}, "
+                             f"HBD: {props['hbd']}, HBA: {props['hba']}")
             
             return mol
             
@@ -39,8 +68,8 @@ class LigandPreparator:
             self.logger.error(f"Error generating 3D structure for {name}: {str(e)}")
             return None
     
-    def mol_to_pdbqt(self, mol, name):
-        """Convert RDKit mol ke PDBQT"""
+    def mol_to_pdbqt(self, mol, name, gen3d=True):
+        """Convert RDKit mol ke PDBQT (gen3d=False mempertahankan koordinat mol)"""
         try:
             # Save as SDF first
             sdf_file = os.path.join(self.ligand_dir, f"{name}.sdf")
@@ -54,16 +83,16 @@ class LigandPreparator:
             cmd = [
                 'obabel',
                 '-isdf', sdf_file,
-                '-opdbqt', pdbqt_file,
-                '--gen3d'
+                '-opdbqt', pdbqt_file
             ]
+            if gen3d:
+                cmd.append('--gen3d')
             
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+            result = get_runner().run(cmd, timeout=30)
             
             if result.returncode == 0 and os.path.exists(pdbqt_file):
                 self.logger.info(f"Generated PDBQT for {name}: {pdbqt_file}")
-                # Clean up SDF file
-                os.remove(sdf_file)
+                # SDF disimpan sebagai molekul sumber (bond order, muatan) untuk export pose
                 return pdbqt_file
             else:
                 self.logger.error(f"PDBQT generation failed for {name}: {result.stderr}")
@@ -73,6 +102,24 @@ class LigandPreparator:
             self.logger.error(f"Error converting {name} to PDBQT: {str(e)}")
             return None
     
+    def prepare_ligand(self, name, smiles):
+        """Preparasi satu ligan (3D + PDBQT), return file PDBQT atau None"""
+        self.logger.info(f"Preparing ligand: {name}")
+        
+        # Generate 3D structure
+        mol = self.smiles_to_3d_mol(smiles, name)
+        if not mol:
+            return None
+        
+        # Convert to PDBQT
+        pdbqt_file = self.mol_to_pdbqt(mol, name)
+        if pdbqt_file:
+            if self.results_store is not None:
+                self.results_store.add_ligand(name, smiles, self.calculate_descriptors(mol))
+            if self.fingerprint_index is not None:
+                self.fingerprint_index.add(name, smiles)
+        return pdbqt_file
+    
     def prepare_ligands(self, ligand_dict):
         """Preparasi batch ligands"""
         self.logger.info(f"Preparing {len(ligand_dict)} ligands...")
@@ -80,17 +127,11 @@ class LigandPreparator:
         prepared_ligands = {}
         
         for name, smiles in ligand_dict.items():
-            self.logger.info(f"Preparing ligand: {name}")
-            
-            # Generate 3D structure
-            mol = self.smiles_to_3d_mol(smiles, name)
-            if not mol:
-                continue
-            
-            # Convert to PDBQT
-            pdbqt_file = self.mol_to_pdbqt(mol, name)
+            pdbqt_file = self.prepare_ligand(name, smiles)
             if pdbqt_file:
                 prepared_ligands[name] = pdbqt_file
         
+        if self.fingerprint_index is not None:
+            self.fingerprint_index.flush()
         self.logger.info(f"Successfully prepared {len(prepared_ligands)} ligands")
         return prepared_ligands
\ No newline at end of file
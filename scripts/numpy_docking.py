@@ -0,0 +1,366 @@
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from scripts.pdbqt_reader import read_docked_poses, write_docked_poses
+from scripts.vina_engine import box_key
+from scripts.vina_scoring import (VINA_WEIGHTS, VINA_CUTOFF, ReceptorGrids, assign_xs_types, atom_elements,
+                                  bonded_pairs, vina_pair_energy, trilinear)
+
+# Resolusi tabel energi intra-ligan (Angstrom)
+INTRA_BIN = 0.02
+# Langkah line search yang dievaluasi sekaligus per iterasi BFGS, dan panjang arah maksimum
+LINE_SEARCH_STEPS = np.array([1.0, 0.5, 0.25, 0.1, 0.03, 0.01])
+MAX_STEP = 1.0
+
+
+def parse_torsion_tree(poses):
+    """Torsi dari pohon ROOT/BRANCH PDBQT
+
+    Return (root_atoms, torsions); torsions berisi (atom a, atom b, atom bergerak) urut induk
+    dulu, sehingga sumbu cabang anak sudah ikut berputar saat torsinya diterapkan.
+    """
+    template = poses['template']
+    line_atom = {line_index: atom for atom, line_index in enumerate(poses['atom_index'])}
+    serial_atom = {int(template[line_index][6:11]): atom for line_index, atom in line_atom.items()}
+
+    root_atoms = []
+    torsions = []
+    stack = []
+    for line_index, line in enumerate(template):
+        if line.startswith('BRANCH'):
+            a, b = (int(value) for value in line.split()[1:3])
+            branch = (serial_atom[a], serial_atom[b], [])
+            torsions.append(branch)
+            stack.append(branch)
+        elif line.startswith('ENDBRANCH'):
+            stack.pop()
+        elif line_index in line_atom:
+            if not stack:
+                root_atoms.append(line_atom[line_index])
+            for branch in stack:
+                branch[2].append(line_atom[line_index])
+    return root_atoms, [(a, b, np.array(moving)) for a, b, moving in torsions]
+
+
+def rotation_matrices(rotvec):
+    """Matriks rotasi (n, 3, 3) dari rotation vector (n, 3) (Rodrigues)"""
+    theta = np.linalg.norm(rotvec, axis=-1)
+    axis = rotvec / np.maximum(theta, 1e-12)[:, None]
+    kx, ky, kz = axis[:, 0], axis[:, 1], axis[:, 2]
+    zero = np.zeros_like(kx)
+    K = np.stack([np.stack([zero, -kz, ky], -1),
+                  np.stack([kz, zero, -kx], -1),
+                  np.stack([-ky, kx, zero], -1)], -2)
+    sin = np.sin(theta)[:, None, None]
+    cos = np.cos(theta)[:, None, None]
+    return np.eye(3) + sin * K + (1 - cos) * (K @ K)
+
+
+class LigandModel:
+    """Ligan fleksibel untuk pencarian: translasi, orientasi (rotation vector) dan sudut torsi
+
+    Koordinat referensi adalah konformer input; vektor konformasi nol = pose input.
+    Energi = inter-molekul dari grid map + intra-ligan (pasangan > 3 ikatan) dari tabel.
+    """
+
+    def __init__(self, poses, index=0):
+        coords = poses['coords'][index].astype(np.float64)
+        self.root_atoms, self.torsions = parse_torsion_tree(poses)
+        self.center = coords[self.root_atoms or slice(None)].mean(axis=0)
+        self.reference = coords - self.center
+        self.n_dims = 6 + len(self.torsions)
+        self.torsdof = next((int(line.split()[1]) for line in poses['template'] if line.startswith('TORSDOF')),
+                            len(self.torsions))
+
+        xs = assign_xs_types(poses['atom_types'], coords)
+        self.heavy = np.array([t is not None for t in xs])
+        self.xs_types = sorted({t for t in xs if t is not None})
+        self.heavy_atoms = np.nonzero(self.heavy)[0]
+        self.heavy_layers = np.array([self.xs_types.index(xs[i]) for i in self.heavy_atoms])
+        self.setup_intra(coords, poses['atom_types'], xs)
+
+    def setup_intra(self, coords, atom_types, xs):
+        """Pasangan atom berat terpisah > 3 ikatan dan tabel energi Vina per pasangan"""
+        n_atoms = len(coords)
+        neighbors = [[] for _ in range(n_atoms)]
+        for i, j in bonded_pairs(coords.astype(np.float32), atom_elements(atom_types)):
+            neighbors[i].append(j)
+            neighbors[j].append(i)
+
+        pairs = []
+        for start in range(n_atoms):
+            if xs[start] is None:
+                continue
+            depth = {start: 0}
+            queue = deque([start])
+            while queue:
+                atom = queue.popleft()
+                if depth[atom] == 3:
+                    continue
+                for neighbor in neighbors[atom]:
+                    if neighbor not in depth:
+                        depth[neighbor] = depth[atom] + 1
+                        queue.append(neighbor)
+            pairs.extend((start, other) for other in range(start + 1, n_atoms)
+                         if xs[other] is not None and other not in depth)
+
+        self.intra_pairs = np.array(pairs, dtype=np.int64).reshape(-1, 2)
+        distances = np.arange(0.0, VINA_CUTOFF + INTRA_BIN, INTRA_BIN)
+        self.intra_table = np.array([vina_pair_energy(distances, xs[i], xs[j]) for i, j in self.intra_pairs],
+                                    dtype=np.float64).reshape(len(self.intra_pairs), len(distances))
+
+    def coordinates(self, x):
+        """Koordinat semua atom (n, n_atoms, 3) untuk vektor konformasi x (n, n_dims)"""
+        n = len(x)
+        coords = np.repeat(self.reference[None], n, axis=0)
+        for k, (a, b, moving) in enumerate(self.torsions):
+            origin = coords[:, b]
+            axis = origin - coords[:, a]
+            axis /= np.linalg.norm(axis, axis=-1, keepdims=True)
+            angle = x[:, 6 + k]
+            v = coords[:, moving] - origin[:, None]
+            cos = np.cos(angle)[:, None, None]
+            sin = np.sin(angle)[:, None, None]
+            k_axis = axis[:, None]
+            # Rodrigues; cross product ditulis manual (np.cross lambat untuk array kecil)
+            cross = np.stack([k_axis[..., 1] * v[..., 2] - k_axis[..., 2] * v[..., 1],
+                              k_axis[..., 2] * v[..., 0] - k_axis[..., 0] * v[..., 2],
+                              k_axis[..., 0] * v[..., 1] - k_axis[..., 1] * v[..., 0]], axis=-1)
+            coords[:, moving] = (origin[:, None] + v * cos + cross * sin
+                                 + k_axis * (v * k_axis).sum(-1, keepdims=True) * (1 - cos))
+        rotation = rotation_matrices(x[:, 3:6])
+        return coords @ rotation.transpose(0, 2, 1) + (self.center + x[:, :3])[:, None]
+
+    def energies(self, grids, x):
+        """(total untuk optimasi, inter-molekul) per konformasi"""
+        coords = self.coordinates(x)
+        inter = grids.interpolate(coords[:, self.heavy_atoms], self.heavy_layers).sum(axis=1)
+        if not len(self.intra_pairs):
+            return inter, inter
+        distance = np.linalg.norm(coords[:, self.intra_pairs[:, 0]] - coords[:, self.intra_pairs[:, 1]], axis=-1)
+        bins = np.minimum((distance / INTRA_BIN).astype(np.int64), self.intra_table.shape[1] - 1)
+        intra = self.intra_table[np.arange(len(self.intra_pairs)), bins].sum(axis=1)
+        return inter + intra, inter
+
+    def affinity(self, inter):
+        """Skor akhir seperti Vina: energi inter-molekul dinormalisasi jumlah torsi"""
+        return inter / (1.0 + VINA_WEIGHTS['rot'] * self.torsdof)
+
+
+class GridMaps:
+    """Map ReceptorGrids untuk tipe atom satu ligan, ditumpuk (dikirim ke worker tanpa receptor)"""
+
+    def __init__(self, grids, xs_types):
+        self.origin = grids.origin
+        self.spacing = grids.spacing
+        maps = grids.get_maps(list(xs_types))
+        self.stacked = np.stack([maps[xs_type] for xs_type in xs_types])
+
+    def interpolate(self, points, layers):
+        """Energi per atom; layers = indeks map (urutan xs_types) per atom"""
+        return trilinear(self.stacked, self.origin, self.spacing, points, layer=layers)
+
+
+def local_optimize(ligand, grids, x, steps, epsilon=1e-3):
+    """BFGS batch untuk banyak konformasi sekaligus
+
+    Gradien finite-difference dan semua langkah line search dievaluasi dalam satu
+    panggilan skor per iterasi. Return (x, energi total).
+    """
+    n, dims = x.shape
+    offsets = np.eye(dims) * epsilon
+
+    def gradient(x, f):
+        shifted = (x[:, None] + offsets[None]).reshape(-1, dims)
+        return (ligand.energies(grids, shifted)[0].reshape(n, dims) - f[:, None]) / epsilon
+
+    f = ligand.energies(grids, x)[0]
+    g = gradient(x, f)
+    H = np.repeat(np.eye(dims)[None], n, axis=0)
+    rows = np.arange(n)
+    for _ in range(steps):
+        direction = -np.einsum('nij,nj->ni', H, g)
+        length = np.linalg.norm(direction, axis=1, keepdims=True)
+        direction *= np.minimum(1.0, MAX_STEP / np.maximum(length, 1e-12))
+        trials = x[:, None] + LINE_SEARCH_STEPS[None, :, None] * direction[:, None]
+        trial_f = ligand.energies(grids, trials.reshape(-1, dims))[0].reshape(n, len(LINE_SEARCH_STEPS))
+        best = trial_f.argmin(axis=1)
+        improved = trial_f[rows, best] < f
+        if not improved.any():
+            break
+
+        x_new = np.where(improved[:, None], trials[rows, best], x)
+        f_new = np.where(improved, trial_f[rows, best], f)
+        g_new = gradient(x_new, f_new)
+        s = x_new - x
+        y = g_new - g
+        sy = (s * y).sum(axis=1)
+        update = improved & (sy > 1e-10)
+        if update.any():
+            rho = 1.0 / sy[update]
+            identity = np.eye(dims)[None]
+            left = identity - rho[:, None, None] * s[update][:, :, None] * y[update][:, None, :]
+            H[update] = (left @ H[update] @ left.transpose(0, 2, 1)
+                         + rho[:, None, None] * s[update][:, :, None] * s[update][:, None, :])
+        x, f, g = x_new, f_new, g_new
+    return x, f
+
+
+def mutate(x, n_torsions, rng, low, high):
+    """Satu mutasi acak per rantai seperti Vina: translasi (dalam box), rotasi, atau satu torsi"""
+    x = x.copy()
+    n = len(x)
+    choice = rng.integers(0, 2 + n_torsions, size=n)
+    translate = choice == 0
+    x[translate, :3] += rng.normal(size=(translate.sum(), 3)) * 2.0
+    x[:, :3] = np.clip(x[:, :3], low, high)
+    rotate = choice == 1
+    x[rotate, 3:6] += rng.normal(size=(rotate.sum(), 3)) * 0.3
+    twist = np.nonzero(choice >= 2)[0]
+    x[twist, 6 + choice[twist] - 2] = rng.uniform(-np.pi, np.pi, size=len(twist))
+    return x
+
+
+def monte_carlo_chains(ligand, grids, n_chains, seed, settings):
+    """Jalankan n_chains rantai Monte Carlo + BFGS paralel (vektor) di satu proses
+
+    Return (konformasi, energi total) semua minimum lokal yang dikunjungi.
+    """
+    rng = np.random.default_rng(seed)
+    low = settings['offset'] - settings['box_size'] / 2
+    high = settings['offset'] + settings['box_size'] / 2
+    x = np.zeros((n_chains, ligand.n_dims))
+    x[:, :3] = rng.uniform(low, high, size=(n_chains, 3))
+    if settings['randomize']:
+        x[:, 3:6] = rng.normal(size=(n_chains, 3)) * np.pi
+        x[:, 6:] = rng.uniform(-np.pi, np.pi, size=(n_chains, ligand.n_dims - 6))
+    x, f = local_optimize(ligand, grids, x, settings['local_steps'])
+
+    visited_x = [x]
+    visited_f = [f]
+    for _ in range(settings['mc_steps']):
+        candidate, candidate_f = local_optimize(ligand, grids, mutate(x, len(ligand.torsions), rng, low, high),
+                                                settings['local_steps'])
+        accept = (candidate_f < f) | (rng.random(n_chains) < np.exp((f - candidate_f) / settings['temperature']))
+        x = np.where(accept[:, None], candidate, x)
+        f = np.where(accept, candidate_f, f)
+        visited_x.append(candidate)
+        visited_f.append(candidate_f)
+    return np.concatenate(visited_x), np.concatenate(visited_f)
+
+
+def select_modes(ligand, grids, x, f, num_modes, min_rmsd):
+    """Pose terbaik yang saling berbeda (RMSD atom berat > min_rmsd), return (x, energi total)"""
+    order = np.argsort(f, kind='stable')
+    x, f = x[order], f[order]
+    coords = ligand.coordinates(x)[:, ligand.heavy]
+    selected = []
+    for index in range(len(x)):
+        if len(selected) >= num_modes:
+            break
+        if selected:
+            rmsd = np.sqrt(((coords[selected] - coords[index]) ** 2).sum(-1).mean(-1))
+            if rmsd.min() < min_rmsd:
+                continue
+        selected.append(index)
+    return x[selected], f[selected]
+
+
+class NumpyDockingEngine:
+    """Docking NumPy tanpa binary vina (fallback untuk node tanpa vina)
+
+    Grid map Vina dihitung sekali per (receptor, box) dan di-cache; pencarian Monte Carlo
+    dengan minimisasi BFGS lokal dibagi ke process pool (rantai = exhaustiveness),
+    dan setiap langkah menilai semua rantai serta semua titik gradien sekaligus.
+    """
+
+    def __init__(self, logger, max_workers=None, spacing=0.375, cache_dir=None, mc_steps=400, local_steps=10,
+                 temperature=1.2, min_rmsd=1.0, max_instances=4):
+        self.logger = logger
+        self.max_workers = max_workers or os.cpu_count()
+        self.spacing = spacing
+        self.cache_dir = cache_dir
+        self.mc_steps = mc_steps
+        self.local_steps = local_steps
+        self.temperature = temperature
+        self.min_rmsd = min_rmsd
+        self.max_instances = max_instances
+        self._grids = {}
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def get_grids(self, protein_file, docking_config):
+        """ReceptorGrids untuk receptor dan box ini (dibuat sekali)"""
+        key = (protein_file, box_key(docking_config))
+        with self._lock:
+            if key not in self._grids:
+                while len(self._grids) >= self.max_instances:
+                    del self._grids[next(iter(self._grids))]
+                self._grids[key] = ReceptorGrids(protein_file, docking_config, self.logger, self.spacing,
+                                                 self.cache_dir)
+            return self._grids[key]
+
+    def executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def search(self, ligand, grids, docking_config, randomize=True):
+        """Bagi rantai Monte Carlo ke worker, return (konformasi, energi total) gabungan"""
+        center = np.array([docking_config['center_x'], docking_config['center_y'], docking_config['center_z']])
+        settings = {
+            'box_size': np.array([docking_config['size_x'], docking_config['size_y'], docking_config['size_z']]),
+            'offset': center - ligand.center,
+            'randomize': randomize,
+            'mc_steps': self.mc_steps,
+            'local_steps': self.local_steps,
+            'temperature': self.temperature
+        }
+        n_chains = max(1, docking_config['exhaustiveness'])
+        n_tasks = min(self.max_workers, n_chains)
+        chunks = [len(chunk) for chunk in np.array_split(np.arange(n_chains), n_tasks)]
+        base_seed = docking_config.get('seed', int(np.random.SeedSequence().entropy % 2 ** 31))
+        futures = [self.executor().submit(monte_carlo_chains, ligand, grids, chunk, base_seed + i, settings)
+                   for i, chunk in enumerate(chunks)]
+        results = [future.result() for future in futures]
+        return np.concatenate([x for x, _ in results]), np.concatenate([f for _, f in results])
+
+    def write_poses(self, ligand, grids, poses, x, output_file):
+        """Tulis pose (urut afinitas) ke PDBQT dengan skor Vina dan RMSD ke pose terbaik; return afinitas"""
+        _, inter = ligand.energies(grids, x)
+        affinities = ligand.affinity(inter)
+        order = np.argsort(affinities, kind='stable')
+        affinities = affinities[order]
+        coords = ligand.coordinates(x[order])
+        rmsd = np.sqrt(((coords[:, ligand.heavy] - coords[0, ligand.heavy]) ** 2).sum(-1).mean(-1))
+        poses = dict(poses)
+        poses['coords'] = coords.astype(np.float32)
+        poses['energies'] = affinities
+        poses['rmsd_lb'] = rmsd
+        poses['rmsd_ub'] = rmsd
+        write_docked_poses(output_file, poses)
+        return affinities.tolist()
+
+    def dock(self, protein_file, ligand_file, output_file, docking_config):
+        """Docking satu ligan dan tulis pose ke output_file, return afinitas per pose"""
+        poses = read_docked_poses(ligand_file)
+        ligand = LigandModel(poses)
+        grids = GridMaps(self.get_grids(protein_file, docking_config), ligand.xs_types)
+        x, f = self.search(ligand, grids, docking_config)
+        x, f = select_modes(ligand, grids, x, f, docking_config['num_modes'], self.min_rmsd)
+        return self.write_poses(ligand, grids, poses, x, output_file)
+
+    def optimize(self, protein_file, ligand_file, output_file, docking_config):
+        """Minimisasi lokal satu pose (tanpa global search), return afinitas (kcal/mol)"""
+        poses = read_docked_poses(ligand_file)
+        ligand = LigandModel(poses)
+        grids = GridMaps(self.get_grids(protein_file, docking_config), ligand.xs_types)
+        x, _ = local_optimize(ligand, grids, np.zeros((1, ligand.n_dims)), self.local_steps * 10)
+        return self.write_poses(ligand, grids, poses, x, output_file)[0]
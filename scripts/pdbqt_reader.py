@@ -0,0 +1,166 @@
+import re
+import mmap
+import bisect
+import numpy as np
+
+ATOM_LINE_RE = re.compile(rb'^(?:ATOM  |HETATM).*?$', re.M)
+VINA_RESULT_RE = re.compile(rb'^REMARK VINA RESULT:\s+(\S+)\s+(\S+)\s+(\S+)', re.M)
+MODEL_RE = re.compile(rb'^MODEL', re.M)
+ENDMDL_RE = re.compile(rb'^ENDMDL', re.M)
+# Energi dari stdout vina --local_only/--score_only: 'Affinity:' (1.1) atau
+# 'Estimated Free Energy of Binding   :' (1.2)
+AFFINITY_RE = re.compile(r'(?:Affinity:|Estimated Free Energy of Binding\s*:)\s+(-?\d+\.\d+)')
+
+# Tipe atom AutoDock -> simbol elemen
+AD_TYPE_ELEMENTS = {
+    'A': 'C', 'NA': 'N', 'NS': 'N', 'OA': 'O', 'OS': 'O', 'SA': 'S',
+    'HD': 'H', 'HS': 'H', 'CL': 'Cl', 'Cl': 'Cl', 'BR': 'Br', 'Br': 'Br'
+}
+
+
+def ad_type_to_element(atom_type):
+    """Konversi tipe atom AutoDock ke simbol elemen"""
+    return AD_TYPE_ELEMENTS.get(atom_type, atom_type[:1])
+
+
+def parse_vina_affinity(stdout):
+    """Energi (kcal/mol) dari stdout vina --local_only/--score_only, None jika tidak ditemukan"""
+    match = AFFINITY_RE.search(stdout or '')
+    return float(match.group(1)) if match else None
+
+
+def read_docked_poses(pdbqt_file, scored_only=False):
+    """Baca semua MODEL dari file PDBQT hasil docking dalam satu pass (memory-mapped)
+
+    scored_only=True membuang pose tanpa REMARK VINA RESULT (ValueError jika tidak ada
+    pose yang tersisa); dipakai untuk output docking yang masuk ke results/pose store.
+
+    Return dict dengan:
+      coords        float32 (n_poses, n_atoms, 3)
+      atom_types    list tipe atom AutoDock (n_atoms)
+      atom_names    list nama atom (n_atoms)
+      energies      float64 (n_poses) dari REMARK VINA RESULT (NaN jika tidak ada)
+      rmsd_lb       float64 (n_poses)
+      rmsd_ub       float64 (n_poses)
+      template      list baris model pertama (tanpa MODEL/ENDMDL/VINA RESULT)
+      atom_index    int32 posisi baris atom di dalam template
+    """
+    with open(pdbqt_file, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            atom_lines = ATOM_LINE_RE.findall(mm)
+            results = [(match.start(), match.groups()) for match in VINA_RESULT_RE.finditer(mm)]
+            model_starts = [match.start() for match in MODEL_RE.finditer(mm)]
+            first_end = ENDMDL_RE.search(mm)
+            first_block = mm[:first_end.start()] if first_end else mm[:]
+
+    n_poses = max(len(model_starts), 1)
+    if not atom_lines or len(atom_lines) % n_poses != 0:
+        raise ValueError(f"Inconsistent atom count across models in {pdbqt_file}")
+    n_atoms = len(atom_lines) // n_poses
+
+    # Kolom koordinat PDB fixed-width (8.3), dipisah manual agar angka yang
+    # menempel (misal -100.000-200.000) tetap terbaca benar
+    coord_text = b' '.join(line[30:38] + b' ' + line[38:46] + b' ' + line[46:54] for line in atom_lines)
+    coords = np.array(coord_text.split(), dtype=np.float32).reshape(n_poses, n_atoms, 3)
+
+    first_atoms = atom_lines[:n_atoms]
+    atom_types = [line[77:79].strip().decode() for line in first_atoms]
+    atom_names = [line[12:16].strip().decode() for line in first_atoms]
+
+    energies = np.full(n_poses, np.nan)
+    rmsd_lb = np.full(n_poses, np.nan)
+    rmsd_ub = np.full(n_poses, np.nan)
+    # REMARK dipetakan ke MODEL tempatnya berada, sehingga model tanpa REMARK tidak menggeser energi model lain
+    for position, values in results:
+        index = max(bisect.bisect_right(model_starts, position) - 1, 0)
+        energies[index], rmsd_lb[index], rmsd_ub[index] = (float(value) for value in values)
+
+    template = []
+    atom_index = []
+    for line in first_block.decode().splitlines():
+        if line.startswith(('MODEL', 'ENDMDL', 'REMARK VINA RESULT')):
+            continue
+        if line.startswith(('ATOM', 'HETATM')):
+            atom_index.append(len(template))
+        template.append(line)
+
+    poses = {
+        'coords': coords,
+        'atom_types': atom_types,
+        'atom_names': atom_names,
+        'energies': energies,
+        'rmsd_lb': rmsd_lb,
+        'rmsd_ub': rmsd_ub,
+        'template': template,
+        'atom_index': np.array(atom_index, dtype=np.int32)
+    }
+    if scored_only:
+        scored = np.flatnonzero(~np.isnan(energies))
+        if not len(scored):
+            raise ValueError(f"No REMARK VINA RESULT in {pdbqt_file}, not a docking output")
+        if len(scored) < n_poses:
+            poses = subset_poses(poses, scored)
+    return poses
+
+
+def format_pose_lines(template, atom_index, coords):
+    """Isi koordinat satu pose ke baris template PDBQT"""
+    lines = list(template)
+    for i, (x, y, z) in zip(atom_index, coords):
+        line = lines[i]
+        lines[i] = f"{line[:30]}{x:8.3f}{y:8.3f}{z:8.3f}{line[54:]}"
+    return lines
+
+
+def pose_to_pdbqt(poses, index):
+    """Bentuk blok PDBQT untuk satu pose"""
+    lines = [f"REMARK VINA RESULT: {poses['energies'][index]:9.3f} "
+             f"{poses['rmsd_lb'][index]:10.3f} {poses['rmsd_ub'][index]:10.3f}"]
+    lines.extend(format_pose_lines(poses['template'], poses['atom_index'], poses['coords'][index]))
+    return '\n'.join(lines) + '\n'
+
+
+def pose_to_pdb_string(poses, index=0):
+    """Konversi satu pose ke format PDB (tanpa kolom muatan/tipe AutoDock) untuk visualisasi"""
+    lines = []
+    for i, (x, y, z) in enumerate(poses['coords'][index]):
+        line = poses['template'][poses['atom_index'][i]]
+        element = ad_type_to_element(poses['atom_types'][i])
+        lines.append(f"{line[:30]}{x:8.3f}{y:8.3f}{z:8.3f}  1.00  0.00          {element:>2}")
+    lines.append('END')
+    return '\n'.join(lines)
+
+
+def write_docked_poses(output_file, poses, order=None):
+    """Tulis pose (opsional dengan urutan/subset tertentu) sebagai PDBQT multi-model"""
+    if order is None:
+        order = range(len(poses['energies']))
+    with open(output_file, 'w') as f:
+        for model, index in enumerate(order, 1):
+            f.write(f"MODEL {model}\n")
+            f.write(pose_to_pdbqt(poses, index))
+            f.write("ENDMDL\n")
+
+
+def concatenate_poses(pose_sets):
+    """Gabungkan beberapa hasil read_docked_poses dari ligan yang sama"""
+    first = pose_sets[0]
+    return {
+        'coords': np.concatenate([p['coords'] for p in pose_sets]),
+        'atom_types': first['atom_types'],
+        'atom_names': first['atom_names'],
+        'energies': np.concatenate([p['energies'] for p in pose_sets]),
+        'rmsd_lb': np.concatenate([p['rmsd_lb'] for p in pose_sets]),
+        'rmsd_ub': np.concatenate([p['rmsd_ub'] for p in pose_sets]),
+        'template': first['template'],
+        'atom_index': first['atom_index']
+    }
+
+
+def subset_poses(poses, indices):
+    """Ambil subset pose (urutan mengikuti indices)"""
+    indices = np.asarray(indices)
+    subset = dict(poses)
+    for key in ('coords', 'energies', 'rmsd_lb', 'rmsd_ub'):
+        subset[key] = poses[key][indices]
+    return subset
@@ -0,0 +1,242 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class Stage:
+    """Satu stage pipeline: fungsi dengan file input/output dan parameter yang dideklarasikan
+
+    func dipanggil tanpa argumen dan mengembalikan nilai truthy jika berhasil (None = gagal).
+    Dependensi antar stage diturunkan dari file: stage yang menghasilkan salah satu input
+    stage lain menjadi upstream-nya. after: upstream tambahan tanpa file (urutan saja).
+    """
+
+    def __init__(self, name, func, inputs=(), outputs=(), params=None, after=(), help=''):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.params = params or {}
+        self.after = list(after)
+        self.help = help
+
+
+class FileHasher:
+    """SHA-256 isi file dengan cache (ukuran, mtime) sehingga file yang tidak berubah tidak dibaca ulang"""
+
+    def __init__(self, cache_file):
+        self.cache_file = cache_file
+        self._lock = threading.Lock()
+        try:
+            with open(cache_file) as f:
+                self.cache = json.load(f)
+        except (OSError, ValueError):
+            self.cache = {}
+
+    def hash(self, path):
+        """Hash isi file, atau None jika file tidak ada"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        key = os.path.abspath(path)
+        with self._lock:
+            cached = self.cache.get(key)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        with self._lock:
+            self.cache[key] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def save(self):
+        with self._lock:
+            tmp_file = f"{self.cache_file}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump(self.cache, f)
+            os.replace(tmp_file, self.cache_file)
+
+
+class PipelineDAG:
+    """Runner pipeline ala Makefile: stage dijalankan hanya jika input, parameter atau output berubah
+
+    Tiap stage yang selesai menulis manifest <manifest_dir>/<stage>.json berisi hash input
+    (isi file input + parameter) dan hash isi tiap output. Saat run berikutnya stage
+    dilewati jika hash input sama dan semua output masih ada dengan isi yang sama.
+    Stage yang semua upstream-nya selesai dijalankan bersamaan di thread pool, sehingga
+    cabang independen (misal preparasi receptor dan ligan) berjalan paralel.
+    """
+
+    def __init__(self, stages, manifest_dir, logger, max_workers=2):
+        self.stages = {stage.name: stage for stage in stages}
+        self.manifest_dir = manifest_dir
+        self.logger = logger
+        self.max_workers = max_workers
+        os.makedirs(manifest_dir, exist_ok=True)
+        self.hasher = FileHasher(os.path.join(manifest_dir, 'file_hashes.json'))
+
+        producers = {}
+        for stage in stages:
+            for output in stage.outputs:
+                if output in producers:
+                    raise ValueError(f"Output {output} is produced by both {producers[output]} and {stage.name}")
+                producers[output] = stage.name
+        self.upstream = {}
+        for stage in stages:
+            unknown = [name for name in stage.after if name not in self.stages]
+            if unknown:
+                raise ValueError(f"Stage {stage.name} runs after unknown stages: {', '.join(unknown)}")
+            self.upstream[stage.name] = sorted({producers[path] for path in stage.inputs if path in producers} |
+                                               set(stage.after) - {stage.name})
+        self.order = self.topological_order()
+
+    def topological_order(self):
+        """Urutan stage yang memenuhi semua dependensi (urutan deklarasi dipertahankan jika bisa)"""
+        order = []
+        visiting = set()
+
+        def visit(name):
+            if name in order:
+                return
+            if name in visiting:
+                raise ValueError(f"Pipeline has a dependency cycle through {name}")
+            visiting.add(name)
+            for upstream in self.upstream[name]:
+                visit(upstream)
+            visiting.discard(name)
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    def downstream(self, names):
+        """Semua stage yang (langsung atau tidak) bergantung pada names"""
+        selected = set(names)
+        for name in self.order:
+            if set(self.upstream[name]) & selected:
+                selected.add(name)
+        return selected - set(names)
+
+    def select(self, targets=None, with_upstream=True, with_downstream=False):
+        """Stage yang dijalankan untuk targets (None = semua), dalam urutan topologis
+
+        with_upstream: sertakan upstream (stage up-to-date tetap dilewati lewat manifest);
+        tanpa upstream, output upstream yang sudah ada dipakai apa adanya.
+        """
+        targets = list(targets or self.stages)
+        unknown = [name for name in targets if name not in self.stages]
+        if unknown:
+            raise ValueError(f"Unknown stages: {', '.join(unknown)} (available: {', '.join(self.order)})")
+        selected = set(targets)
+        if with_downstream:
+            selected |= self.downstream(targets)
+        if with_upstream:
+            pending = list(selected)
+            while pending:
+                for upstream in self.upstream[pending.pop()]:
+                    if upstream not in selected:
+                        selected.add(upstream)
+                        pending.append(upstream)
+        return [name for name in self.order if name in selected]
+
+    def manifest_file(self, name):
+        return os.path.join(self.manifest_dir, f"{name}.json")
+
+    def load_manifest(self, name):
+        try:
+            with open(self.manifest_file(name)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def input_hash(self, stage):
+        """Hash gabungan parameter dan isi semua file input (file yang tidak ada ikut tercatat)"""
+        digest = hashlib.sha256(json.dumps(stage.params, sort_keys=True, default=str).encode())
+        for path in sorted(stage.inputs):
+            digest.update(f"{path}\0{self.hasher.hash(path)}\n".encode())
+        return digest.hexdigest()
+
+    def status(self, name):
+        """'up-to-date', 'stale' (input/parameter berubah atau output hilang/berubah) atau 'never run'"""
+        manifest = self.load_manifest(name)
+        if manifest is None:
+            return 'never run'
+        stage = self.stages[name]
+        if manifest['input_hash'] != self.input_hash(stage):
+            return 'stale'
+        if any(self.hasher.hash(path) != manifest['outputs'].get(path) for path in stage.outputs):
+            return 'stale'
+        return 'up-to-date'
+
+    def run_stage(self, name, force):
+        """Jalankan satu stage jika perlu; return 'skipped', 'done' atau 'failed'"""
+        stage = self.stages[name]
+        if not force and self.status(name) == 'up-to-date':
+            self.logger.info(f"Stage {name}: up to date, skipping")
+            return 'skipped'
+
+        missing = [path for path in stage.inputs if not os.path.exists(path)]
+        if missing:
+            self.logger.warning(f"Stage {name}: {len(missing)} inputs missing (e.g. {missing[0]})")
+        self.logger.info(f"Stage {name}: running")
+        start_time = time.monotonic()
+        try:
+            ok = stage.func()
+        except Exception as e:
+            self.logger.error(f"Stage {name} failed: {str(e)}")
+            ok = None
+        if not ok:
+            return 'failed'
+
+        manifest = {
+            'input_hash': self.input_hash(stage),
+            'outputs': {path: self.hasher.hash(path) for path in stage.outputs},
+            'seconds': round(time.monotonic() - start_time, 2),
+            'finished': time.strftime('%Y-%m-%d %H:%M:%S')
+        }
+        tmp_file = f"{self.manifest_file(name)}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp_file, self.manifest_file(name))
+        self.logger.info(f"Stage {name}: done in {manifest['seconds']:.1f} s")
+        return 'done'
+
+    def run(self, targets=None, with_upstream=True, with_downstream=False, force=False):
+        """Jalankan stage terpilih; stage yang upstream-nya gagal tidak dijalankan
+
+        force: jalankan ulang target meski up to date (upstream tetap memakai manifest).
+        Return {stage: 'done' | 'skipped' | 'failed' | 'blocked'} dalam urutan topologis.
+        """
+        selected = self.select(targets, with_upstream, with_downstream)
+        forced = set(targets or self.stages) if force else set()
+        results = {}
+        remaining = list(selected)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while remaining or running:
+                for name in list(remaining):
+                    # Upstream di luar seleksi dianggap sudah tersedia
+                    upstream = [up for up in self.upstream[name] if up in selected]
+                    if any(results.get(up) in ('failed', 'blocked') for up in upstream):
+                        results[name] = 'blocked'
+                        remaining.remove(name)
+                        self.logger.warning(f"Stage {name}: blocked by failed upstream stage")
+                    elif all(up in results for up in upstream):
+                        running[executor.submit(self.run_stage, name, name in forced)] = name
+                        remaining.remove(name)
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[running.pop(future)] = future.result()
+
+        self.hasher.save()
+        return {name: results[name] for name in selected}
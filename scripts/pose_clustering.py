@@ -0,0 +1,134 @@
+import numpy as np
+from scripts.pdbqt_reader import pose_to_pdb_string
+
+HYDROGEN_TYPES = ('H', 'HD', 'HS')
+
+
+def heavy_atom_mask(poses):
+    """Mask atom berat (RMSD dihitung tanpa hidrogen)"""
+    return np.array([atom_type not in HYDROGEN_TYPES for atom_type in poses['atom_types']])
+
+
+def symmetry_permutations(poses, max_permutations=64):
+    """Permutasi atom berat yang ekuivalen secara simetri (automorfisme graf molekul)
+
+    Graf dibangun dari geometri pose pertama. Return int array (n_permutations, n_heavy);
+    baris pertama selalu identitas.
+    """
+    from rdkit import Chem
+
+    mask = heavy_atom_mask(poses)
+    n_heavy = int(mask.sum())
+    identity = np.arange(n_heavy)[None, :]
+
+    mol = Chem.MolFromPDBBlock(pose_to_pdb_string(poses, 0), removeHs=False, sanitize=False)
+    if mol is None:
+        return identity
+    mol = Chem.RemoveHs(mol, sanitize=False)
+    if mol.GetNumAtoms() != n_heavy:
+        return identity
+    mol.UpdatePropertyCache(strict=False)
+    Chem.FastFindRings(mol)
+
+    matches = mol.GetSubstructMatches(mol, uniquify=False, useChirality=False, maxMatches=max_permutations)
+    if not matches:
+        return identity
+    permutations = np.array(matches, dtype=np.int64)
+    return np.unique(np.vstack([identity, permutations]), axis=0)
+
+
+def pairwise_rmsd(coords, permutations=None, block_size=16):
+    """Matriks RMSD (n_poses x n_poses) dengan minimum atas permutasi simetri
+
+    coords: (n_poses, n_atoms, 3). Dihitung dengan broadcasting per blok baris
+    sehingga memori tetap O(block_size * n_poses * n_permutations * n_atoms).
+    """
+    coords = np.asarray(coords, dtype=np.float32)
+    n_poses, n_atoms, _ = coords.shape
+    if permutations is None:
+        permutations = np.arange(n_atoms)[None, :]
+
+    permuted = coords[:, permutations]  # (P, S, N, 3)
+    rmsd = np.empty((n_poses, n_poses), dtype=np.float32)
+    for start in range(0, n_poses, block_size):
+        block = coords[start:start + block_size, None, None]  # (B, 1, 1, N, 3)
+        squared = ((block - permuted[None]) ** 2).sum(-1).mean(-1)  # (B, P, S)
+        rmsd[start:start + block_size] = np.sqrt(squared.min(-1))
+    # Simetrikan (min atas permutasi tidak selalu simetris karena maxMatches)
+    return np.minimum(rmsd, rmsd.T)
+
+
+def leader_clustering(rmsd, energies, cutoff):
+    """Leader clustering: pose diurutkan dari energi terbaik, pose yang berjarak
+    >= cutoff dari semua leader menjadi leader baru"""
+    order = np.argsort(energies, kind='stable')
+    labels = np.full(len(energies), -1, dtype=np.int64)
+    leaders = []
+    for index in order:
+        if leaders:
+            distances = rmsd[index, leaders]
+            nearest = int(np.argmin(distances))
+            if distances[nearest] < cutoff:
+                labels[index] = nearest
+                continue
+        labels[index] = len(leaders)
+        leaders.append(index)
+    return np.array(leaders, dtype=np.int64), labels
+
+
+def hierarchical_clustering(rmsd, energies, cutoff):
+    """Agglomerative complete-linkage: gabung cluster selama jarak maksimum antar
+    anggota < cutoff. Representatif = pose dengan energi terbaik di cluster."""
+    n_poses = len(energies)
+    clusters = [[i] for i in range(n_poses)]
+    distance = rmsd.astype(np.float64).copy()
+    np.fill_diagonal(distance, np.inf)
+
+    while len(clusters) > 1:
+        i, j = np.unravel_index(np.argmin(distance), distance.shape)
+        if distance[i, j] >= cutoff:
+            break
+        i, j = min(i, j), max(i, j)
+        clusters[i].extend(clusters[j])
+        # Complete linkage: jarak cluster gabungan = maksimum kedua jarak lama
+        merged = np.maximum(distance[i], distance[j])
+        distance[i, :] = merged
+        distance[:, i] = merged
+        distance[i, i] = np.inf
+        distance = np.delete(np.delete(distance, j, axis=0), j, axis=1)
+        del clusters[j]
+
+    representatives = [min(members, key=lambda m: energies[m]) for members in clusters]
+    order = np.argsort([energies[r] for r in representatives], kind='stable')
+    labels = np.empty(n_poses, dtype=np.int64)
+    for label, cluster_index in enumerate(order):
+        labels[clusters[cluster_index]] = label
+    return np.array([representatives[i] for i in order], dtype=np.int64), labels
+
+
+def cluster_poses(poses, cutoff=2.0, method='leader', symmetry=True, max_permutations=64):
+    """Cluster pose satu ligan berdasarkan RMSD atom berat
+
+    Return dict dengan representatives (index pose, urut energi terbaik), labels
+    per pose dan populations per representatif.
+    """
+    mask = heavy_atom_mask(poses)
+    coords = poses['coords'][:, mask]
+    permutations = symmetry_permutations(poses, max_permutations) if symmetry else None
+    rmsd = pairwise_rmsd(coords, permutations)
+
+    energies = poses['energies']
+    if method == 'leader':
+        representatives, labels = leader_clustering(rmsd, energies, cutoff)
+    elif method == 'hierarchical':
+        representatives, labels = hierarchical_clustering(rmsd, energies, cutoff)
+    else:
+        raise ValueError(f"Unknown clustering method: {method}")
+
+    populations = np.bincount(labels, minlength=len(representatives))
+    return {
+        'representatives': representatives,
+        'labels': labels,
+        'populations': populations,
+        'rmsd': rmsd
+    }
@@ -0,0 +1,205 @@
+import os
+import json
+import sqlite3
+import threading
+import numpy as np
+from scripts.pdbqt_reader import pose_to_pdbqt
+from scripts.work_queue import default_worker_id
+
+
+def pose_key(ligand_name, site=None):
+    """Kunci pose store dan nama file output untuk pasangan (ligan, site)"""
+    return ligand_name if site in (None, 'default') else f"{ligand_name}_{site}"
+
+
+class PoseStore:
+    """Penyimpanan pose biner terkompresi per chunk dengan index SQLite untuk random access
+
+    Layout direktori:
+      index.sqlite           satu baris per ligan -> (chunk, offset pose/atom, ukuran)
+      <writer>_<seq>.npz     chunk berisi coords float32, energi/RMSD per pose dan template PDBQT
+    """
+
+    def __init__(self, store_dir, logger, chunk_size=256, writer_id=None):
+        self.store_dir = store_dir
+        self.logger = logger
+        self.chunk_size = chunk_size
+        self.writer_id = (writer_id or default_worker_id()).replace(':', '_').replace(os.sep, '_')
+        self.index_file = os.path.join(store_dir, 'index.sqlite')
+        self._buffer = []
+        self._chunk_seq = 0
+        self._cached_chunk = (None, None)
+        self._lock = threading.RLock()
+
+        os.makedirs(store_dir, exist_ok=True)
+        conn = self.connect()
+        try:
+            conn.execute("""CREATE TABLE IF NOT EXISTS ligands (
+                name TEXT PRIMARY KEY,
+                chunk TEXT NOT NULL,
+                pose_start INTEGER NOT NULL,
+                n_poses INTEGER NOT NULL,
+                atom_start INTEGER NOT NULL,
+                n_atoms INTEGER NOT NULL,
+                slot INTEGER NOT NULL
+            )""")
+        finally:
+            conn.close()
+
+    def connect(self):
+        """Buka koneksi ke index"""
+        conn = sqlite3.connect(self.index_file, timeout=60)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def add(self, name, poses):
+        """Tambahkan pose satu ligan ke buffer; chunk ditulis saat buffer penuh"""
+        with self._lock:
+            self._buffer.append((name, poses))
+            if len(self._buffer) >= self.chunk_size:
+                self.flush()
+
+    def flush(self):
+        """Tulis buffer sebagai satu chunk (atomik) lalu daftarkan di index"""
+        with self._lock:
+            buffer, self._buffer = self._buffer, []
+        if not buffer:
+            return None
+
+        coords, energies, rmsd_lb, rmsd_ub, templates, rows = [], [], [], [], [], []
+        pose_start = 0
+        atom_start = 0
+        for slot, (name, poses) in enumerate(buffer):
+            n_poses, n_atoms, _ = poses['coords'].shape
+            coords.append(poses['coords'].reshape(-1, 3))
+            energies.append(poses['energies'])
+            rmsd_lb.append(poses['rmsd_lb'])
+            rmsd_ub.append(poses['rmsd_ub'])
+            templates.append(poses['template'])
+            rows.append((name, pose_start, n_poses, atom_start, n_atoms, slot))
+            pose_start += n_poses
+            atom_start += n_poses * n_atoms
+
+        # Nama chunk unik per writer agar banyak worker bisa menulis bersamaan
+        with self._lock:
+            while True:
+                chunk_name = f"{self.writer_id}_{self._chunk_seq:06d}.npz"
+                self._chunk_seq += 1
+                if not os.path.exists(os.path.join(self.store_dir, chunk_name)):
+                    break
+        chunk_file = os.path.join(self.store_dir, chunk_name)
+        tmp_file = chunk_file + '.tmp'
+
+        with open(tmp_file, 'wb') as f:
+            np.savez_compressed(
+                f,
+                coords=np.concatenate(coords).astype(np.float32),
+                energies=np.concatenate(energies).astype(np.float32),
+                rmsd_lb=np.concatenate(rmsd_lb).astype(np.float32),
+                rmsd_ub=np.concatenate(rmsd_ub).astype(np.float32),
+                templates=np.array(json.dumps(templates))
+            )
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, chunk_file)
+
+        conn = self.connect()
+        try:
+            with conn:
+                conn.executemany("""INSERT OR REPLACE INTO ligands
+                                    (name, chunk, pose_start, n_poses, atom_start, n_atoms, slot)
+                                    VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                                 [(name, chunk_name, ps, n_poses, ast, n_atoms, slot)
+                                  for name, ps, n_poses, ast, n_atoms, slot in rows])
+        finally:
+            conn.close()
+
+        self.logger.info(f"Pose store chunk written: {chunk_name} ({len(rows)} ligands)")
+        return chunk_file
+
+    def close(self):
+        """Flush sisa buffer"""
+        self.flush()
+
+    def names(self):
+        """Daftar semua ligan di store"""
+        conn = self.connect()
+        try:
+            return [row[0] for row in conn.execute("SELECT name FROM ligands ORDER BY name")]
+        finally:
+            conn.close()
+
+    def _load_chunk(self, chunk_name):
+        """Load satu chunk (chunk terakhir di-cache untuk akses berurutan)
+
+        Aman dipanggil dari banyak thread: cache dibaca dan diganti di bawah lock, dan
+        yang dikembalikan selalu chunk lokal (bukan cache yang mungkin sudah diganti thread lain).
+        """
+        with self._lock:
+            cached_name, chunk = self._cached_chunk
+        if cached_name == chunk_name:
+            return chunk
+        with np.load(os.path.join(self.store_dir, chunk_name)) as data:
+            chunk = {key: data[key] for key in data.files}
+        chunk['templates'] = json.loads(str(chunk['templates']))
+        with self._lock:
+            self._cached_chunk = (chunk_name, chunk)
+        return chunk
+
+    def get(self, name):
+        """Ambil semua pose satu ligan (format sama dengan read_docked_poses), None jika tidak ada"""
+        conn = self.connect()
+        try:
+            row = conn.execute("""SELECT chunk, pose_start, n_poses, atom_start, n_atoms, slot
+                                  FROM ligands WHERE name = ?""", (name,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+
+        chunk_name, pose_start, n_poses, atom_start, n_atoms, slot = row
+        chunk = self._load_chunk(chunk_name)
+        template = chunk['templates'][slot]
+        atom_index = [i for i, line in enumerate(template) if line.startswith(('ATOM', 'HETATM'))]
+        pose_slice = slice(pose_start, pose_start + n_poses)
+
+        return {
+            'coords': chunk['coords'][atom_start:atom_start + n_poses * n_atoms].reshape(n_poses, n_atoms, 3),
+            'atom_types': [template[i][77:79].strip() for i in atom_index],
+            'atom_names': [template[i][12:16].strip() for i in atom_index],
+            'energies': chunk['energies'][pose_slice].astype(np.float64).round(3),
+            'rmsd_lb': chunk['rmsd_lb'][pose_slice].astype(np.float64).round(3),
+            'rmsd_ub': chunk['rmsd_ub'][pose_slice].astype(np.float64).round(3),
+            'template': template,
+            'atom_index': np.array(atom_index, dtype=np.int32)
+        }
+
+    def export_pdbqt(self, name, pose_index, output_file):
+        """Export satu pose ke file PDBQT"""
+        poses = self.get(name)
+        if poses is None:
+            self.logger.error(f"Ligand {name} not found in pose store")
+            return None
+        with open(output_file, 'w') as f:
+            f.write(pose_to_pdbqt(poses, pose_index))
+        return output_file
+
+    def export_sdf(self, name, pose_index, output_file, template_file=None):
+        """Export satu pose ke file SDF (bond order dari template SDF ligand prep jika ada)"""
+        from rdkit import Chem
+        from scripts.sdf_export import load_template, restore_pose_mol
+
+        poses = self.get(name)
+        if poses is None:
+            self.logger.error(f"Ligand {name} not found in pose store")
+            return None
+        mol, _ = restore_pose_mol(poses, pose_index, load_template(template_file))
+        if mol is None:
+            self.logger.error(f"RDKit could not build a molecule from pose {pose_index} of {name}")
+            return None
+        mol.SetProp('_Name', name)
+        mol.SetProp('Binding_Affinity_kcal_mol', f"{poses['energies'][pose_index]:.3f}")
+        writer = Chem.SDWriter(output_file)
+        writer.write(mol)
+        writer.close()
+        return output_file
@@ -1,14 +1,15 @@
 import os
-import subprocess
 import requests
 import tempfile
 from Bio.PDB import PDBParser, PDBIO, Select
 from Bio.PDB.PDBList import PDBList
+from scripts.backends import MGLToolsBackend, OpenBabelBackend
 
 class ProteinPreparator:
-    def __init__(self, protein_dir, logger):
+    def __init__(self, protein_dir, logger, backends=None):
         self.protein_dir = protein_dir
         self.logger = logger
+        self.backends = backends or [MGLToolsBackend(logger), OpenBabelBackend(logger)]
         self.pdb_parser = PDBParser(QUIET=True)
         self.pdb_io = PDBIO()
     
@@ -71,41 +72,21 @@ class ProteinPreparator:
             return None
     
     def pdb_to_pdbqt(self, pdb_file):
-        """Convert PDB ke PDBQT menggunakan MGLTools"""
+        """Convert PDB ke PDBQT, mencoba backend preparasi berurutan (default MGLTools lalu Open Babel)"""
         try:
             # Create output file name
             base_name = os.path.basename(pdb_file).split('.')[0]
             output_file = os.path.join(self.protein_dir, f"{base_name}.pdbqt")
             
-            # Use MGLTools' prepare_receptor4.py via subprocess
-            # Assuming MGLTools is installed and in PATH
-            cmd = f"prepare_receptor4.py -r {pdb_file} -o {output_file} -A hydrogens"
+            for backend in self.backends:
+                error = backend.convert(pdb_file, output_file)
+                if error is None:
+                    self.logger.info(f"Successfully converted to PDBQT with {backend.name}: {output_file}")
+                    return output_file
+                self.logger.error(f"Error converting PDB to PDBQT with {backend.name}: {error}")
             
-            # Alternative: use Open Babel if MGLTools not available
-            # cmd = f"obabel {pdb_file} -O {output_file} -xr"
-            
-            self.logger.info(f"Running command: {cmd}")
-            process = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            stdout, stderr = process.communicate()
-            
-            if process.returncode != 0:
-                self.logger.error(f"Error converting PDB to PDBQT: {stderr.decode()}")
-                # Fallback to Open Babel if MGLTools fails
-                cmd = f"obabel {pdb_file} -O {output_file} -xr"
-                self.logger.info(f"Trying fallback with Open Babel: {cmd}")
-                process = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                stdout, stderr = process.communicate()
-                
-                if process.returncode != 0:
-                    self.logger.error(f"Fallback also failed: {stderr.decode()}")
-                    return None
-            
-            if os.path.exists(output_file):
-                self.logger.info(f"Successfully converted to PDBQT: {output_file}")
-                return output_file
-            else:
-                self.logger.error(f"PDBQT file was not created")
-                return None
+            self.logger.error(f"PDBQT file was not created")
+            return None
                 
         except Exception as e:
             self.logger.error(f"Error in PDB to PDBQT conversion: {str(e)}")
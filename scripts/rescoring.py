@@ -0,0 +1,110 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from scripts.results_store import SCORE_FUNCTIONS, receptor_name
+from scripts.vina_engine import VinaEngine
+
+# Satu VinaEngine per worker process; map per (scoring function, site) dipakai ulang antar task
+_ENGINE = None
+
+
+def _init_worker(logger, cpu, ad4_maps):
+    global _ENGINE
+    _ENGINE = VinaEngine(logger, cpu=cpu, ad4_maps=ad4_maps, max_instances=2 * len(SCORE_FUNCTIONS))
+
+
+def _score_task(protein_file, docking_config, sf_name, jobs, minimize):
+    """Skor satu chunk file pose dengan satu scoring function (dijalankan di worker process)
+
+    jobs: list (ligan, site, file pose). Return (sf_name, rows (ligan, site, pose, skor), gagal).
+    """
+    rows = []
+    failed = []
+    for ligand_name, site, pose_file in jobs:
+        try:
+            scores = _ENGINE.score_file(protein_file, pose_file, docking_config, sf_name, minimize)
+        except Exception as e:
+            failed.append((ligand_name, str(e)))
+            continue
+        rows.extend((ligand_name, site, pose, score) for pose, score in enumerate(scores, 1))
+    return sf_name, rows, failed
+
+
+class MultiScoreRescorer:
+    """Rescoring pose yang sudah ada dengan beberapa scoring function Vina (vina, vinardo, ad4)
+
+    Pose tidak di-docking ulang: tiap file pose di-skor lewat Vina Python API di box site,
+    sehingga map receptor cukup dihitung sekali per (scoring function, site) di tiap worker.
+    Skor disimpan sebagai kolom score_<sf> di results store untuk konsensus.
+    """
+
+    def __init__(self, results_store, logger, scoring_functions=None, max_workers=None, chunk_size=50,
+                 ad4_maps=None, cpu=1, minimize=False):
+        self.results_store = results_store
+        self.logger = logger
+        self.scoring_functions = list(scoring_functions or SCORE_FUNCTIONS)
+        self.max_workers = max_workers or os.cpu_count()
+        self.chunk_size = chunk_size
+        self.ad4_maps = ad4_maps
+        self.cpu = cpu
+        self.minimize = minimize
+
+    def active_functions(self):
+        """Scoring function yang bisa dijalankan (ad4 butuh map autogrid4)"""
+        functions = []
+        for sf_name in self.scoring_functions:
+            if sf_name not in SCORE_FUNCTIONS:
+                self.logger.warning(f"Skipping unknown scoring function {sf_name}")
+            elif sf_name == 'ad4' and not self.ad4_maps:
+                self.logger.warning("Skipping ad4 rescoring: no autogrid4 maps configured")
+            else:
+                functions.append(sf_name)
+        return functions
+
+    def rescore(self, protein_file, docking_config, sites=None, receptor=None, ligands=None):
+        """Rescoring semua pose receptor di results store; return {sf: jumlah pose di-skor}
+
+        sites: {nama site: box} seperti DOCKING_SITES; pose dari site lain di-skor di box docking_config.
+        ligands: batasi ke daftar ligan (None = semua ligan receptor).
+        """
+        if not VinaEngine.available():
+            self.logger.error("Rescoring requires the Vina Python bindings (pip install vina)")
+            return None
+
+        try:
+            receptor = receptor or receptor_name(protein_file)
+            poses = self.results_store.query(receptor=receptor, ligands=ligands, best_pose_only=True)
+            files = poses[['ligand', 'site', 'output_file']].dropna().drop_duplicates()
+            functions = self.active_functions()
+            if files.empty or not functions:
+                self.logger.warning("Nothing to rescore")
+                return {}
+
+            tasks = []
+            for site, group in files.groupby('site', sort=False):
+                site_config = dict(docking_config, **(sites or {}).get(site, {}))
+                jobs = list(group.itertuples(index=False, name=None))
+                for start in range(0, len(jobs), self.chunk_size):
+                    for sf_name in functions:
+                        tasks.append((site_config, sf_name, jobs[start:start + self.chunk_size]))
+
+            self.logger.info(f"Rescoring {len(files)} pose files with {', '.join(functions)} "
+                             f"({len(tasks)} tasks, {self.max_workers} workers)")
+            counts = dict.fromkeys(functions, 0)
+            with ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                     initargs=(self.logger, self.cpu, self.ad4_maps)) as executor:
+                futures = [executor.submit(_score_task, protein_file, site_config, sf_name, jobs, self.minimize)
+                           for site_config, sf_name, jobs in tasks]
+                for future in as_completed(futures):
+                    sf_name, rows, failed = future.result()
+                    for ligand_name, error in failed:
+                        self.logger.warning(f"Could not rescore {ligand_name} with {sf_name}: {error}")
+                    # Tulis segera agar hasil parsial tetap tersimpan
+                    counts[sf_name] += self.results_store.add_scores(sf_name, rows, receptor)
+
+            self.logger.info("Rescoring completed: " +
+                             ", ".join(f"{sf_name} {n} poses" for sf_name, n in counts.items()))
+            return counts
+
+        except Exception as e:
+            self.logger.error(f"Error rescoring poses: {str(e)}")
+            return None
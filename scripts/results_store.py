@@ -0,0 +1,538 @@
+import os
+import time
+import sqlite3
+import numpy as np
+import pandas as pd
+
+DESCRIPTOR_COLUMNS = ['mw', 'logp', 'hbd', 'hba', 'rotatable_bonds', 'heavy_atoms']
+SCORE_FUNCTIONS = ['vina', 'vinardo', 'ad4']
+
+
+def receptor_name(protein_file):
+    """Nama receptor untuk results store (nama file tanpa ekstensi)"""
+    return os.path.splitext(os.path.basename(protein_file))[0]
+
+
+class ResultsStore:
+    """Penyimpanan hasil docking ter-index (SQLite) sebagai system of record"""
+
+    def __init__(self, db_file, logger, commit_every=50, commit_seconds=30):
+        self.db_file = db_file
+        self.logger = logger
+        self.commit_every = commit_every
+        self.commit_seconds = commit_seconds
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_file)), exist_ok=True)
+        conn = self.connect()
+        try:
+            with conn:
+                conn.execute(f"""CREATE TABLE IF NOT EXISTS poses (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    ligand TEXT NOT NULL,
+                    receptor TEXT NOT NULL,
+                    site TEXT NOT NULL DEFAULT 'default',
+                    pose INTEGER NOT NULL,
+                    affinity REAL NOT NULL,
+                    rmsd_lb REAL,
+                    rmsd_ub REAL,
+                    output_file TEXT,
+                    partial INTEGER NOT NULL DEFAULT 0,
+                    cluster_size INTEGER,
+                    box_x REAL,
+                    box_y REAL,
+                    box_z REAL,
+                    {', '.join(f'score_{name} REAL' for name in SCORE_FUNCTIONS)},
+                    ifp BLOB,
+                    UNIQUE (ligand, receptor, site, pose)
+                )""")
+                self.add_missing_columns(conn, 'poses', dict({'box_x': 'REAL', 'box_y': 'REAL', 'box_z': 'REAL',
+                                                              'ifp': 'BLOB'},
+                                                             **{f'score_{name}': 'REAL' for name in SCORE_FUNCTIONS}))
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_poses_affinity ON poses (affinity)")
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_poses_pose_affinity ON poses (pose, affinity)")
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_poses_receptor_affinity ON poses (receptor, affinity)")
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_poses_site_affinity ON poses (receptor, site, affinity)")
+                conn.execute("""CREATE TABLE IF NOT EXISTS timings (
+                    ligand TEXT NOT NULL,
+                    receptor TEXT NOT NULL,
+                    site TEXT NOT NULL DEFAULT 'default',
+                    torsions INTEGER,
+                    heavy_atoms INTEGER,
+                    volume REAL,
+                    exhaustiveness INTEGER,
+                    elapsed_seconds REAL NOT NULL,
+                    partial INTEGER NOT NULL DEFAULT 0,
+                    recorded REAL,
+                    PRIMARY KEY (ligand, receptor, site)
+                )""")
+                # Label bit fingerprint interaksi (residu:tipe) per receptor, urut posisi bit
+                conn.execute("""CREATE TABLE IF NOT EXISTS fingerprint_bits (
+                    receptor TEXT NOT NULL,
+                    bit INTEGER NOT NULL,
+                    label TEXT NOT NULL,
+                    PRIMARY KEY (receptor, bit)
+                )""")
+                conn.execute(f"""CREATE TABLE IF NOT EXISTS ligands (
+                    name TEXT PRIMARY KEY,
+                    smiles TEXT,
+                    {', '.join(f'{column} REAL' for column in DESCRIPTOR_COLUMNS)}
+                )""")
+        finally:
+            conn.close()
+
+    def add_missing_columns(self, conn, table, columns):
+        """Tambah kolom baru ke tabel dari versi database lama"""
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        for column, column_type in columns.items():
+            if column not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+    def connect(self):
+        """Buka koneksi baru ke database"""
+        conn = sqlite3.connect(self.db_file, timeout=60)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def result_rows(self, ligand_name, receptor, result):
+        """Ubah satu hasil docking (dict) menjadi baris tabel poses"""
+        n_poses = len(result['binding_affinities'])
+        rmsd_lb = result.get('rmsd_lb') or [None] * n_poses
+        rmsd_ub = result.get('rmsd_ub') or [None] * n_poses
+        cluster_sizes = result.get('cluster_sizes') or [None] * n_poses
+        site = result.get('site', 'default')
+        box = result.get('box') or {}
+        box_size = (box.get('size_x'), box.get('size_y'), box.get('size_z'))
+        return [(ligand_name, receptor, site, i + 1, affinity, rmsd_lb[i], rmsd_ub[i],
+                 result['output_file'], int(result.get('partial', False)), cluster_sizes[i]) + box_size
+                for i, affinity in enumerate(result['binding_affinities'])]
+
+    def write_results(self, conn, results, receptor):
+        """Tulis hasil dalam satu transaksi pada koneksi yang diberikan
+
+        results: dict {ligand: result} atau list pasangan (ligand, result); site diambil dari result.
+        """
+        items = list(results.items()) if isinstance(results, dict) else list(results)
+        rows = []
+        timings = []
+        now = time.time()
+        for ligand_name, result in items:
+            rows.extend(self.result_rows(ligand_name, receptor, result))
+            features = result.get('cost_features')
+            if features and result.get('elapsed_seconds') is not None:
+                timings.append((ligand_name, receptor, result.get('site', 'default'), features['torsions'],
+                                features['heavy_atoms'], features['volume'], features['exhaustiveness'],
+                                result['elapsed_seconds'], int(result.get('partial', False)), now))
+
+        with conn:
+            conn.executemany("DELETE FROM poses WHERE ligand = ? AND receptor = ? AND site = ?",
+                             [(ligand_name, receptor, result.get('site', 'default')) for ligand_name, result in items])
+            conn.executemany("""INSERT INTO poses
+                                (ligand, receptor, site, pose, affinity, rmsd_lb, rmsd_ub, output_file, partial,
+                                 cluster_size, box_x, box_y, box_z)
+                                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""", rows)
+            conn.executemany("""INSERT OR REPLACE INTO timings
+                                (ligand, receptor, site, torsions, heavy_atoms, volume, exhaustiveness,
+                                 elapsed_seconds, partial, recorded)
+                                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""", timings)
+        return len(rows)
+
+    def add_results(self, results, receptor):
+        """Simpan hasil docking ({ligand: result} atau list (ligand, result)) untuk satu receptor"""
+        conn = self.connect()
+        try:
+            return self.write_results(conn, results, receptor)
+        finally:
+            conn.close()
+
+    def open_writer(self, receptor, before_commit=None):
+        """Buka writer streaming untuk satu batch docking"""
+        return StreamingResultWriter(self, receptor, self.commit_every, self.commit_seconds, before_commit)
+
+    def add_ligand(self, name, smiles, descriptors):
+        """Simpan SMILES dan deskriptor ligan (untuk join dengan hasil docking)"""
+        conn = self.connect()
+        try:
+            with conn:
+                conn.execute(f"""INSERT OR REPLACE INTO ligands (name, smiles, {', '.join(DESCRIPTOR_COLUMNS)})
+                                 VALUES (?, ?, {', '.join('?' for _ in DESCRIPTOR_COLUMNS)})""",
+                             [name, smiles] + [descriptors.get(column) for column in DESCRIPTOR_COLUMNS])
+        finally:
+            conn.close()
+
+    def add_scores(self, scoring_function, rows, receptor):
+        """Simpan skor rescoring satu scoring function: rows berisi (ligand, site, pose, skor)"""
+        if scoring_function not in SCORE_FUNCTIONS:
+            raise ValueError(f"Unknown scoring function: {scoring_function}")
+        conn = self.connect()
+        try:
+            with conn:
+                conn.executemany(f"""UPDATE poses SET score_{scoring_function} = ?
+                                      WHERE ligand = ? AND receptor = ? AND site = ? AND pose = ?""",
+                                 [(score, ligand, receptor, site, pose) for ligand, site, pose, score in rows])
+        finally:
+            conn.close()
+        return len(rows)
+
+    def consensus(self, receptor=None, scoring_functions=None, best_pose_only=False):
+        """Skor konsensus per pose dari kolom skor rescoring yang tersedia
+
+        consensus_z = rata-rata z-score antar fungsi skor (lebih negatif lebih baik),
+        consensus_rank = rata-rata rank. Diurutkan dari consensus_z terbaik.
+        """
+        poses = self.query(receptor=receptor, best_pose_only=best_pose_only)
+        columns = [f"score_{name}" for name in (scoring_functions or SCORE_FUNCTIONS)
+                   if poses[f"score_{name}"].notna().any()]
+        if not columns:
+            self.logger.warning("No rescoring scores available for consensus")
+            return poses
+
+        scores = poses[columns].astype(float)
+        poses['consensus_z'] = ((scores - scores.mean()) / scores.std(ddof=0).replace(0, 1)).mean(axis=1)
+        poses['consensus_rank'] = scores.rank().mean(axis=1)
+        return poses.sort_values('consensus_z').reset_index(drop=True)
+
+    def set_fingerprint_labels(self, receptor, labels):
+        """Simpan label bit fingerprint receptor; fingerprint lama dihapus jika layout bit berubah"""
+        conn = self.connect()
+        try:
+            with conn:
+                existing = [row[0] for row in conn.execute(
+                    "SELECT label FROM fingerprint_bits WHERE receptor = ? ORDER BY bit", (receptor,))]
+                if existing == list(labels):
+                    return
+                if existing:
+                    self.logger.warning(f"Fingerprint bit layout changed for {receptor}, clearing old fingerprints")
+                    conn.execute("UPDATE poses SET ifp = NULL WHERE receptor = ?", (receptor,))
+                conn.execute("DELETE FROM fingerprint_bits WHERE receptor = ?", (receptor,))
+                conn.executemany("INSERT INTO fingerprint_bits (receptor, bit, label) VALUES (?, ?, ?)",
+                                 [(receptor, bit, label) for bit, label in enumerate(labels)])
+        finally:
+            conn.close()
+
+    def fingerprint_labels(self, receptor):
+        """Label bit fingerprint receptor (list, urut posisi bit)"""
+        conn = self.connect()
+        try:
+            return [row[0] for row in conn.execute(
+                "SELECT label FROM fingerprint_bits WHERE receptor = ? ORDER BY bit", (receptor,))]
+        finally:
+            conn.close()
+
+    def pose_files(self, receptor, missing_fingerprints=False):
+        """File pose unik (ligand, site, output_file) satu receptor, opsional yang belum punya fingerprint"""
+        sql = "SELECT DISTINCT ligand, site, output_file FROM poses WHERE receptor = ? AND output_file IS NOT NULL"
+        if missing_fingerprints:
+            sql += " AND ifp IS NULL"
+        conn = self.connect()
+        try:
+            return pd.read_sql_query(sql, conn, params=[receptor])
+        finally:
+            conn.close()
+
+    def add_fingerprints(self, rows, receptor):
+        """Simpan fingerprint interaksi terpack: rows berisi (ligand, site, pose, bytes)"""
+        conn = self.connect()
+        try:
+            with conn:
+                conn.executemany("""UPDATE poses SET ifp = ?
+                                    WHERE ligand = ? AND receptor = ? AND site = ? AND pose = ?""",
+                                 [(sqlite3.Binary(bits), ligand, receptor, site, pose)
+                                  for ligand, site, pose, bits in rows])
+        finally:
+            conn.close()
+        return len(rows)
+
+    def interaction_masks(self, receptor, labels):
+        """Mask bit terpack per syarat; label 'MET793' (tanpa tipe) cocok dengan semua tipe interaksi residu"""
+        bit_labels = self.fingerprint_labels(receptor)
+        masks = []
+        for label in labels:
+            bits = [bit for bit, name in enumerate(bit_labels) if label in (name, name.rsplit(':', 1)[0])]
+            if not bits:
+                raise ValueError(f"Unknown interaction for {receptor}: {label}")
+            mask = np.zeros(len(bit_labels), dtype=bool)
+            mask[bits] = True
+            masks.append(np.packbits(mask))
+        return bit_labels, masks
+
+    def filter_interactions(self, receptor, require=(), exclude=(), best_pose_only=False, chunk_size=100000):
+        """Pose dengan semua interaksi require dan tanpa interaksi exclude (DataFrame, urut affinity)
+
+        Fingerprint dibaca bertahap per chunk lalu dicek dengan operasi bit NumPy, sehingga
+        jutaan pose bisa difilter tanpa memuat semuanya ke memori. Kolom 'interactions'
+        berisi label semua bit yang aktif pada pose yang lolos.
+        """
+        bit_labels, required = self.interaction_masks(receptor, require)
+        _, excluded = self.interaction_masks(receptor, exclude)
+        labels = np.array(bit_labels, dtype=object)
+        sql = (f"SELECT {', '.join(self.pose_columns())}, p.ifp FROM poses p "
+               f"WHERE p.receptor = ? AND p.ifp IS NOT NULL")
+        if best_pose_only:
+            sql += " AND p.pose = 1"
+        sql += " ORDER BY p.affinity"
+
+        matches = []
+        conn = self.connect()
+        try:
+            for chunk in pd.read_sql_query(sql, conn, params=[receptor], chunksize=chunk_size):
+                packed = np.frombuffer(b''.join(chunk['ifp']), dtype=np.uint8).reshape(len(chunk), -1)
+                keep = np.ones(len(chunk), dtype=bool)
+                for mask in required:
+                    keep &= (packed & mask).any(axis=1)
+                for mask in excluded:
+                    keep &= ~(packed & mask).any(axis=1)
+                if not keep.any():
+                    continue
+                chunk = chunk[keep].drop(columns='ifp')
+                bits = np.unpackbits(packed[keep], axis=1, count=len(bit_labels)).astype(bool)
+                chunk['interactions'] = [';'.join(labels[row]) for row in bits]
+                matches.append(chunk)
+        finally:
+            conn.close()
+        if not matches:
+            return pd.DataFrame(columns=[column.split('.', 1)[1] for column in self.pose_columns()] + ['interactions'])
+        return pd.concat(matches, ignore_index=True)
+
+    def load_timings(self, limit=None):
+        """Timing docking historis (run lengkap saja, terbaru dulu) untuk kalibrasi cost model"""
+        sql = """SELECT torsions, heavy_atoms, volume, exhaustiveness, elapsed_seconds FROM timings
+                 WHERE partial = 0 AND elapsed_seconds > 0 ORDER BY recorded DESC"""
+        params = []
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        conn = self.connect()
+        try:
+            return pd.read_sql_query(sql, conn, params=params)
+        finally:
+            conn.close()
+
+    def pose_columns(self):
+        """Kolom tabel poses yang dikembalikan query (alias p)"""
+        columns = ["p.ligand", "p.receptor", "p.site", "p.pose", "p.affinity", "p.rmsd_lb", "p.rmsd_ub",
+                   "p.output_file", "p.partial", "p.cluster_size", "p.box_x", "p.box_y", "p.box_z"]
+        return columns + [f"p.score_{name}" for name in SCORE_FUNCTIONS]
+
+    def query(self, receptor=None, ligands=None, min_affinity=None, max_affinity=None, site=None,
+              best_pose_only=False, with_descriptors=False, limit=None, **descriptor_filters):
+        """Query pose dengan filter, diurutkan dari affinity terbaik (DataFrame)
+
+        descriptor_filters berbentuk <deskriptor>_max / <deskriptor>_min, misal mw_max=500
+        """
+        columns = self.pose_columns()
+        joins = ""
+        conditions = []
+        params = []
+
+        if receptor is not None:
+            conditions.append("p.receptor = ?")
+            params.append(receptor)
+        if site is not None:
+            conditions.append("p.site = ?")
+            params.append(site)
+        if ligands is not None:
+            ligands = list(ligands)
+            conditions.append(f"p.ligand IN ({', '.join('?' for _ in ligands)})")
+            params.extend(ligands)
+        if min_affinity is not None:
+            conditions.append("p.affinity >= ?")
+            params.append(min_affinity)
+        if max_affinity is not None:
+            conditions.append("p.affinity <= ?")
+            params.append(max_affinity)
+        if best_pose_only:
+            conditions.append("p.pose = 1")
+
+        if with_descriptors or descriptor_filters:
+            joins = "LEFT JOIN ligands l ON l.name = p.ligand"
+            columns += ["l.smiles"] + [f"l.{column}" for column in DESCRIPTOR_COLUMNS]
+        for key, value in descriptor_filters.items():
+            column, _, bound = key.rpartition('_')
+            if column not in DESCRIPTOR_COLUMNS or bound not in ('min', 'max'):
+                raise ValueError(f"Unknown filter: {key}")
+            conditions.append(f"l.{column} {'>=' if bound == 'min' else '<='} ?")
+            params.append(value)
+
+        sql = f"SELECT {', '.join(columns)} FROM poses p {joins}"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY p.affinity"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+
+        conn = self.connect()
+        try:
+            return pd.read_sql_query(sql, conn, params=params)
+        finally:
+            conn.close()
+
+    def top_k(self, k, **filters):
+        """k pose dengan affinity terbaik (filter sama dengan query)"""
+        return self.query(limit=k, **filters)
+
+    def summary(self, receptor=None):
+        """Ringkasan per ligan: affinity terbaik (di semua site), site terbaik dan jumlah pose"""
+        # SQLite mengambil kolom 'site' dari baris dengan MIN(affinity)
+        sql = """SELECT ligand, receptor, MIN(affinity) AS best_affinity, site AS best_site,
+                        COUNT(*) AS n_poses, SUM(partial) > 0 AS partial
+                 FROM poses"""
+        params = []
+        if receptor is not None:
+            sql += " WHERE receptor = ?"
+            params.append(receptor)
+        sql += " GROUP BY ligand, receptor ORDER BY best_affinity"
+
+        conn = self.connect()
+        try:
+            return pd.read_sql_query(sql, conn, params=params)
+        finally:
+            conn.close()
+
+    def best_affinities(self, receptor, ligands, chunk_size=500):
+        """Affinity terbaik (semua site) untuk daftar ligan -> {ligan: affinity}; ligan tanpa hasil dilewati"""
+        ligands = list(ligands)
+        scores = {}
+        conn = self.connect()
+        try:
+            for start in range(0, len(ligands), chunk_size):
+                chunk = ligands[start:start + chunk_size]
+                scores.update(conn.execute(f"""SELECT ligand, MIN(affinity) FROM poses
+                                                WHERE receptor = ? AND ligand IN ({', '.join('?' for _ in chunk)})
+                                                GROUP BY ligand""", [receptor] + chunk).fetchall())
+        finally:
+            conn.close()
+        return scores
+
+    def scored_ligands(self, receptor):
+        """Ligan dengan SMILES dan affinity terbaik untuk satu receptor (DataFrame ligand, smiles, best_affinity)"""
+        sql = """SELECT p.ligand, l.smiles, MIN(p.affinity) AS best_affinity FROM poses p
+                 JOIN ligands l ON l.name = p.ligand
+                 WHERE p.receptor = ? AND l.smiles IS NOT NULL AND p.partial = 0
+                 GROUP BY p.ligand ORDER BY best_affinity"""
+        conn = self.connect()
+        try:
+            return pd.read_sql_query(sql, conn, params=[receptor])
+        finally:
+            conn.close()
+
+    def site_summary(self, receptor=None):
+        """Affinity terbaik per ligan per site (satu kolom per site) dan site terbaik"""
+        sql = "SELECT ligand, receptor, site, MIN(affinity) AS best_affinity FROM poses"
+        params = []
+        if receptor is not None:
+            sql += " WHERE receptor = ?"
+            params.append(receptor)
+        sql += " GROUP BY ligand, receptor, site"
+
+        conn = self.connect()
+        try:
+            per_site = pd.read_sql_query(sql, conn, params=params)
+        finally:
+            conn.close()
+
+        table = per_site.pivot_table(index=['ligand', 'receptor'], columns='site', values='best_affinity')
+        table.columns.name = None
+        table['best_site'] = table.idxmin(axis=1)
+        table['best_affinity'] = table.drop(columns='best_site').min(axis=1)
+        return table.reset_index().sort_values('best_affinity')
+
+    def load_results(self, receptor=None, limit=None):
+        """Bangun kembali dict hasil {ligand: result} (site terbaik) dari disk, urut dari affinity terbaik
+
+        Hanya limit ligan teratas yang dimuat sehingga memori tetap kecil untuk library besar.
+        """
+        summary = self.summary(receptor)
+        if limit is not None:
+            summary = summary.head(limit)
+
+        results = {}
+        conn = self.connect()
+        try:
+            for row in summary.itertuples(index=False):
+                poses = conn.execute("""SELECT affinity, rmsd_lb, rmsd_ub, output_file, cluster_size FROM poses
+                                        WHERE ligand = ? AND receptor = ? AND site = ? ORDER BY pose""",
+                                     (row.ligand, row.receptor, row.best_site)).fetchall()
+                affinities = [pose[0] for pose in poses]
+                results[row.ligand] = {
+                    'output_file': poses[0][3],
+                    'binding_affinities': affinities,
+                    'rmsd_lb': [pose[1] for pose in poses],
+                    'rmsd_ub': [pose[2] for pose in poses],
+                    'cluster_sizes': [pose[4] for pose in poses],
+                    'best_affinity': min(affinities),
+                    'site': row.best_site,
+                    'partial': bool(row.partial)
+                }
+        finally:
+            conn.close()
+        return results
+
+    def export_excel(self, excel_file, max_rows=None, **filters):
+        """Export hasil query (All_Results) dan ringkasan (Summary) ke Excel"""
+        try:
+            poses = self.query(limit=max_rows, **filters)
+            summary = self.summary(filters.get('receptor'))
+
+            with pd.ExcelWriter(excel_file, engine='openpyxl') as writer:
+                poses.to_excel(writer, sheet_name='All_Results', index=False)
+                summary.to_excel(writer, sheet_name='Summary', index=False)
+                if poses['site'].nunique() > 1:
+                    self.site_summary(filters.get('receptor')).to_excel(writer, sheet_name='Sites', index=False)
+
+            self.logger.info(f"Results exported to Excel: {excel_file} ({len(poses)} poses)")
+            return excel_file
+
+        except Exception as e:
+            self.logger.error(f"Error exporting results to Excel: {str(e)}")
+            return None
+
+
+class StreamingResultWriter:
+    """Tulis hasil docking ke results store segera setelah tiap ligan selesai
+
+    Hasil di-buffer maksimal commit_every ligan atau commit_seconds detik, lalu
+    di-commit dalam satu transaksi (synchronous=FULL, satu fsync per batch).
+    before_commit dipanggil sebelum tiap commit (misal flush pose store), sehingga hasil
+    yang sudah tercatat di store selalu punya pose di disk.
+    """
+
+    def __init__(self, results_store, receptor, commit_every=50, commit_seconds=30, before_commit=None):
+        self.results_store = results_store
+        self.receptor = receptor
+        self.commit_every = commit_every
+        self.commit_seconds = commit_seconds
+        self.before_commit = before_commit
+        self.n_written = 0
+        self._buffer = {}
+        self._last_commit = time.monotonic()
+        self._conn = results_store.connect()
+        self._conn.execute("PRAGMA synchronous=FULL")
+
+    def append(self, ligand_name, result):
+        """Tambahkan satu hasil; return True jika batch baru saja di-commit"""
+        self._buffer[(ligand_name, result.get('site', 'default'))] = result
+        if (len(self._buffer) >= self.commit_every
+                or time.monotonic() - self._last_commit >= self.commit_seconds):
+            self.commit()
+            return True
+        return False
+
+    def commit(self):
+        """Commit buffer secara atomik"""
+        if self._buffer:
+            if self.before_commit is not None:
+                self.before_commit()
+            items = [(ligand_name, result) for (ligand_name, _), result in self._buffer.items()]
+            self.results_store.write_results(self._conn, items, self.receptor)
+            self.n_written += len(self._buffer)
+            self._buffer = {}
+        self._last_commit = time.monotonic()
+
+    def close(self):
+        """Commit sisa buffer dan tutup koneksi"""
+        try:
+            self.commit()
+        finally:
+            self._conn.close()
@@ -0,0 +1,147 @@
+import io
+import os
+import gzip
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from rdkit import Chem
+from rdkit.Chem import AllChem
+from scripts.pdbqt_reader import read_docked_poses, pose_to_pdb_string
+from scripts.pose_clustering import heavy_atom_mask
+
+
+def load_template(template_file):
+    """Molekul sumber dari ligand prep (SDF dengan bond order dan muatan), tanpa hidrogen"""
+    if not template_file or not os.path.exists(template_file):
+        return None
+    mol = next(iter(Chem.SDMolSupplier(template_file, removeHs=False)), None)
+    return Chem.RemoveHs(mol) if mol is not None else None
+
+
+def restore_pose_mol(poses, index, template=None):
+    """Bangun mol RDKit untuk satu pose docking
+
+    Dengan template, bond order dan muatan formal diambil dari molekul sumber lalu
+    hidrogen ditambahkan kembali dengan koordinat. Tanpa template (atau jika pemetaan
+    gagal) hanya konektivitas dari jarak atom PDB yang tersedia: semua ikatan tunggal dan
+    hidrogen non-polar tidak ada (PDBQT), sehingga bond order tidak bisa dipercaya.
+    Return (mol, restored).
+    """
+    mask = heavy_atom_mask(poses)
+    heavy = dict(poses)
+    heavy['coords'] = poses['coords'][:, mask]
+    heavy['atom_types'] = [t for t, keep in zip(poses['atom_types'], mask) if keep]
+    heavy['atom_index'] = poses['atom_index'][mask]
+    pose_mol = Chem.MolFromPDBBlock(pose_to_pdb_string(heavy, index), removeHs=False, sanitize=False)
+
+    if template is not None and pose_mol is not None:
+        try:
+            mol = AllChem.AssignBondOrdersFromTemplate(template, pose_mol)
+            # Atom dari PDB ditandai tanpa H implisit; hitung ulang agar AddHs bekerja
+            for atom in mol.GetAtoms():
+                atom.SetNoImplicit(False)
+            Chem.SanitizeMol(mol)
+            return Chem.AddHs(mol, addCoords=True), True
+        except Exception:
+            pass
+
+    # Tanpa hidrogen non-polar, perkiraan bond order dari geometri (rdDetermineBonds) juga salah
+    mol = Chem.MolFromPDBBlock(pose_to_pdb_string(poses, index), removeHs=False)
+    return mol, False
+
+
+def export_ligand_poses(ligand_name, output_file, template_file, pose_rows):
+    """Record SDF untuk pose satu ligan (dijalankan di worker process)
+
+    pose_rows: list dict per pose (pose, affinity, receptor, site, ...) dari results store.
+    Return (jumlah pose ditulis, jumlah dengan bond order dari template, teks SDF).
+    """
+    template = load_template(template_file)
+    poses = read_docked_poses(output_file)
+
+    buffer = io.StringIO()
+    writer = Chem.SDWriter(buffer)
+    n_written = 0
+    n_restored = 0
+    for row in pose_rows:
+        index = int(row['pose']) - 1
+        if index >= len(poses['coords']):
+            continue
+        mol, restored = restore_pose_mol(poses, index, template)
+        if mol is None:
+            continue
+        mol.SetProp('_Name', ligand_name)
+        for key, value in row.items():
+            if value is not None and not (isinstance(value, float) and np.isnan(value)):
+                mol.SetProp(key, f"{value:.3f}" if isinstance(value, float) else str(value))
+        # Record tanpa template hanya punya ikatan tunggal
+        mol.SetProp('bond_orders', 'template' if restored else 'unreliable')
+        writer.write(mol)
+        n_written += 1
+        n_restored += int(restored)
+    writer.flush()
+    return n_written, n_restored, buffer.getvalue()
+
+
+class PoseSDFExporter:
+    """Export pose docking dari results store ke satu file SDF.gz secara paralel
+
+    Tiap worker membaca pose satu ligan dan memetakannya ke molekul sumber dari
+    ligand prep; record ditulis ke file gzip segera setelah tiap ligan selesai.
+    """
+
+    def __init__(self, ligand_dir, logger, max_workers=None):
+        self.ligand_dir = ligand_dir
+        self.logger = logger
+        self.max_workers = max_workers or os.cpu_count()
+
+    def template_file(self, ligand_name):
+        """Path SDF sumber untuk satu ligan"""
+        return os.path.join(self.ligand_dir, f"{ligand_name}.sdf")
+
+    def export(self, results_store, output_file, receptor=None, best_pose_only=False, **filters):
+        """Export semua pose hasil query results store ke output_file (.sdf.gz)"""
+        try:
+            rows = results_store.query(receptor=receptor, best_pose_only=best_pose_only, **filters)
+            columns = ['pose', 'affinity', 'receptor', 'site', 'rmsd_lb', 'rmsd_ub', 'cluster_size']
+            groups = rows.groupby(['ligand', 'site', 'output_file'], sort=False)
+
+            n_written = 0
+            n_restored = 0
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor, \
+                    gzip.open(output_file, 'wt') as f:
+                jobs = iter(groups)
+                pending = {}
+                while True:
+                    # Batasi job in-flight agar memori tidak tumbuh dengan ukuran library
+                    for (ligand_name, site, pose_file), group in jobs:
+                        future = executor.submit(export_ligand_poses, ligand_name, pose_file,
+                                                 self.template_file(ligand_name),
+                                                 group[columns].to_dict('records'))
+                        pending[future] = ligand_name
+                        if len(pending) >= 2 * self.max_workers:
+                            break
+                    if not pending:
+                        break
+
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        ligand_name = pending.pop(future)
+                        try:
+                            written, restored, sdf_text = future.result()
+                        except Exception as e:
+                            self.logger.warning(f"Could not export poses for {ligand_name}: {str(e)}")
+                            continue
+                        f.write(sdf_text)
+                        n_written += written
+                        n_restored += restored
+
+            self.logger.info(f"Exported {n_written} poses to {output_file} "
+                             f"({n_restored} with bond orders from the source molecule)")
+            if n_written > n_restored:
+                self.logger.warning(f"{n_written - n_restored} poses have no source molecule and are written "
+                                    f"with single bonds only (bond_orders=unreliable)")
+            return output_file
+
+        except Exception as e:
+            self.logger.error(f"Error exporting poses to SDF: {str(e)}")
+            return None
@@ -0,0 +1,168 @@
+import os
+import time
+import queue
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Penanda akhir stream di antrian ligan siap docking
+_DONE = object()
+
+
+class CpuBudget:
+    """Jumlah core bersama antara preparasi ligan dan docking
+
+    Job mengambil sejumlah slot selama berjalan. Permintaan prioritas (docking) didahulukan,
+    tetapi docking hanya boleh memakai total - reserved slot: reserved slot selalu tersisa
+    untuk preparasi sehingga preparasi tidak kelaparan di belakang docking. Di luar reserved,
+    preparasi hanya mengisi core yang menganggur saat tidak ada docking yang menunggu.
+    """
+
+    def __init__(self, total=None, reserved=1):
+        self.total = total or os.cpu_count()
+        self.reserved = min(reserved, self.total)
+        self.priority_limit = max(1, self.total - self.reserved)
+        self.available = self.total
+        self.priority_in_use = 0
+        self.priority_waiting = 0
+        self._condition = threading.Condition()
+
+    def prep_in_use(self):
+        """Slot yang sedang dipakai permintaan biasa (preparasi)"""
+        return self.total - self.available - self.priority_in_use
+
+    def acquire(self, n=1, priority=False):
+        with self._condition:
+            if priority:
+                n = max(1, min(n, self.priority_limit))
+                self.priority_waiting += 1
+                try:
+                    self._condition.wait_for(lambda: self.available >= n
+                                             and self.priority_in_use + n <= self.priority_limit)
+                finally:
+                    self.priority_waiting -= 1
+                self.priority_in_use += n
+            else:
+                n = max(1, min(n, self.total))
+                # Reserved slot selalu boleh dipakai preparasi; sisanya hanya jika docking tidak menunggu
+                self._condition.wait_for(lambda: self.available >= n and (
+                    not self.priority_waiting or self.prep_in_use() + n <= self.reserved))
+            self.available -= n
+        return n
+
+    def release(self, n, priority=False):
+        with self._condition:
+            self.available += n
+            if priority:
+                self.priority_in_use -= n
+            self._condition.notify_all()
+
+    @contextmanager
+    def slots(self, n=1, priority=False):
+        n = self.acquire(n, priority)
+        try:
+            yield
+        finally:
+            self.release(n, priority)
+
+
+class StreamingScreen:
+    """Preparasi ligan dan docking yang tumpang tindih (producer-consumer)
+
+    Worker preparasi mengisi antrian terbatas dengan ligan yang siap; docking mengambil
+    dari antrian begitu ligan tersedia. Antrian penuh menahan preparasi (backpressure) dan
+    keduanya berbagi CpuBudget, sehingga wall time mendekati max(prep, dock), bukan jumlahnya.
+    """
+
+    def __init__(self, ligand_prep, docker, logger, cpu_budget=None, prep_workers=2, queue_size=32):
+        self.ligand_prep = ligand_prep
+        self.docker = docker
+        self.logger = logger
+        self.cpu_budget = cpu_budget or CpuBudget()
+        self.prep_workers = prep_workers
+        self.queue_size = queue_size
+        self.prepared = {}
+        self.stats = {}
+
+    def prepare_one(self, name, smiles):
+        with self.cpu_budget.slots(1):
+            return self.ligand_prep.prepare_ligand(name, smiles)
+
+    def produce(self, ligand_dict, ready, stop):
+        """Thread producer: preparasi paralel, ligan siap dimasukkan ke antrian ready"""
+        start_time = time.monotonic()
+        try:
+            with ThreadPoolExecutor(max_workers=self.prep_workers) as executor:
+                items = iter(ligand_dict.items())
+                pending = {}
+                while not stop.is_set():
+                    for name, smiles in items:
+                        pending[executor.submit(self.prepare_one, name, smiles)] = name
+                        if len(pending) >= 2 * self.prep_workers:
+                            break
+                    if not pending:
+                        break
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name = pending.pop(future)
+                        pdbqt_file = future.result()
+                        if not pdbqt_file:
+                            continue
+                        self.prepared[name] = pdbqt_file
+                        # Blok jika docking tertinggal (antrian penuh)
+                        while not stop.is_set():
+                            try:
+                                ready.put((name, pdbqt_file), timeout=1)
+                                break
+                            except queue.Full:
+                                continue
+        except Exception as e:
+            self.logger.error(f"Error in streaming ligand preparation: {str(e)}")
+        finally:
+            if self.ligand_prep.fingerprint_index is not None:
+                self.ligand_prep.fingerprint_index.flush()
+            self.stats['prep_seconds'] = round(time.monotonic() - start_time, 2)
+            ready.put(_DONE)
+
+    def consume(self, ready):
+        """Iterable (nama, file PDBQT) dari antrian sampai producer selesai"""
+        while True:
+            item = ready.get()
+            if item is _DONE:
+                return
+            yield item
+
+    def run(self, protein_file, ligand_dict, docking_config, budget_config=None, summary_limit=None, sites=None,
+            max_workers=1, seeds=None, seed_site=None, receptor=None):
+        """Preparasi + docking {nama: SMILES} secara streaming
+
+        Return hasil docking seperti run_docking_batch; ligan yang berhasil dipreparasi ada di
+        self.prepared dan waktu tiap tahap di self.stats.
+        """
+        self.prepared = {}
+        self.stats = {}
+        ready = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        self.logger.info(f"Streaming {len(ligand_dict)} ligands: {self.prep_workers} prep workers, "
+                         f"{max_workers} docking workers, {self.cpu_budget.total} CPUs, queue {self.queue_size}")
+        start_time = time.monotonic()
+        producer = threading.Thread(target=self.produce, args=(ligand_dict, ready, stop), daemon=True)
+        producer.start()
+        try:
+            results = self.docker.run_docking_stream(protein_file, self.consume(ready), docking_config, budget_config,
+                                                     summary_limit, sites, max_workers, seeds, seed_site, receptor,
+                                                     self.cpu_budget)
+        finally:
+            # Docking gagal di tengah jalan: hentikan producer dan kosongkan antrian
+            stop.set()
+            while producer.is_alive():
+                try:
+                    ready.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            producer.join()
+
+        self.stats['wall_seconds'] = round(time.monotonic() - start_time, 2)
+        self.logger.info(f"Streaming completed: {len(self.prepared)} ligands prepared in "
+                         f"{self.stats['prep_seconds']:.1f} s, total wall time {self.stats['wall_seconds']:.1f} s")
+        return results
@@ -0,0 +1,129 @@
+import numpy as np
+from rdkit import Chem
+from rdkit.Chem import AllChem, rdFMCS
+
+
+def extract_reference_ligand(pdb_file, resname, smiles=None):
+    """Ambil ligan ko-kristal (instance pertama resname) dari file PDB sebagai mol RDKit 3D
+
+    Bond order di-assign dari smiles jika diberikan; return (mol, bond_orders_assigned).
+    """
+    with open(pdb_file, 'r') as f:
+        lines = [line for line in f if line.startswith('HETATM') and line[17:20].strip() == resname]
+    if not lines:
+        raise ValueError(f"No {resname} ligand found in {pdb_file}")
+
+    # Instance pertama saja (chain + nomor residu)
+    residue = lines[0][21:27]
+    block = ''.join(line for line in lines if line[21:27] == residue) + 'END\n'
+    mol = Chem.MolFromPDBBlock(block, removeHs=True)
+    if mol is None:
+        raise ValueError(f"Could not parse {resname} from {pdb_file}")
+
+    if smiles:
+        try:
+            return AllChem.AssignBondOrdersFromTemplate(Chem.MolFromSmiles(smiles), mol), True
+        except Exception:
+            pass
+    return mol, False
+
+
+def seeded_config(seed, docking_config):
+    """Docking config untuk pencarian tereduksi di sekitar seed (box kecil, exhaustiveness rendah)"""
+    config = dict(docking_config)
+    for axis, value in zip(('center_x', 'center_y', 'center_z'), seed['center']):
+        config[axis] = value
+    for axis in ('size_x', 'size_y', 'size_z'):
+        config[axis] = round(min(seed['edge'], docking_config[axis]), 3)
+    config['exhaustiveness'] = min(seed['exhaustiveness'], docking_config['exhaustiveness'])
+    return config
+
+
+class TemplateSeeder:
+    """Seed konformasi ligan dari ligan ko-kristal lewat maximum common substructure
+
+    Atom core (MCS) ditempatkan di koordinat kristal, sisa molekul di-embed dan
+    direlaksasi (MMFF) dengan core tetap. Mode docking dipilih dari ukuran core:
+    'local' (minimisasi lokal saja) atau 'reduced' (box kecil dan exhaustiveness rendah).
+    """
+
+    def __init__(self, reference_mol, ligand_preparator, logger, config, bond_orders=True):
+        self.reference = reference_mol
+        self.ligand_preparator = ligand_preparator
+        self.logger = logger
+        self.config = config
+        self.bond_compare = rdFMCS.BondCompare.CompareOrder if bond_orders else rdFMCS.BondCompare.CompareAny
+
+    def seed_conformer(self, smiles):
+        """Embed molekul dengan core di koordinat referensi; return (mol, jumlah atom core) atau (None, 0)"""
+        mol = Chem.AddHs(Chem.MolFromSmiles(smiles))
+        mcs = rdFMCS.FindMCS([self.reference, Chem.RemoveHs(mol)], bondCompare=self.bond_compare,
+                             ringMatchesRingOnly=True, completeRingsOnly=True,
+                             timeout=self.config['mcs_timeout'])
+        if mcs.numAtoms < self.config['min_core_atoms']:
+            return None, mcs.numAtoms
+
+        core = Chem.MolFromSmarts(mcs.smartsString)
+        reference_match = self.reference.GetSubstructMatch(core)
+        ligand_match = mol.GetSubstructMatch(core)
+        if not reference_match or not ligand_match:
+            return None, 0
+
+        conformer = self.reference.GetConformer()
+        coord_map = {l: conformer.GetAtomPosition(r) for r, l in zip(reference_match, ligand_match)}
+        if AllChem.EmbedMolecule(mol, coordMap=coord_map, randomSeed=42, useRandomCoords=True) < 0:
+            return None, 0
+
+        # Embed hanya menjaga jarak internal core; luruskan ke posisi kristal lalu relaksasi sisanya
+        atom_map = list(zip(ligand_match, reference_match))
+        AllChem.AlignMol(mol, self.reference, atomMap=atom_map)
+        properties = AllChem.MMFFGetMoleculeProperties(mol)
+        if properties is not None:
+            force_field = AllChem.MMFFGetMoleculeForceField(mol, properties)
+            for index in ligand_match:
+                force_field.AddFixedPoint(index)
+            force_field.Minimize(maxIts=500)
+        return mol, len(ligand_match)
+
+    def seed_ligand(self, name, smiles):
+        """Buat seed PDBQT untuk satu ligan; return dict info seed atau None jika core terlalu kecil"""
+        try:
+            mol, core_atoms = self.seed_conformer(smiles)
+            if mol is None:
+                self.logger.info(f"No template seed for {name} (core of {core_atoms} atoms)")
+                return None
+
+            core_fraction = core_atoms / mol.GetNumHeavyAtoms()
+            seed_file = self.ligand_preparator.mol_to_pdbqt(mol, f"{name}_seed", gen3d=False)
+            if not seed_file:
+                return None
+
+            heavy = np.array([atom.GetAtomicNum() > 1 for atom in mol.GetAtoms()])
+            coords = mol.GetConformer().GetPositions()[heavy]
+            edge = (coords.max(axis=0) - coords.min(axis=0)).max() + 2 * self.config['box_padding']
+            mode = 'local' if core_fraction >= self.config['local_only_fraction'] else 'reduced'
+            self.logger.info(f"Template seed for {name}: {core_atoms} core atoms "
+                             f"({core_fraction:.0%} of ligand), {mode} search")
+            return {
+                'seed_file': seed_file,
+                'core_atoms': core_atoms,
+                'core_fraction': core_fraction,
+                'mode': mode,
+                'center': coords.mean(axis=0).round(3).tolist(),
+                'edge': float(edge),
+                'exhaustiveness': self.config['reduced_exhaustiveness']
+            }
+
+        except Exception as e:
+            self.logger.error(f"Error seeding {name} from template: {str(e)}")
+            return None
+
+    def seed_ligands(self, ligand_dict):
+        """Seed semua ligan {nama: smiles}; return {nama: info seed} untuk ligan dengan core cukup besar"""
+        seeds = {}
+        for name, smiles in ligand_dict.items():
+            seed = self.seed_ligand(name, smiles)
+            if seed:
+                seeds[name] = seed
+        self.logger.info(f"Template seeds prepared for {len(seeds)} of {len(ligand_dict)} ligands")
+        return seeds
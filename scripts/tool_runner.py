@@ -0,0 +1,144 @@
+import os
+import signal
+import asyncio
+import threading
+import subprocess
+
+# Batas proses bersamaan per tool (nama executable); tool lain memakai default_limit
+DEFAULT_TOOL_LIMITS = {
+    'vina': os.cpu_count(),
+    'obabel': 2 * os.cpu_count(),
+    'prepare_receptor4.py': 2
+}
+
+
+class ToolRunner:
+    """Runner asyncio untuk tool eksternal (vina, obabel, prepare_receptor4.py)
+
+    Semua proses dijalankan dan ditunggu di satu event loop pada thread latar, sehingga
+    banyak panggilan bisa tumpang tindih tanpa satu thread per proses:
+      - argv langsung tanpa shell, tiap proses di process group sendiri
+      - semaphore per tool membatasi proses bersamaan
+      - stderr dibaca per baris saat proses berjalan (log debug) sambil dikumpulkan
+      - timeout atau cancel: SIGTERM ke process group, SIGKILL setelah kill_grace detik
+    Pemanggil sinkron memakai run() (return subprocess.CompletedProcess, timeout melempar
+    subprocess.TimeoutExpired seperti subprocess.run); submit() mengembalikan Future agar
+    beberapa panggilan bisa berjalan bersamaan; coroutine run_async() untuk kode async.
+    """
+
+    def __init__(self, logger=None, limits=None, default_limit=None, kill_grace=5.0):
+        self.logger = logger
+        self.limits = dict(DEFAULT_TOOL_LIMITS, **(limits or {}))
+        self.default_limit = default_limit or os.cpu_count()
+        self.kill_grace = kill_grace
+        self.pid = os.getpid()
+        self._semaphores = {}
+        self._processes = set()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='tool-runner', daemon=True)
+        self._thread.start()
+
+    def semaphore(self, tool):
+        # Hanya dipanggil dari dalam event loop
+        if tool not in self._semaphores:
+            self._semaphores[tool] = asyncio.Semaphore(self.limits.get(tool, self.default_limit))
+        return self._semaphores[tool]
+
+    async def kill(self, process):
+        """Hentikan seluruh process group: SIGTERM, lalu SIGKILL jika masih hidup"""
+        for sig, grace in ((signal.SIGTERM, self.kill_grace), (signal.SIGKILL, None)):
+            try:
+                os.killpg(process.pid, sig)
+            except ProcessLookupError:
+                break
+            try:
+                await asyncio.wait_for(process.wait(), grace)
+                break
+            except asyncio.TimeoutError:
+                continue
+
+    async def read_stderr(self, stream, tool, lines):
+        async for line in stream:
+            line = line.decode(errors='replace')
+            lines.append(line)
+            if self.logger is not None:
+                self.logger.debug(f"[{tool}] {line.rstrip()}")
+
+    async def run_async(self, argv, timeout=None, tool=None, cwd=None):
+        """Jalankan argv dan tunggu selesai; return subprocess.CompletedProcess (teks)
+
+        Timeout dihitung sejak proses mulai (bukan sejak antri di semaphore).
+        """
+        argv = [str(arg) for arg in argv]
+        tool = tool or os.path.basename(argv[0])
+        async with self.semaphore(tool):
+            process = await asyncio.create_subprocess_exec(
+                *argv, cwd=cwd, stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE, start_new_session=True)
+            self._processes.add(process)
+            stderr_lines = []
+            stdout_task = asyncio.ensure_future(process.stdout.read())
+            stderr_task = asyncio.ensure_future(self.read_stderr(process.stderr, tool, stderr_lines))
+            try:
+                await asyncio.wait_for(asyncio.gather(stdout_task, stderr_task, process.wait()), timeout)
+            except asyncio.TimeoutError:
+                await self.kill(process)
+                stdout_task.cancel()
+                stderr_task.cancel()
+                raise subprocess.TimeoutExpired(argv, timeout, stderr=''.join(stderr_lines))
+            except asyncio.CancelledError:
+                await self.kill(process)
+                raise
+            finally:
+                self._processes.discard(process)
+            return subprocess.CompletedProcess(argv, process.returncode, stdout_task.result().decode(errors='replace'),
+                                               ''.join(stderr_lines))
+
+    def submit(self, argv, timeout=None, tool=None, cwd=None):
+        """Jadwalkan argv di event loop; return concurrent.futures.Future (cancel() menghentikan proses)"""
+        return asyncio.run_coroutine_threadsafe(self.run_async(argv, timeout, tool, cwd), self._loop)
+
+    def run(self, argv, timeout=None, tool=None, cwd=None):
+        """Versi sinkron run_async untuk kode berbasis thread"""
+        future = self.submit(argv, timeout, tool, cwd)
+        try:
+            return future.result()
+        except BaseException:
+            # Misal KeyboardInterrupt di thread pemanggil: jangan tinggalkan proses yatim
+            future.cancel()
+            raise
+
+    def cancel_all(self):
+        """Hentikan semua proses yang sedang berjalan"""
+        async def kill_all():
+            await asyncio.gather(*(self.kill(process) for process in list(self._processes)))
+        asyncio.run_coroutine_threadsafe(kill_all(), self._loop).result()
+
+    def close(self):
+        self.cancel_all()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+_RUNNER = None
+_RUNNER_LOCK = threading.Lock()
+
+
+def configure_runner(logger=None, limits=None, default_limit=None, kill_grace=5.0):
+    """Ganti runner bersama proses ini (misal dengan batas per tool dari TOOL_RUNNER_CONFIG)"""
+    global _RUNNER
+    with _RUNNER_LOCK:
+        _RUNNER = ToolRunner(logger, limits, default_limit, kill_grace)
+    return _RUNNER
+
+
+def get_runner():
+    """Runner bersama proses ini; dibuat ulang setelah fork (thread event loop tidak ikut ter-fork)"""
+    global _RUNNER
+    with _RUNNER_LOCK:
+        if _RUNNER is None or _RUNNER.pid != os.getpid():
+            previous = _RUNNER
+            _RUNNER = ToolRunner(previous.logger if previous else None, previous.limits if previous else None,
+                                 previous.default_limit if previous else None,
+                                 previous.kill_grace if previous else 5.0)
+        return _RUNNER
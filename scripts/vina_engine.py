@@ -0,0 +1,105 @@
+import threading
+from scripts.pdbqt_reader import read_docked_poses, pose_to_pdbqt
+
+try:
+    from vina import Vina
+except ImportError:
+    Vina = None
+
+BOX_KEYS = ('center_x', 'center_y', 'center_z', 'size_x', 'size_y', 'size_z')
+
+
+def box_key(docking_config):
+    """Kunci cache untuk satu box docking"""
+    return tuple(float(docking_config[key]) for key in BOX_KEYS)
+
+
+class VinaEngine:
+    """Docking in-process lewat Vina Python API
+
+    Receptor di-load sekali dan grid map dihitung sekali per (receptor, box,
+    scoring function, seed), lalu dipakai ulang untuk semua ligan di box tersebut.
+    Seed hanya bisa diatur saat Vina dibuat, sehingga seed berbeda memakai instance sendiri.
+    """
+
+    def __init__(self, logger, sf_name='vina', cpu=0, verbosity=0, max_instances=8, ad4_maps=None):
+        if Vina is None:
+            raise ImportError("Vina Python bindings are not installed (pip install vina)")
+        self.logger = logger
+        self.sf_name = sf_name
+        self.cpu = cpu
+        self.verbosity = verbosity
+        self.max_instances = max_instances
+        self.ad4_maps = ad4_maps
+        self._instances = {}
+        self._locks = {}
+        self._cache_lock = threading.Lock()
+
+    @staticmethod
+    def available():
+        """True jika Vina Python bindings terinstall"""
+        return Vina is not None
+
+    def get_vina(self, protein_file, docking_config, sf_name=None):
+        """Ambil instance Vina dengan receptor dan map untuk box ini (dibuat sekali)"""
+        sf_name = sf_name or self.sf_name
+        key = (protein_file, box_key(docking_config), sf_name, docking_config.get('seed', 0))
+        with self._cache_lock:
+            if key not in self._instances:
+                # Box per ligan membuat banyak map; buang instance paling lama
+                while len(self._instances) >= self.max_instances:
+                    oldest = next(iter(self._instances))
+                    del self._instances[oldest]
+                    del self._locks[oldest]
+                self.logger.info(f"Computing {sf_name} maps for {protein_file} at box {key[1]}")
+                v = Vina(sf_name=sf_name, cpu=self.cpu, seed=docking_config.get('seed', 0),
+                         verbosity=self.verbosity)
+                if sf_name == 'ad4':
+                    # Map AD4 tidak bisa dihitung Vina, harus dari autogrid4 (prefix file .map)
+                    if not self.ad4_maps:
+                        raise ValueError("ad4 scoring requires precomputed autogrid4 maps (ad4_maps)")
+                    v.load_maps(self.ad4_maps)
+                else:
+                    v.set_receptor(rigid_pdbqt_filename=protein_file)
+                    v.compute_vina_maps(
+                        center=[docking_config['center_x'], docking_config['center_y'], docking_config['center_z']],
+                        box_size=[docking_config['size_x'], docking_config['size_y'], docking_config['size_z']]
+                    )
+                self._instances[key] = v
+                self._locks[key] = threading.Lock()
+            return self._instances[key], self._locks[key]
+
+    def dock(self, protein_file, ligand_file, output_file, docking_config):
+        """Docking satu ligan dan tulis pose ke output_file"""
+        v, lock = self.get_vina(protein_file, docking_config)
+        # Satu instance Vina tidak thread-safe; paralelisme ada di dalam dock (cpu)
+        with lock:
+            v.set_ligand_from_file(ligand_file)
+            v.dock(exhaustiveness=docking_config['exhaustiveness'], n_poses=docking_config['num_modes'])
+            v.write_poses(output_file, n_poses=docking_config['num_modes'], overwrite=True)
+        return output_file
+
+    def optimize(self, protein_file, ligand_file, output_file, docking_config):
+        """Minimisasi lokal satu pose tanpa global search, return energi total (kcal/mol)"""
+        v, lock = self.get_vina(protein_file, docking_config)
+        with lock:
+            v.set_ligand_from_file(ligand_file)
+            energies = v.optimize()
+            v.write_pose(output_file, overwrite=True)
+        return float(energies[0])
+
+    def score_file(self, protein_file, pose_file, docking_config, sf_name=None, minimize=False):
+        """Skor semua pose di pose_file dengan satu scoring function (tanpa docking ulang)
+
+        minimize=True menjalankan minimisasi lokal dulu dengan fungsi skor tersebut.
+        Return list energi total (kcal/mol) per pose.
+        """
+        v, lock = self.get_vina(protein_file, docking_config, sf_name)
+        poses = read_docked_poses(pose_file)
+        scores = []
+        with lock:
+            for index in range(len(poses['coords'])):
+                v.set_ligand_from_string(pose_to_pdbqt(poses, index))
+                energies = v.optimize() if minimize else v.score()
+                scores.append(float(energies[0]))
+        return scores
@@ -0,0 +1,387 @@
+import os
+import hashlib
+import tempfile
+import numpy as np
+from scripts.pdbqt_reader import read_docked_poses, ad_type_to_element, pose_to_pdbqt, parse_vina_affinity
+from scripts.tool_runner import get_runner
+
+# Bobot term empiris AutoDock Vina (Trott & Olson 2010)
+VINA_WEIGHTS = {
+    'gauss1': -0.0356,
+    'gauss2': -0.00516,
+    'repulsion': 0.840,
+    'hydrophobic': -0.0351,
+    'hbond': -0.587,
+    'rot': 0.0585
+}
+VINA_CUTOFF = 8.0
+
+# Tipe atom X-Score yang dipakai Vina
+XS_TYPES = ['C_H', 'C_P', 'N_P', 'N_D', 'N_A', 'N_DA', 'O_P', 'O_D', 'O_A', 'O_DA',
+            'S_P', 'P_P', 'F_H', 'Cl_H', 'Br_H', 'I_H', 'Met_D']
+XS_RADII = {'C': 1.9, 'N': 1.8, 'O': 1.7, 'S': 2.0, 'P': 2.1, 'F': 1.5,
+            'Cl': 1.8, 'Br': 2.0, 'I': 2.2, 'Met': 1.2}
+XS_HYDROPHOBIC = {'C_H', 'F_H', 'Cl_H', 'Br_H', 'I_H'}
+XS_DONOR = {'N_D', 'N_DA', 'O_D', 'O_DA', 'Met_D'}
+XS_ACCEPTOR = {'N_A', 'N_DA', 'O_A', 'O_DA'}
+
+COVALENT_RADII = {'H': 0.37, 'C': 0.77, 'N': 0.75, 'O': 0.73, 'S': 1.02, 'P': 1.06,
+                  'F': 0.71, 'Cl': 0.99, 'Br': 1.14, 'I': 1.33}
+METALS = {'Mg', 'Mn', 'Zn', 'Ca', 'Fe', 'Na', 'K', 'Cu', 'Co', 'Ni'}
+AD_METAL_TYPES = {'MG': 'Mg', 'MN': 'Mn', 'ZN': 'Zn', 'CA': 'Ca', 'FE': 'Fe', 'Mg': 'Mg', 'Mn': 'Mn',
+                  'Zn': 'Zn', 'Ca': 'Ca', 'Fe': 'Fe'}
+
+
+def read_pdbqt_atoms(pdbqt_file):
+    """Baca koordinat dan tipe AutoDock semua atom dari file PDBQT (receptor)"""
+    coords = []
+    atom_types = []
+    residues = []
+    with open(pdbqt_file, 'r') as f:
+        for line in f:
+            if line.startswith(('ATOM', 'HETATM')):
+                coords.append((float(line[30:38]), float(line[38:46]), float(line[46:54])))
+                atom_types.append(line[77:79].strip())
+                residues.append((line[17:20].strip(), line[21:22].strip(), line[22:26].strip(), line[12:16].strip()))
+    return np.array(coords, dtype=np.float32), atom_types, residues
+
+
+def atom_elements(atom_types):
+    """Elemen per atom dari tipe AutoDock (logam dinormalisasi)"""
+    return [AD_METAL_TYPES.get(t, ad_type_to_element(t)) for t in atom_types]
+
+
+def bonded_pairs(coords, elements, chunk_size=1024):
+    """Pasangan atom terikat kovalen berdasarkan jarak (< 1.1 x jumlah jari-jari kovalen)"""
+    radii = np.array([COVALENT_RADII.get(e, 1.2) for e in elements], dtype=np.float32)
+    pairs = []
+    for start in range(0, len(coords), chunk_size):
+        block = coords[start:start + chunk_size]
+        distance = np.linalg.norm(block[:, None] - coords[None], axis=-1)
+        limit = 1.1 * (radii[start:start + chunk_size, None] + radii[None])
+        i, j = np.nonzero((distance < limit) & (distance > 0.1))
+        i = i + start
+        keep = i < j
+        pairs.append(np.stack([i[keep], j[keep]], axis=1))
+    return np.concatenate(pairs) if pairs else np.empty((0, 2), dtype=np.int64)
+
+
+def assign_xs_types(atom_types, coords):
+    """Tipe X-Score per atom (None untuk hidrogen), mengikuti aturan Vina"""
+    elements = atom_elements(atom_types)
+    n_atoms = len(elements)
+    bonded_hetero = np.zeros(n_atoms, dtype=bool)
+    bonded_h = np.zeros(n_atoms, dtype=bool)
+    for i, j in bonded_pairs(coords, elements):
+        for a, b in ((i, j), (j, i)):
+            if elements[b] == 'H':
+                bonded_h[a] = True
+            elif elements[b] != 'C':
+                bonded_hetero[a] = True
+
+    xs = []
+    for i, (atom_type, element) in enumerate(zip(atom_types, elements)):
+        if element == 'H':
+            xs.append(None)
+        elif element == 'C':
+            xs.append('C_P' if bonded_hetero[i] else 'C_H')
+        elif element == 'N':
+            acceptor = atom_type in ('NA', 'NS')
+            donor = bool(bonded_h[i])
+            xs.append('N_DA' if donor and acceptor else 'N_D' if donor else 'N_A' if acceptor else 'N_P')
+        elif element == 'O':
+            xs.append('O_DA' if bonded_h[i] else 'O_A')
+        elif element == 'S':
+            xs.append('S_P')
+        elif element == 'P':
+            xs.append('P_P')
+        elif element in ('F', 'Cl', 'Br', 'I'):
+            xs.append(f'{element}_H')
+        elif element in METALS:
+            xs.append('Met_D')
+        else:
+            xs.append(None)
+    return xs
+
+
+def xs_radius(xs_type):
+    """Jari-jari vdW X-Score"""
+    return XS_RADII[xs_type.split('_')[0]]
+
+
+def vina_pair_energy(distance, xs_ligand, xs_receptor):
+    """Energi interaksi Vina (belum dinormalisasi torsi) untuk array jarak dan satu pasangan tipe"""
+    surface = distance - xs_radius(xs_ligand) - xs_radius(xs_receptor)
+    energy = VINA_WEIGHTS['gauss1'] * np.exp(-(surface / 0.5) ** 2)
+    energy += VINA_WEIGHTS['gauss2'] * np.exp(-((surface - 3.0) / 2.0) ** 2)
+    energy += VINA_WEIGHTS['repulsion'] * np.where(surface < 0, surface ** 2, 0.0)
+    if xs_ligand in XS_HYDROPHOBIC and xs_receptor in XS_HYDROPHOBIC:
+        energy += VINA_WEIGHTS['hydrophobic'] * np.clip((1.5 - surface) / 1.0, 0.0, 1.0)
+    if ((xs_ligand in XS_DONOR and xs_receptor in XS_ACCEPTOR)
+            or (xs_ligand in XS_ACCEPTOR and xs_receptor in XS_DONOR)):
+        energy += VINA_WEIGHTS['hbond'] * np.clip(-surface / 0.7, 0.0, 1.0)
+    return np.where(distance < VINA_CUTOFF, energy, 0.0)
+
+
+def trilinear(grid, origin, spacing, points, outside_penalty=1.0, layer=None):
+    """Interpolasi trilinear grid map untuk array titik (..., 3)
+
+    Titik di luar box di-clamp ke tepi dan diberi penalti linear per Angstrom. Dengan
+    layer (indeks map per titik), grid adalah tumpukan map (n_map, nx, ny, nz) sehingga
+    atom dengan tipe berbeda diinterpolasi dalam satu operasi.
+    """
+    shape = np.array(grid.shape[-3:])
+    fractional = (points - origin) / spacing
+    clamped = np.clip(fractional, 0, shape - 1.000001)
+    outside = np.linalg.norm((fractional - clamped) * spacing, axis=-1)
+
+    base = np.floor(clamped).astype(np.int64)
+    t = clamped - base
+    x0, y0, z0 = base[..., 0], base[..., 1], base[..., 2]
+    tx, ty, tz = t[..., 0], t[..., 1], t[..., 2]
+    if layer is not None:
+        # Indeks datar ke tumpukan map: satu gather per sudut sel
+        flat = grid.reshape(-1)
+        strides = np.array([shape[0] * shape[1] * shape[2], shape[1] * shape[2], shape[2], 1])
+        index = layer * strides[0] + x0 * strides[1] + y0 * strides[2] + z0
+
+    value = 0.0
+    for dx in (0, 1):
+        wx = tx if dx else 1 - tx
+        for dy in (0, 1):
+            wy = ty if dy else 1 - ty
+            for dz in (0, 1):
+                wz = tz if dz else 1 - tz
+                if layer is None:
+                    corner = grid[x0 + dx, y0 + dy, z0 + dz]
+                else:
+                    corner = flat[index + dx * strides[1] + dy * strides[2] + dz]
+                value = value + wx * wy * wz * corner
+    return value + outside_penalty * outside
+
+
+class ReceptorGrids:
+    """Grid map energi Vina per tipe atom ligan untuk satu receptor dan box
+
+    Map dihitung blok per blok (hanya atom receptor dalam jarak cutoff dari blok)
+    dan di-cache ke disk sebagai .npz sehingga bisa dipakai ulang antar proses.
+    """
+
+    def __init__(self, protein_file, docking_config, logger, spacing=0.375, cache_dir=None):
+        self.protein_file = protein_file
+        self.logger = logger
+        self.spacing = spacing
+        self.cache_dir = cache_dir
+        center = np.array([docking_config['center_x'], docking_config['center_y'], docking_config['center_z']])
+        size = np.array([docking_config['size_x'], docking_config['size_y'], docking_config['size_z']])
+        self.shape = np.ceil(size / spacing).astype(int) + 1
+        self.origin = (center - (self.shape - 1) * spacing / 2.0).astype(np.float32)
+        self.maps = {}
+
+        coords, atom_types, _ = read_pdbqt_atoms(protein_file)
+        # Hanya atom dalam box + cutoff (+ margin untuk deteksi ikatan) yang relevan
+        upper = self.origin + (self.shape - 1) * spacing
+        margin = VINA_CUTOFF + 2.0
+        near = np.all((coords >= self.origin - margin) & (coords <= upper + margin), axis=1)
+        coords = coords[near]
+        atom_types = [t for t, keep in zip(atom_types, near) if keep]
+        xs = assign_xs_types(atom_types, coords)
+        heavy = np.array([t is not None for t in xs], dtype=bool)
+        self.receptor_coords = coords[heavy]
+        self.receptor_xs = np.array([t for t in xs if t is not None])
+
+        # Receptor dan box tetap selama objek hidup: hash cukup dihitung sekali
+        self.cache_key = None
+        if cache_dir:
+            with open(protein_file, 'rb') as f:
+                digest = hashlib.sha1(f.read())
+            digest.update(self.origin.tobytes() + self.shape.tobytes() + str(spacing).encode())
+            self.cache_key = digest.hexdigest()[:16]
+
+    def cache_file(self, xs_type):
+        """Path cache untuk satu map"""
+        if not self.cache_dir:
+            return None
+        return os.path.join(self.cache_dir, f"vina_{xs_type}_{self.cache_key}.npz")
+
+    def get_map(self, xs_type):
+        """Map energi untuk satu tipe atom ligan (dihitung sekali)"""
+        return self.get_maps([xs_type])[xs_type]
+
+    def get_maps(self, xs_types):
+        """Map energi untuk beberapa tipe atom ligan; map yang belum ada dihitung sekaligus"""
+        missing = []
+        for xs_type in xs_types:
+            if xs_type in self.maps:
+                continue
+            cache_file = self.cache_file(xs_type)
+            if cache_file and os.path.exists(cache_file):
+                with np.load(cache_file) as data:
+                    self.maps[xs_type] = data['grid']
+            else:
+                missing.append(xs_type)
+
+        if missing:
+            self.logger.info(f"Computing Vina grid maps for {', '.join(missing)} "
+                             f"({'x'.join(map(str, self.shape))} points)")
+            for xs_type, grid in zip(missing, self.compute_maps(missing)):
+                cache_file = self.cache_file(xs_type)
+                if cache_file:
+                    os.makedirs(self.cache_dir, exist_ok=True)
+                    np.savez_compressed(cache_file, grid=grid)
+                self.maps[xs_type] = grid
+        return {xs_type: self.maps[xs_type] for xs_type in xs_types}
+
+    def compute_maps(self, xs_types, block=8):
+        """Hitung map per blok grid; matriks jarak tiap blok dipakai untuk semua tipe ligan"""
+        grids = [np.zeros(tuple(self.shape), dtype=np.float32) for _ in xs_types]
+        receptor_types = np.unique(self.receptor_xs)
+        axes = [self.origin[d] + np.arange(self.shape[d], dtype=np.float32) * self.spacing for d in range(3)]
+
+        for ix in range(0, self.shape[0], block):
+            for iy in range(0, self.shape[1], block):
+                for iz in range(0, self.shape[2], block):
+                    xs_, ys_, zs_ = axes[0][ix:ix + block], axes[1][iy:iy + block], axes[2][iz:iz + block]
+                    low = np.array([xs_[0], ys_[0], zs_[0]]) - VINA_CUTOFF
+                    high = np.array([xs_[-1], ys_[-1], zs_[-1]]) + VINA_CUTOFF
+                    near = np.all((self.receptor_coords >= low) & (self.receptor_coords <= high), axis=1)
+                    if not near.any():
+                        continue
+                    points = np.stack(np.meshgrid(xs_, ys_, zs_, indexing='ij'), axis=-1).reshape(-1, 3)
+                    near_types = self.receptor_xs[near]
+                    distance = np.linalg.norm(points[:, None] - self.receptor_coords[near][None], axis=-1)
+                    energies = [np.zeros(len(points), dtype=np.float32) for _ in xs_types]
+                    for receptor_type in receptor_types:
+                        columns = near_types == receptor_type
+                        if not columns.any():
+                            continue
+                        typed_distance = distance[:, columns]
+                        for energy, xs_type in zip(energies, xs_types):
+                            energy += vina_pair_energy(typed_distance, xs_type, receptor_type).sum(axis=1)
+                    shape = (len(xs_), len(ys_), len(zs_))
+                    for grid, energy in zip(grids, energies):
+                        grid[ix:ix + block, iy:iy + block, iz:iz + block] = energy.reshape(shape)
+        return grids
+
+    def interpolate(self, xs_type, points, outside_penalty=1.0):
+        """Interpolasi trilinear energi untuk array titik (..., 3) sekaligus"""
+        return trilinear(self.get_map(xs_type), self.origin, self.spacing, points, outside_penalty)
+
+
+class VinaScorer:
+    """Rescoring pose dengan fungsi skor Vina (inter-molekul) di NumPy
+
+    Semua pose satu ligan dinilai dalam satu operasi array per tipe atom.
+    """
+
+    def __init__(self, protein_file, docking_config, logger, spacing=0.375, cache_dir=None):
+        self.logger = logger
+        self.grids = ReceptorGrids(protein_file, docking_config, logger, spacing, cache_dir)
+
+    def ligand_typing(self, poses):
+        """Tipe XS dan jumlah torsi ligan (dari template PDBQT)"""
+        xs = assign_xs_types(poses['atom_types'], poses['coords'][0])
+        torsions = 0
+        for line in poses['template']:
+            if line.startswith('TORSDOF'):
+                torsions = int(line.split()[1])
+        return xs, torsions
+
+    def score_poses(self, poses):
+        """Skor Vina (kcal/mol) untuk semua pose, shape (n_poses,)"""
+        xs, torsions = self.ligand_typing(poses)
+        xs = np.array([t if t is not None else '' for t in xs])
+        present = [xs_type for xs_type in np.unique(xs) if xs_type]
+        self.grids.get_maps(present)
+        inter = np.zeros(len(poses['coords']), dtype=np.float64)
+        for xs_type in present:
+            atoms = poses['coords'][:, xs == xs_type]  # (n_poses, n_type, 3)
+            inter += self.grids.interpolate(xs_type, atoms).sum(axis=1)
+        return inter / (1.0 + VINA_WEIGHTS['rot'] * torsions)
+
+    def score_file(self, pdbqt_file):
+        """Skor semua pose di satu file PDBQT hasil docking"""
+        return self.score_poses(read_docked_poses(pdbqt_file))
+
+
+def score_only_command(protein_file, pose_pdbqt, docking_config):
+    """argv `vina --score_only` untuk satu pose"""
+    cmd = ['vina', '--score_only', '--receptor', protein_file, '--ligand', pose_pdbqt]
+    for key in ('center_x', 'center_y', 'center_z', 'size_x', 'size_y', 'size_z'):
+        cmd += [f'--{key}', str(docking_config[key])]
+    return cmd
+
+
+def parse_score_only(result, pose_pdbqt):
+    """Affinity dari output `vina --score_only` (CompletedProcess)"""
+    energy = parse_vina_affinity(result.stdout)
+    if result.returncode != 0 or energy is None:
+        raise RuntimeError(f"vina --score_only failed for {pose_pdbqt}: {result.stderr.strip()}")
+    return energy
+
+
+def vina_score_only(protein_file, pose_pdbqt, docking_config, timeout=120):
+    """Skor satu pose dengan `vina --score_only` (referensi untuk validasi)"""
+    result = get_runner().run(score_only_command(protein_file, pose_pdbqt, docking_config), timeout)
+    return parse_score_only(result, pose_pdbqt)
+
+
+def validate_against_vina(scorers, protein_file, docked_files, site_configs, logger, output_csv=None):
+    """Bandingkan skor NumPy dengan `vina --score_only` untuk semua pose di docked_files
+
+    docked_files: {(ligan, site): file pose}; scorers dan site_configs: {site: VinaScorer / docking config}
+    sehingga tiap pose dinilai di box site tempat ia di-docking (di box lain grid ter-clamp).
+    Return dict statistik (n, pearson_r, mae, rmse, max_abs_error) dan opsional tulis CSV per pose.
+    """
+    rows = []
+    for (ligand_name, site), docked_file in docked_files.items():
+        try:
+            poses = read_docked_poses(docked_file)
+            numpy_scores = scorers[site].score_poses(poses)
+        except Exception as e:
+            logger.error(f"Could not score {docked_file}: {str(e)}")
+            continue
+
+        # Semua pose satu ligan di-skor vina bersamaan lewat runner (tanpa thread per proses)
+        pose_files = []
+        for index in range(len(numpy_scores)):
+            with tempfile.NamedTemporaryFile('w', suffix='.pdbqt', delete=False) as f:
+                f.write(pose_to_pdbqt(poses, index))
+                pose_files.append(f.name)
+        futures = [get_runner().submit(score_only_command(protein_file, pose_file, site_configs[site]), 120)
+                   for pose_file in pose_files]
+        for index, (numpy_score, pose_file, future) in enumerate(zip(numpy_scores, pose_files, futures)):
+            try:
+                vina_score = parse_score_only(future.result(), pose_file)
+            except Exception as e:
+                logger.warning(str(e))
+                continue
+            finally:
+                os.unlink(pose_file)
+            rows.append((ligand_name, site, index + 1, float(numpy_score), vina_score))
+
+    if not rows:
+        logger.error("No poses could be validated")
+        return None
+
+    numpy_scores = np.array([row[3] for row in rows])
+    vina_scores = np.array([row[4] for row in rows])
+    errors = numpy_scores - vina_scores
+    stats = {
+        'n': len(rows),
+        'pearson_r': float(np.corrcoef(numpy_scores, vina_scores)[0, 1])
+        if len(rows) > 1 and numpy_scores.std() > 0 and vina_scores.std() > 0 else float('nan'),
+        'mae': float(np.abs(errors).mean()),
+        'rmse': float(np.sqrt((errors ** 2).mean())),
+        'max_abs_error': float(np.abs(errors).max())
+    }
+
+    if output_csv:
+        with open(output_csv, 'w') as f:
+            f.write("ligand,site,pose,numpy_score,vina_score_only\n")
+            for ligand_name, site, pose, numpy_score, vina_score in rows:
+                f.write(f"{ligand_name},{site},{pose},{numpy_score:.3f},{vina_score:.3f}\n")
+
+    logger.info(f"Scoring validation on {stats['n']} poses: r = {stats['pearson_r']:.3f}, "
+                f"MAE = {stats['mae']:.3f}, RMSE = {stats['rmse']:.3f} kcal/mol")
+    return stats
@@ -6,11 +6,15 @@ import plotly.graph_objects as go
 import plotly.express as px
 from plotly.subplots import make_subplots
 import py3Dmol
+from rdkit import Chem
+from scripts.pdbqt_reader import read_docked_poses, pose_to_pdb_string
+from scripts.sdf_export import load_template, restore_pose_mol
 
 class ResultVisualizer:
-    def __init__(self, results_dir, logger):
+    def __init__(self, results_dir, logger, ligand_dir=None):
         self.results_dir = results_dir
         self.logger = logger
+        self.ligand_dir = ligand_dir
         plt.style.use('seaborn-v0_8')
     
     def create_binding_affinity_chart(self, docking_results):
@@ -127,12 +131,18 @@ class ResultVisualizer:
                 protein_pdb = f.read()
             
             # Read best ligand pose
+            ligand_format = "pdb"
             if os.path.exists(ligand_result['output_file']):
-                with open(ligand_result['output_file'], 'r') as f:
-                    ligand_pdbqt = f.read()
+                poses = read_docked_poses(ligand_result['output_file'])
                 
-                # Convert PDBQT to PDB format for visualization
-                ligand_pdb = self.pdbqt_to_pdb_string(ligand_pdbqt)
+                # Bond order dari molekul sumber ligand prep jika ada, selain itu PDB dari pose
+                template = load_template(os.path.join(self.ligand_dir, f"{ligand_name}.sdf")) if self.ligand_dir else None
+                mol, restored = restore_pose_mol(poses, 0, template)
+                if restored:
+                    ligand_pdb = Chem.MolToMolBlock(mol)
+                    ligand_format = "sdf"
+                else:
+                    ligand_pdb = pose_to_pdb_string(poses, 0)
             else:
                 ligand_pdb = ""
             
@@ -201,7 +211,7 @@ class ResultVisualizer:
             
             // Add ligand if available
             if (`{ligand_pdb}`.length > 0) {{
-                viewer.addModel(`{ligand_pdb}`, "pdb");
+                viewer.addModel(`{ligand_pdb}`, "{ligand_format}");
                 viewer.setStyle({{model: 1}}, {{stick: {{colorscheme: 'greenCarbon', radius: 0.2}}}});
             }}
             
@@ -257,22 +267,6 @@ class ResultVisualizer:
         except Exception as e:
             self.logger.error(f"Error creating 3D visualization: {str(e)}")
     
-    def pdbqt_to_pdb_string(self, pdbqt_content):
-        """Convert PDBQT content to PDB format for visualization"""
-        try:
-            pdb_lines = []
-            for line in pdbqt_content.split('\n'):
-                if line.startswith(('ATOM', 'HETATM')):
-                    # Convert PDBQT line to PDB format (remove extra columns)
-                    pdb_line = line[:66] + '  1.00  0.00' + line[66:78] if len(line) > 78 else line[:66] + '  1.00  0.00'
-                    pdb_lines.append(pdb_line)
-                elif line.startswith(('MODEL', 'ENDMDL', 'END')):
-                    pdb_lines.append(line)
-            
-            return '\n'.join(pdb_lines[:100])  # Limit lines for web display
-        except:
-            return ""
-    
     def generate_analysis_report(self, docking_results):
         """Generate comprehensive analysis report"""
         try:
@@ -0,0 +1,91 @@
+import os
+import threading
+import numpy as np
+from scripts.pdbqt_reader import read_docked_poses, write_docked_poses, subset_poses
+from scripts.pose_clustering import heavy_atom_mask
+from scripts.pose_store import pose_key
+
+
+class WarmStartPlanner:
+    """Titik awal re-docking dari pose teratas run sebelumnya (results store / pose store)
+
+    Dipakai saat box site sedikit digeser atau receptor diganti struktur yang mirip:
+    pose lama diminimisasi ulang lalu pencarian global dibatasi di sekitarnya, dan
+    docking penuh hanya dijalankan jika skor bergeser melebihi drift_threshold.
+    """
+
+    def __init__(self, results_store, work_dir, logger, config, receptor, pose_store=None):
+        self.results_store = results_store
+        self.work_dir = work_dir
+        self.pose_store = pose_store
+        self.logger = logger
+        self.config = config
+        self._lock = threading.Lock()
+        self._counts = {'warm': 0, 'escalated': 0}
+
+        # Dibaca sekali di awal: hasil run baru untuk receptor yang sama akan menimpa baris lama
+        previous_receptor = config.get('previous_receptor') or receptor
+        best = results_store.query(receptor=previous_receptor, best_pose_only=True)
+        self.previous = {(row.ligand, row.site): (float(row.affinity), row.output_file)
+                         for row in best.itertuples(index=False)}
+        self.logger.info(f"Warm start: {len(self.previous)} previous (ligand, site) results "
+                         f"from receptor {previous_receptor}")
+
+    def previous_poses(self, ligand_name, site):
+        """Pose run sebelumnya (pose store dulu, lalu file output), None jika tidak ada"""
+        if (ligand_name, site) not in self.previous:
+            return None
+        if self.pose_store is not None:
+            poses = self.pose_store.get(pose_key(ligand_name, site))
+            if poses is not None:
+                return poses
+        output_file = self.previous[(ligand_name, site)][1]
+        if output_file and os.path.exists(output_file):
+            return read_docked_poses(output_file)
+        return None
+
+    def seed(self, ligand_name, site, docking_config):
+        """Info warm start untuk satu job, atau None jika tidak ada hasil sebelumnya
+
+        Return dict seperti seed TemplateSeeder (seed_file, center, edge, exhaustiveness)
+        ditambah previous_affinity; seed_file berisi top_k pose lama.
+        """
+        try:
+            poses = self.previous_poses(ligand_name, site)
+        except Exception as e:
+            self.logger.warning(f"Could not read previous poses for {ligand_name}: {str(e)}")
+            return None
+        if poses is None:
+            return None
+
+        top = np.argsort(poses['energies'], kind='stable')[:self.config['top_k']]
+        poses = subset_poses(poses, top)
+        seed_file = os.path.join(self.work_dir, f"{pose_key(ligand_name, site)}_warm.pdbqt")
+        write_docked_poses(seed_file, poses)
+
+        # Box tereduksi di sekitar pose terbaik lama, center tetap di dalam box site baru
+        coords = poses['coords'][0][heavy_atom_mask(poses)]
+        center = np.array([docking_config['center_x'], docking_config['center_y'], docking_config['center_z']])
+        half = np.array([docking_config['size_x'], docking_config['size_y'], docking_config['size_z']]) / 2
+        seed_center = np.clip(coords.mean(axis=0), center - half, center + half)
+        edge = (coords.max(axis=0) - coords.min(axis=0)).max() + 2 * self.config['box_padding']
+        return {
+            'seed_file': seed_file,
+            'center': seed_center.round(3).tolist(),
+            'edge': float(edge),
+            'exhaustiveness': self.config['exhaustiveness'],
+            'previous_affinity': self.previous[(ligand_name, site)][0]
+        }
+
+    def escalate(self, previous_affinity, affinity):
+        """True jika skor warm start bergeser melebihi threshold dari skor lama"""
+        drift = abs(affinity - previous_affinity)
+        escalated = drift > self.config['drift_threshold']
+        with self._lock:
+            self._counts['escalated' if escalated else 'warm'] += 1
+        return escalated
+
+    def summary(self):
+        """Jumlah job selesai dengan warm start vs dieskalasi ke docking penuh"""
+        with self._lock:
+            return dict(self._counts)
@@ -0,0 +1,213 @@
+import os
+import json
+import time
+import socket
+import sqlite3
+import threading
+
+class WorkQueue:
+    """Antrian kerja berbasis SQLite di shared filesystem dengan lease dan heartbeat"""
+
+    def __init__(self, db_file, logger, lease_seconds=900, max_attempts=3, journal_mode='WAL'):
+        self.db_file = db_file
+        self.logger = logger
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.journal_mode = journal_mode
+
+    def connect(self):
+        """Buka koneksi baru (satu koneksi per proses/thread)"""
+        conn = sqlite3.connect(self.db_file, timeout=60, isolation_level=None)
+        conn.execute(f"PRAGMA journal_mode={self.journal_mode}")
+        conn.execute("PRAGMA busy_timeout=60000")
+        return conn
+
+    def initialize(self, protein_file, docking_config, budget_config=None, sites=None, seeds=None, seed_site=None):
+        """Buat tabel antrian dan simpan setting docking bersama untuk semua worker"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_file)), exist_ok=True)
+        conn = self.connect()
+        try:
+            conn.execute("""CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ligands TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                worker TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                result TEXT,
+                updated REAL
+            )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status, lease_expires)")
+            conn.execute("CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT)")
+            settings = {
+                'protein_file': protein_file,
+                'docking_config': docking_config,
+                'budget_config': budget_config,
+                'sites': sites,
+                'seeds': seeds,
+                'seed_site': seed_site
+            }
+            conn.executemany("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+                             [(key, json.dumps(value)) for key, value in settings.items()])
+        finally:
+            conn.close()
+
+    def get_settings(self):
+        """Baca setting docking yang disimpan saat enqueue"""
+        conn = self.connect()
+        try:
+            rows = conn.execute("SELECT key, value FROM settings").fetchall()
+            return {key: json.loads(value) for key, value in rows}
+        finally:
+            conn.close()
+
+    def enqueue(self, ligand_files, chunk_size=1):
+        """Masukkan ligan ke antrian dalam chunk berisi chunk_size ligan"""
+        items = list(ligand_files.items())
+        chunks = [dict(items[i:i + chunk_size]) for i in range(0, len(items), chunk_size)]
+        now = time.time()
+
+        conn = self.connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany("INSERT INTO tasks (ligands, updated) VALUES (?, ?)",
+                             [(json.dumps(chunk), now) for chunk in chunks])
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+        self.logger.info(f"Enqueued {len(items)} ligands in {len(chunks)} tasks")
+        return len(chunks)
+
+    def requeue_expired(self, conn):
+        """Kembalikan task dengan lease kadaluarsa ke antrian (atau tandai gagal)"""
+        now = time.time()
+        conn.execute("""UPDATE tasks SET status = 'failed', error = 'lease expired too many times', updated = ?
+                        WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?""",
+                     (now, now, self.max_attempts))
+        expired = conn.execute("""UPDATE tasks SET status = 'pending', worker = NULL, lease_expires = NULL, updated = ?
+                                  WHERE status = 'leased' AND lease_expires < ?""", (now, now)).rowcount
+        if expired:
+            self.logger.warning(f"Requeued {expired} tasks with expired leases")
+
+    def claim(self, worker_id):
+        """Ambil satu task pending secara atomik, return (task_id, ligands) atau None"""
+        conn = self.connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            self.requeue_expired(conn)
+            row = conn.execute("SELECT id, ligands FROM tasks WHERE status = 'pending' ORDER BY id LIMIT 1").fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+
+            now = time.time()
+            conn.execute("""UPDATE tasks SET status = 'leased', worker = ?, lease_expires = ?,
+                            attempts = attempts + 1, updated = ? WHERE id = ?""",
+                         (worker_id, now + self.lease_seconds, now, row[0]))
+            conn.execute("COMMIT")
+            return row[0], json.loads(row[1])
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def heartbeat(self, task_id, worker_id, conn=None):
+        """Perpanjang lease; return False jika lease sudah diambil worker lain"""
+        own_conn = conn is None
+        conn = conn or self.connect()
+        try:
+            now = time.time()
+            updated = conn.execute("""UPDATE tasks SET lease_expires = ?, updated = ?
+                                      WHERE id = ? AND worker = ? AND status = 'leased'""",
+                                   (now + self.lease_seconds, now, task_id, worker_id)).rowcount
+            return updated == 1
+        finally:
+            if own_conn:
+                conn.close()
+
+    def complete(self, task_id, worker_id, results):
+        """Tandai task selesai dan simpan hasilnya"""
+        conn = self.connect()
+        try:
+            updated = conn.execute("""UPDATE tasks SET status = 'done', result = ?, lease_expires = NULL, updated = ?
+                                      WHERE id = ? AND worker = ? AND status = 'leased'""",
+                                   (json.dumps(results), time.time(), task_id, worker_id)).rowcount
+            if updated != 1:
+                self.logger.warning(f"Task {task_id} was no longer leased by {worker_id}, result discarded")
+            return updated == 1
+        finally:
+            conn.close()
+
+    def fail(self, task_id, worker_id, error):
+        """Kembalikan task ke antrian setelah error (gagal permanen setelah max_attempts)"""
+        conn = self.connect()
+        try:
+            conn.execute("""UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                            worker = NULL, lease_expires = NULL, error = ?, updated = ?
+                            WHERE id = ? AND worker = ?""",
+                         (self.max_attempts, str(error), time.time(), task_id, worker_id))
+        finally:
+            conn.close()
+
+    def status(self):
+        """Hitung jumlah task per status"""
+        conn = self.connect()
+        try:
+            rows = conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall()
+            return dict(rows)
+        finally:
+            conn.close()
+
+    def collect_results(self):
+        """Gabungkan hasil semua task yang selesai menjadi satu dict per ligan"""
+        conn = self.connect()
+        try:
+            results = {}
+            for (result,) in conn.execute("SELECT result FROM tasks WHERE status = 'done' ORDER BY id"):
+                results.update(json.loads(result))
+            return results
+        finally:
+            conn.close()
+
+
+class LeaseHeartbeat:
+    """Thread yang memperpanjang lease task secara periodik selama docking berjalan"""
+
+    def __init__(self, queue, task_id, worker_id, interval):
+        self.queue = queue
+        self.task_id = task_id
+        self.worker_id = worker_id
+        self.interval = interval
+        self.lease_lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        conn = self.queue.connect()
+        try:
+            while not self._stop.wait(self.interval):
+                try:
+                    if not self.queue.heartbeat(self.task_id, self.worker_id, conn):
+                        self.lease_lost = True
+                        self.queue.logger.warning(f"Lease lost for task {self.task_id}")
+                        return
+                except sqlite3.Error as e:
+                    self.queue.logger.warning(f"Heartbeat failed for task {self.task_id}: {str(e)}")
+        finally:
+            conn.close()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+
+
+def default_worker_id():
+    """ID worker unik per node dan proses"""
+    return f"{socket.gethostname()}:{os.getpid()}"
@@ -0,0 +1,43 @@
+import os
+import sys
+import logging
+import pytest
+
+# Modul scripts.* diimpor relatif terhadap root repo
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Ligan kecil (fenol) dalam format PDBQT output ligand prep
+LIGAND_PDBQT = """REMARK  Name = phenol
+ROOT
+ATOM      1  C   UNL     1       1.394   0.000   0.000  1.00  0.00     0.000 A 
+ATOM      2  C   UNL     1       0.697   1.207   0.000  1.00  0.00     0.000 A 
+ATOM      3  C   UNL     1      -0.697   1.207   0.000  1.00  0.00     0.000 A 
+ATOM      4  C   UNL     1      -1.394   0.000   0.000  1.00  0.00     0.000 A 
+ATOM      5  C   UNL     1      -0.697  -1.207   0.000  1.00  0.00     0.000 A 
+ATOM      6  C   UNL     1       0.697  -1.207   0.000  1.00  0.00     0.000 A 
+ENDROOT
+BRANCH   1   7
+ATOM      7  O   UNL     1       2.754   0.000   0.000  1.00  0.00    -0.358 OA
+ATOM      8  H   UNL     1       3.104   0.900   0.000  1.00  0.00     0.217 HD
+ENDBRANCH   1   7
+TORSDOF 1
+"""
+
+BOX = {'center_x': 10.0, 'center_y': -5.0, 'center_z': 2.5, 'size_x': 20.0, 'size_y': 20.0, 'size_z': 20.0}
+
+
+@pytest.fixture
+def logger():
+    return logging.getLogger('tests')
+
+
+@pytest.fixture
+def ligand_file(tmp_path):
+    path = tmp_path / 'phenol.pdbqt'
+    path.write_text(LIGAND_PDBQT)
+    return str(path)
+
+
+@pytest.fixture
+def docking_config():
+    return dict(BOX, exhaustiveness=8, num_modes=5, seed=42, cpu=1)
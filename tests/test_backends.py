@@ -0,0 +1,134 @@
+import sys
+import pytest
+from scripts.backends import (BackendProbe, FakeDockingBackend, DockingBackend, NumpyBackend, ReceptorPrepBackend,
+                              docking_calibration, rank_backends, select_backend)
+from scripts.tool_runner import ToolRunner
+
+
+class StubBackend(DockingBackend):
+    """Backend dengan ketersediaan dan fingerprint tetap; hitung berapa kali kalibrasi dijalankan"""
+
+    def __init__(self, logger, available=True, fingerprint='stub:1'):
+        super().__init__(logger)
+        self._available = available
+        self._fingerprint = fingerprint
+        self.calls = 0
+
+    def available(self):
+        return self._available
+
+    def fingerprint(self):
+        return self._fingerprint
+
+    def dock(self, protein_file, ligand_file, output_file, log_file, docking_config, timeout):
+        self.calls += 1
+        return None
+
+
+def test_rank_backends_fastest_first():
+    results = {
+        'vina-cli': {'available': True, 'seconds': 4.0},
+        'vina-python': {'available': True, 'seconds': 1.5},
+        'numpy': {'available': True, 'seconds': None},
+        'fake': {'available': False, 'seconds': None}
+    }
+    assert rank_backends(results, ['numpy', 'vina-cli', 'vina-python', 'fake']) == ['vina-python', 'vina-cli',
+                                                                                   'numpy']
+
+
+def test_rank_backends_without_timing_keeps_order():
+    results = {'b': {'available': True, 'seconds': None}, 'a': {'available': True, 'seconds': None}}
+    assert rank_backends(results, ['b', 'a']) == ['b', 'a']
+    assert rank_backends(results, ['missing']) == []
+
+
+def test_rank_backends_fallback_last():
+    results = {
+        'vina-cli': {'available': True, 'seconds': 9.0},
+        'numpy': {'available': True, 'seconds': 0.5}
+    }
+    assert rank_backends(results, ['numpy', 'vina-cli'], fallback=['numpy']) == ['vina-cli', 'numpy']
+    results['vina-cli']['available'] = False
+    assert rank_backends(results, ['numpy', 'vina-cli'], fallback=['numpy']) == ['numpy']
+
+
+def test_select_backend_prefers_vina_over_numpy(tmp_path, logger):
+    class FastNumpy(NumpyBackend):
+        def available(self):
+            return True
+
+    registry = {'vina-cli': StubBackend, 'numpy': FastNumpy}
+    probe = BackendProbe(None, logger)
+    assert isinstance(select_backend('docking', registry, 'auto', logger, probe), StubBackend)
+    registry['vina-cli'] = lambda logger: StubBackend(logger, available=False)
+    assert isinstance(select_backend('docking', registry, 'auto', logger, probe), FastNumpy)
+
+
+def test_numpy_backend_close_shuts_down_pool(logger):
+    backend = NumpyBackend(logger, max_workers=1)
+    backend.close()
+    executor = backend.engine.executor()
+    assert executor.submit(sum, [1, 2]).result() == 3
+    backend.close()
+    assert backend.engine._executor is None
+    with pytest.raises(RuntimeError):
+        executor.submit(sum, [1, 2])
+
+
+def test_probe_cache_reused(tmp_path, ligand_file, docking_config, logger):
+    probe = BackendProbe(str(tmp_path / 'probe.json'), logger)
+    backend = StubBackend(logger)
+    calibrate = docking_calibration(ligand_file, ligand_file, docking_config)
+    assert probe.probe('docking', {'stub': backend}, calibrate)['stub']['seconds'] is not None
+    probe.probe('docking', {'stub': backend}, calibrate)
+    assert backend.calls == 1
+
+    probe.probe('docking', {'stub': StubBackend(logger, fingerprint='stub:2')}, calibrate)
+    assert probe.load()['docking']['stub']['fingerprint'] == 'stub:2'
+
+
+def test_probe_cache_invalidated_by_calibration_input(tmp_path, ligand_file, docking_config, logger):
+    probe = BackendProbe(str(tmp_path / 'probe.json'), logger)
+    backend = StubBackend(logger)
+    probe.probe('docking', {'stub': backend}, docking_calibration(ligand_file, ligand_file, docking_config))
+
+    other_ligand = tmp_path / 'other.pdbqt'
+    other_ligand.write_text(open(ligand_file).read().replace('phenol', 'anisole'))
+    probe.probe('docking', {'stub': backend}, docking_calibration(ligand_file, str(other_ligand), docking_config))
+    assert backend.calls == 2
+    probe.probe('docking', {'stub': backend}, docking_calibration(ligand_file, ligand_file,
+                                                                    dict(docking_config, size_x=30.0)))
+    assert backend.calls == 3
+    # Tanpa kalibrasi (misal worker) timing tercache tetap dipakai
+    assert probe.probe('docking', {'stub': backend})['stub']['seconds'] is not None
+    assert backend.calls == 3
+
+
+def test_select_backend_auto_and_fixed(tmp_path, logger):
+    registry = {'slow': StubBackend, 'missing': lambda logger: StubBackend(logger, available=False),
+                'fake': FakeDockingBackend}
+    assert isinstance(select_backend('docking', registry, 'fake', logger), FakeDockingBackend)
+    with pytest.raises(ValueError, match='Unknown docking backend'):
+        select_backend('docking', registry, 'gnina', logger)
+    assert isinstance(select_backend('docking', registry, 'auto', logger, candidates=['missing', 'slow']),
+                      StubBackend)
+    assert select_backend('docking', registry, 'auto', logger, candidates=['missing']) is None
+
+
+class SleepingPrepBackend(ReceptorPrepBackend):
+    """Backend preparasi receptor yang menggantung (tidak pernah menulis output)"""
+    name = 'sleeping'
+    executable = sys.executable
+
+    def command(self, pdb_file, output_file):
+        return [self.executable, '-c', 'import time; time.sleep(30)']
+
+
+def test_receptor_prep_timeout_returns_error(tmp_path, logger):
+    runner = ToolRunner(logger, kill_grace=0.1)
+    try:
+        backend = SleepingPrepBackend(logger, runner)
+        error = backend.convert(str(tmp_path / 'receptor.pdb'), str(tmp_path / 'receptor.pdbqt'), timeout=0.2)
+    finally:
+        runner.close()
+    assert error is not None and 'timed out' in error
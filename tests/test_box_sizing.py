@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from scripts.box_sizing import RG_BOX_SCALE, box_of, ligand_box, radius_of_gyration
+from scripts.docking import AutoDockVina
+
+BOX_CONFIG = {'enabled': True, 'scale': RG_BOX_SCALE, 'min_size': 10, 'max_size': 25}
+
+
+@pytest.fixture
+def chain_file(tmp_path):
+    """Ligan memanjang: 12 karbon berjarak 1.5 A di sumbu x (+ hidrogen yang diabaikan Rg)"""
+    lines = ['ROOT']
+    for i in range(12):
+        lines.append(f"ATOM  {i + 1:>5}  C   UNL     1    {1.5 * i:8.3f}   0.000   0.000  1.00  0.00     0.000 C ")
+    lines.append(f"ATOM  {13:>5}  H   UNL     1    {30.0:8.3f}   0.000   0.000  1.00  0.00     0.000 HD")
+    lines += ['ENDROOT', 'TORSDOF 0']
+    path = tmp_path / 'chain.pdbqt'
+    path.write_text('\n'.join(lines) + '\n')
+    return str(path)
+
+
+def test_radius_of_gyration_ignores_hydrogens(chain_file):
+    x = 1.5 * np.arange(12)
+    assert radius_of_gyration(chain_file) == pytest.approx(x.std(), abs=1e-3)
+
+
+def test_small_ligand_gets_min_size(ligand_file, docking_config):
+    sized = ligand_box(ligand_file, docking_config, BOX_CONFIG)
+    assert (sized['size_x'], sized['size_y'], sized['size_z']) == (10, 10, 10)
+    # Center tetap di site
+    assert box_of(sized)['center_x'] == docking_config['center_x']
+
+
+def test_box_scales_with_rg_and_is_capped(chain_file, docking_config):
+    edge = round(RG_BOX_SCALE * radius_of_gyration(chain_file), 3)
+    assert ligand_box(chain_file, docking_config, BOX_CONFIG)['size_x'] == edge
+    assert ligand_box(chain_file, docking_config, dict(BOX_CONFIG, max_size=12))['size_y'] == 12
+    # Tidak pernah lebih besar dari box site
+    assert ligand_box(chain_file, dict(docking_config, size_z=11.0), BOX_CONFIG)['size_z'] == 11.0
+
+
+def test_site_config_uses_ligand_box_only_when_enabled(tmp_path, ligand_file, docking_config, logger):
+    box = {'center_x': 1.0, 'size_x': 30.0, 'size_y': 30.0, 'size_z': 30.0}
+    fixed = AutoDockVina(str(tmp_path), logger, box_config=dict(BOX_CONFIG, enabled=False))
+    assert fixed.site_config(ligand_file, docking_config, box)['size_x'] == 30.0
+
+    sized = AutoDockVina(str(tmp_path), logger, box_config=BOX_CONFIG)
+    config = sized.site_config(ligand_file, docking_config, box)
+    assert (config['center_x'], config['size_x']) == (1.0, 10)
+    # Ligan tidak terbaca: box site dipakai apa adanya
+    assert sized.site_config(str(tmp_path / 'missing.pdbqt'), docking_config, box)['size_x'] == 30.0
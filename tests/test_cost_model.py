@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scripts.cost_model import DockingCostModel
+
+
+class TimingSource:
+    """Pengganti results store yang hanya menyediakan load_timings"""
+
+    def __init__(self, timings):
+        self.timings = timings
+
+    def load_timings(self, limit=None):
+        return self.timings
+
+
+def synthetic_timings(n=40, exhaustiveness=(8,), volume=(15625,), seed=0):
+    rng = np.random.default_rng(seed)
+    torsions = rng.integers(0, 12, n)
+    heavy_atoms = rng.integers(10, 40, n)
+    exh = rng.choice(exhaustiveness, n)
+    vol = rng.choice(volume, n)
+    seconds = (10 + 5 * torsions + heavy_atoms) * exh / 8 * vol / 15625
+    return pd.DataFrame({'torsions': torsions, 'heavy_atoms': heavy_atoms, 'exhaustiveness': exh,
+                         'volume': vol, 'elapsed_seconds': seconds})
+
+
+def test_constant_box_uses_proportional_scaling(logger):
+    model = DockingCostModel(logger, min_samples=20)
+    assert model.calibrate(TimingSource(synthetic_timings()))
+    assert model.coefficients[3] == 1.0 and model.coefficients[4] == 1.0
+
+    features = {'torsions': 5, 'heavy_atoms': 25, 'volume': 15625, 'exhaustiveness': 8}
+    base = model.predict(features)
+    assert model.predict(dict(features, exhaustiveness=32)) == pytest.approx(4 * base)
+    assert model.predict(dict(features, volume=2 * 15625)) == pytest.approx(2 * base)
+
+
+def test_varying_exhaustiveness_is_fitted(logger):
+    model = DockingCostModel(logger, min_samples=20, ridge=1e-6)
+    assert model.calibrate(TimingSource(synthetic_timings(exhaustiveness=(8, 16, 32))))
+    assert model.coefficients[3] == 1.0
+    assert model.coefficients[4] == pytest.approx(1.0, abs=0.05)
+
+
+def test_prior_before_enough_samples(logger):
+    model = DockingCostModel(logger, min_samples=100)
+    assert not model.calibrate(TimingSource(synthetic_timings(n=10)))
+    features = {'torsions': 0, 'heavy_atoms': 0, 'volume': 15625, 'exhaustiveness': 8}
+    assert model.predict(features) == pytest.approx(model.prior['base_seconds'])
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+from scripts.fingerprint_index import POPCOUNT, FingerprintIndex, morgan_fingerprints, tanimoto_top_k
+
+LIBRARY = {f"lig{n:02d}_{k}": 'C' * n + substituent
+           for n in range(1, 13) for k, substituent in enumerate(['', 'O', 'N', 'c1ccccc1', 'C(=O)O', 'Cl'])}
+
+
+def brute_force_top_k(queries, fingerprints, k):
+    """Top-k Tanimoto dari bit yang di-unpack; seri diurutkan menurut index baris"""
+    bits = np.unpackbits(fingerprints, axis=1).astype(bool)
+    results = []
+    for query in np.unpackbits(queries, axis=1).astype(bool):
+        common = (bits & query).sum(axis=1)
+        union = (bits | query).sum(axis=1)
+        similarity = np.where(union > 0, common / np.maximum(union, 1), 0.0)
+        top = sorted(range(len(bits)), key=lambda i: (-similarity[i], i))[:k]
+        results.append((top, similarity[top]))
+    return results
+
+
+@pytest.mark.parametrize('density', [0.05, 0.5])
+def test_tanimoto_top_k_matches_brute_force(density):
+    rng = np.random.default_rng(3)
+    # Fingerprint pendek dan jarang -> banyak seri di batas top-k
+    fingerprints = np.packbits(rng.random((300, 64)) < density, axis=1)
+    queries = np.packbits(rng.random((7, 64)) < density, axis=1)
+    indices, similarities = tanimoto_top_k(queries, POPCOUNT[queries].sum(axis=1), fingerprints,
+                                           POPCOUNT[fingerprints].sum(axis=1, dtype=np.uint16), 10)
+    for q, (top, expected) in enumerate(brute_force_top_k(queries, fingerprints, 10)):
+        assert indices[q].tolist() == top
+        np.testing.assert_allclose(similarities[q], expected, rtol=1e-6)
+
+
+def test_tanimoto_top_k_small_block():
+    fingerprints = np.packbits(np.eye(16, dtype=bool)[:3], axis=1)
+    indices, similarities = tanimoto_top_k(fingerprints[:1], POPCOUNT[fingerprints[:1]].sum(axis=1), fingerprints,
+                                           POPCOUNT[fingerprints].sum(axis=1, dtype=np.uint16), 5)
+    assert indices.tolist() == [[0, 1, 2]] and similarities.tolist() == [[1.0, 0.0, 0.0]]
+
+
+def test_add_buffers_and_skips_duplicates(tmp_path, logger):
+    index = FingerprintIndex(str(tmp_path / 'fp'), logger, n_bits=512, buffer_size=3)
+    index.add('a', 'CCO')
+    index.add('b', 'not a smiles')
+    assert len(index) == 0
+    index.add('c', 'c1ccccc1')
+    assert index.names() == ['a', 'c']
+    index.add('a', 'CCCC')
+    index.flush()
+    assert len(index) == 2
+    # Meta tersimpan: dibuka ulang dengan n_bits index, bukan argumen
+    assert FingerprintIndex(str(tmp_path / 'fp'), logger, n_bits=2048).n_bits == 512
+
+
+def test_interrupted_write_is_truncated(tmp_path, logger):
+    index = FingerprintIndex(str(tmp_path / 'fp'), logger, n_bits=512)
+    packed, _ = morgan_fingerprints(['CCO', 'CCN'], n_bits=512)
+    index.add_packed(['a', 'b'], packed)
+    # Tulisan terputus: fingerprint baris ketiga tanpa popcount dan nama
+    with open(index.path('fingerprints.bin'), 'ab') as f:
+        f.write(packed[0].tobytes())
+    assert len(index) == 2
+    index.add_packed(['c'], packed[1:])
+    fingerprints, counts = index.arrays()
+    np.testing.assert_array_equal(fingerprints[2], packed[1])
+    assert index.names() == ['a', 'b', 'c'] and len(counts) == 3
+
+
+def test_search_chunked_matches_single_scan(tmp_path, logger):
+    index = FingerprintIndex(str(tmp_path / 'fp'), logger, n_bits=1024)
+    assert index.build(LIBRARY, max_workers=1, chunk_size=20) == len(LIBRARY)
+    assert index.build(LIBRARY, max_workers=1) == 0
+
+    queries = ['lig06_3', 'CCO']
+    single = index.search(queries, k=5)
+    assert index.search(queries, k=5, max_workers=2, chunk_rows=13) == single
+    assert len(single) == 10
+    # Nama ligan di index tidak menjadi hit-nya sendiri; SMILES identik memberi Tanimoto 1
+    assert all(hit['ligand'] != 'lig06_3' for hit in single if hit['query'] == 'lig06_3')
+    smiles_hits = [hit for hit in single if hit['query'] == 'CCO']
+    assert smiles_hits[0] == {'query': 'CCO', 'rank': 1, 'ligand': 'lig02_1', 'tanimoto': 1.0}
+    assert [hit['tanimoto'] for hit in smiles_hits] == sorted((hit['tanimoto'] for hit in smiles_hits),
+                                                             reverse=True)
@@ -0,0 +1,61 @@
+import os
+import pytest
+from scripts.backends import FakeDockingBackend
+from scripts.docking import AutoDockVina
+from scripts.funnel import ScreeningFunnel, promote
+from scripts.pose_store import PoseStore
+from scripts.results_store import ResultsStore
+
+
+class PreparedLigands:
+    """Ligand prep uji: semua ligan sudah punya PDBQT di ligand_dir"""
+
+    def __init__(self, ligand_dir):
+        self.ligand_dir = ligand_dir
+
+    def prepare_ligands(self, ligand_dict):
+        return {}
+
+
+def test_promote_rules():
+    scores = {'a': -9.0, 'b': -7.5, 'c': -8.0, 'd': -6.0}
+    assert promote(scores, None) == ['a', 'c', 'b', 'd']
+    assert promote(scores, {'max_score': -7.0}) == ['a', 'c', 'b']
+    assert promote(scores, {'top_fraction': 0.5, 'max_score': -8.5}) == ['a']
+    assert promote(scores, {'top_n': 3, 'top_fraction': 0.5}) == ['a', 'c']
+
+
+def test_dock_stages_keep_separate_poses(tmp_path, ligand_file, docking_config, logger):
+    ligand_dir = tmp_path / 'ligands'
+    ligand_dir.mkdir()
+    library = {f"lig{i}": 'c1ccccc1O' for i in range(4)}
+    for name in library:
+        os.link(ligand_file, ligand_dir / f"{name}.pdbqt")
+
+    results_store = ResultsStore(str(tmp_path / 'results.sqlite'), logger)
+    pose_stores = {}
+
+    def docker_factory(results_dir, receptor):
+        pose_stores[receptor] = PoseStore(os.path.join(results_dir, 'pose_store'), logger, writer_id='test')
+        return AutoDockVina(results_dir, logger, pose_stores[receptor], results_store, FakeDockingBackend(logger))
+
+    stages = [
+        {'name': 'fast', 'type': 'dock', 'docking': {'exhaustiveness': 4}, 'promote': {'top_n': 2}},
+        {'name': 'full', 'type': 'dock', 'docking': {'exhaustiveness': 16, 'seed': 7}}
+    ]
+    funnel = ScreeningFunnel(stages, str(tmp_path / 'funnel'), logger, results_store, PreparedLigands(str(ligand_dir)),
+                             docker_factory, str(tmp_path / 'receptor.pdbqt'), docking_config)
+    report, hits = funnel.run(library)
+    assert list(report['n_promoted']) == [2, 2]
+
+    receptors = [funnel.stage_receptor(stage) for stage in stages]
+    assert sorted(pose_stores) == sorted(receptors)
+    for receptor in receptors:
+        best = results_store.best_affinities(receptor, library)
+        store = pose_stores[receptor]
+        assert sorted(store.names()) == sorted(best)
+        for name, affinity in best.items():
+            assert store.get(name)['energies'].min() == pytest.approx(affinity, abs=1e-3)
+    # Seed berbeda di stage kedua: pose tidak boleh tertimpa pose stage pertama
+    fast, full = (pose_stores[receptor].get(hits['ligand'][0])['energies'][0] for receptor in receptors)
+    assert fast != pytest.approx(full, abs=1e-3)
@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+from scripts.interactions import (INTERACTION_CUTOFFS, InteractionFingerprinter, InteractionProfiler, ReceptorIndex,
+                                  get_receptor_index)
+from scripts.pdbqt_reader import read_docked_poses, write_docked_poses
+from scripts.results_store import ResultsStore
+
+# Kantong di sekitar fenol (ring di bidang z=0): PHE bertumpuk paralel di atas ring,
+# ASP akseptor di depan OH, LEU hidrofobik di sisi lain dan ALA jauh di luar
+PHE_RING = [(name, 1.394 * np.cos(angle), 1.394 * np.sin(angle), 3.7)
+            for name, angle in zip(['CG', 'CD1', 'CE1', 'CZ', 'CE2', 'CD2'], np.radians(np.arange(0, 360, 60)))]
+RECEPTOR_ATOMS = ([('PHE', 1, name, 'A', (x, y, z)) for name, x, y, z in PHE_RING] +
+                  [('ASP', 2, 'OD1', 'OA', (5.7, 0.0, 0.0)), ('LEU', 3, 'CD1', 'C', (-5.194, 0.0, 0.0)),
+                   ('ALA', 4, 'CB', 'C', (20.0, 20.0, 20.0))])
+
+
+@pytest.fixture
+def receptor_file(tmp_path):
+    path = tmp_path / 'receptor.pdbqt'
+    lines = [f"ATOM  {i + 1:>5} {name:<4} {resname} A {resnum:>3}    {x:8.3f}{y:8.3f}{z:8.3f}  1.00  0.00     0.000 "
+             f"{ad:<2}" for i, (resname, resnum, name, ad, (x, y, z)) in enumerate(RECEPTOR_ATOMS)]
+    path.write_text('\n'.join(lines) + '\n')
+    return str(path)
+
+
+@pytest.fixture
+def poses(ligand_file):
+    """Pose 1 di dalam kantong, pose 2 digeser jauh (tanpa interaksi)"""
+    poses = read_docked_poses(ligand_file)
+    coords = poses['coords'][0]
+    poses['coords'] = np.array([coords, coords + np.float32(30.0)])
+    poses['energies'] = np.array([-8.0, -5.0])
+    poses['rmsd_lb'] = poses['rmsd_ub'] = np.zeros(2)
+    return poses
+
+
+def active_labels(fingerprinter, fingerprint):
+    return sorted(np.array(fingerprinter.labels)[fingerprint])
+
+
+def test_neighbors_cover_all_atoms_within_cutoff(receptor_file):
+    index = ReceptorIndex.build(receptor_file)
+    points = np.random.default_rng(0).uniform(-8.0, 8.0, size=(500, 3)).astype(np.float32)
+    candidates = index.neighbors(points)
+    # Brute force: semua atom berfitur dalam cutoff harus ada di kandidat
+    distance = np.linalg.norm(points[:, None] - index.coords[None], axis=-1)
+    for point, near in enumerate(distance <= index.cutoff):
+        assert set(np.nonzero(near)[0]) <= set(candidates[point].tolist())
+
+
+def test_fingerprint_pocket(receptor_file, poses):
+    fingerprinter = InteractionFingerprinter(ReceptorIndex.build(receptor_file), batch_points=4)
+    fingerprints = fingerprinter.fingerprint_poses(poses)
+    assert active_labels(fingerprinter, fingerprints[0]) == [
+        'ASP2:hbond', 'LEU3:hydrophobic', 'PHE1:hydrophobic', 'PHE1:pi_stacking']
+    assert not fingerprints[1].any()
+    assert len(fingerprinter.labels) == 4 * len(fingerprinter.index.residues)
+
+
+def test_hbond_cutoff(receptor_file, poses):
+    fingerprinter = InteractionFingerprinter(ReceptorIndex.build(receptor_file))
+    # Geser OH menjauhi ASP sampai tepat di luar cutoff H-bond
+    shift = 5.7 - 2.754 - INTERACTION_CUTOFFS['hbond'] - 0.05
+    poses['coords'] = poses['coords'] + np.array([shift, 0.0, 0.0], dtype=np.float32)
+    assert 'ASP2:hbond' not in active_labels(fingerprinter, fingerprinter.fingerprint_poses(poses)[0])
+
+
+def test_index_cached_and_memory_mapped(tmp_path, receptor_file, poses, logger, monkeypatch):
+    cache_dir = str(tmp_path / 'cache')
+    index_dir = get_receptor_index(receptor_file, cache_dir, logger)
+    loaded = ReceptorIndex.load(index_dir)
+    assert isinstance(loaded.cells, np.memmap)
+    expected = InteractionFingerprinter(ReceptorIndex.build(receptor_file)).fingerprint_poses(poses)
+    np.testing.assert_array_equal(InteractionFingerprinter(loaded).fingerprint_poses(poses), expected)
+
+    def fail(*args, **kwargs):
+        raise AssertionError('index should come from the cache')
+    monkeypatch.setattr(ReceptorIndex, 'build', fail)
+    assert get_receptor_index(receptor_file, cache_dir, logger) == index_dir
+
+
+def test_profiler_stores_and_filters(tmp_path, receptor_file, poses, logger):
+    output_file = str(tmp_path / 'phenol_docked.pdbqt')
+    write_docked_poses(output_file, poses)
+    results_store = ResultsStore(str(tmp_path / 'results.sqlite'), logger)
+    results_store.add_results({'phenol': {'output_file': output_file, 'binding_affinities': [-8.0, -5.0]}},
+                              'receptor')
+
+    profiler = InteractionProfiler(results_store, logger, str(tmp_path / 'cache'), max_workers=1)
+    assert profiler.fingerprint(receptor_file) == 2
+    # Pose yang sudah punya fingerprint dilewati
+    assert profiler.fingerprint(receptor_file) == 0
+
+    matches = results_store.filter_interactions('receptor', require=['ASP2:hbond', 'PHE1'])
+    assert matches['pose'].tolist() == [1]
+    assert 'PHE1:pi_stacking' in matches['interactions'][0]
+    assert results_store.filter_interactions('receptor', exclude=['LEU3'])['pose'].tolist() == [2]
+    with pytest.raises(ValueError, match='Unknown interaction'):
+        results_store.filter_interactions('receptor', require=['MET793'])
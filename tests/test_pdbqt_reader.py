@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from scripts.backends import FakeDockingBackend
+from scripts.pdbqt_reader import read_docked_poses, write_docked_poses, concatenate_poses, subset_poses
+
+
+@pytest.fixture
+def docked_file(tmp_path, ligand_file, docking_config, logger):
+    output_file = tmp_path / 'phenol_docked.pdbqt'
+    backend = FakeDockingBackend(logger)
+    assert backend.dock('receptor.pdbqt', ligand_file, str(output_file), None, docking_config, 60) is None
+    return str(output_file)
+
+
+def test_read_ligand_without_results(ligand_file):
+    poses = read_docked_poses(ligand_file)
+    assert poses['coords'].shape == (1, 8, 3)
+    assert poses['atom_types'][-2:] == ['OA', 'HD']
+    assert np.isnan(poses['energies']).all()
+
+
+def test_scored_only_rejects_unscored_file(ligand_file):
+    with pytest.raises(ValueError, match='REMARK VINA RESULT'):
+        read_docked_poses(ligand_file, scored_only=True)
+
+
+def test_docked_round_trip(tmp_path, docked_file):
+    poses = read_docked_poses(docked_file, scored_only=True)
+    assert poses['coords'].shape == (5, 8, 3)
+    assert np.all(np.diff(poses['energies']) >= 0)
+
+    copy_file = tmp_path / 'copy.pdbqt'
+    write_docked_poses(str(copy_file), poses, [2, 0])
+    copy = read_docked_poses(str(copy_file))
+    np.testing.assert_allclose(copy['coords'], poses['coords'][[2, 0]], atol=1e-3)
+    np.testing.assert_allclose(copy['energies'], poses['energies'][[2, 0]], atol=1e-3)
+    assert copy['atom_types'] == poses['atom_types']
+    assert [line[:30] for line in copy['template']] == [line[:30] for line in poses['template']]
+
+
+def test_remark_maps_to_its_model(tmp_path, docked_file):
+    lines = open(docked_file).read().splitlines(keepends=True)
+    remarks = [i for i, line in enumerate(lines) if line.startswith('REMARK VINA RESULT')]
+    del lines[remarks[1]]
+    missing_file = tmp_path / 'missing.pdbqt'
+    missing_file.write_text(''.join(lines))
+
+    expected = read_docked_poses(docked_file)['energies']
+    poses = read_docked_poses(str(missing_file))
+    assert np.isnan(poses['energies'][1])
+    np.testing.assert_allclose(np.delete(poses['energies'], 1), np.delete(expected, 1))
+
+    scored = read_docked_poses(str(missing_file), scored_only=True)
+    assert len(scored['energies']) == 4
+    assert not np.isnan(scored['energies']).any()
+
+
+def test_concatenate_and_subset(docked_file):
+    poses = read_docked_poses(docked_file)
+    merged = concatenate_poses([poses, poses])
+    assert merged['coords'].shape[0] == 10
+    subset = subset_poses(merged, [9, 0])
+    np.testing.assert_array_equal(subset['energies'], merged['energies'][[9, 0]])
@@ -0,0 +1,102 @@
+import logging
+import pytest
+from scripts.pipeline_dag import PipelineDAG, Stage
+
+
+class Pipeline:
+    """Pipeline uji source -> upper -> count, dengan cabang independen 'other'"""
+
+    def __init__(self, tmp_path, params=None):
+        self.source = tmp_path / 'source.txt'
+        self.upper = tmp_path / 'upper.txt'
+        self.count = tmp_path / 'count.txt'
+        self.other = tmp_path / 'other.txt'
+        self.calls = []
+        self.fail = set()
+        self.source.write_text('egfr kinase\n')
+        self.stages = [
+            Stage('upper', self.stage('upper', lambda: self.upper.write_text(self.source.read_text().upper())),
+                  inputs=[str(self.source)], outputs=[str(self.upper)], params=params or {}),
+            Stage('count', self.stage('count', lambda: self.count.write_text(str(len(self.upper.read_text())))),
+                  inputs=[str(self.upper)], outputs=[str(self.count)]),
+            Stage('other', self.stage('other', lambda: self.other.write_text('x')), outputs=[str(self.other)])
+        ]
+
+    def stage(self, name, body):
+        def run():
+            self.calls.append(name)
+            if name in self.fail:
+                return None
+            body()
+            return True
+        return run
+
+    def dag(self, tmp_path):
+        return PipelineDAG(self.stages, str(tmp_path / 'manifests'), logging.getLogger('tests'))
+
+
+def test_second_run_skips(tmp_path):
+    pipeline = Pipeline(tmp_path)
+    assert pipeline.dag(tmp_path).run() == {'upper': 'done', 'count': 'done', 'other': 'done'}
+    pipeline.calls.clear()
+    assert set(pipeline.dag(tmp_path).run().values()) == {'skipped'}
+    assert pipeline.calls == []
+
+
+def test_changed_input_reruns_downstream(tmp_path):
+    pipeline = Pipeline(tmp_path)
+    pipeline.dag(tmp_path).run()
+    pipeline.source.write_text('her2 kinase\n')
+    dag = pipeline.dag(tmp_path)
+    assert dag.status('upper') == 'stale'
+    assert dag.status('other') == 'up-to-date'
+    assert dag.run() == {'upper': 'done', 'count': 'done', 'other': 'skipped'}
+
+
+def test_same_output_content_keeps_downstream(tmp_path):
+    pipeline = Pipeline(tmp_path)
+    pipeline.dag(tmp_path).run()
+    # Input berubah tetapi output upper identik: count tetap up to date
+    pipeline.source.write_text('EGFR kinase\n')
+    assert pipeline.dag(tmp_path).run() == {'upper': 'done', 'count': 'skipped', 'other': 'skipped'}
+
+
+def test_changed_params_and_modified_output(tmp_path):
+    Pipeline(tmp_path).dag(tmp_path).run()
+    pipeline = Pipeline(tmp_path, params={'case': 'upper'})
+    assert pipeline.dag(tmp_path).status('upper') == 'stale'
+    pipeline.dag(tmp_path).run()
+    pipeline.count.write_text('edited')
+    assert pipeline.dag(tmp_path).status('count') == 'stale'
+    pipeline.count.unlink()
+    assert pipeline.dag(tmp_path).status('count') == 'stale'
+
+
+def test_failed_stage_blocks_downstream(tmp_path):
+    pipeline = Pipeline(tmp_path)
+    pipeline.fail.add('upper')
+    assert pipeline.dag(tmp_path).run() == {'upper': 'failed', 'count': 'blocked', 'other': 'done'}
+    assert pipeline.dag(tmp_path).status('upper') == 'never run'
+
+
+def test_select_and_force(tmp_path):
+    pipeline = Pipeline(tmp_path)
+    dag = pipeline.dag(tmp_path)
+    assert dag.select(['count']) == ['upper', 'count']
+    assert dag.select(['count'], with_upstream=False) == ['count']
+    assert dag.select(['upper'], with_upstream=False, with_downstream=True) == ['upper', 'count']
+    dag.run()
+    pipeline.calls.clear()
+    assert dag.run(['count'], force=True) == {'upper': 'skipped', 'count': 'done'}
+    assert pipeline.calls == ['count']
+    with pytest.raises(ValueError, match='Unknown stages'):
+        dag.select(['dock'])
+
+
+def test_duplicate_output_and_cycle(tmp_path):
+    with pytest.raises(ValueError, match='produced by both'):
+        PipelineDAG([Stage('a', None, outputs=['x']), Stage('b', None, outputs=['x'])], str(tmp_path),
+                    logging.getLogger('tests'))
+    with pytest.raises(ValueError, match='cycle'):
+        PipelineDAG([Stage('a', None, inputs=['y'], outputs=['x']), Stage('b', None, inputs=['x'], outputs=['y'])],
+                    str(tmp_path), logging.getLogger('tests'))
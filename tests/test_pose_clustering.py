@@ -0,0 +1,78 @@
+import itertools
+import numpy as np
+import pytest
+from scripts.pdbqt_reader import read_docked_poses
+from scripts.pose_clustering import (cluster_poses, heavy_atom_mask, pairwise_rmsd, symmetry_permutations)
+
+# Cermin terhadap sumbu x: cincin fenol dibalik (C2<->C6, C3<->C5), geometri atom berat sama
+FLIP = np.diag([1.0, -1.0, 1.0])
+
+
+def make_poses(ligand_file, coords, energies):
+    poses = read_docked_poses(ligand_file)
+    poses['coords'] = np.array(coords, dtype=np.float32)
+    poses['energies'] = np.array(energies, dtype=np.float64)
+    return poses
+
+
+def brute_force_rmsd(coords, permutations):
+    n_poses = len(coords)
+    rmsd = np.empty((n_poses, n_poses))
+    for i, j in itertools.product(range(n_poses), repeat=2):
+        rmsd[i, j] = min(np.sqrt(((coords[i] - coords[j][perm]) ** 2).sum(-1).mean()) for perm in permutations)
+    return np.minimum(rmsd, rmsd.T)
+
+
+def test_symmetry_permutations_of_phenol(ligand_file):
+    permutations = symmetry_permutations(read_docked_poses(ligand_file))
+    # Identitas + flip cincin
+    assert permutations.shape == (2, 7)
+    assert (permutations == np.arange(7)).all(axis=1).any()
+
+
+def test_pairwise_rmsd_matches_brute_force(ligand_file):
+    base = read_docked_poses(ligand_file)['coords'][0]
+    rng = np.random.default_rng(0)
+    coords = [base + rng.normal(scale=0.8, size=base.shape) for _ in range(5)] + [base @ FLIP]
+    poses = make_poses(ligand_file, coords, np.zeros(len(coords)))
+    heavy = poses['coords'][:, heavy_atom_mask(poses)]
+    permutations = symmetry_permutations(poses)
+    np.testing.assert_allclose(pairwise_rmsd(heavy, permutations, block_size=4),
+                               brute_force_rmsd(heavy.astype(np.float64), permutations), atol=1e-4)
+
+
+def test_flipped_ring_is_same_pose_only_with_symmetry(ligand_file):
+    base = read_docked_poses(ligand_file)['coords'][0]
+    poses = make_poses(ligand_file, [base, base @ FLIP, base + [5.0, 0.0, 0.0]], [-8.0, -7.5, -7.0])
+
+    plain = cluster_poses(poses, cutoff=1.0, symmetry=False)
+    assert plain['rmsd'][0, 1] > 1.0
+    assert plain['representatives'].tolist() == [0, 1, 2]
+
+    for method in ('leader', 'hierarchical'):
+        clusters = cluster_poses(poses, cutoff=1.0, method=method)
+        assert clusters['rmsd'][0, 1] == pytest.approx(0.0, abs=1e-5)
+        assert clusters['representatives'].tolist() == [0, 2]
+        assert clusters['labels'].tolist() == [0, 0, 1]
+        assert clusters['populations'].tolist() == [2, 1]
+
+
+def test_leader_and_hierarchical_differ_on_chain(ligand_file):
+    base = read_docked_poses(ligand_file)['coords'][0]
+    # Pose berjarak 1.5 A berurutan; pose tengah paling baik
+    coords = [base + [shift, 0.0, 0.0] for shift in (0.0, 1.5, 3.0)]
+    poses = make_poses(ligand_file, coords, [-7.0, -9.0, -8.0])
+
+    leader = cluster_poses(poses, cutoff=2.0, method='leader')
+    assert leader['representatives'].tolist() == [1]
+    assert leader['populations'].tolist() == [3]
+
+    # Complete linkage: jarak maksimum 3.0 A >= cutoff, ujung-ujung tidak digabung
+    hierarchical = cluster_poses(poses, cutoff=2.0, method='hierarchical')
+    assert hierarchical['representatives'].tolist() == [1, 2]
+    assert hierarchical['labels'].tolist() == [0, 0, 1]
+
+
+def test_unknown_method(ligand_file):
+    with pytest.raises(ValueError, match='Unknown clustering method'):
+        cluster_poses(read_docked_poses(ligand_file), method='kmeans')
@@ -0,0 +1,88 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pytest
+from scripts.backends import FakeDockingBackend
+from scripts.docking import AutoDockVina
+from scripts.pdbqt_reader import read_docked_poses
+from scripts.pose_store import PoseStore, pose_key
+from scripts.results_store import ResultsStore
+
+
+def test_pose_key():
+    assert pose_key('erlotinib') == 'erlotinib'
+    assert pose_key('erlotinib', 'default') == 'erlotinib'
+    assert pose_key('erlotinib', 'allosteric') == 'erlotinib_allosteric'
+
+
+def test_round_trip(tmp_path, ligand_file, docking_config, logger):
+    backend = FakeDockingBackend(logger)
+    store = PoseStore(str(tmp_path / 'poses'), logger, chunk_size=2, writer_id='test')
+    written = {}
+    for i, site in enumerate(['default', 'allosteric', 'hinge']):
+        poses = backend.fake_poses(ligand_file, dict(docking_config, seed=i), 3)
+        store.add(pose_key('phenol', site), poses)
+        written[pose_key('phenol', site)] = poses
+    # Chunk pertama ditulis otomatis (chunk_size=2), sisanya saat flush
+    assert len(store.names()) == 2
+    store.flush()
+    assert store.names() == sorted(written)
+
+    reopened = PoseStore(str(tmp_path / 'poses'), logger, writer_id='test')
+    for name, poses in written.items():
+        stored = reopened.get(name)
+        np.testing.assert_allclose(stored['coords'], poses['coords'], atol=1e-5)
+        np.testing.assert_allclose(stored['energies'], poses['energies'], atol=1e-3)
+        assert stored['atom_types'] == poses['atom_types']
+    assert reopened.get('missing') is None
+
+
+def test_concurrent_get_returns_own_chunk(tmp_path, ligand_file, docking_config, logger):
+    backend = FakeDockingBackend(logger)
+    # Satu ligan per chunk: tiap get berganti chunk dan mengganti cache
+    store = PoseStore(str(tmp_path / 'poses'), logger, chunk_size=1, writer_id='test')
+    written = {}
+    for i in range(4):
+        written[f"lig{i}"] = backend.fake_poses(ligand_file, dict(docking_config, seed=i), 3)
+        store.add(f"lig{i}", written[f"lig{i}"])
+
+    names = list(written) * 50
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for name, stored in zip(names, executor.map(store.get, names)):
+            np.testing.assert_allclose(stored['coords'], written[name]['coords'], atol=1e-5)
+
+
+def test_export_pdbqt(tmp_path, ligand_file, docking_config, logger):
+    poses = FakeDockingBackend(logger).fake_poses(ligand_file, docking_config, 3)
+    store = PoseStore(str(tmp_path / 'poses'), logger, writer_id='test')
+    store.add('phenol', poses)
+    store.flush()
+    output_file = str(tmp_path / 'pose2.pdbqt')
+    store.export_pdbqt('phenol', 1, output_file)
+    exported = read_docked_poses(output_file, scored_only=True)
+    np.testing.assert_allclose(exported['coords'][0], poses['coords'][1], atol=1e-3)
+
+
+def test_batch_docking_poses_match_results(tmp_path, ligand_file, docking_config, logger):
+    results_store = ResultsStore(str(tmp_path / 'results.sqlite'), logger, commit_every=2)
+    pose_store = PoseStore(str(tmp_path / 'poses'), logger, writer_id='test')
+    order = []
+    flush, write_results = pose_store.flush, results_store.write_results
+    pose_store.flush = lambda: order.append('poses') or flush()
+    results_store.write_results = lambda *args: order.append('results') or write_results(*args)
+
+    docker = AutoDockVina(str(tmp_path), logger, pose_store, results_store, FakeDockingBackend(logger))
+    ligand_files = {}
+    for name in ('lig_a', 'lig_b', 'lig_c'):
+        ligand_files[name] = str(tmp_path / f"{name}.pdbqt")
+        os.link(ligand_file, ligand_files[name])
+    sites = {'default': {}, 'allosteric': {'center_x': 0.0}}
+    results = docker.run_docking_batch('receptor.pdbqt', ligand_files, docking_config, sites=sites)
+
+    assert sorted(results) == sorted(ligand_files)
+    # Tiap commit hasil didahului flush pose
+    assert order[0] == 'poses' and all(order[i - 1] == 'poses' for i, step in enumerate(order) if step == 'results')
+    for name, result in results.items():
+        stored = pose_store.get(pose_key(name, result['site']))
+        assert stored is not None
+        assert stored['energies'][0] == pytest.approx(result['best_affinity'], abs=1e-3)
@@ -0,0 +1,99 @@
+import pytest
+import scripts.vina_engine as vina_engine
+from scripts.backends import FakeDockingBackend
+from scripts.pdbqt_reader import read_docked_poses
+from scripts.rescoring import MultiScoreRescorer
+from scripts.results_store import ResultsStore
+from scripts.vina_engine import VinaEngine
+
+SITES = {'default': {}, 'allosteric': {'center_x': 3.0}}
+
+
+class StubVina:
+    """Pengganti vina.Vina: mencatat perhitungan map, skor = -center_x - offset scoring function"""
+    maps_computed = []
+
+    def __init__(self, sf_name='vina', cpu=0, seed=0, verbosity=0):
+        self.sf_name = sf_name
+
+    def set_receptor(self, rigid_pdbqt_filename):
+        self.receptor = rigid_pdbqt_filename
+
+    def compute_vina_maps(self, center, box_size):
+        self.center = center
+        StubVina.maps_computed.append((self.sf_name, tuple(center)))
+
+    def load_maps(self, prefix):
+        self.center = [0.0, 0.0, 0.0]
+        StubVina.maps_computed.append((self.sf_name, prefix))
+
+    def set_ligand_from_string(self, pdbqt):
+        self.ligand = pdbqt
+
+    def score(self):
+        return [-self.center[0] - {'vina': 0.0, 'vinardo': 0.5, 'ad4': 1.0}[self.sf_name]]
+
+    def optimize(self):
+        return [self.score()[0] - 0.25]
+
+
+@pytest.fixture
+def stub_vina(monkeypatch):
+    StubVina.maps_computed = []
+    monkeypatch.setattr(vina_engine, 'Vina', StubVina)
+    return StubVina
+
+
+@pytest.fixture
+def results_store(tmp_path, ligand_file, docking_config, logger):
+    backend = FakeDockingBackend(logger)
+    store = ResultsStore(str(tmp_path / 'results.sqlite'), logger)
+    for site, box in SITES.items():
+        output_file = str(tmp_path / f"phenol_{site}.pdbqt")
+        backend.dock('receptor.pdbqt', ligand_file, output_file, None, dict(docking_config, **box), 60)
+        poses = read_docked_poses(output_file, scored_only=True)
+        store.add_results([('phenol', {'output_file': output_file, 'site': site,
+                                       'binding_affinities': poses['energies'].tolist()})], 'receptor')
+    return store
+
+
+def test_active_functions(results_store, logger):
+    rescorer = MultiScoreRescorer(results_store, logger, ['vina', 'vinardo', 'ad4', 'gnina'])
+    assert rescorer.active_functions() == ['vina', 'vinardo']
+    rescorer.ad4_maps = 'receptor_maps/receptor'
+    assert rescorer.active_functions() == ['vina', 'vinardo', 'ad4']
+
+
+def test_rescore_requires_vina(results_store, logger, monkeypatch):
+    monkeypatch.setattr(vina_engine, 'Vina', None)
+    assert MultiScoreRescorer(results_store, logger).rescore('receptor.pdbqt', {}) is None
+
+
+def test_engine_computes_maps_once_per_box_and_function(tmp_path, ligand_file, docking_config, logger, stub_vina):
+    engine = VinaEngine(logger, max_instances=2)
+    for _ in range(3):
+        engine.score_file('receptor.pdbqt', ligand_file, docking_config, 'vina')
+    engine.score_file('receptor.pdbqt', ligand_file, docking_config, 'vinardo')
+    assert stub_vina.maps_computed == [('vina', (10.0, -5.0, 2.5)), ('vinardo', (10.0, -5.0, 2.5))]
+    # Instance tertua dibuang saat melebihi max_instances
+    engine.score_file('receptor.pdbqt', ligand_file, dict(docking_config, center_x=0.0), 'vina')
+    engine.score_file('receptor.pdbqt', ligand_file, docking_config, 'vina')
+    assert len(stub_vina.maps_computed) == 4
+    with pytest.raises(ValueError, match='autogrid4'):
+        engine.score_file('receptor.pdbqt', ligand_file, docking_config, 'ad4')
+
+
+def test_rescore_each_site_in_its_box(results_store, docking_config, logger, stub_vina):
+    rescorer = MultiScoreRescorer(results_store, logger, ['vina', 'vinardo'], max_workers=1)
+    counts = rescorer.rescore('receptor.pdbqt', docking_config, SITES)
+    # Semua pose file terbaik per site di-skor
+    n_poses = 2 * docking_config['num_modes']
+    assert counts == {'vina': n_poses, 'vinardo': n_poses}
+
+    poses = results_store.query(receptor='receptor', best_pose_only=True).set_index('site')
+    assert poses.loc['default', 'score_vina'] == pytest.approx(-docking_config['center_x'])
+    assert poses.loc['allosteric', 'score_vina'] == pytest.approx(-3.0)
+    assert poses.loc['allosteric', 'score_vinardo'] == pytest.approx(-3.5)
+
+    consensus = results_store.consensus('receptor', ['vina', 'vinardo'], best_pose_only=True)
+    assert consensus['site'].tolist() == ['default', 'allosteric']
@@ -0,0 +1,122 @@
+import pytest
+from scripts.results_store import ResultsStore, receptor_name
+
+
+def docking_result(affinities, site='default', partial=False):
+    return {
+        'output_file': f"/results/{site}.pdbqt",
+        'binding_affinities': affinities,
+        'rmsd_lb': [0.0] * len(affinities),
+        'rmsd_ub': [0.0] * len(affinities),
+        'best_affinity': min(affinities),
+        'site': site,
+        'partial': partial,
+        'box': {'size_x': 20.0, 'size_y': 20.0, 'size_z': 20.0}
+    }
+
+
+@pytest.fixture
+def store(tmp_path, logger):
+    store = ResultsStore(str(tmp_path / 'results.sqlite'), logger)
+    store.add_results([
+        ('erlotinib', docking_result([-9.1, -8.4, -7.0])),
+        ('erlotinib', docking_result([-6.5, -6.0], site='allosteric')),
+        ('gefitinib', docking_result([-8.7, -8.0])),
+        ('aspirin', docking_result([-5.2, -4.9], partial=True))
+    ], 'EGFR')
+    store.add_results({'erlotinib': docking_result([-7.7])}, 'HER2')
+    store.add_ligand('erlotinib', 'COCCOc1cc2ncnc(Nc3cccc(C#C)c3)c2cc1OCCOC', {'mw': 393.4, 'heavy_atoms': 29})
+    store.add_ligand('aspirin', 'CC(=O)Oc1ccccc1C(=O)O', {'mw': 180.2, 'heavy_atoms': 13})
+    return store
+
+
+def test_receptor_name():
+    assert receptor_name('/data/protein/1M17_clean.pdbqt') == '1M17_clean'
+
+
+def test_query_filters(store):
+    assert len(store.query()) == 10
+    egfr = store.query(receptor='EGFR')
+    assert len(egfr) == 9 and egfr['affinity'].is_monotonic_increasing
+    best = store.query(receptor='EGFR', best_pose_only=True)
+    assert sorted(zip(best['ligand'], best['site'])) == [('aspirin', 'default'), ('erlotinib', 'allosteric'),
+                                                         ('erlotinib', 'default'), ('gefitinib', 'default')]
+    assert store.query(receptor='EGFR', site='allosteric')['ligand'].unique().tolist() == ['erlotinib']
+    assert store.query(receptor='EGFR', max_affinity=-8.5)['affinity'].tolist() == [-9.1, -8.7]
+    assert store.top_k(2, receptor='EGFR', ligands=['gefitinib'])['pose'].tolist() == [1, 2]
+
+
+def test_descriptor_filters(store):
+    small = store.query(receptor='EGFR', mw_max=200)
+    assert small['ligand'].unique().tolist() == ['aspirin']
+    assert 'smiles' in store.query(with_descriptors=True, limit=1).columns
+    with pytest.raises(ValueError, match='Unknown filter'):
+        store.query(charge_max=1)
+
+
+def test_summary_and_best_affinities(store):
+    summary = store.summary('EGFR').set_index('ligand')
+    assert summary.loc['erlotinib', 'best_affinity'] == -9.1
+    assert summary.loc['erlotinib', 'best_site'] == 'default'
+    assert summary.loc['erlotinib', 'n_poses'] == 5
+    assert bool(summary.loc['aspirin', 'partial'])
+    assert store.best_affinities('EGFR', ['erlotinib', 'aspirin', 'unknown'], chunk_size=1) == {
+        'erlotinib': -9.1, 'aspirin': -5.2}
+    assert store.best_affinities('HER2', ['erlotinib']) == {'erlotinib': -7.7}
+
+
+def test_rewrite_replaces_poses(store):
+    store.add_results({'gefitinib': docking_result([-10.0])}, 'EGFR')
+    gefitinib = store.query(receptor='EGFR', ligands=['gefitinib'])
+    assert gefitinib['affinity'].tolist() == [-10.0]
+
+
+def test_load_results_limit(store):
+    results = store.load_results('EGFR', limit=2)
+    assert list(results) == ['erlotinib', 'gefitinib']
+    assert results['erlotinib']['binding_affinities'] == [-9.1, -8.4, -7.0]
+    assert results['erlotinib']['site'] == 'default'
+    assert store.load_results('EGFR', limit=0) == {}
+
+
+def test_export_excel(store, tmp_path):
+    excel_file = str(tmp_path / 'results.xlsx')
+    assert store.export_excel(excel_file, receptor='EGFR') == excel_file
+
+
+def test_writer_commits_in_batches(tmp_path, logger):
+    store = ResultsStore(str(tmp_path / 'results.sqlite'), logger, commit_every=2, commit_seconds=3600)
+    commits = []
+    writer = store.open_writer('EGFR', before_commit=lambda: commits.append(len(store.summary('EGFR'))))
+    # Satu fsync per batch: koneksi writer memakai synchronous=FULL
+    assert writer._conn.execute("PRAGMA synchronous").fetchone()[0] == 2
+
+    committed = [writer.append(f"lig{i}", docking_result([-7.0 - i])) for i in range(5)]
+    assert committed == [False, True, False, True, False]
+    # Hasil yang sudah di-commit terlihat dari koneksi lain sebelum writer ditutup (crash-safe)
+    assert len(store.summary('EGFR')) == 4
+    writer.close()
+    assert len(store.summary('EGFR')) == 5
+    assert writer.n_written == 5
+    # before_commit hanya dipanggil untuk batch yang tidak kosong, sebelum batch ditulis
+    assert commits == [0, 2, 4]
+
+
+def test_writer_commits_after_interval(tmp_path, logger):
+    store = ResultsStore(str(tmp_path / 'results.sqlite'), logger, commit_every=100, commit_seconds=0)
+    writer = store.open_writer('EGFR')
+    try:
+        assert writer.append('lig0', docking_result([-7.0]))
+        assert len(store.summary('EGFR')) == 1
+    finally:
+        writer.close()
+
+
+def test_writer_keeps_latest_result_per_site(tmp_path, logger):
+    store = ResultsStore(str(tmp_path / 'results.sqlite'), logger, commit_every=100)
+    writer = store.open_writer('EGFR')
+    writer.append('lig0', docking_result([-7.0]))
+    writer.append('lig0', docking_result([-8.0]))
+    writer.append('lig0', docking_result([-6.0], site='allosteric'))
+    writer.close()
+    assert sorted(store.query(receptor='EGFR')['affinity']) == [-8.0, -6.0]
@@ -0,0 +1,75 @@
+import os
+import gzip
+import pytest
+from rdkit import Chem
+from rdkit.Chem import AllChem
+from scripts.backends import FakeDockingBackend
+from scripts.pdbqt_reader import read_docked_poses
+from scripts.results_store import ResultsStore
+from scripts.sdf_export import PoseSDFExporter, load_template, restore_pose_mol
+
+
+@pytest.fixture
+def ligand_dir(tmp_path, ligand_file):
+    """Folder ligand prep: PDBQT + SDF sumber fenol, anisol hanya PDBQT (tanpa template)"""
+    ligand_dir = tmp_path / 'ligands'
+    ligand_dir.mkdir()
+    mol = Chem.AddHs(Chem.MolFromSmiles('Oc1ccccc1'))
+    AllChem.Compute2DCoords(mol)
+    writer = Chem.SDWriter(str(ligand_dir / 'phenol.sdf'))
+    writer.write(mol)
+    writer.close()
+    for name in ('phenol', 'anisole'):
+        os.link(ligand_file, ligand_dir / f"{name}.pdbqt")
+    return str(ligand_dir)
+
+
+@pytest.fixture
+def docked_file(tmp_path, ligand_file, docking_config, logger):
+    output_file = str(tmp_path / 'phenol_docked.pdbqt')
+    FakeDockingBackend(logger).dock('receptor.pdbqt', ligand_file, output_file, None, docking_config, 60)
+    return output_file
+
+
+def test_restore_bond_orders_from_template(ligand_dir, docked_file):
+    poses = read_docked_poses(docked_file)
+    mol, restored = restore_pose_mol(poses, 2, load_template(os.path.join(ligand_dir, 'phenol.sdf')))
+    assert restored
+    assert Chem.MolToSmiles(Chem.RemoveHs(mol)) == Chem.MolToSmiles(Chem.MolFromSmiles('Oc1ccccc1'))
+    # Hidrogen non-polar ditambahkan kembali dengan koordinat
+    assert mol.GetNumAtoms() == 13
+    heavy = mol.GetConformer().GetPositions()[:7]
+    assert abs(heavy - poses['coords'][2][:7]).max() < 1e-2
+
+
+def test_without_template_is_unreliable(docked_file):
+    mol, restored = restore_pose_mol(read_docked_poses(docked_file), 0, None)
+    assert not restored and mol is not None
+    assert all(bond.GetBondType() == Chem.BondType.SINGLE for bond in mol.GetBonds())
+
+
+def test_export_results_store(tmp_path, ligand_dir, docking_config, logger):
+    backend = FakeDockingBackend(logger)
+    results_store = ResultsStore(str(tmp_path / 'results.sqlite'), logger)
+    for name in ('phenol', 'anisole'):
+        output_file = str(tmp_path / f"{name}_docked.pdbqt")
+        backend.dock('receptor.pdbqt', os.path.join(ligand_dir, f"{name}.pdbqt"), output_file, None,
+                     docking_config, 60)
+        poses = read_docked_poses(output_file, scored_only=True)
+        results_store.add_results({name: {'output_file': output_file,
+                                           'binding_affinities': poses['energies'].tolist()}}, 'EGFR')
+
+    output_file = str(tmp_path / 'poses.sdf.gz')
+    exporter = PoseSDFExporter(ligand_dir, logger, max_workers=1)
+    assert exporter.export(results_store, output_file, receptor='EGFR') == output_file
+    with gzip.open(output_file, 'rb') as f:
+        mols = [mol for mol in Chem.ForwardSDMolSupplier(f, removeHs=False)]
+    assert len(mols) == 2 * docking_config['num_modes']
+    tags = {(mol.GetProp('_Name'), mol.GetProp('bond_orders')) for mol in mols}
+    assert tags == {('phenol', 'template'), ('anisole', 'unreliable')}
+    assert all(mol.HasProp('affinity') and mol.GetProp('site') == 'default' for mol in mols)
+
+    best_file = str(tmp_path / 'best.sdf.gz')
+    exporter.export(results_store, best_file, receptor='EGFR', best_pose_only=True)
+    with gzip.open(best_file, 'rb') as f:
+        assert sum(1 for _ in Chem.ForwardSDMolSupplier(f)) == 2
@@ -0,0 +1,133 @@
+import os
+import time
+import threading
+from scripts.backends import FakeDockingBackend
+from scripts.docking import AutoDockVina
+from scripts.results_store import ResultsStore
+from scripts.streaming import CpuBudget, StreamingScreen
+
+
+def acquire_in_thread(budget, n, priority, events, name):
+    def run():
+        budget.acquire(n, priority)
+        events.append(name)
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_slots_are_released():
+    budget = CpuBudget(4)
+    with budget.slots(3):
+        assert budget.available == 1
+    assert budget.available == 4
+    # Permintaan lebih besar dari total dibatasi ke total
+    assert budget.acquire(8) == 4
+    budget.release(4)
+
+
+def test_priority_served_first():
+    budget = CpuBudget(2)
+    budget.acquire(2)
+    events = []
+    prep = acquire_in_thread(budget, 1, False, events, 'prep')
+    time.sleep(0.1)
+    dock = acquire_in_thread(budget, 1, True, events, 'dock')
+    time.sleep(0.1)
+    assert events == []
+    budget.release(1)
+    dock.join(1)
+    time.sleep(0.1)
+    assert events == ['dock']
+    budget.release(1)
+    prep.join(1)
+    assert events == ['dock', 'prep']
+
+
+def test_docking_leaves_reserved_slot_for_prep():
+    budget = CpuBudget(4, reserved=1)
+    assert budget.acquire(8, priority=True) == 3
+    events = []
+    dock = acquire_in_thread(budget, 1, True, events, 'dock')
+    time.sleep(0.1)
+    # Satu slot bebas, tetapi hanya untuk preparasi
+    assert events == []
+    prep = acquire_in_thread(budget, 1, False, events, 'prep')
+    prep.join(1)
+    assert events == ['prep']
+    budget.release(1)
+    time.sleep(0.1)
+    assert events == ['prep']
+    budget.release(3, priority=True)
+    dock.join(1)
+    assert events == ['prep', 'dock']
+
+
+def test_prep_not_starved_by_waiting_docking():
+    budget = CpuBudget(2, reserved=1)
+    stop = threading.Event()
+    prepared = []
+
+    def docking():
+        while not stop.is_set():
+            with budget.slots(2, priority=True):
+                time.sleep(0.01)
+
+    def preparation():
+        for i in range(5):
+            with budget.slots(1):
+                prepared.append(i)
+
+    dockers = [threading.Thread(target=docking, daemon=True) for _ in range(3)]
+    for thread in dockers:
+        thread.start()
+    prep = threading.Thread(target=preparation, daemon=True)
+    prep.start()
+    prep.join(5)
+    stop.set()
+    assert prepared == list(range(5))
+
+
+class SlowPrep:
+    """Preparasi ligan uji: salin PDBQT jadi dengan jeda, satu ligan gagal"""
+    fingerprint_index = None
+
+    def __init__(self, ligand_file, ligand_dir, seconds=0.1, failing=('L3',)):
+        self.ligand_file = ligand_file
+        self.ligand_dir = ligand_dir
+        self.seconds = seconds
+        self.failing = failing
+
+    def prepare_ligand(self, name, smiles):
+        time.sleep(self.seconds)
+        if name in self.failing:
+            return None
+        pdbqt_file = os.path.join(self.ligand_dir, f"{name}.pdbqt")
+        if not os.path.exists(pdbqt_file):
+            os.link(self.ligand_file, pdbqt_file)
+        return pdbqt_file
+
+
+class SlowFakeBackend(FakeDockingBackend):
+    def dock(self, protein_file, ligand_file, output_file, log_file, docking_config, timeout):
+        time.sleep(0.1)
+        return super().dock(protein_file, ligand_file, output_file, log_file, docking_config, timeout)
+
+
+def test_streaming_twenty_ligands(tmp_path, ligand_file, docking_config, logger):
+    library = {f"L{i}": 'c1ccccc1O' for i in range(20)}
+    results_store = ResultsStore(str(tmp_path / 'results.sqlite'), logger)
+    docker = AutoDockVina(str(tmp_path), logger, None, results_store, SlowFakeBackend(logger))
+    screen = StreamingScreen(SlowPrep(ligand_file, str(tmp_path)), docker, logger, CpuBudget(4, reserved=1),
+                             prep_workers=2, queue_size=4)
+
+    start = time.monotonic()
+    results = screen.run('receptor.pdbqt', library, dict(docking_config, cpu=1), max_workers=2, receptor='stream')
+    wall = time.monotonic() - start
+
+    assert len(screen.prepared) == 19 and 'L3' not in screen.prepared
+    assert sorted(results) == sorted(screen.prepared)
+    assert sorted(results_store.best_affinities('stream', library)) == sorted(screen.prepared)
+    # Preparasi (20 x 0.1 s / 2 worker) dan docking (19 x 0.1 s / 2 worker) tumpang tindih
+    assert wall < 0.8 * (1.0 + 0.95)
+    assert screen.stats['prep_seconds'] <= screen.stats['wall_seconds']
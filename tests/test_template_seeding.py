@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+from rdkit import Chem
+from rdkit.Chem import AllChem
+from scripts.docking import AutoDockVina
+from scripts.template_seeding import TemplateSeeder, extract_reference_ligand, seeded_config
+
+ERLOTINIB = 'COCCOc1cc2ncnc(Nc3cccc(C#C)c3)c2cc1OCCOC'
+GEFITINIB = 'COc1cc2ncnc(Nc3ccc(F)c(Cl)c3)c2cc1OCCCN1CCOCC1'
+ASPIRIN = 'CC(=O)Oc1ccccc1C(=O)O'
+CONFIG = {'min_core_atoms': 10, 'local_only_fraction': 0.9, 'reduced_exhaustiveness': 4, 'box_padding': 4.0,
+          'mcs_timeout': 10}
+
+
+@pytest.fixture(scope='module')
+def reference_pdb(tmp_path_factory):
+    """Struktur 'kristal' berisi erlotinib sebagai HETATM AQ4 (plus residu protein lain)"""
+    mol = Chem.AddHs(Chem.MolFromSmiles(ERLOTINIB))
+    AllChem.EmbedMolecule(mol, randomSeed=7)
+    mol = Chem.RemoveHs(mol)
+    for i, atom in enumerate(mol.GetAtoms()):
+        info = Chem.AtomPDBResidueInfo(f"{atom.GetSymbol()}{i + 1}"[:4].ljust(4), residueName='AQ4',
+                                       residueNumber=999, chainId='A', isHeteroAtom=True)
+        atom.SetMonomerInfo(info)
+    path = tmp_path_factory.mktemp('pdb') / 'reference.pdb'
+    protein = "ATOM      1  CA  ALA A   1      30.000  30.000  30.000  1.00  0.00           C\n"
+    path.write_text(protein + Chem.MolToPDBBlock(mol, flavor=2))
+    return str(path)
+
+
+class StubPreparator:
+    """Ganti konversi PDBQT: seed cukup dicatat sebagai mol"""
+
+    def __init__(self):
+        self.mols = {}
+
+    def mol_to_pdbqt(self, mol, name, gen3d=True):
+        self.mols[name] = Chem.Mol(mol)
+        return f"{name}.pdbqt"
+
+
+@pytest.fixture
+def seeder(reference_pdb, logger):
+    reference, bond_orders = extract_reference_ligand(reference_pdb, 'AQ4', ERLOTINIB)
+    assert bond_orders
+    return TemplateSeeder(reference, StubPreparator(), logger, CONFIG, bond_orders)
+
+
+def test_extract_reference_ligand(reference_pdb):
+    mol, bond_orders = extract_reference_ligand(reference_pdb, 'AQ4', ERLOTINIB)
+    assert bond_orders and mol.GetNumAtoms() == 29
+    assert Chem.MolToSmiles(mol) == Chem.MolToSmiles(Chem.MolFromSmiles(ERLOTINIB))
+    # Tanpa SMILES: geometri saja, tanpa bond order
+    assert not extract_reference_ligand(reference_pdb, 'AQ4')[1]
+    with pytest.raises(ValueError, match='No ATP ligand'):
+        extract_reference_ligand(reference_pdb, 'ATP')
+
+
+def test_core_placed_at_crystal_coordinates(seeder):
+    mol, core_atoms = seeder.seed_conformer(GEFITINIB)
+    assert core_atoms >= CONFIG['min_core_atoms']
+    core = Chem.MolFromSmiles('c1nc2ccccc2c(Nc2ccccc2)n1')
+    placed = mol.GetConformer().GetPositions()[list(mol.GetSubstructMatch(core))]
+    crystal = seeder.reference.GetConformer().GetPositions()[list(seeder.reference.GetSubstructMatch(core))]
+    assert np.sqrt(((placed - crystal) ** 2).sum(axis=1).mean()) < 0.5
+
+
+def test_seed_modes(seeder):
+    seeds = seeder.seed_ligands({'erlotinib': ERLOTINIB, 'gefitinib': GEFITINIB, 'aspirin': ASPIRIN})
+    # Core kecil (aspirin) -> docking global biasa
+    assert sorted(seeds) == ['erlotinib', 'gefitinib']
+    assert seeds['erlotinib']['mode'] == 'local' and seeds['erlotinib']['core_fraction'] == 1.0
+    assert seeds['gefitinib']['mode'] == 'reduced'
+    assert seeds['gefitinib']['seed_file'] == 'gefitinib_seed.pdbqt'
+    assert seeds['gefitinib']['edge'] > 2 * CONFIG['box_padding']
+
+
+def test_seeded_config_shrinks_search(docking_config):
+    seed = {'center': [1.0, 2.0, 3.0], 'edge': 14.0, 'exhaustiveness': 4}
+    config = seeded_config(seed, docking_config)
+    assert (config['center_x'], config['center_y'], config['center_z']) == (1.0, 2.0, 3.0)
+    assert config['size_x'] == 14.0 and config['exhaustiveness'] == 4
+    assert seeded_config(dict(seed, edge=40.0), docking_config)['size_y'] == docking_config['size_y']
+
+
+def test_plan_job_uses_seed(tmp_path, ligand_file, docking_config, logger):
+    docker = AutoDockVina(str(tmp_path), logger)
+    seeds = {'phenol': {'seed_file': 'phenol_seed.pdbqt', 'mode': 'local', 'center': [0.0, 0.0, 0.0],
+                        'edge': 12.0, 'exhaustiveness': 4}}
+    job_file, config, local_only = docker.plan_job('phenol', ligand_file, docking_config, 'atp', seeds=seeds)
+    assert (job_file, local_only, config['size_x']) == ('phenol_seed.pdbqt', True, 12.0)
+    assert docker.plan_job('other', ligand_file, docking_config, 'atp', seeds=seeds) == (
+        ligand_file, docking_config, False)
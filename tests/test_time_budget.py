@@ -0,0 +1,41 @@
+import pytest
+from scripts.backends import FakeDockingBackend
+from scripts.docking import AutoDockVina
+
+BUDGET = {'enabled': True, 'slices': 4, 'budget_factor': 1.5, 'min_seconds': 60, 'max_seconds': 1800}
+
+
+class CountingBackend(FakeDockingBackend):
+    """Backend fake yang mencatat seed tiap panggilan dock"""
+
+    def __init__(self, logger, in_process=False):
+        super().__init__(logger)
+        self.in_process = in_process
+        self.seeds = []
+
+    def dock(self, protein_file, ligand_file, output_file, log_file, docking_config, timeout):
+        self.seeds.append(docking_config['seed'])
+        return super().dock(protein_file, ligand_file, output_file, log_file, docking_config, timeout)
+
+
+@pytest.mark.parametrize('budget, in_process, expected', [
+    (None, False, False),
+    (dict(BUDGET, enabled=False), False, False),
+    (BUDGET, False, True),
+    (BUDGET, True, False)
+])
+def test_use_time_budget(logger, budget, in_process, expected):
+    docker = AutoDockVina('.', logger, backend=CountingBackend(logger, in_process))
+    assert docker.use_time_budget(budget) is expected
+
+
+@pytest.mark.parametrize('in_process, n_calls', [(False, 4), (True, 1)])
+def test_batch_slices_only_external_backends(tmp_path, ligand_file, docking_config, logger, in_process, n_calls):
+    backend = CountingBackend(logger, in_process)
+    docker = AutoDockVina(str(tmp_path), logger, backend=backend)
+    results = docker.run_docking_batch('receptor.pdbqt', {'phenol': ligand_file}, docking_config, BUDGET)
+    assert len(backend.seeds) == n_calls
+    assert results['phenol']['best_affinity'] < 0
+    # Backend in-process: satu dock dengan seed asli (instance Vina tercache tetap dipakai)
+    if in_process:
+        assert backend.seeds == [docking_config['seed']]
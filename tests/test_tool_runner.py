@@ -0,0 +1,103 @@
+import os
+import time
+import subprocess
+import pytest
+from scripts.backends import FakeDockingBackend, VinaCLIBackend
+from scripts.docking import AutoDockVina
+from scripts.tool_runner import ToolRunner
+
+
+@pytest.fixture
+def runner(logger):
+    runner = ToolRunner(logger, kill_grace=0.5)
+    yield runner
+    runner.close()
+
+
+def process_gone(pid, wait=3.0):
+    """True jika pid sudah tidak ada (atau zombie) dalam wait detik"""
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                if f.read().split(')')[-1].split()[0] == 'Z':
+                    return True
+        except FileNotFoundError:
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_run_returns_output(runner):
+    result = runner.run(['sh', '-c', 'echo out; echo err >&2; exit 3'])
+    assert (result.returncode, result.stdout, result.stderr) == (3, 'out\n', 'err\n')
+
+
+def test_timeout_kills_process_group(tmp_path, runner):
+    pid_file = tmp_path / 'child.pid'
+    # Proses yang mengabaikan SIGTERM dan punya child: keduanya harus mati (SIGKILL ke group)
+    script = f"trap '' TERM; sleep 30 & echo $! > {pid_file}; wait"
+    start = time.monotonic()
+    with pytest.raises(subprocess.TimeoutExpired):
+        runner.run(['sh', '-c', script], timeout=0.5)
+    assert time.monotonic() - start < 5
+    assert process_gone(int(pid_file.read_text()))
+
+
+def test_cancel_future_kills_process(tmp_path, runner):
+    pid_file = tmp_path / 'sleep.pid'
+    future = runner.submit(['sh', '-c', f"echo $$ > {pid_file}; exec sleep 30"])
+    deadline = time.monotonic() + 5
+    while not pid_file.exists() or not pid_file.read_text().strip():
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    future.cancel()
+    assert process_gone(int(pid_file.read_text()))
+
+
+def test_per_tool_limit(logger):
+    runner = ToolRunner(logger, limits={'sleep': 1})
+    try:
+        start = time.monotonic()
+        futures = [runner.submit(['sleep', '0.3']) for _ in range(3)]
+        for future in futures:
+            assert future.result().returncode == 0
+        assert time.monotonic() - start >= 0.9
+    finally:
+        runner.close()
+
+
+def test_cli_backend_timeout(tmp_path, runner, ligand_file, docking_config, logger):
+    vina = tmp_path / 'vina'
+    vina.write_text('#!/bin/sh\nsleep 30\n')
+    vina.chmod(0o755)
+    backend = VinaCLIBackend(logger, executable=str(vina), runner=runner)
+    with pytest.raises(subprocess.TimeoutExpired):
+        backend.dock('receptor.pdbqt', ligand_file, str(tmp_path / 'out.pdbqt'), str(tmp_path / 'out.log'),
+                     docking_config, timeout=0.5)
+
+
+class StallingBackend(FakeDockingBackend):
+    """Slice pertama selesai seperti backend fake, slice berikutnya menggantung sampai di-kill runner"""
+
+    def __init__(self, logger, runner, first_seed):
+        super().__init__(logger)
+        self.runner = runner
+        self.first_seed = first_seed
+
+    def dock(self, protein_file, ligand_file, output_file, log_file, docking_config, timeout):
+        if docking_config['seed'] != self.first_seed:
+            self.runner.run(['sleep', '30'], timeout)
+        return super().dock(protein_file, ligand_file, output_file, log_file, docking_config, timeout)
+
+
+def test_budget_exhausted_keeps_partial_result(tmp_path, runner, ligand_file, docking_config, logger):
+    backend = StallingBackend(logger, runner, first_seed=docking_config['seed'] + 1)
+    docker = AutoDockVina(str(tmp_path), logger, backend=backend)
+    start = time.monotonic()
+    result = docker.run_budgeted_docking('receptor.pdbqt', ligand_file, 'phenol', dict(docking_config, slices=4),
+                                         time_budget=2.5)
+    assert time.monotonic() - start < 6
+    assert result['partial'] and result['completed_slices'] == 1
+    assert len(result['binding_affinities']) == docking_config['num_modes']
+    assert not [name for name in os.listdir(tmp_path) if '_slice' in name]
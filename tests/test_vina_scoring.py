@@ -0,0 +1,117 @@
+import os
+import csv
+import numpy as np
+import pytest
+from scripts.backends import FakeDockingBackend
+from scripts.pdbqt_reader import read_docked_poses
+from scripts.vina_scoring import (VINA_WEIGHTS, ReceptorGrids, VinaScorer, assign_xs_types, read_pdbqt_atoms,
+                                  validate_against_vina, vina_pair_energy)
+
+# Kantong kecil di sekitar origin: karbon, nitrogen akseptor dan oksigen
+RECEPTOR_ATOMS = [('C', 'C', (6.5, 0.0, 0.0)), ('N', 'NA', (-5.5, 1.0, 0.5)), ('O', 'OA', (0.5, 5.8, -0.5)),
+                  ('C', 'C', (0.0, -5.5, 1.0)), ('C', 'C', (1.0, 0.5, 4.5))]
+SCORING_BOX = {'center_x': 0.0, 'center_y': 0.0, 'center_z': 0.0, 'size_x': 12.0, 'size_y': 12.0, 'size_z': 12.0}
+
+
+@pytest.fixture
+def receptor_file(tmp_path):
+    path = tmp_path / 'receptor.pdbqt'
+    lines = [f"ATOM  {i + 1:>5} {name:<4} ALA A {i + 1:>3}    {x:8.3f}{y:8.3f}{z:8.3f}  1.00  0.00     0.000 {ad:<2}"
+             for i, (name, ad, (x, y, z)) in enumerate(RECEPTOR_ATOMS)]
+    path.write_text('\n'.join(lines) + '\n')
+    return str(path)
+
+
+@pytest.fixture
+def centered_poses(ligand_file):
+    poses = read_docked_poses(ligand_file)
+    coords = poses['coords'][0] - poses['coords'][0].mean(axis=0)
+    rotation = np.array([[0.0, -1.0, 0.0], [1.0, 0.0, 0.0], [0.0, 0.0, 1.0]])
+    poses['coords'] = np.array([coords, coords @ rotation.T + [0.5, 0.0, 0.0]], dtype=np.float32)
+    return poses
+
+
+def direct_score(receptor_file, poses):
+    """Skor Vina tanpa grid: jumlah energi pasangan atom ligan-receptor"""
+    receptor_coords, receptor_types, _ = read_pdbqt_atoms(receptor_file)
+    receptor_xs = assign_xs_types(receptor_types, receptor_coords)
+    ligand_xs = assign_xs_types(poses['atom_types'], poses['coords'][0])
+    scores = []
+    for coords in poses['coords']:
+        total = 0.0
+        for xs_ligand, atom in zip(ligand_xs, coords):
+            if xs_ligand is None:
+                continue
+            for xs_receptor, receptor_atom in zip(receptor_xs, receptor_coords):
+                total += float(vina_pair_energy(np.linalg.norm(atom - receptor_atom), xs_ligand, xs_receptor))
+        scores.append(total / (1.0 + VINA_WEIGHTS['rot'] * 1))
+    return np.array(scores)
+
+
+def test_grid_score_matches_direct_sum(receptor_file, centered_poses, logger):
+    scorer = VinaScorer(receptor_file, SCORING_BOX, logger, spacing=0.25)
+    np.testing.assert_allclose(scorer.score_poses(centered_poses), direct_score(receptor_file, centered_poses),
+                               atol=0.02)
+
+
+def test_outside_box_is_penalized(receptor_file, centered_poses, logger):
+    scorer = VinaScorer(receptor_file, SCORING_BOX, logger)
+    inside = scorer.score_poses(centered_poses)
+    centered_poses['coords'] = centered_poses['coords'] + np.float32(10.0)
+    assert (scorer.score_poses(centered_poses) > inside + 1.0).all()
+
+
+def test_maps_cached_on_disk(tmp_path, receptor_file, centered_poses, logger, monkeypatch):
+    cache_dir = str(tmp_path / 'maps')
+    scores = VinaScorer(receptor_file, SCORING_BOX, logger, cache_dir=cache_dir).score_poses(centered_poses)
+
+    def fail(*args, **kwargs):
+        raise AssertionError('maps should come from the cache')
+    monkeypatch.setattr(ReceptorGrids, 'compute_maps', fail)
+    cached = VinaScorer(receptor_file, SCORING_BOX, logger, cache_dir=cache_dir).score_poses(centered_poses)
+    np.testing.assert_allclose(cached, scores)
+    # Box lain -> key cache lain
+    with pytest.raises(AssertionError):
+        VinaScorer(receptor_file, dict(SCORING_BOX, center_x=1.0), logger, cache_dir=cache_dir).score_poses(
+            centered_poses)
+
+
+class SiteScorer:
+    """Scorer uji: skor tetap per site"""
+
+    def __init__(self, score):
+        self.score = score
+
+    def score_poses(self, poses):
+        return np.full(len(poses['coords']), self.score)
+
+
+def test_validation_scores_each_site_in_its_box(tmp_path, ligand_file, docking_config, logger, monkeypatch):
+    # vina palsu: skor = -center_x, sehingga box yang dipakai terlihat di hasil
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir()
+    vina = bin_dir / 'vina'
+    vina.write_text('#!/bin/sh\nwhile [ $# -gt 0 ]; do [ "$1" = "--center_x" ] && cx=$2; shift; done\n'
+                    'echo "Estimated Free Energy of Binding   : -$cx (kcal/mol)"\n')
+    vina.chmod(0o755)
+    monkeypatch.setenv('PATH', f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+
+    site_configs = {'default': dict(docking_config, center_x=10.0), 'allosteric': dict(docking_config, center_x=3.0)}
+    docked_files = {}
+    backend = FakeDockingBackend(logger)
+    for site, site_config in site_configs.items():
+        docked_file = str(tmp_path / f"phenol_{site}.pdbqt")
+        backend.dock('receptor.pdbqt', ligand_file, docked_file, None, dict(site_config, num_modes=2), 60)
+        docked_files[('phenol', site)] = docked_file
+    scorers = {'default': SiteScorer(-10.0), 'allosteric': SiteScorer(-3.5)}
+
+    output_csv = str(tmp_path / 'validation.csv')
+    stats = validate_against_vina(scorers, 'receptor.pdbqt', docked_files, site_configs, logger, output_csv)
+
+    assert stats['n'] == 4
+    assert stats['mae'] == pytest.approx(0.25)
+    with open(output_csv) as f:
+        rows = list(csv.DictReader(f))
+    assert sorted((row['site'], row['pose'], row['vina_score_only']) for row in rows) == [
+        ('allosteric', '1', '-3.000'), ('allosteric', '2', '-3.000'),
+        ('default', '1', '-10.000'), ('default', '2', '-10.000')]
@@ -0,0 +1,55 @@
+import os
+import glob
+import pytest
+from scripts.backends import FakeDockingBackend
+from scripts.docking import AutoDockVina
+from scripts.pdbqt_reader import read_docked_poses
+from scripts.results_store import ResultsStore
+from scripts.warm_start import WarmStartPlanner
+
+WARM_CONFIG = {'previous_receptor': None, 'top_k': 3, 'exhaustiveness': 4, 'box_padding': 4.0,
+               'drift_threshold': 1.0}
+
+
+@pytest.fixture
+def previous_run(tmp_path, ligand_file, docking_config, logger):
+    """Run sebelumnya: site default dengan skor asli, site allosteric dengan skor lama jauh lebih baik"""
+    previous_dir = tmp_path / 'previous'
+    previous_dir.mkdir()
+    results_store = ResultsStore(str(tmp_path / 'results.sqlite'), logger)
+    for site, offset in (('default', 0.0), ('allosteric', -10.0)):
+        output_file = str(previous_dir / f"phenol_{site}_docked.pdbqt")
+        FakeDockingBackend(logger).dock('receptor.pdbqt', ligand_file, output_file, None, docking_config, 60)
+        energies = read_docked_poses(output_file, scored_only=True)['energies'] + offset
+        results_store.add_results([('phenol', {'output_file': output_file, 'site': site,
+                                               'binding_affinities': energies.tolist()})], 'receptor')
+    return results_store
+
+
+def test_seed_reduces_search_around_previous_pose(tmp_path, previous_run, docking_config, logger):
+    planner = WarmStartPlanner(previous_run, str(tmp_path), logger, WARM_CONFIG, 'receptor')
+    seed = planner.seed('phenol', 'default', docking_config)
+    assert len(read_docked_poses(seed['seed_file'])['energies']) == WARM_CONFIG['top_k']
+    assert seed['edge'] < docking_config['size_x'] and seed['exhaustiveness'] == 4
+    assert seed['previous_affinity'] == previous_run.query(receptor='receptor', best_pose_only=True).set_index(
+        'site').loc['default', 'affinity']
+    # Tanpa hasil sebelumnya: docking biasa
+    assert planner.seed('aspirin', 'default', docking_config) is None
+
+
+def test_drift_escalates_to_full_docking(tmp_path, previous_run, ligand_file, docking_config, logger):
+    work_dir = tmp_path / 'work'
+    work_dir.mkdir()
+    planner = WarmStartPlanner(previous_run, str(work_dir), logger, WARM_CONFIG, 'receptor')
+    docker = AutoDockVina(str(work_dir), logger, backend=FakeDockingBackend(logger), warm_start=planner)
+
+    warm = docker.run_vina_docking('receptor.pdbqt', ligand_file, 'phenol', docking_config, site='default')
+    assert warm['warm_start'] == 'warm' and abs(warm['score_drift']) <= WARM_CONFIG['drift_threshold']
+
+    escalated = docker.run_vina_docking('receptor.pdbqt', ligand_file, 'phenol', docking_config, site='allosteric')
+    assert escalated['warm_start'] == 'escalated' and escalated['score_drift'] > WARM_CONFIG['drift_threshold']
+    assert len(escalated['binding_affinities']) > 1
+
+    assert planner.summary() == {'warm': 1, 'escalated': 1}
+    # Seed file warm start dihapus setelah job selesai
+    assert glob.glob(os.path.join(str(work_dir), '*_warm.pdbqt')) == []
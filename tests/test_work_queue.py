@@ -0,0 +1,95 @@
+import time
+import logging
+import multiprocessing
+from scripts.work_queue import WorkQueue, LeaseHeartbeat
+
+LIGANDS = {f"L{i}": f"/ligands/L{i}.pdbqt" for i in range(12)}
+
+
+def create_queue(tmp_path, logger, **kwargs):
+    queue = WorkQueue(str(tmp_path / 'queue.sqlite'), logger, **kwargs)
+    queue.initialize('receptor.pdbqt', {'exhaustiveness': 8}, sites={'hinge': {'center_x': 1.0}})
+    return queue
+
+
+def drain(db_file, worker_id):
+    """Worker lokal: ambil task sampai antrian kosong, hasil = ligan yang dikerjakan"""
+    queue = WorkQueue(db_file, logging.getLogger('tests'))
+    while True:
+        task = queue.claim(worker_id)
+        if task is None:
+            return
+        task_id, ligand_files = task
+        time.sleep(0.01)
+        queue.complete(task_id, worker_id, {name: {'worker': worker_id} for name in ligand_files})
+
+
+def test_settings_round_trip(tmp_path, logger):
+    queue = create_queue(tmp_path, logger)
+    settings = queue.get_settings()
+    assert settings['protein_file'] == 'receptor.pdbqt'
+    assert settings['sites'] == {'hinge': {'center_x': 1.0}}
+    assert settings['budget_config'] is None
+
+
+def test_worker_processes_drain_queue_once(tmp_path, logger):
+    queue = create_queue(tmp_path, logger)
+    assert queue.enqueue(LIGANDS, chunk_size=2) == 6
+
+    workers = [multiprocessing.Process(target=drain, args=(queue.db_file, f"worker{i}")) for i in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(30)
+        assert worker.exitcode == 0
+
+    assert queue.status() == {'done': 6}
+    results = queue.collect_results()
+    assert sorted(results) == sorted(LIGANDS)
+
+
+def test_stale_lease_is_taken_over(tmp_path, logger):
+    queue = create_queue(tmp_path, logger, lease_seconds=0.2)
+    queue.enqueue(LIGANDS, chunk_size=len(LIGANDS))
+    task_id, _ = queue.claim('crashed')
+    assert queue.claim('other') is None
+
+    time.sleep(0.3)
+    assert queue.claim('other')[0] == task_id
+    # Worker lama kembali setelah lease diambil alih: hasilnya dibuang
+    assert not queue.heartbeat(task_id, 'crashed')
+    assert not queue.complete(task_id, 'crashed', {'L0': {}})
+    assert queue.complete(task_id, 'other', {'L0': {}})
+    assert queue.status() == {'done': 1}
+
+
+def test_expired_too_often_fails(tmp_path, logger):
+    queue = create_queue(tmp_path, logger, lease_seconds=0.05, max_attempts=2)
+    queue.enqueue({'L0': 'L0.pdbqt'})
+    for worker_id in ('a', 'b'):
+        assert queue.claim(worker_id) is not None
+        time.sleep(0.1)
+    assert queue.claim('c') is None
+    assert queue.status() == {'failed': 1}
+
+
+def test_fail_requeues_until_max_attempts(tmp_path, logger):
+    queue = create_queue(tmp_path, logger, max_attempts=2)
+    queue.enqueue({'L0': 'L0.pdbqt'})
+    task_id, _ = queue.claim('a')
+    queue.fail(task_id, 'a', RuntimeError('vina crashed'))
+    assert queue.status() == {'pending': 1}
+    task_id, _ = queue.claim('b')
+    queue.fail(task_id, 'b', RuntimeError('vina crashed'))
+    assert queue.status() == {'failed': 1}
+
+
+def test_heartbeat_keeps_lease(tmp_path, logger):
+    queue = create_queue(tmp_path, logger, lease_seconds=0.3)
+    queue.enqueue({'L0': 'L0.pdbqt'})
+    task_id, _ = queue.claim('a')
+    with LeaseHeartbeat(queue, task_id, 'a', 0.05) as heartbeat:
+        time.sleep(0.6)
+        assert queue.claim('b') is None
+    assert not heartbeat.lease_lost
+    assert queue.complete(task_id, 'a', {'L0': {}})